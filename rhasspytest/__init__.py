@@ -0,0 +1,67 @@
+"""Performance tools for testing Rhasspy."""
+import json
+import os
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class RhasspyConnection:
+    """Location of a running Rhasspy instance."""
+
+    http_host: str = "localhost"
+    http_port: int = 12101
+    mqtt_host: str = "localhost"
+    mqtt_port: int = 1883
+
+    @classmethod
+    def from_env(cls) -> "RhasspyConnection":
+        """Create connection using the same environment variables as the tests."""
+        http_host = os.environ.get("RHASSPY_HTTP_HOST", "localhost")
+        return RhasspyConnection(
+            http_host=http_host,
+            http_port=int(os.environ.get("RHASSPY_HTTP_PORT") or 12101),
+            mqtt_host=os.environ.get("RHASSPY_MQTT_HOST", http_host),
+            mqtt_port=int(os.environ.get("RHASSPY_MQTT_PORT") or 1883),
+        )
+
+    def api_url(self, fragment: str) -> str:
+        """Get URL of HTTP API endpoint."""
+        return f"http://{self.http_host}:{self.http_port}/api/{fragment}"
+
+    def ws_url(self, fragment: str) -> str:
+        """Get URL of websocket API endpoint."""
+        return f"ws://{self.http_host}:{self.http_port}/api/{fragment}"
+
+
+# -----------------------------------------------------------------------------
+
+
+def load_profile(profile_path: typing.Union[str, Path]) -> typing.Dict[str, typing.Any]:
+    """Load a test profile.json (empty if missing)."""
+    profile_path = Path(profile_path)
+    if profile_path.is_dir():
+        profile_path = profile_path / "profile.json"
+
+    if not profile_path.is_file():
+        return {}
+
+    with open(profile_path, "r") as profile_file:
+        return json.load(profile_file)
+
+
+def get_system(profile: typing.Dict[str, typing.Any], section: str) -> str:
+    """Get configured system for a profile section (e.g., speech_to_text)."""
+    return str(profile.get(section, {}).get("system", "dummy"))
+
+
+def write_report(report: typing.Any, output_path: typing.Optional[Path] = None):
+    """Write JSON report to a file or stdout (indented like jq)."""
+    if output_path is None:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w") as output_file:
+        json.dump(report, output_file, indent=2, ensure_ascii=False)
@@ -0,0 +1,1940 @@
+"""Command-line interface to Rhasspy performance tools."""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+from . import RhasspyConnection, get_system, load_profile, write_report
+
+_LOGGER = logging.getLogger("rhasspytest")
+
+DEFAULT_HISTORY_DB = os.environ.get(
+    "RHASSPY_HISTORY_DB",
+    str(Path(__file__).parent.parent / "history" / "history.db"),
+)
+
+# -----------------------------------------------------------------------------
+
+
+def main():
+    """Main method."""
+    parser = argparse.ArgumentParser(prog="rhasspytest")
+    parser.add_argument(
+        "--debug", action="store_true", help="Print DEBUG messages to the console"
+    )
+
+    sub_parsers = parser.add_subparsers()
+    sub_parsers.required = True
+    sub_parsers.dest = "command"
+
+    # -------------------------------------------------------------------------
+
+    wait_ready_parser = sub_parsers.add_parser(
+        "wait-ready", help="Block until Rhasspy services answer MQTT probes"
+    )
+    wait_ready_parser.add_argument(
+        "--profile", required=True, help="Path to test profile directory or JSON"
+    )
+    wait_ready_parser.add_argument(
+        "--wav-dir", required=True, help="Directory with WAV/JSON probe samples"
+    )
+    wait_ready_parser.add_argument(
+        "--require-success",
+        action="store_true",
+        help="Wait for the expected intent and a transcription (after training)",
+    )
+    wait_ready_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60,
+        help="Seconds to wait before failing (default: 60)",
+    )
+    wait_ready_parser.set_defaults(func=wait_ready)
+
+    # -------------------------------------------------------------------------
+
+    archive_corpus_parser = sub_parsers.add_parser(
+        "archive-corpus", help="Index a WAV corpus for streamed evaluation"
+    )
+    archive_corpus_parser.add_argument(
+        "--wav-dir", required=True, help="Directory with WAV/JSON files"
+    )
+    archive_corpus_parser.add_argument(
+        "--output", required=True, help="Path to write archive index JSON"
+    )
+    archive_corpus_parser.set_defaults(func=archive_corpus)
+
+    # -------------------------------------------------------------------------
+
+    evaluate_parser = sub_parsers.add_parser(
+        "evaluate", help="Stream a WAV corpus to /api/evaluate"
+    )
+    evaluate_parser.add_argument(
+        "--wav-dir", required=True, help="Directory with WAV/JSON files"
+    )
+    evaluate_parser.add_argument(
+        "--archive-index",
+        help="Archive index from archive-corpus (re-built if corpus changed)",
+    )
+    evaluate_parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Seconds to wait for report (default: no limit)",
+    )
+    evaluate_parser.add_argument(
+        "--replica-port",
+        type=int,
+        action="append",
+        help="HTTP port of another replica of the same trained profile "
+        "(repeatable); shards of the corpus are evaluated in parallel",
+    )
+    evaluate_parser.add_argument(
+        "--shards", type=int, help="Number of shards (default: number of replicas)"
+    )
+    evaluate_parser.add_argument(
+        "--shard-output", help="Path to write JSON summary of shards"
+    )
+    evaluate_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    add_selection_args(evaluate_parser)
+    evaluate_parser.set_defaults(func=evaluate_corpus)
+
+    # -------------------------------------------------------------------------
+
+    score_parser = sub_parsers.add_parser(
+        "score", help="Score recognition results locally (same as /api/evaluate)"
+    )
+    score_parser.add_argument(
+        "--wav-dir", required=True, help="Directory with expected WAV/JSON files"
+    )
+    score_parser.add_argument(
+        "--hypotheses",
+        required=True,
+        help="JSON object of WAV name to recognition result (or a report.json)",
+    )
+    score_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    score_parser.set_defaults(func=score_results)
+
+    # -------------------------------------------------------------------------
+
+    rescore_parser = sub_parsers.add_parser(
+        "rescore", help="Check local scoring against existing report.json files"
+    )
+    rescore_parser.add_argument("report", nargs="+", help="Path to report.json")
+    rescore_parser.set_defaults(func=rescore)
+
+    # -------------------------------------------------------------------------
+
+    manifest_update_parser = sub_parsers.add_parser(
+        "manifest-update", help="Create or incrementally update a corpus manifest"
+    )
+    manifest_update_parser.add_argument(
+        "--wav-dir", required=True, help="Directory with WAV/JSON files"
+    )
+    manifest_update_parser.add_argument(
+        "--manifest", required=True, help="Path to manifest database"
+    )
+    manifest_update_parser.set_defaults(func=manifest_update)
+
+    # -------------------------------------------------------------------------
+
+    manifest_select_parser = sub_parsers.add_parser(
+        "manifest-select", help="Print WAV files of a corpus subset"
+    )
+    manifest_select_parser.add_argument(
+        "--wav-dir", required=True, help="Directory with WAV/JSON files"
+    )
+    manifest_select_parser.add_argument(
+        "--json", action="store_true", help="Print utterances as JSON"
+    )
+    add_selection_args(manifest_select_parser)
+    manifest_select_parser.set_defaults(func=manifest_select)
+
+    # -------------------------------------------------------------------------
+
+    benchmark_evaluate_parser = sub_parsers.add_parser(
+        "benchmark-evaluate", help="Evaluate a WAV corpus repeatedly with warmup"
+    )
+    benchmark_evaluate_parser.add_argument(
+        "--wav-dir", required=True, help="Directory with WAV/JSON files"
+    )
+    benchmark_evaluate_parser.add_argument(
+        "--archive-index",
+        help="Archive index from archive-corpus (re-built if corpus changed)",
+    )
+    add_selection_args(benchmark_evaluate_parser)
+    benchmark_evaluate_parser.add_argument(
+        "--runs", type=int, default=5, help="Number of measured passes (default: 5)"
+    )
+    benchmark_evaluate_parser.add_argument(
+        "--warmup",
+        type=int,
+        default=1,
+        help="Number of discarded passes before measuring (default: 1)",
+    )
+    benchmark_evaluate_parser.add_argument(
+        "--bucket-edges",
+        type=float,
+        nargs="+",
+        help="Upper bounds in seconds of wav_seconds buckets",
+    )
+    benchmark_evaluate_parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="Confidence level of bootstrap intervals (default: 0.95)",
+    )
+    benchmark_evaluate_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    benchmark_evaluate_parser.set_defaults(func=benchmark_evaluate)
+
+    # -------------------------------------------------------------------------
+
+    stream_asr_parser = sub_parsers.add_parser(
+        "stream-asr", help="Measure endpointing latency of streaming ASR"
+    )
+    stream_asr_parser.add_argument(
+        "--wav-dir", required=True, help="Directory with WAV/JSON files"
+    )
+    stream_asr_parser.add_argument(
+        "--profile", help="Path to test profile (recorded in report)"
+    )
+    stream_asr_parser.add_argument(
+        "--transport",
+        action="append",
+        choices=["mqtt", "websocket"],
+        help="Audio transport(s) to measure (default: all)",
+    )
+    stream_asr_parser.add_argument(
+        "--site-id", default="default", help="Hermes site id (default: default)"
+    )
+    stream_asr_parser.add_argument(
+        "--chunk-seconds",
+        type=float,
+        default=0.03,
+        help="Seconds of audio per chunk (default: 0.03)",
+    )
+    stream_asr_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    stream_asr_parser.set_defaults(func=stream_asr)
+
+    # -------------------------------------------------------------------------
+
+    benchmark_wake_parser = sub_parsers.add_parser(
+        "benchmark-wake", help="Measure wake word latency, CPU and capacity"
+    )
+    benchmark_wake_parser.add_argument(
+        "--wake-system",
+        default=os.environ.get("WAKE_SYSTEM", "porcupine"),
+        help="Wake system being tested (default: $WAKE_SYSTEM)",
+    )
+    benchmark_wake_parser.add_argument(
+        "--wav-dir", default="wav/wake/en", help="Directory with wake WAV files"
+    )
+    benchmark_wake_parser.add_argument(
+        "--probe-wav-dir",
+        default="wav/en",
+        help="Directory with WAV/JSON files for readiness probes after restart",
+    )
+    benchmark_wake_parser.add_argument(
+        "--repeats",
+        type=int,
+        default=5,
+        help="Number of single-stream measurements (default: 5)",
+    )
+    benchmark_wake_parser.add_argument(
+        "--max-streams",
+        type=int,
+        default=32,
+        help="Maximum number of concurrent streams to try (default: 32)",
+    )
+    benchmark_wake_parser.add_argument(
+        "--max-latency",
+        type=float,
+        default=1.0,
+        help="p95 detection latency in seconds still considered real time",
+    )
+    benchmark_wake_parser.add_argument(
+        "--sweep-key",
+        help="Profile setting to vary (e.g., wake.raven.probability_threshold)",
+    )
+    benchmark_wake_parser.add_argument(
+        "--sweep-values", nargs="+", default=[], help="Values for --sweep-key"
+    )
+    benchmark_wake_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    benchmark_wake_parser.set_defaults(func=benchmark_wake)
+
+    # -------------------------------------------------------------------------
+
+    soak_wake_parser = sub_parsers.add_parser(
+        "soak-wake", help="Stream background audio and count false activations"
+    )
+    soak_wake_parser.add_argument(
+        "--background-dir",
+        required=True,
+        help="Directory with long WAV files that don't contain the keyword",
+    )
+    soak_wake_parser.add_argument(
+        "--probe-wav-dir",
+        default="wav/en",
+        help="Directory with WAV/JSON files for readiness probes after restart",
+    )
+    soak_wake_parser.add_argument(
+        "--streams",
+        type=int,
+        default=4,
+        help="Number of parallel streams (default: 4)",
+    )
+    soak_wake_parser.add_argument(
+        "--hours",
+        type=float,
+        default=24,
+        help="Total hours of audio to stream (default: 24)",
+    )
+    soak_wake_parser.add_argument(
+        "--max-speed",
+        type=float,
+        default=8,
+        help="Maximum speed of each stream relative to real time (default: 8)",
+    )
+    soak_wake_parser.add_argument(
+        "--target-utilization",
+        type=float,
+        default=0.8,
+        help="CPU cores wake processes may use before slowing down (default: 0.8)",
+    )
+    soak_wake_parser.add_argument(
+        "--sample-seconds",
+        type=float,
+        default=10,
+        help="Seconds between resource samples (default: 10)",
+    )
+    soak_wake_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    soak_wake_parser.set_defaults(func=soak_wake)
+
+    # -------------------------------------------------------------------------
+
+    benchmark_nlu_parser = sub_parsers.add_parser(
+        "benchmark-nlu", help="Measure text-to-intent throughput and latency"
+    )
+    benchmark_nlu_parser.add_argument(
+        "--profile", help="Path to test profile (recorded in report)"
+    )
+    benchmark_nlu_parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 4, 16],
+        help="Numbers of concurrent requests (default: 1 4 16)",
+    )
+    benchmark_nlu_parser.add_argument(
+        "--limit-per-intent",
+        type=int,
+        default=1000,
+        help="Maximum sentences generated per intent (default: 1000)",
+    )
+    benchmark_nlu_parser.add_argument(
+        "--scale-copies",
+        type=int,
+        nargs="+",
+        default=[],
+        help="Retrain with this many copies of every intent and measure again",
+    )
+    benchmark_nlu_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    benchmark_nlu_parser.set_defaults(func=benchmark_nlu)
+
+    # -------------------------------------------------------------------------
+
+    benchmark_slots_parser = sub_parsers.add_parser(
+        "benchmark-slots", help="Measure training cost of growing slot lists"
+    )
+    benchmark_slots_parser.add_argument(
+        "--profile", help="Path to test profile (recorded in report)"
+    )
+    benchmark_slots_parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        help="Numbers of slot values (default: 100 1000 10000 100000)",
+    )
+    benchmark_slots_parser.add_argument(
+        "--wav-dir", help="Directory with WAV files for speech-to-text latency"
+    )
+    benchmark_slots_parser.add_argument(
+        "--queries",
+        type=int,
+        default=100,
+        help="Slot values to recognize after each training (default: 100)",
+    )
+    benchmark_slots_parser.add_argument(
+        "--train-timeout", type=float, help="Seconds to wait for training"
+    )
+    benchmark_slots_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    benchmark_slots_parser.set_defaults(func=benchmark_slots)
+
+    # -------------------------------------------------------------------------
+
+    benchmark_freshness_parser = sub_parsers.add_parser(
+        "benchmark-freshness",
+        help="Measure time from a profile change until it is recognized",
+    )
+    benchmark_freshness_parser.add_argument(
+        "--profile", help="Path to test profile (recorded in report)"
+    )
+    benchmark_freshness_parser.add_argument(
+        "--kinds",
+        nargs="+",
+        choices=["slots", "sentences", "custom_words"],
+        help="Kinds of change (default: all)",
+    )
+    benchmark_freshness_parser.add_argument(
+        "--no-speech",
+        action="store_true",
+        help="Only probe text-to-intent (no text to speech audio)",
+    )
+    benchmark_freshness_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=300.0,
+        help="Seconds to wait for each change to be recognized (default: 300)",
+    )
+    benchmark_freshness_parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.05,
+        help="Seconds between probes (default: 0.05)",
+    )
+    benchmark_freshness_parser.add_argument(
+        "--block-factor",
+        type=float,
+        default=10.0,
+        help="Probes this many times slower than before the change are blocked",
+    )
+    benchmark_freshness_parser.add_argument(
+        "--train-timeout", type=float, help="Seconds to wait for training"
+    )
+    benchmark_freshness_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    benchmark_freshness_parser.set_defaults(func=benchmark_freshness)
+
+    # -------------------------------------------------------------------------
+
+    benchmark_grammar_parser = sub_parsers.add_parser(
+        "benchmark-grammar",
+        help="Measure training and recognition vs synthetic grammar structure",
+    )
+    benchmark_grammar_parser.add_argument(
+        "--profile", help="Path to test profile (recorded in report)"
+    )
+    benchmark_grammar_parser.add_argument(
+        "--profile-dir",
+        help="User profile directory of the running instance (for model size)",
+    )
+    benchmark_grammar_parser.add_argument(
+        "--intent-systems",
+        nargs="+",
+        help="Intent systems to switch between (default: profile's own)",
+    )
+    benchmark_grammar_parser.add_argument(
+        "--wav-dir", help="Directory with WAV files (needed for --intent-systems)"
+    )
+    benchmark_grammar_parser.add_argument(
+        "--depths",
+        type=int,
+        nargs="*",
+        help="Depths of nested alternatives (default: 1 2 3 4)",
+    )
+    benchmark_grammar_parser.add_argument(
+        "--optionals",
+        type=int,
+        nargs="*",
+        help="Numbers of optional words (default: 0 4 8)",
+    )
+    benchmark_grammar_parser.add_argument(
+        "--fan-outs",
+        type=int,
+        nargs="*",
+        help="Numbers of rule references (default: 1 2 4 8)",
+    )
+    benchmark_grammar_parser.add_argument(
+        "--number-ranges",
+        type=int,
+        nargs="*",
+        help="Number range ends, 0..N (default: 10 100 1000 10000 100000)",
+    )
+    benchmark_grammar_parser.add_argument(
+        "--breadth",
+        type=int,
+        default=3,
+        help="Choices per alternative and rule (default: 3)",
+    )
+    benchmark_grammar_parser.add_argument(
+        "--queries",
+        type=int,
+        default=100,
+        help="Sentences to recognize after each training (default: 100)",
+    )
+    benchmark_grammar_parser.add_argument(
+        "--train-timeout", type=float, help="Seconds to wait for training"
+    )
+    benchmark_grammar_parser.add_argument(
+        "--html", help="Also write a static HTML chart to this path"
+    )
+    benchmark_grammar_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    benchmark_grammar_parser.set_defaults(func=benchmark_grammar)
+
+    # -------------------------------------------------------------------------
+
+    benchmark_formats_parser = sub_parsers.add_parser(
+        "benchmark-formats",
+        help="Measure latency and CPU of non-native audio formats",
+    )
+    benchmark_formats_parser.add_argument(
+        "--wav-dir", required=True, help="Directory with WAV/JSON files"
+    )
+    benchmark_formats_parser.add_argument(
+        "--profile", help="Path to test profile (recorded in report)"
+    )
+    benchmark_formats_parser.add_argument(
+        "--wavs",
+        type=int,
+        default=20,
+        help="Number of WAV files to sample from the directory (default: 20)",
+    )
+    benchmark_formats_parser.add_argument(
+        "--sample-rates",
+        type=int,
+        nargs="+",
+        help="Sample rates in Hz (default: 16000 8000 22050 44100 48000)",
+    )
+    benchmark_formats_parser.add_argument(
+        "--channels",
+        type=int,
+        nargs="+",
+        help="Channel counts (default: 1 2)",
+    )
+    benchmark_formats_parser.add_argument(
+        "--sample-widths",
+        type=int,
+        nargs="+",
+        choices=[1, 2, 4],
+        help="Bytes per sample (default: 2 4)",
+    )
+    benchmark_formats_parser.add_argument(
+        "--endpoint",
+        action="append",
+        choices=["speech-to-text", "speech-to-intent"],
+        help="HTTP endpoint(s) to measure (default: all)",
+    )
+    benchmark_formats_parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Don't stream audio frames over MQTT",
+    )
+    benchmark_formats_parser.add_argument(
+        "--site-id", default="default", help="Hermes site id (default: default)"
+    )
+    benchmark_formats_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    benchmark_formats_parser.set_defaults(func=benchmark_formats)
+
+    # -------------------------------------------------------------------------
+
+    benchmark_g2p_parser = sub_parsers.add_parser(
+        "benchmark-g2p", help="Measure bulk word lookups and custom words scaling"
+    )
+    benchmark_g2p_parser.add_argument(
+        "--profile", help="Path to test profile (recorded in report)"
+    )
+    benchmark_g2p_parser.add_argument(
+        "--words",
+        type=int,
+        default=2000,
+        help="Number of unknown words to look up (default: 2000)",
+    )
+    benchmark_g2p_parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 4, 16],
+        help="Numbers of concurrent requests (default: 1 4 16)",
+    )
+    benchmark_g2p_parser.add_argument(
+        "-n",
+        type=int,
+        nargs="+",
+        default=[1, 5],
+        help="Numbers of guessed pronunciations per word (default: 1 5)",
+    )
+    benchmark_g2p_parser.add_argument(
+        "--custom-words-sizes",
+        type=int,
+        nargs="*",
+        help="Numbers of custom words to train with (default: 10000 100000)",
+    )
+    benchmark_g2p_parser.add_argument(
+        "--train-timeout", type=float, help="Seconds to wait for training"
+    )
+    benchmark_g2p_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    benchmark_g2p_parser.set_defaults(func=benchmark_g2p)
+
+    # -------------------------------------------------------------------------
+
+    benchmark_bridge_parser = sub_parsers.add_parser(
+        "benchmark-bridge",
+        help="Measure throughput and backpressure of the /api/mqtt websocket",
+    )
+    benchmark_bridge_parser.add_argument(
+        "--kind",
+        nargs="+",
+        choices=["json", "wav"],
+        default=["json", "wav"],
+        help="Payload kinds (default: json wav)",
+    )
+    benchmark_bridge_parser.add_argument(
+        "--payload-bytes",
+        type=int,
+        nargs="+",
+        default=[256, 4096, 65536, 1048576],
+        help="Payload sizes (default: 256 4096 65536 1048576)",
+    )
+    benchmark_bridge_parser.add_argument(
+        "--rate",
+        type=float,
+        nargs="+",
+        default=[0],
+        help="Messages per second to publish, 0 for maximum (default: 0)",
+    )
+    benchmark_bridge_parser.add_argument(
+        "--read-delay",
+        type=float,
+        nargs="+",
+        default=[0, 0.02],
+        help="Seconds the websocket client waits after each message (default: 0 0.02)",
+    )
+    benchmark_bridge_parser.add_argument(
+        "--messages",
+        type=int,
+        default=1000,
+        help="Messages per stage (default: 1000)",
+    )
+    benchmark_bridge_parser.add_argument(
+        "--max-stage-bytes",
+        type=int,
+        default=64 * 1024 * 1024,
+        help="Fewer messages for large payloads above this total (default: 64 MiB)",
+    )
+    benchmark_bridge_parser.add_argument(
+        "--drain-seconds",
+        type=float,
+        default=5.0,
+        help="Seconds without messages before the rest count as dropped (default: 5)",
+    )
+    benchmark_bridge_parser.add_argument(
+        "--stall-seconds",
+        type=float,
+        default=1.0,
+        help="Gap between messages classified as stalling (default: 1)",
+    )
+    benchmark_bridge_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    benchmark_bridge_parser.set_defaults(func=benchmark_bridge)
+
+    # -------------------------------------------------------------------------
+
+    long_audio_parser = sub_parsers.add_parser(
+        "long-audio", help="Measure recognition of long audio uploaded in chunks"
+    )
+    long_audio_parser.add_argument(
+        "--wav-dir", required=True, help="Directory with WAV files to concatenate"
+    )
+    long_audio_parser.add_argument(
+        "--profile", help="Path to test profile (recorded in report)"
+    )
+    long_audio_parser.add_argument(
+        "--seconds",
+        type=float,
+        nargs="+",
+        default=[1, 10, 30, 60, 120, 300, 600],
+        help="Audio lengths (default: 1 10 30 60 120 300 600)",
+    )
+    long_audio_parser.add_argument(
+        "--endpoint",
+        nargs="+",
+        choices=["speech-to-text", "speech-to-intent"],
+        default=["speech-to-text", "speech-to-intent"],
+        help="HTTP endpoints to post audio to (default: both)",
+    )
+    long_audio_parser.add_argument(
+        "--repeats", type=int, default=1, help="Requests per length (default: 1)"
+    )
+    long_audio_parser.add_argument(
+        "--timeout", type=float, help="Seconds to wait for each response"
+    )
+    long_audio_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    long_audio_parser.set_defaults(func=long_audio)
+
+    # -------------------------------------------------------------------------
+
+    scenario_parser = sub_parsers.add_parser(
+        "scenario", help="Run concurrent mixed workloads from a scenario file"
+    )
+    scenario_parser.add_argument("scenario", help="Path to scenario JSON file")
+    scenario_parser.add_argument(
+        "--wav-dir", required=True, help="Directory with WAV/JSON samples"
+    )
+    scenario_parser.add_argument(
+        "--wake-wav-dir", help="Directory with wake WAVs (<system>_*.wav)"
+    )
+    scenario_parser.add_argument(
+        "--profile", help="Path to test profile (wake system and report)"
+    )
+    scenario_parser.add_argument(
+        "--duration", type=float, help="Override duration of scenario (seconds)"
+    )
+    scenario_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    scenario_parser.set_defaults(func=run_scenario)
+
+    # -------------------------------------------------------------------------
+
+    interleave_parser = sub_parsers.add_parser(
+        "interleave",
+        help="Compare configurations round-robin on dedicated CPU sets",
+    )
+    interleave_parser.add_argument("lang", help="Language of test profiles")
+    interleave_parser.add_argument(
+        "configurations",
+        nargs="+",
+        help="Test profiles to compare as <PROFILE>[@<IMAGE>] (first is baseline)",
+    )
+    interleave_parser.add_argument(
+        "--cpus",
+        action="append",
+        help="CPU set for each configuration in order (e.g., 0-1)",
+    )
+    interleave_parser.add_argument(
+        "--loadgen-cpus",
+        help="CPU set for this process (default: $LOADGEN_CPUS or split evenly)",
+    )
+    interleave_parser.add_argument(
+        "--no-pin", action="store_true", help="Don't restrict CPUs"
+    )
+    interleave_parser.add_argument(
+        "--rounds", type=int, default=5, help="Number of rounds (default: 5)"
+    )
+    interleave_parser.add_argument(
+        "--warmup",
+        type=int,
+        default=1,
+        help="Discarded passes per configuration before measuring (default: 1)",
+    )
+    interleave_parser.add_argument(
+        "--download-url-base",
+        default="http://localhost:5000",
+        help="Where containers download profile artifacts from",
+    )
+    interleave_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    interleave_parser.set_defaults(func=interleave)
+
+    # -------------------------------------------------------------------------
+
+    matrix_generate_parser = sub_parsers.add_parser(
+        "matrix-generate", help="Create test profiles for combinations of settings"
+    )
+    matrix_generate_parser.add_argument("lang", help="Language of test profiles")
+    matrix_generate_parser.add_argument(
+        "--matrix", help="JSON file with base, settings and axes"
+    )
+    matrix_generate_parser.add_argument(
+        "--axis",
+        action="append",
+        default=[],
+        help="Axis as KEY=VALUE,VALUE,... (e.g., intent.system=fsticuffs,fuzzywuzzy)",
+    )
+    matrix_generate_parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        help="Fixed setting as KEY=VALUE for all variants",
+    )
+    matrix_generate_parser.add_argument(
+        "--base", help="Test profile that variants start from (e.g., test_kaldi)"
+    )
+    matrix_generate_parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="Remove previously generated variants first",
+    )
+    matrix_generate_parser.set_defaults(func=matrix_generate)
+
+    matrix_report_parser = sub_parsers.add_parser(
+        "matrix-report", help="Rank generated test profiles by their results"
+    )
+    matrix_report_parser.add_argument("lang", help="Language of test profiles")
+    matrix_report_parser.add_argument(
+        "--rank-by",
+        nargs="+",
+        default=["intent_entity_accuracy", "real_time_factor"],
+        help="Metrics to sort by (default: intent_entity_accuracy real_time_factor)",
+    )
+    matrix_report_parser.add_argument(
+        "--metric",
+        nargs="+",
+        default=[
+            "intent_entity_accuracy",
+            "transcription_accuracy",
+            "word_error_rate",
+            "real_time_factor",
+            "transcribe_seconds",
+            "startup_seconds",
+            "rss_bytes",
+            "cpu_seconds",
+        ],
+        help="Metrics shown in table",
+    )
+    matrix_report_parser.add_argument(
+        "--output", help="Path to write JSON report (table is printed)"
+    )
+    matrix_report_parser.set_defaults(func=matrix_report)
+
+    resource_snapshot_parser = sub_parsers.add_parser(
+        "resource-snapshot", help="Record memory and CPU time used by Rhasspy so far"
+    )
+    resource_snapshot_parser.add_argument(
+        "--output", help="Path to write JSON report (default: stdout)"
+    )
+    resource_snapshot_parser.set_defaults(func=resource_snapshot)
+
+    # -------------------------------------------------------------------------
+
+    history_record_parser = sub_parsers.add_parser(
+        "history-record", help="Store a run's reports in the history database"
+    )
+    history_record_parser.add_argument("lang", help="Language of test profile")
+    history_record_parser.add_argument("profile", help="Name of test profile")
+    history_record_parser.add_argument(
+        "--output-dir", required=True, help="Directory with the run's reports"
+    )
+    history_record_parser.add_argument(
+        "--profile-dir", help="Test profile directory (for speech/intent systems)"
+    )
+    history_record_parser.add_argument(
+        "--image-digest", help="Docker image id/digest of Rhasspy"
+    )
+    history_record_parser.add_argument(
+        "--db", default=DEFAULT_HISTORY_DB, help="Path to SQLite database"
+    )
+    history_record_parser.set_defaults(func=history_record)
+
+    history_trend_parser = sub_parsers.add_parser(
+        "history-trend", help="Print metrics of recent runs for a profile"
+    )
+    history_trend_parser.add_argument("lang", help="Language of test profile")
+    history_trend_parser.add_argument("profile", help="Name of test profile")
+    history_trend_parser.add_argument(
+        "--last", type=int, default=20, help="Number of runs (default: 20)"
+    )
+    history_trend_parser.add_argument(
+        "--metric", action="append", help="Metric(s) to show (default: main ones)"
+    )
+    history_trend_parser.add_argument(
+        "--html", help="Also write a static HTML chart to this path"
+    )
+    history_trend_parser.add_argument(
+        "--db", default=DEFAULT_HISTORY_DB, help="Path to SQLite database"
+    )
+    history_trend_parser.set_defaults(func=history_trend)
+
+    history_outcome_parser = sub_parsers.add_parser(
+        "history-outcome",
+        help="Store pass/fail and duration of a profile run and its tests",
+    )
+    history_outcome_parser.add_argument("lang", help="Language of test profile")
+    history_outcome_parser.add_argument("profile", help="Name of test profile")
+    history_outcome_parser.add_argument(
+        "--failed", action="store_true", help="Profile run failed"
+    )
+    history_outcome_parser.add_argument(
+        "--started",
+        type=float,
+        required=True,
+        help="Start time of the profile run (seconds since epoch)",
+    )
+    history_outcome_parser.add_argument(
+        "--profile-dir", help="Test profile directory (for change detection)"
+    )
+    history_outcome_parser.add_argument(
+        "--timings", help="test_timings.json of the run (for test outcomes)"
+    )
+    history_outcome_parser.add_argument(
+        "--db", default=DEFAULT_HISTORY_DB, help="Path to SQLite database"
+    )
+    history_outcome_parser.set_defaults(func=history_outcome)
+
+    # -------------------------------------------------------------------------
+
+    schedule_parser = sub_parsers.add_parser(
+        "schedule", help="Print test profiles in history-driven order"
+    )
+    _add_schedule_arguments(schedule_parser)
+    schedule_parser.add_argument(
+        "--output", help="Path to write predicted schedule (JSON)"
+    )
+    schedule_parser.set_defaults(func=schedule)
+
+    run_scheduled_parser = sub_parsers.add_parser(
+        "run-scheduled",
+        help="Run test profiles in history-driven order on a pool of workers",
+    )
+    _add_schedule_arguments(run_scheduled_parser)
+    run_scheduled_parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop all profiles on the first failure",
+    )
+    run_scheduled_parser.add_argument(
+        "--log-dir", help="Directory for output of each profile run"
+    )
+    run_scheduled_parser.add_argument(
+        "--output", help="Path to write predicted vs actual schedule (JSON)"
+    )
+    run_scheduled_parser.set_defaults(func=run_scheduled)
+
+    # -------------------------------------------------------------------------
+
+    run_tests_parser = sub_parsers.add_parser(
+        "run-tests", help="Run integration tests concurrently on one event loop"
+    )
+    run_tests_parser.add_argument("test_file", nargs="+", help="Test .py file(s)")
+    run_tests_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of tests running at once (default: 8)",
+    )
+    run_tests_parser.add_argument(
+        "--junit-xml", help="Write JUnit XML report to this file"
+    )
+    run_tests_parser.add_argument(
+        "--timings",
+        help="Write JSON timing summary (ranked by duration) to this file",
+    )
+    run_tests_parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Start no more tests after the first failure",
+    )
+    run_tests_parser.add_argument(
+        "--order-by-history",
+        nargs=2,
+        metavar=("LANG", "PROFILE"),
+        help="Run recently failed or changed tests of a profile first",
+    )
+    run_tests_parser.add_argument(
+        "--db",
+        default=DEFAULT_HISTORY_DB,
+        help="Path to SQLite database (for --order-by-history)",
+    )
+    run_tests_parser.set_defaults(func=run_tests)
+
+    # -------------------------------------------------------------------------
+
+    annotate_parser = sub_parsers.add_parser(
+        "annotate", help="Add detected speech timings to WAV sidecar JSON files"
+    )
+    annotate_parser.add_argument("wav", nargs="+", help="Path(s) to WAV files")
+    annotate_parser.add_argument(
+        "--keyword",
+        action="store_true",
+        help="Annotate end of first utterance as keyword_end_seconds",
+    )
+    annotate_parser.add_argument(
+        "--overwrite", action="store_true", help="Replace existing annotations"
+    )
+    annotate_parser.set_defaults(func=annotate)
+
+    # -------------------------------------------------------------------------
+
+    mqtt_record_parser = sub_parsers.add_parser(
+        "mqtt-record", help="Record MQTT traffic into a binary log"
+    )
+    mqtt_record_parser.add_argument("--output", required=True, help="Path to log")
+    mqtt_record_parser.add_argument(
+        "--topic",
+        action="append",
+        help="Topic (with wildcards) to record (default: #)",
+    )
+    mqtt_record_parser.add_argument(
+        "--seconds",
+        type=float,
+        help="Stop after this many seconds (default: until SIGINT/SIGTERM)",
+    )
+    mqtt_record_parser.set_defaults(func=mqtt_record)
+
+    mqtt_replay_parser = sub_parsers.add_parser(
+        "mqtt-replay", help="Publish a recorded MQTT log with original timing"
+    )
+    mqtt_replay_parser.add_argument("log", help="Path to log from mqtt-record")
+    mqtt_replay_parser.add_argument(
+        "--speed",
+        default="1",
+        help="Speed factor, or 'max' to publish as fast as possible (default: 1)",
+    )
+    mqtt_replay_parser.add_argument(
+        "--topic", action="append", help="Only replay topics (with wildcards)"
+    )
+    mqtt_replay_parser.add_argument(
+        "--exclude", action="append", help="Don't replay topics (with wildcards)"
+    )
+    mqtt_replay_parser.add_argument("--output", help="Path to write JSON report")
+    mqtt_replay_parser.set_defaults(func=mqtt_replay)
+
+    mqtt_dump_parser = sub_parsers.add_parser(
+        "mqtt-dump", help="Summarize or print messages in a recorded MQTT log"
+    )
+    mqtt_dump_parser.add_argument("log", help="Path to log from mqtt-record")
+    mqtt_dump_parser.add_argument(
+        "--messages",
+        action="store_true",
+        help="Print one JSON line per message instead of a summary",
+    )
+    mqtt_dump_parser.set_defaults(func=mqtt_dump)
+
+    # -------------------------------------------------------------------------
+
+    args = parser.parse_args()
+
+    if args.debug:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.INFO)
+
+    _LOGGER.debug(args)
+
+    loadgen_cpus = os.environ.get("LOADGEN_CPUS")
+    if loadgen_cpus and (args.func is not interleave):
+        # Keep load generator off the CPUs given to Rhasspy.
+        # interleave splits all CPUs itself and pins after assigning them.
+        from .host import parse_cpu_list, pin_process
+
+        pin_process(parse_cpu_list(loadgen_cpus))
+
+    args.func(args)
+
+
+# -----------------------------------------------------------------------------
+
+
+def wait_ready(args: argparse.Namespace):
+    """Block until Rhasspy services answer MQTT probes."""
+    from . import startup
+
+    try:
+        timings = startup.wait_ready(
+            RhasspyConnection.from_env(),
+            load_profile(args.profile),
+            Path(args.wav_dir),
+            require_success=args.require_success,
+            timeout=args.timeout,
+        )
+    except startup.ProbeFailed as e:
+        _LOGGER.fatal(e)
+        sys.exit(1)
+
+    json.dump(timings, sys.stdout)
+    print("")
+
+
+def add_selection_args(parser: argparse.ArgumentParser):
+    """Add arguments for selecting a corpus subset from a manifest."""
+    parser.add_argument(
+        "--manifest", help="Corpus manifest database (updated before selecting)"
+    )
+    parser.add_argument(
+        "--intent", action="append", help="Only utterances with intent (repeatable)"
+    )
+    parser.add_argument(
+        "--min-seconds", type=float, help="Only utterances at least this long"
+    )
+    parser.add_argument(
+        "--max-seconds", type=float, help="Only utterances at most this long"
+    )
+    parser.add_argument(
+        "--sample", type=int, help="Hash-stable random sample of this many utterances"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of random sample (default: 0)"
+    )
+
+
+def select_utterances(args: argparse.Namespace):
+    """Update --manifest from --wav-dir and select utterances."""
+    from .manifest import Manifest
+
+    with Manifest(args.manifest) as manifest:
+        manifest.update(Path(args.wav_dir))
+        return manifest.select(
+            intents=args.intent,
+            min_seconds=args.min_seconds,
+            max_seconds=args.max_seconds,
+            sample=args.sample,
+            seed=args.seed,
+        )
+
+
+def load_archive(args: argparse.Namespace):
+    """Corpus archive of --wav-dir (subset if --manifest is given)."""
+    from .archive import CorpusArchive, load_or_build
+
+    if args.manifest:
+        utterances = select_utterances(args)
+        _LOGGER.debug("Selected %s utterance(s)", len(utterances))
+        return CorpusArchive.from_paths(
+            path
+            for u in utterances
+            for path in [u.wav_path, u.json_path]
+            if path.is_file()
+        )
+
+    wav_dir = Path(args.wav_dir)
+    if args.archive_index:
+        return load_or_build(wav_dir, Path(args.archive_index))
+
+    return CorpusArchive.from_dir(wav_dir)
+
+
+def score_results(args: argparse.Namespace):
+    """Score recognition results locally (same as /api/evaluate)."""
+    from . import scoring
+
+    with open(args.hypotheses, "r") as hypotheses_file:
+        hypotheses = json.load(hypotheses_file)
+
+    # Server reports are keyed by path
+    hypotheses = hypotheses.get("actual", hypotheses)
+    actual = {
+        Path(key).name: {k: v for k, v in result.items() if k not in scoring.SCORE_KEYS}
+        for key, result in hypotheses.items()
+    }
+
+    report = scoring.score(scoring.load_expected(Path(args.wav_dir)), actual)
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def rescore(args: argparse.Namespace):
+    """Check local scoring against existing report.json files."""
+    from .scoring import compare_reports, rescore_report
+
+    success = True
+    for report_path in args.report:
+        with open(report_path, "r") as report_file:
+            report = json.load(report_file)
+
+        differences = compare_reports(report, rescore_report(report))
+        if differences:
+            success = False
+            print(report_path, "differs at", *differences)
+        else:
+            print(report_path, "OK")
+
+    if not success:
+        sys.exit(1)
+
+
+def manifest_update(args: argparse.Namespace):
+    """Create or incrementally update a corpus manifest."""
+    from .manifest import Manifest
+
+    with Manifest(args.manifest) as manifest:
+        counts = manifest.update(Path(args.wav_dir))
+        write_report({**counts, "intents": manifest.intent_counts()})
+
+
+def manifest_select(args: argparse.Namespace):
+    """Print WAV files of a corpus subset."""
+    if not args.manifest:
+        _LOGGER.fatal("--manifest is required")
+        sys.exit(1)
+
+    utterances = select_utterances(args)
+    if args.json:
+        write_report(
+            [
+                {
+                    "name": u.name,
+                    "wav_path": str(u.wav_path),
+                    "sha256": u.sha256,
+                    "sample_rate": u.sample_rate,
+                    "seconds": u.seconds,
+                    "text": u.text,
+                    "intent": u.intent,
+                    "entities": u.entities,
+                }
+                for u in utterances
+            ]
+        )
+    else:
+        for utterance in utterances:
+            print(utterance.wav_path)
+
+
+def archive_corpus(args: argparse.Namespace):
+    """Index a WAV corpus for streamed evaluation."""
+    from .archive import load_or_build
+
+    archive = load_or_build(Path(args.wav_dir), Path(args.output))
+    print(archive.sha256, archive.size, len(archive.members))
+
+
+def evaluate_corpus(args: argparse.Namespace):
+    """Stream a WAV corpus to /api/evaluate."""
+    from . import evaluate
+
+    connection = RhasspyConnection.from_env()
+    archive = load_archive(args)
+
+    if args.replica_port:
+        from . import sharding
+
+        try:
+            report, shards = sharding.evaluate_sharded(
+                sharding.replica_connections(connection, args.replica_port),
+                archive,
+                num_shards=args.shards,
+                timeout=args.timeout,
+            )
+        except sharding.ShardError as e:
+            _LOGGER.fatal(e)
+            sys.exit(1)
+
+        if args.shard_output:
+            write_report(
+                {"shards": [shard.to_dict() for shard in shards]},
+                Path(args.shard_output),
+            )
+    else:
+        report = evaluate.evaluate(connection, archive, timeout=args.timeout)
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def benchmark_evaluate(args: argparse.Namespace):
+    """Evaluate a WAV corpus repeatedly with warmup."""
+    from . import evaluate
+
+    report = evaluate.benchmark(
+        RhasspyConnection.from_env(),
+        Path(args.wav_dir),
+        archive=load_archive(args),
+        runs=args.runs,
+        warmup=args.warmup,
+        bucket_edges=args.bucket_edges or evaluate.DEFAULT_BUCKET_EDGES,
+        confidence=args.confidence,
+    )
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def stream_asr(args: argparse.Namespace):
+    """Measure endpointing latency of streaming ASR."""
+    from . import asr_stream
+
+    report = asr_stream.benchmark(
+        RhasspyConnection.from_env(),
+        Path(args.wav_dir),
+        transports=args.transport or asr_stream.TRANSPORTS,
+        site_id=args.site_id,
+        chunk_seconds=args.chunk_seconds,
+    )
+
+    if args.profile:
+        profile = load_profile(args.profile)
+        report["profile"] = Path(args.profile).name
+        report["speech_to_text"] = get_system(profile, "speech_to_text")
+        report["intent"] = get_system(profile, "intent")
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def benchmark_wake(args: argparse.Namespace):
+    """Measure wake word latency, CPU and capacity."""
+    from . import wake
+    from .settings import parse_value
+
+    report = wake.benchmark(
+        RhasspyConnection.from_env(),
+        Path(args.wav_dir),
+        Path(args.probe_wav_dir),
+        args.wake_system,
+        repeats=args.repeats,
+        max_streams=args.max_streams,
+        max_latency=args.max_latency,
+        sweep_key=args.sweep_key,
+        sweep_values=[parse_value(v) for v in args.sweep_values],
+    )
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def soak_wake(args: argparse.Namespace):
+    """Stream background audio and count false activations."""
+    from . import soak
+
+    report = soak.soak(
+        RhasspyConnection.from_env(),
+        Path(args.background_dir),
+        Path(args.probe_wav_dir),
+        num_streams=args.streams,
+        target_hours=args.hours,
+        max_speed=args.max_speed,
+        target_utilization=args.target_utilization,
+        sample_seconds=args.sample_seconds,
+    )
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def benchmark_nlu(args: argparse.Namespace):
+    """Measure text-to-intent throughput and latency."""
+    from . import nlu
+
+    report = nlu.benchmark(
+        RhasspyConnection.from_env(),
+        concurrency_levels=args.concurrency,
+        limit_per_intent=args.limit_per_intent,
+        scale_copies=args.scale_copies,
+    )
+
+    if args.profile:
+        report["profile"] = Path(args.profile).name
+        report["intent"] = get_system(load_profile(args.profile), "intent")
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def benchmark_slots(args: argparse.Namespace):
+    """Measure training cost of growing slot lists."""
+    from . import slots
+
+    report = slots.benchmark(
+        RhasspyConnection.from_env(),
+        sizes=args.sizes or slots.DEFAULT_SIZES,
+        wav_dir=Path(args.wav_dir) if args.wav_dir else None,
+        num_queries=args.queries,
+        train_timeout=args.train_timeout,
+    )
+
+    if args.profile:
+        profile = load_profile(args.profile)
+        report["profile"] = Path(args.profile).name
+        report["speech_to_text"] = get_system(profile, "speech_to_text")
+        report["intent"] = get_system(profile, "intent")
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def benchmark_freshness(args: argparse.Namespace):
+    """Measure time from a profile change until it is recognized."""
+    from . import freshness
+
+    report = freshness.FreshnessBenchmark(
+        RhasspyConnection.from_env(),
+        speech=not args.no_speech,
+        timeout=args.timeout,
+        interval=args.interval,
+        block_factor=args.block_factor,
+        train_timeout=args.train_timeout,
+    ).run(kinds=args.kinds or freshness.KINDS)
+
+    if args.profile:
+        profile = load_profile(args.profile)
+        report["profile"] = Path(args.profile).name
+        report["speech_to_text"] = get_system(profile, "speech_to_text")
+        report["intent"] = get_system(profile, "intent")
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def benchmark_grammar(args: argparse.Namespace):
+    """Measure training and recognition vs synthetic grammar structure."""
+    from . import grammar_complexity
+
+    specs = grammar_complexity.make_specs(
+        depths=grammar_complexity.DEFAULT_DEPTHS
+        if args.depths is None
+        else args.depths,
+        optionals=grammar_complexity.DEFAULT_OPTIONALS
+        if args.optionals is None
+        else args.optionals,
+        fan_outs=grammar_complexity.DEFAULT_FAN_OUTS
+        if args.fan_outs is None
+        else args.fan_outs,
+        number_ranges=grammar_complexity.DEFAULT_NUMBER_RANGES
+        if args.number_ranges is None
+        else args.number_ranges,
+        breadth=args.breadth,
+    )
+
+    if args.intent_systems and not args.wav_dir:
+        _LOGGER.fatal("--wav-dir is required with --intent-systems")
+        sys.exit(1)
+
+    report = grammar_complexity.benchmark(
+        RhasspyConnection.from_env(),
+        specs,
+        intent_systems=args.intent_systems or [None],
+        wav_dir=Path(args.wav_dir) if args.wav_dir else None,
+        profile_dir=Path(args.profile_dir) if args.profile_dir else None,
+        num_queries=args.queries,
+        train_timeout=args.train_timeout,
+    )
+
+    if args.profile:
+        profile = load_profile(args.profile)
+        report["profile"] = Path(args.profile).name
+        report["speech_to_text"] = get_system(profile, "speech_to_text")
+        report["intent"] = get_system(profile, "intent")
+
+        # Name the profile's own system in charts
+        if "profile" in report["intent_systems"]:
+            report["intent_systems"][report["intent"]] = report["intent_systems"].pop(
+                "profile"
+            )
+
+    if args.html:
+        grammar_complexity.write_html(report, Path(args.html))
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def benchmark_formats(args: argparse.Namespace):
+    """Measure latency and CPU of non-native audio formats."""
+    from . import formats
+
+    wav_paths = formats.sample_wavs(Path(args.wav_dir), args.wavs)
+    if not wav_paths:
+        _LOGGER.fatal("No WAV files in %s", args.wav_dir)
+        sys.exit(1)
+
+    report = formats.benchmark(
+        RhasspyConnection.from_env(),
+        wav_paths,
+        formats.make_formats(
+            sample_rates=args.sample_rates or formats.DEFAULT_SAMPLE_RATES,
+            channels=args.channels or formats.DEFAULT_CHANNELS,
+            sample_widths=args.sample_widths or formats.DEFAULT_SAMPLE_WIDTHS,
+        ),
+        endpoints=args.endpoint or formats.ENDPOINTS,
+        stream=not args.no_stream,
+        site_id=args.site_id,
+    )
+
+    if args.profile:
+        profile = load_profile(args.profile)
+        report["profile"] = Path(args.profile).name
+        report["speech_to_text"] = get_system(profile, "speech_to_text")
+        report["intent"] = get_system(profile, "intent")
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def benchmark_g2p(args: argparse.Namespace):
+    """Measure bulk word lookups and custom words scaling."""
+    from . import g2p
+
+    report = g2p.benchmark(
+        RhasspyConnection.from_env(),
+        num_words=args.words,
+        concurrency_levels=args.concurrency,
+        num_pronunciations=args.n,
+        custom_words_sizes=g2p.DEFAULT_CUSTOM_WORDS_SIZES
+        if args.custom_words_sizes is None
+        else args.custom_words_sizes,
+        train_timeout=args.train_timeout,
+    )
+
+    if args.profile:
+        report["profile"] = Path(args.profile).name
+        report["speech_to_text"] = get_system(
+            load_profile(args.profile), "speech_to_text"
+        )
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def benchmark_bridge(args: argparse.Namespace):
+    """Measure throughput and backpressure of the /api/mqtt websocket."""
+    from . import ws_bridge
+
+    stages = ws_bridge.make_stages(
+        args.kind,
+        args.payload_bytes,
+        args.rate,
+        args.read_delay,
+        messages=args.messages,
+        max_stage_bytes=args.max_stage_bytes,
+    )
+    report = ws_bridge.benchmark(
+        RhasspyConnection.from_env(),
+        stages,
+        drain_seconds=args.drain_seconds,
+        stall_seconds=args.stall_seconds,
+    )
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def long_audio(args: argparse.Namespace):
+    """Measure recognition of long audio uploaded in chunks."""
+    from . import long_audio as long_audio_benchmark
+
+    report = long_audio_benchmark.benchmark(
+        RhasspyConnection.from_env(),
+        Path(args.wav_dir).glob("*.wav"),
+        lengths=args.seconds,
+        endpoints=args.endpoint,
+        repeats=args.repeats,
+        timeout=args.timeout,
+    )
+
+    if args.profile:
+        report["profile"] = Path(args.profile).name
+        report["speech_to_text"] = get_system(
+            load_profile(args.profile), "speech_to_text"
+        )
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def run_scenario(args: argparse.Namespace):
+    """Run concurrent mixed workloads from a scenario file."""
+    from . import scenario as scenario_module
+
+    scenario = scenario_module.load_scenario(Path(args.scenario))
+    if args.duration is not None:
+        scenario["duration"] = args.duration
+
+    profile = load_profile(args.profile) if args.profile else {}
+    wake_system = os.environ.get("WAKE_SYSTEM") or get_system(profile, "wake")
+    engine = scenario_module.ScenarioEngine(
+        RhasspyConnection.from_env(),
+        scenario,
+        Path(args.wav_dir),
+        wake_wav_dir=Path(args.wake_wav_dir) if args.wake_wav_dir else None,
+        wake_system=wake_system if wake_system != "dummy" else None,
+    )
+    report = engine.run()
+    report["scenario"] = Path(args.scenario).name
+
+    if args.profile:
+        report["profile"] = Path(args.profile).name
+        report["speech_to_text"] = get_system(profile, "speech_to_text")
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def interleave(args: argparse.Namespace):
+    """Compare configurations round-robin on dedicated CPU sets."""
+    from . import interleave as interleave_module
+    from .host import parse_cpu_list
+
+    base_dir = Path(__file__).parent.parent
+    configurations = [
+        interleave_module.Configuration.parse(spec, base_dir / "profiles" / args.lang)
+        for spec in args.configurations
+    ]
+
+    for config, cpu_list in zip(configurations, args.cpus or []):
+        config.cpus = parse_cpu_list(cpu_list)
+
+    loadgen_cpus = args.loadgen_cpus or os.environ.get("LOADGEN_CPUS")
+    report = interleave_module.interleave(
+        args.lang,
+        configurations,
+        base_dir / "wav" / args.lang,
+        rounds=args.rounds,
+        warmup=args.warmup,
+        loadgen_cpus=parse_cpu_list(loadgen_cpus) if loadgen_cpus else None,
+        pin=not args.no_pin,
+        download_url_base=args.download_url_base,
+    )
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def matrix_generate(args: argparse.Namespace):
+    """Create test profiles for combinations of settings."""
+    from . import matrix
+    from .settings import parse_value
+
+    spec = matrix.load_matrix(Path(args.matrix)) if args.matrix else {"axes": {}}
+    axes = dict(spec["axes"])
+    for axis in args.axis:
+        key, _, values = axis.partition("=")
+        axes[key] = [parse_value(value) for value in values.split(",")]
+
+    settings = dict(spec.get("settings", {}))
+    for setting in args.set:
+        key, _, value = setting.partition("=")
+        settings[key] = parse_value(value)
+
+    if not axes:
+        _LOGGER.fatal("No axes (use --matrix or --axis)")
+        sys.exit(1)
+
+    profiles_dir = Path(__file__).parent.parent / "profiles" / args.lang
+    base_name = args.base or spec.get("base")
+    base_dir = (profiles_dir / base_name) if base_name else None
+    if (base_dir is not None) and (not base_dir.is_dir()):
+        _LOGGER.fatal("Base profile does not exist: %s", base_dir)
+        sys.exit(1)
+
+    if args.clean:
+        for variant_dir in matrix.clean_variants(profiles_dir):
+            _LOGGER.debug("Removed %s", variant_dir)
+
+    variants = matrix.expand_axes(axes, settings)
+    for variant_dir in matrix.write_variants(variants, profiles_dir, base_dir):
+        print(variant_dir.name)
+
+
+def matrix_report(args: argparse.Namespace):
+    """Rank generated test profiles by their results."""
+    from . import matrix
+
+    base_dir = Path(__file__).parent.parent
+    rows = matrix.collect_variants(
+        base_dir / "profiles" / args.lang, base_dir / "output" / args.lang
+    )
+    ranked = matrix.rank_variants(rows, rank_metrics=args.rank_by)
+    print(matrix.format_table(ranked, args.metric))
+
+    if args.output:
+        write_report(
+            {"lang": args.lang, "rank_by": args.rank_by, "variants": ranked},
+            Path(args.output),
+        )
+
+
+def resource_snapshot(args: argparse.Namespace):
+    """Record memory and CPU time used by Rhasspy so far."""
+    import dataclasses
+
+    from .resources import get_process_tree, get_rhasspy_pid, sample_processes
+
+    pid = get_rhasspy_pid()
+    if pid is None:
+        _LOGGER.fatal("Set RHASSPY_PID or RHASSPY_CONTAINER_ID")
+        sys.exit(1)
+
+    sample = sample_processes(get_process_tree(pid))
+    write_report(dataclasses.asdict(sample), Path(args.output) if args.output else None)
+
+
+def history_record(args: argparse.Namespace):
+    """Store a run's reports in the history database."""
+    from . import history
+
+    with history.HistoryStore(args.db) as store:
+        run_id = store.record(
+            args.lang,
+            args.profile,
+            Path(args.output_dir),
+            profile_dir=Path(args.profile_dir) if args.profile_dir else None,
+            git_commit=history.get_git_commit(Path(__file__).parent.parent),
+            image_digest=args.image_digest,
+        )
+
+    _LOGGER.debug("Recorded run %s", run_id)
+
+
+def history_trend(args: argparse.Namespace):
+    """Print metrics of recent runs for a profile."""
+    from . import history
+
+    metrics = args.metric or history.DEFAULT_TREND_METRICS
+    with history.HistoryStore(args.db) as store:
+        runs = store.last_runs(args.lang, args.profile, limit=args.last)
+
+    if not runs:
+        _LOGGER.fatal("No runs for %s/%s", args.lang, args.profile)
+        sys.exit(1)
+
+    print(history.format_trend(runs, metrics))
+
+    if args.html:
+        history.write_html(
+            runs, metrics, f"{args.lang}/{args.profile}", Path(args.html)
+        )
+
+
+def history_outcome(args: argparse.Namespace):
+    """Store pass/fail and duration of a profile run and its tests."""
+    from . import history
+
+    profile_dir = Path(args.profile_dir) if args.profile_dir else None
+    outcomes = [
+        history.Outcome(
+            test_id="",
+            passed=not args.failed,
+            seconds=time.time() - args.started,
+            fingerprint=history.file_fingerprint(profile_dir) if profile_dir else None,
+        )
+    ]
+
+    if args.timings:
+        outcomes.extend(
+            history.collect_test_outcomes(
+                Path(args.timings),
+                test_dir=(profile_dir / "tests") if profile_dir else None,
+            )
+        )
+
+    with history.HistoryStore(args.db) as store:
+        store.record_outcomes(args.lang, args.profile, outcomes, timestamp=args.started)
+
+
+def _add_schedule_arguments(parser: argparse.ArgumentParser):
+    """Arguments shared by schedule and run-scheduled."""
+    parser.add_argument("lang", help="Language of test profiles")
+    parser.add_argument(
+        "profile", nargs="*", help="Names of test profiles (default: test_*)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of profiles to run at once (default: 1)",
+    )
+    parser.add_argument(
+        "--history-runs",
+        type=int,
+        default=10,
+        help="Recent runs to predict from (default: 10)",
+    )
+    parser.add_argument(
+        "--db", default=DEFAULT_HISTORY_DB, help="Path to SQLite database"
+    )
+
+
+def _plan_profiles(args: argparse.Namespace):
+    """Predicted schedule of test profiles."""
+    from . import history
+    from .schedule import order_jobs, plan, predict_jobs
+
+    profiles_dir = Path(__file__).parent.parent / "profiles" / args.lang
+    profile_names = args.profile or sorted(
+        p.name for p in profiles_dir.glob("test_*") if p.is_dir()
+    )
+
+    fingerprints = {}
+    for name in profile_names:
+        profile_dir = profiles_dir / name
+        if not profile_dir.is_dir():
+            _LOGGER.fatal("Directory does not exist: %s", profile_dir)
+            sys.exit(1)
+
+        fingerprints[name] = history.file_fingerprint(profile_dir)
+
+    with history.HistoryStore(args.db) as store:
+        jobs = predict_jobs(store, args.lang, fingerprints, args.history_runs)
+
+    return plan(order_jobs(jobs), args.workers)
+
+
+def schedule(args: argparse.Namespace):
+    """Print test profiles in history-driven order."""
+    from .schedule import schedule_report
+
+    predicted = _plan_profiles(args)
+    for slot in predicted:
+        print(slot.job.name)
+
+    if args.output:
+        write_report(schedule_report(predicted, [], args.workers), Path(args.output))
+
+
+def run_scheduled(args: argparse.Namespace):
+    """Run test profiles in history-driven order on a pool of workers."""
+    from .schedule import JobPool, format_schedule, schedule_report
+
+    predicted = _plan_profiles(args)
+    run_script = Path(__file__).parent.parent / "scripts" / "run-tests-for.sh"
+
+    env = dict(os.environ)
+    if args.fail_fast:
+        # Also stop at the first failed test inside a profile
+        env["FAIL_FAST"] = "1"
+
+    pool = JobPool(
+        lambda job: [str(run_script), args.lang, job.name],
+        workers=args.workers,
+        fail_fast=args.fail_fast,
+        log_dir=Path(args.log_dir) if args.log_dir else None,
+        env=env,
+    )
+    success = pool.run(slot.job for slot in predicted)
+
+    report = schedule_report(predicted, pool.slots, args.workers, args.fail_fast)
+    print(format_schedule(report))
+
+    if args.output:
+        write_report(report, Path(args.output))
+
+    if not success:
+        sys.exit(1)
+
+
+def run_tests(args: argparse.Namespace):
+    """Run integration tests concurrently on one event loop."""
+    from .async_runner import AsyncTestRunner, junit_xml, load_tests, summarize_outcomes
+
+    test_paths = [Path(p) for p in args.test_file]
+    cases = load_tests(test_paths)
+    if args.order_by_history:
+        from .history import HistoryStore
+        from .schedule import order_tests
+
+        lang, profile = args.order_by_history
+        with HistoryStore(args.db) as store:
+            cases = order_tests(
+                cases, store, lang, profile, test_dir=test_paths[0].parent
+            )
+
+    runner = AsyncTestRunner(max_concurrency=args.concurrency, fail_fast=args.fail_fast)
+    success = runner.run(cases)
+
+    if args.junit_xml:
+        junit_path = Path(args.junit_xml)
+        junit_path.parent.mkdir(parents=True, exist_ok=True)
+        junit_xml(runner.outcomes, runner.wall_seconds).write(
+            str(junit_path), encoding="utf-8", xml_declaration=True
+        )
+
+    if args.timings:
+        write_report(
+            summarize_outcomes(runner.outcomes, runner.wall_seconds),
+            Path(args.timings),
+        )
+
+    if not success:
+        sys.exit(1)
+
+
+def annotate(args: argparse.Namespace):
+    """Add detected speech timings to WAV sidecar JSON files."""
+    from . import audio
+
+    key = audio.KEYWORD_END_KEY if args.keyword else audio.SPEECH_END_KEY
+    for wav_path in map(Path, args.wav):
+        if (key in audio.load_sidecar(wav_path)) and (not args.overwrite):
+            _LOGGER.debug("Skipping %s (already annotated)", wav_path)
+            continue
+
+        wav_audio = audio.WavAudio.from_bytes(wav_path.read_bytes())
+        segments = audio.detect_speech_segments(wav_audio)
+        if not segments:
+            _LOGGER.warning("No speech detected in %s", wav_path)
+            continue
+
+        value = segments[0][1] if args.keyword else segments[-1][1]
+        audio.annotate(wav_path, key, value)
+        print(wav_path, key, value)
+
+
+def mqtt_record(args: argparse.Namespace):
+    """Record MQTT traffic until stopped."""
+    import signal
+    import threading
+
+    from .mqtt_log import MqttRecorder
+
+    stop_event = threading.Event()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, lambda *_: stop_event.set())
+
+    with MqttRecorder(
+        RhasspyConnection.from_env(), Path(args.output), topics=args.topic
+    ) as recorder:
+        _LOGGER.info("Recording to %s", args.output)
+        stop_event.wait(timeout=args.seconds)
+
+    _LOGGER.info("Recorded %s message(s)", recorder.num_messages)
+
+
+def mqtt_replay(args: argparse.Namespace):
+    """Publish a recorded MQTT log."""
+    from .mqtt_log import replay
+
+    speed = None if args.speed == "max" else float(args.speed)
+    report = replay(
+        RhasspyConnection.from_env(),
+        Path(args.log),
+        speed=speed,
+        topics=args.topic,
+        exclude_topics=args.exclude,
+    )
+
+    write_report(report, Path(args.output) if args.output else None)
+
+
+def mqtt_dump(args: argparse.Namespace):
+    """Print summary or messages of a recorded MQTT log."""
+    from .mqtt_log import read_log, summarize_log
+
+    log_path = Path(args.log)
+    if not args.messages:
+        write_report(summarize_log(log_path))
+        return
+
+    for message in read_log(log_path):
+        try:
+            payload = json.loads(message.payload)
+        except ValueError:
+            payload = {"bytes": len(message.payload)}
+
+        print(
+            json.dumps(
+                {
+                    "timestamp": message.timestamp,
+                    "topic": message.topic,
+                    "payload": payload,
+                },
+                ensure_ascii=False,
+            )
+        )
+
+
+# -----------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Uncompressed tar archives of WAV corpora, streamed from disk.
+
+WAV audio barely compresses, so corpora are sent to /api/evaluate as a
+plain tar. The archive is never written anywhere: tar headers are built
+from an index of the corpus files and the file contents are read in
+chunks while the request body is sent (chunked multipart), so memory use
+does not depend on the size of the corpus.
+
+The index (file names, sizes, modification times and the SHA-256 of the
+whole tar stream) is built once per language and saved as JSON, so every
+profile evaluates exactly the same archive. Streaming fails if a file
+changed after the index was built.
+"""
+import hashlib
+import json
+import logging
+import tarfile
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+from uuid import uuid4
+
+_LOGGER = logging.getLogger(__name__)
+
+ARCHIVE_FILE_NAME = "archive.tar"
+ARCHIVE_SUFFIXES = {".wav", ".json"}
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# -----------------------------------------------------------------------------
+
+
+class CorpusChangedError(Exception):
+    """Corpus file changed after the archive index was built."""
+
+
+@dataclass
+class ArchiveMember:
+    """File in a corpus archive."""
+
+    name: str
+    path: Path
+    size: int
+    mtime_ns: int
+
+    @classmethod
+    def from_path(cls, path: Path, name: typing.Optional[str] = None):
+        """Create member from file on disk."""
+        stat = path.stat()
+        return ArchiveMember(
+            name=name or path.name,
+            path=path,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+        )
+
+    def tar_header(self) -> bytes:
+        """Tar header block(s) for this file."""
+        info = tarfile.TarInfo(self.name)
+        info.size = self.size
+        info.mtime = self.mtime_ns // 1_000_000_000
+        info.mode = 0o644
+        return info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+    def check_unchanged(self):
+        """Raise CorpusChangedError if file differs from index."""
+        stat = self.path.stat()
+        if (stat.st_size != self.size) or (stat.st_mtime_ns != self.mtime_ns):
+            raise CorpusChangedError(f"{self.path} changed since archive was indexed")
+
+
+def _padding(size: int, block_size: int = tarfile.BLOCKSIZE) -> int:
+    return (block_size - (size % block_size)) % block_size
+
+
+class CorpusArchive:
+    """Plain tar archive of a corpus directory, generated while reading."""
+
+    def __init__(
+        self,
+        members: typing.List[ArchiveMember],
+        sha256: typing.Optional[str] = None,
+    ):
+        self.members = members
+        self._sha256 = sha256
+
+    @classmethod
+    def from_dir(cls, wav_dir: Path) -> "CorpusArchive":
+        """Index WAV/JSON files in a directory (same files as build_archive)."""
+        return CorpusArchive.from_paths(
+            file_path
+            for file_path in wav_dir.iterdir()
+            if file_path.is_file() and (file_path.suffix in ARCHIVE_SUFFIXES)
+        )
+
+    @classmethod
+    def from_paths(cls, file_paths: typing.Iterable[Path]) -> "CorpusArchive":
+        """Index files (e.g., a subset of a corpus) by file name."""
+        return CorpusArchive(
+            [ArchiveMember.from_path(file_path) for file_path in sorted(file_paths)]
+        )
+
+    @classmethod
+    def load(cls, index_path: Path) -> "CorpusArchive":
+        """Load index saved with save()."""
+        with open(index_path, "r") as index_file:
+            index = json.load(index_file)
+
+        return CorpusArchive(
+            [
+                ArchiveMember(
+                    name=m["name"],
+                    path=Path(m["path"]),
+                    size=m["size"],
+                    mtime_ns=m["mtime_ns"],
+                )
+                for m in index["members"]
+            ],
+            sha256=index.get("sha256"),
+        )
+
+    def save(self, index_path: Path):
+        """Save index (and content hash) as JSON."""
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(index_path, "w") as index_file:
+            json.dump(
+                {
+                    "sha256": self.sha256,
+                    "size": self.size,
+                    "num_files": len(self.members),
+                    "members": [
+                        {
+                            "name": m.name,
+                            "path": str(m.path.absolute()),
+                            "size": m.size,
+                            "mtime_ns": m.mtime_ns,
+                        }
+                        for m in self.members
+                    ],
+                },
+                index_file,
+                indent=4,
+                ensure_ascii=False,
+            )
+
+    @property
+    def size(self) -> int:
+        """Length of the tar stream in bytes."""
+        size = sum(
+            len(m.tar_header()) + m.size + _padding(m.size) for m in self.members
+        )
+
+        # End-of-archive blocks, padded to a full record like tarfile
+        size += 2 * tarfile.BLOCKSIZE
+        return size + _padding(size, tarfile.RECORDSIZE)
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 of the tar stream (computed by reading all files once)."""
+        if self._sha256 is None:
+            hasher = hashlib.sha256()
+            for chunk in self.chunks(verify=False):
+                hasher.update(chunk)
+
+            self._sha256 = hasher.hexdigest()
+
+        return self._sha256
+
+    def chunks(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE, verify: bool = True
+    ) -> typing.Iterable[bytes]:
+        """Tar stream in chunks of at most chunk_size bytes (plus headers)."""
+        size = 0
+        for member in self.members:
+            if verify:
+                member.check_unchanged()
+
+            header = member.tar_header()
+            yield header
+            size += len(header)
+
+            with open(member.path, "rb") as member_file:
+                bytes_left = member.size
+                while bytes_left > 0:
+                    chunk = member_file.read(min(chunk_size, bytes_left))
+                    if not chunk:
+                        raise CorpusChangedError(f"{member.path} is truncated")
+
+                    yield chunk
+                    bytes_left -= len(chunk)
+
+            padding = _padding(member.size)
+            size += member.size + padding
+            if padding > 0:
+                yield bytes(padding)
+
+        end_size = 2 * tarfile.BLOCKSIZE
+        end_size += _padding(size + end_size, tarfile.RECORDSIZE)
+        yield bytes(end_size)
+
+    def multipart(
+        self,
+        field_name: str = "archive",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> typing.Tuple[str, typing.Iterable[bytes]]:
+        """Content type and body of a multipart/form-data upload."""
+        boundary = uuid4().hex
+
+        def body():
+            yield (
+                f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="{field_name}"; '
+                f'filename="{ARCHIVE_FILE_NAME}"\r\n'
+                "Content-Type: application/x-tar\r\n\r\n"
+            ).encode()
+            yield from self.chunks(chunk_size=chunk_size)
+            yield f"\r\n--{boundary}--\r\n".encode()
+
+        return f"multipart/form-data; boundary={boundary}", body()
+
+
+def load_or_build(wav_dir: Path, index_path: Path) -> CorpusArchive:
+    """Load saved index if it still matches wav_dir, otherwise rebuild it."""
+    if index_path.is_file():
+        archive = CorpusArchive.load(index_path)
+        current = CorpusArchive.from_dir(wav_dir)
+        if [(m.name, m.size, m.mtime_ns) for m in archive.members] == [
+            (m.name, m.size, m.mtime_ns) for m in current.members
+        ]:
+            return archive
+
+        _LOGGER.debug("Corpus changed, re-indexing %s", wav_dir)
+
+    archive = CorpusArchive.from_dir(wav_dir)
+    archive.save(index_path)
+    return archive
@@ -0,0 +1,290 @@
+"""Endpointing latency of streaming speech recognition.
+
+Audio is streamed in real time into a dialogue session, either as MQTT
+AudioFrame messages or through the websocket audio endpoint. Latency is
+measured from the true end of speech (speech_end_seconds in the sidecar
+JSON) to AsrTextCaptured and NluIntent.
+"""
+import asyncio
+import logging
+import time
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+from uuid import uuid4
+
+import websockets
+
+from rhasspyhermes.asr import AsrError, AsrTextCaptured
+from rhasspyhermes.audioserver import AudioFrame
+from rhasspyhermes.dialogue import (
+    DialogueAction,
+    DialogueEndSession,
+    DialogueSessionStarted,
+    DialogueStartSession,
+)
+from rhasspyhermes.nlu import NluIntent, NluIntentNotRecognized
+
+from . import RhasspyConnection
+from .audio import WavAudio, get_speech_end, pace
+from .events import MqttEvent, MqttEventLog
+from .stats import summarize
+
+_LOGGER = logging.getLogger(__name__)
+
+TRANSPORTS = ("mqtt", "websocket")
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class StreamResult:
+    """Latencies for one streamed WAV file."""
+
+    wav_name: str
+    transport: str
+    speech_end_seconds: float
+    text_captured_seconds: typing.Optional[float] = None
+    intent_seconds: typing.Optional[float] = None
+    text: typing.Optional[str] = None
+    intent_name: typing.Optional[str] = None
+    error: typing.Optional[str] = None
+
+
+class AudioSender:
+    """Sends paced audio chunks over one transport."""
+
+    def __init__(
+        self, connection: RhasspyConnection, events: MqttEventLog, site_id: str
+    ):
+        self.connection = connection
+        self.events = events
+        self.site_id = site_id
+
+    def stream(
+        self,
+        transport: str,
+        audio: WavAudio,
+        stop_predicate: typing.Callable[[], bool],
+        chunk_seconds: float,
+        max_silence_seconds: float,
+    ) -> float:
+        """Stream audio followed by silence until stop_predicate is true.
+
+        Returns perf_counter time when streaming started, which corresponds to
+        audio time 0.
+        """
+        if transport == "websocket":
+            return asyncio.get_event_loop().run_until_complete(
+                self.stream_websocket(
+                    audio, stop_predicate, chunk_seconds, max_silence_seconds
+                )
+            )
+
+        topic = AudioFrame.topic(site_id=self.site_id)
+        start_time = time.perf_counter()
+        for _audio_seconds, chunk in self.iter_paced_chunks(
+            audio, start_time, stop_predicate, chunk_seconds, max_silence_seconds
+        ):
+            self.events.publish(topic, audio.to_wav(chunk))
+
+        return start_time
+
+    async def stream_websocket(
+        self,
+        audio: WavAudio,
+        stop_predicate: typing.Callable[[], bool],
+        chunk_seconds: float,
+        max_silence_seconds: float,
+    ) -> float:
+        """Send WAV chunks as binary websocket messages."""
+        url = self.connection.ws_url(f"stream-to-mqtt?siteId={self.site_id}")
+        async with websockets.connect(url) as websocket:
+            start_time = time.perf_counter()
+            for _audio_seconds, chunk in self.iter_paced_chunks(
+                audio, start_time, stop_predicate, chunk_seconds, max_silence_seconds
+            ):
+                await websocket.send(audio.to_wav(chunk))
+
+        return start_time
+
+    def iter_paced_chunks(
+        self,
+        audio: WavAudio,
+        start_time: float,
+        stop_predicate: typing.Callable[[], bool],
+        chunk_seconds: float,
+        max_silence_seconds: float,
+    ) -> typing.Iterable[typing.Tuple[float, bytes]]:
+        """Yield chunks when their audio would have been captured by a microphone."""
+        audio_seconds = 0.0
+        for audio_seconds, chunk in audio.iter_chunks(chunk_seconds):
+            pace(start_time, audio_seconds)
+            yield (audio_seconds, chunk)
+
+        # Trailing silence so the recognizer can detect the end of speech
+        silence = audio.silence(chunk_seconds)
+        silence_end = audio_seconds + max_silence_seconds
+        while (audio_seconds < silence_end) and (not stop_predicate()):
+            audio_seconds += chunk_seconds
+            pace(start_time, audio_seconds)
+            yield (audio_seconds, silence)
+
+
+# -----------------------------------------------------------------------------
+
+
+def stream_wav(
+    connection: RhasspyConnection,
+    events: MqttEventLog,
+    wav_path: Path,
+    transport: str,
+    site_id: str = "default",
+    chunk_seconds: float = 0.03,
+    max_silence_seconds: float = 5.0,
+    timeout: float = 10.0,
+    audio: typing.Optional[WavAudio] = None,
+) -> StreamResult:
+    """Stream one WAV file into a new dialogue session and measure latencies.
+
+    If audio is given, it is streamed instead of the contents of wav_path
+    (e.g., after conversion to another format).
+    """
+    if audio is None:
+        audio = WavAudio.from_bytes(wav_path.read_bytes())
+
+    result = StreamResult(
+        wav_name=wav_path.name,
+        transport=transport,
+        speech_end_seconds=get_speech_end(wav_path, audio),
+    )
+
+    # Dialogue manager starts ASR and forwards transcription to NLU
+    custom_data = str(uuid4())
+    events.clear()
+    start_session = DialogueStartSession(
+        init=DialogueAction(can_be_enqueued=False, send_intent_not_recognized=True),
+        site_id=site_id,
+        custom_data=custom_data,
+    )
+    events.publish(start_session.topic(), start_session.payload())
+
+    started = events.wait_for(
+        lambda e: DialogueSessionStarted.is_topic(e.topic)
+        and (e.payload.get("customData") == custom_data),
+        timeout=timeout,
+    )
+    if started is None:
+        result.error = "Dialogue session did not start"
+        return result
+
+    session_id = started.payload["sessionId"]
+
+    def is_session(event: MqttEvent) -> bool:
+        return event.payload.get("sessionId") == session_id
+
+    def is_text(event: MqttEvent) -> bool:
+        return is_session(event) and (
+            AsrTextCaptured.is_topic(event.topic) or AsrError.is_topic(event.topic)
+        )
+
+    def is_intent(event: MqttEvent) -> bool:
+        return is_session(event) and (
+            NluIntent.is_topic(event.topic)
+            or NluIntentNotRecognized.is_topic(event.topic)
+        )
+
+    try:
+        sender = AudioSender(connection, events, site_id)
+        try:
+            start_time = sender.stream(
+                transport,
+                audio,
+                lambda: events.find(is_text) is not None,
+                chunk_seconds,
+                max_silence_seconds,
+            )
+        except (OSError, websockets.exceptions.WebSocketException) as e:
+            result.error = f"Streaming failed: {e}"
+            return result
+
+        speech_end_time = start_time + result.speech_end_seconds
+
+        text_event = events.wait_for(is_text, timeout=timeout)
+        if (text_event is None) or AsrError.is_topic(text_event.topic):
+            result.error = "No transcription"
+            return result
+
+        result.text = text_event.payload.get("text")
+        result.text_captured_seconds = text_event.timestamp - speech_end_time
+
+        intent_event = events.wait_for(is_intent, timeout=timeout)
+        if intent_event is None:
+            result.error = "No intent"
+            return result
+
+        result.intent_name = intent_event.payload.get("intent", {}).get("intentName")
+        result.intent_seconds = intent_event.timestamp - speech_end_time
+    finally:
+        end_session = DialogueEndSession(session_id=session_id)
+        events.publish(end_session.topic(), end_session.payload())
+
+    return result
+
+
+def benchmark(
+    connection: RhasspyConnection,
+    wav_dir: Path,
+    transports: typing.Sequence[str] = TRANSPORTS,
+    site_id: str = "default",
+    chunk_seconds: float = 0.03,
+) -> typing.Dict[str, typing.Any]:
+    """Stream every WAV in wav_dir over each transport and summarize latencies."""
+    topics = [
+        DialogueSessionStarted.topic(),
+        AsrTextCaptured.topic(),
+        AsrError.topic(),
+        NluIntent.topic(intent_name="#"),
+        NluIntentNotRecognized.topic(),
+    ]
+
+    results: typing.List[StreamResult] = []
+    with MqttEventLog(connection, topics) as events:
+        for wav_path in sorted(wav_dir.glob("*.wav")):
+            for transport in transports:
+                _LOGGER.debug("Streaming %s over %s", wav_path, transport)
+                result = stream_wav(
+                    connection,
+                    events,
+                    wav_path,
+                    transport,
+                    site_id=site_id,
+                    chunk_seconds=chunk_seconds,
+                )
+                if result.error:
+                    _LOGGER.warning("%s (%s): %s", wav_path, transport, result.error)
+
+                results.append(result)
+
+    summary: typing.Dict[str, typing.Any] = {}
+    for transport in transports:
+        transport_results = [r for r in results if r.transport == transport]
+        summary[transport] = {
+            "text_captured_seconds": summarize(
+                [
+                    r.text_captured_seconds
+                    for r in transport_results
+                    if r.text_captured_seconds is not None
+                ]
+            ),
+            "intent_seconds": summarize(
+                [
+                    r.intent_seconds
+                    for r in transport_results
+                    if r.intent_seconds is not None
+                ]
+            ),
+            "errors": sum(1 for r in transport_results if r.error),
+        }
+
+    return {"summary": summary, "results": [vars(r) for r in results]}
@@ -0,0 +1,367 @@
+"""Runs unittest integration tests concurrently on a single event loop.
+
+Most integration tests spend their time waiting for MQTT or websocket
+messages, so waits can overlap. All tests share one event loop (set as the
+current loop, which tests pick up in setUp). Tests with an async_<name>
+coroutine are awaited directly; other test methods, setUp and tearDown run
+in worker threads.
+
+Only tests marked with rhasspytest.testing.shares run concurrently, and
+never with another test that shares a resource. Unmarked tests and tests
+marked with mutates_state run one at a time after the concurrent ones.
+With a concurrency of 1, all tests run one at a time in their usual order.
+With fail_fast, no more tests are started after the first failure or error.
+
+Each test's duration is broken down by rhasspytest.timing into time spent
+in HTTP calls, MQTT waits, websocket waits and training. Results can be
+written as JUnit XML and as a JSON summary ranked by duration.
+"""
+import asyncio
+import contextvars
+import importlib.util
+import logging
+import sys
+import time
+import traceback
+import typing
+import unittest
+import xml.etree.ElementTree as ET
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .testing import get_resources, is_marked
+from .timing import CATEGORIES, WaitTiming, instrument, timing_scope
+
+_LOGGER = logging.getLogger(__name__)
+
+STATUS_OK = "ok"
+STATUS_FAIL = "fail"
+STATUS_ERROR = "error"
+STATUS_SKIP = "skip"
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class TestOutcome:
+    """Result of running one test."""
+
+    test_id: str
+    status: str
+    start_time: float
+    seconds: float
+    message: str = ""
+    concurrent: bool = False
+    breakdown: typing.Dict[str, typing.Any] = field(default_factory=dict)
+
+
+def load_tests(test_paths: typing.Iterable[Path]) -> typing.List[unittest.TestCase]:
+    """Import test files and return their test cases in order."""
+    loader = unittest.TestLoader()
+    cases: typing.List[unittest.TestCase] = []
+
+    def flatten(suite: unittest.TestSuite):
+        for test in suite:
+            if isinstance(test, unittest.TestSuite):
+                flatten(test)
+            else:
+                cases.append(typing.cast(unittest.TestCase, test))
+
+    for test_path in test_paths:
+        module_name = test_path.stem
+        spec = importlib.util.spec_from_file_location(module_name, str(test_path))
+        assert (spec is not None) and (spec.loader is not None)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)  # type: ignore
+
+        flatten(loader.loadTestsFromModule(module))
+
+    return cases
+
+
+def get_test_resources(
+    case: unittest.TestCase,
+) -> typing.Optional[typing.FrozenSet[str]]:
+    """Resources of a test (method markers win over class markers).
+
+    None means the test must run alone.
+    """
+    test_class = type(case)
+    method_name = case._testMethodName
+    for marked in [
+        getattr(test_class, method_name),
+        getattr(test_class, f"async_{method_name}", None),
+        test_class,
+    ]:
+        if (marked is not None) and is_marked(marked):
+            return get_resources(marked)
+
+    return None
+
+
+# -----------------------------------------------------------------------------
+
+
+class ResourceScheduler:
+    """Lets marked tests run together unless they share a resource."""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.running = 0
+        self.in_use: typing.Counter[str] = Counter()
+        self.condition = asyncio.Condition()
+
+    def can_start(self, resources: typing.FrozenSet[str]) -> bool:
+        """True if test with resources may start now."""
+        return (self.running < self.max_concurrency) and not any(
+            self.in_use[resource] for resource in resources
+        )
+
+    async def acquire(self, resources: typing.FrozenSet[str]):
+        """Wait until resources are free and claim them."""
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.can_start(resources))
+            self.running += 1
+            self.in_use.update(resources)
+
+    async def release(self, resources: typing.FrozenSet[str]):
+        """Free resources and wake up waiting tests."""
+        async with self.condition:
+            self.running -= 1
+            self.in_use.subtract(resources)
+            self.condition.notify_all()
+
+
+class AsyncTestRunner:
+    """Runs test cases on one event loop, overlapping marked tests."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        stream: typing.TextIO = sys.stderr,
+        fail_fast: bool = False,
+    ):
+        self.max_concurrency = max_concurrency
+        self.stream = stream
+        self.fail_fast = fail_fast
+        self.stopped = False
+        self.outcomes: typing.List[TestOutcome] = []
+        self.wall_seconds = 0.0
+
+    def run(self, cases: typing.List[unittest.TestCase]) -> bool:
+        """Run all tests, returning True if all passed."""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        start_time = time.perf_counter()
+        try:
+            with instrument():
+                loop.run_until_complete(self.run_async(cases))
+        finally:
+            loop.close()
+
+        self.wall_seconds = time.perf_counter() - start_time
+        self.print_summary(self.wall_seconds)
+        return all(o.status in {STATUS_OK, STATUS_SKIP} for o in self.outcomes)
+
+    async def run_async(self, cases: typing.List[unittest.TestCase]):
+        """Run marked tests concurrently, then the rest one at a time."""
+        scheduler = ResourceScheduler(self.max_concurrency)
+        concurrent_cases = []
+        serial_cases = []
+        for case in cases:
+            resources = get_test_resources(case)
+            if (resources is None) or (self.max_concurrency <= 1):
+                serial_cases.append(case)
+            else:
+                concurrent_cases.append((case, resources))
+
+        async def run_concurrent(case, resources):
+            await scheduler.acquire(resources)
+            try:
+                if self.stopped:
+                    return
+
+                outcome = await self.run_test(case)
+                outcome.concurrent = True
+                self.report(outcome)
+            finally:
+                await scheduler.release(resources)
+
+        await asyncio.gather(
+            *[run_concurrent(case, resources) for case, resources in concurrent_cases]
+        )
+
+        for case in serial_cases:
+            if self.stopped:
+                break
+
+            self.report(await self.run_test(case))
+
+    async def run_test(self, case: unittest.TestCase) -> TestOutcome:
+        """Set up, run and tear down one test."""
+        loop = asyncio.get_event_loop()
+        method_name = case._testMethodName
+        start_time = time.perf_counter()
+        status = STATUS_OK
+        message = ""
+        timing = WaitTiming()
+
+        def in_worker(function: typing.Callable[[], typing.Any]):
+            """Run blocking function in a worker thread with the shared loop."""
+
+            def call():
+                asyncio.set_event_loop(loop)
+                return function()
+
+            # Worker thread records waits to the same test
+            context = contextvars.copy_context()
+            return loop.run_in_executor(None, context.run, call)
+
+        try:
+            with timing_scope(timing):
+                # setUp/tearDown connect and disconnect clients, which blocks
+                await in_worker(case.setUp)
+                try:
+                    coroutine_function = getattr(case, f"async_{method_name}", None)
+                    if asyncio.iscoroutinefunction(coroutine_function):
+                        # Await directly instead of run_until_complete
+                        await coroutine_function()  # type: ignore
+                    else:
+                        await in_worker(getattr(case, method_name))
+                finally:
+                    await in_worker(case.tearDown)
+        except unittest.SkipTest as e:
+            status = STATUS_SKIP
+            message = str(e)
+        except case.failureException:
+            status = STATUS_FAIL
+            message = traceback.format_exc()
+        except Exception:
+            status = STATUS_ERROR
+            message = traceback.format_exc()
+
+        seconds = time.perf_counter() - start_time
+        return TestOutcome(
+            test_id=case.id(),
+            status=status,
+            start_time=start_time,
+            seconds=seconds,
+            message=message,
+            breakdown=timing.breakdown(seconds),
+        )
+
+    def report(self, outcome: TestOutcome):
+        """Record outcome and print a unittest-style line."""
+        self.outcomes.append(outcome)
+        if self.fail_fast and (outcome.status in {STATUS_FAIL, STATUS_ERROR}):
+            self.stopped = True
+
+        print(
+            f"{outcome.test_id} ... {outcome.status} ({outcome.seconds:.3f}s)",
+            file=self.stream,
+        )
+
+    def print_summary(self, wall_seconds: float):
+        """Print failures and totals like unittest."""
+        for outcome in self.outcomes:
+            if outcome.status in {STATUS_FAIL, STATUS_ERROR}:
+                print("=" * 70, file=self.stream)
+                print(f"{outcome.status.upper()}: {outcome.test_id}", file=self.stream)
+                print("-" * 70, file=self.stream)
+                print(outcome.message, file=self.stream)
+
+        counts = Counter(outcome.status for outcome in self.outcomes)
+        test_seconds = sum(outcome.seconds for outcome in self.outcomes)
+        print("-" * 70, file=self.stream)
+        print(
+            f"Ran {len(self.outcomes)} tests in {wall_seconds:.3f}s "
+            f"(sum of test times: {test_seconds:.3f}s)",
+            file=self.stream,
+        )
+        print("", file=self.stream)
+
+        if counts[STATUS_FAIL] or counts[STATUS_ERROR]:
+            print(
+                f"FAILED (failures={counts[STATUS_FAIL]}, errors={counts[STATUS_ERROR]})",
+                file=self.stream,
+            )
+        else:
+            print("OK", file=self.stream)
+
+
+# -----------------------------------------------------------------------------
+
+
+def summarize_outcomes(
+    outcomes: typing.List[TestOutcome], wall_seconds: float
+) -> typing.Dict[str, typing.Any]:
+    """JSON summary of test timings, slowest test first."""
+    ranked = sorted(outcomes, key=lambda o: o.seconds, reverse=True)
+    return {
+        "num_tests": len(outcomes),
+        "wall_seconds": wall_seconds,
+        "test_seconds": sum(o.seconds for o in outcomes),
+        "totals": {
+            f"{category}_seconds": sum(
+                o.breakdown.get(f"{category}_seconds", 0.0) for o in outcomes
+            )
+            for category in CATEGORIES + ["other"]
+        },
+        "tests": [
+            {
+                "rank": rank,
+                "id": outcome.test_id,
+                "status": outcome.status,
+                "seconds": outcome.seconds,
+                "concurrent": outcome.concurrent,
+                **outcome.breakdown,
+            }
+            for rank, outcome in enumerate(ranked, start=1)
+        ],
+    }
+
+
+def junit_xml(
+    outcomes: typing.List[TestOutcome], wall_seconds: float, name: str = "rhasspytest"
+) -> ET.ElementTree:
+    """JUnit XML report with the timing breakdown as test case properties."""
+    counts = Counter(outcome.status for outcome in outcomes)
+    suite = ET.Element(
+        "testsuite",
+        name=name,
+        tests=str(len(outcomes)),
+        failures=str(counts[STATUS_FAIL]),
+        errors=str(counts[STATUS_ERROR]),
+        skipped=str(counts[STATUS_SKIP]),
+        time=f"{wall_seconds:.3f}",
+    )
+
+    for outcome in outcomes:
+        class_name, _, test_name = outcome.test_id.rpartition(".")
+        test_case = ET.SubElement(
+            suite,
+            "testcase",
+            classname=class_name,
+            name=test_name,
+            time=f"{outcome.seconds:.3f}",
+        )
+
+        if outcome.breakdown:
+            properties = ET.SubElement(test_case, "properties")
+            for key, value in outcome.breakdown.items():
+                ET.SubElement(properties, "property", name=key, value=str(value))
+
+        if outcome.status == STATUS_SKIP:
+            ET.SubElement(test_case, "skipped", message=outcome.message)
+        elif outcome.status in {STATUS_FAIL, STATUS_ERROR}:
+            element_name = "failure" if outcome.status == STATUS_FAIL else "error"
+            last_line = outcome.message.strip().splitlines()[-1:]
+            element = ET.SubElement(
+                test_case, element_name, message=last_line[0] if last_line else ""
+            )
+            element.text = outcome.message
+
+    return ET.ElementTree(suite)
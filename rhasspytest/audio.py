@@ -0,0 +1,186 @@
+"""WAV chunking, pacing and speech annotation helpers."""
+import audioop
+import io
+import json
+import time
+import typing
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+
+# Sidecar JSON keys
+SPEECH_END_KEY = "speech_end_seconds"
+KEYWORD_END_KEY = "keyword_end_seconds"
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class WavAudio:
+    """Raw audio frames and format of a WAV file."""
+
+    frames: bytes
+    sample_rate: int
+    sample_width: int
+    channels: int
+
+    @classmethod
+    def from_bytes(cls, wav_bytes: bytes) -> "WavAudio":
+        """Parse WAV bytes."""
+        with io.BytesIO(wav_bytes) as wav_io:
+            with wave.open(wav_io, "rb") as wav_file:
+                return WavAudio(
+                    frames=wav_file.readframes(wav_file.getnframes()),
+                    sample_rate=wav_file.getframerate(),
+                    sample_width=wav_file.getsampwidth(),
+                    channels=wav_file.getnchannels(),
+                )
+
+    @property
+    def bytes_per_second(self) -> int:
+        """Number of frame bytes in one second of audio."""
+        return self.sample_rate * self.sample_width * self.channels
+
+    @property
+    def seconds(self) -> float:
+        """Duration of audio."""
+        return len(self.frames) / self.bytes_per_second
+
+    def to_wav(self, frames: typing.Optional[bytes] = None) -> bytes:
+        """Wrap frames (default: all) in a WAV header with this format."""
+        with io.BytesIO() as wav_io:
+            wav_file: wave.Wave_write = wave.open(wav_io, "wb")
+            with wav_file:
+                wav_file.setframerate(self.sample_rate)
+                wav_file.setsampwidth(self.sample_width)
+                wav_file.setnchannels(self.channels)
+                wav_file.writeframes(self.frames if frames is None else frames)
+
+            return wav_io.getvalue()
+
+    def iter_chunks(
+        self, chunk_seconds: float = 0.03
+    ) -> typing.Iterable[typing.Tuple[float, bytes]]:
+        """Yield (end time in seconds, raw frames) for each chunk."""
+        block_align = self.sample_width * self.channels
+        chunk_size = max(
+            block_align,
+            int(chunk_seconds * self.sample_rate) * block_align,
+        )
+
+        for offset in range(0, len(self.frames), chunk_size):
+            chunk = self.frames[offset : offset + chunk_size]
+            yield ((offset + len(chunk)) / self.bytes_per_second, chunk)
+
+    def silence(self, seconds: float) -> bytes:
+        """Raw frames of silence with this format."""
+        block_align = self.sample_width * self.channels
+        return bytes(int(seconds * self.sample_rate) * block_align)
+
+
+# -----------------------------------------------------------------------------
+
+
+def pace(start_time: float, audio_seconds: float):
+    """Sleep until audio_seconds have passed since start_time (perf_counter).
+
+    Using absolute deadlines keeps sleep errors from accumulating.
+    """
+    delay = (start_time + audio_seconds) - time.perf_counter()
+    if delay > 0:
+        time.sleep(delay)
+
+
+# -----------------------------------------------------------------------------
+
+
+def detect_speech_segments(
+    audio: WavAudio,
+    frame_seconds: float = 0.01,
+    threshold_ratio: float = 0.1,
+    min_silence_seconds: float = 0.3,
+) -> typing.List[typing.Tuple[float, float]]:
+    """Find (start, end) seconds of speech using frame energy.
+
+    A frame is speech when its RMS is above threshold_ratio of the loudest
+    frame. Gaps shorter than min_silence_seconds are merged.
+    """
+    mono_frames = audio.frames
+    if audio.channels > 1:
+        mono_frames = audioop.tomono(mono_frames, audio.sample_width, 0.5, 0.5)
+
+    frame_size = max(1, int(frame_seconds * audio.sample_rate)) * audio.sample_width
+    energies = [
+        audioop.rms(mono_frames[offset : offset + frame_size], audio.sample_width)
+        for offset in range(0, len(mono_frames) - frame_size + 1, frame_size)
+    ]
+
+    if not energies:
+        return []
+
+    threshold = max(energies) * threshold_ratio
+    segments: typing.List[typing.Tuple[float, float]] = []
+    for index, energy in enumerate(energies):
+        if energy < threshold:
+            continue
+
+        start = index * frame_seconds
+        end = start + frame_seconds
+        if segments and ((start - segments[-1][1]) < min_silence_seconds):
+            segments[-1] = (segments[-1][0], end)
+        else:
+            segments.append((start, end))
+
+    return segments
+
+
+def load_sidecar(wav_path: Path) -> typing.Dict[str, typing.Any]:
+    """Load JSON next to a WAV file (empty if missing)."""
+    json_path = wav_path.with_suffix(".json")
+    if not json_path.is_file():
+        return {}
+
+    with open(json_path, "r") as json_file:
+        return json.load(json_file)
+
+
+def get_speech_end(wav_path: Path, audio: typing.Optional[WavAudio] = None) -> float:
+    """Annotated end of speech, or detected from audio energy if missing."""
+    speech_end = load_sidecar(wav_path).get(SPEECH_END_KEY)
+    if speech_end is not None:
+        return float(speech_end)
+
+    audio = audio or WavAudio.from_bytes(wav_path.read_bytes())
+    segments = detect_speech_segments(audio)
+    return segments[-1][1] if segments else audio.seconds
+
+
+def annotate(wav_path: Path, key: str, value: float):
+    """Add/update a timing annotation in the sidecar JSON of a WAV file."""
+    sidecar = load_sidecar(wav_path)
+    sidecar[key] = round(value, 3)
+
+    with open(wav_path.with_suffix(".json"), "w") as json_file:
+        json.dump(sidecar, json_file, ensure_ascii=False)
+
+
+def iter_wav_file(
+    wav_path: Path, chunk_seconds: float
+) -> typing.Iterable[typing.Tuple[float, bytes]]:
+    """Yield (start seconds, WAV chunk) without reading the whole file."""
+    with wave.open(str(wav_path), "rb") as wav_file:
+        audio = WavAudio(
+            frames=b"",
+            sample_rate=wav_file.getframerate(),
+            sample_width=wav_file.getsampwidth(),
+            channels=wav_file.getnchannels(),
+        )
+        frames_per_chunk = max(1, int(chunk_seconds * audio.sample_rate))
+        start_seconds = 0.0
+        while True:
+            frames = wav_file.readframes(frames_per_chunk)
+            if not frames:
+                break
+
+            yield (start_seconds, audio.to_wav(frames))
+            start_seconds += len(frames) / audio.bytes_per_second
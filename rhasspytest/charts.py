@@ -0,0 +1,82 @@
+"""Inline SVG line charts for static HTML reports."""
+import html
+import itertools
+import math
+import typing
+
+COLORS = ("steelblue", "darkorange", "seagreen", "crimson")
+
+# -----------------------------------------------------------------------------
+
+
+def svg_line_chart(
+    title: str,
+    series: typing.Mapping[str, typing.Sequence[typing.Optional[float]]],
+    x_labels: typing.Optional[typing.Sequence[str]] = None,
+    point_titles: typing.Optional[typing.Mapping[str, typing.Sequence[str]]] = None,
+    width: int = 640,
+    height: int = 200,
+) -> str:
+    """SVG chart with one line per series (hover for its name).
+
+    Points of all series are evenly spaced on a shared x axis; missing and
+    non-finite values are skipped. Series with point titles get a circle
+    with a hover text for each point.
+    """
+    margin = 40
+    valid = {
+        name: [
+            (index, value)
+            for index, value in enumerate(points)
+            if (value is not None) and math.isfinite(value)
+        ]
+        for name, points in series.items()
+    }
+    values = [value for points in valid.values() for _, value in points]
+    if not values:
+        return f"<p>No values for {html.escape(title)}</p>"
+
+    low, high = min(values), max(values)
+    span = (high - low) or 1.0
+    num_points = max(len(points) for points in series.values())
+    x_step = (width - 2 * margin) / max(1, num_points - 1)
+
+    def xy(index: int, value: float) -> typing.Tuple[float, float]:
+        return (
+            margin + index * x_step,
+            height - margin - (value - low) / span * (height - 2 * margin),
+        )
+
+    lines = []
+    for name, color in zip(series, itertools.cycle(COLORS)):
+        coords = [xy(index, value) for index, value in valid[name]]
+        polyline = " ".join(f"{x:.1f},{y:.1f}" for x, y in coords)
+        lines.append(
+            f'<polyline points="{polyline}" fill="none" stroke="{color}">'
+            f"<title>{html.escape(name)}</title></polyline>"
+        )
+
+        titles = (point_titles or {}).get(name)
+        if titles:
+            circles = "".join(
+                f'<circle cx="{x:.1f}" cy="{y:.1f}" r="3">'
+                f"<title>{html.escape(titles[index])}</title></circle>"
+                for (index, _), (x, y) in zip(valid[name], coords)
+            )
+            lines.append(f'<g fill="{color}">{circles}</g>')
+
+    labels = "".join(
+        f'<text x="{margin + i * x_step:.1f}" y="{height - 10}">'
+        f"{html.escape(label)}</text>"
+        for i, label in enumerate(x_labels or [])
+    )
+
+    return (
+        f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">'
+        f'<text x="{margin}" y="15">{html.escape(title)}</text>'
+        f'<text x="0" y="{margin}">{high:.4g}</text>'
+        f'<text x="0" y="{height - margin}">{low:.4g}</text>'
+        + "".join(lines)
+        + labels
+        + "</svg>"
+    )
@@ -0,0 +1,136 @@
+"""Repeated evaluation of a WAV corpus with /api/evaluate."""
+import logging
+import time
+import typing
+from collections import defaultdict
+from pathlib import Path
+
+import requests
+
+from . import RhasspyConnection
+from .archive import CorpusArchive
+from .host import host_conditions
+from .stats import bucket_label, bucket_labels, summarize
+
+_LOGGER = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of wav_seconds buckets
+DEFAULT_BUCKET_EDGES = (1.0, 2.0, 3.0, 5.0)
+
+# -----------------------------------------------------------------------------
+
+
+def build_archive(wav_dir: Path) -> CorpusArchive:
+    """Index WAV/JSON files for an uncompressed archive streamed from disk."""
+    return CorpusArchive.from_dir(wav_dir)
+
+
+def evaluate(
+    connection: RhasspyConnection,
+    archive: CorpusArchive,
+    timeout: typing.Optional[float] = None,
+) -> typing.Dict[str, typing.Any]:
+    """Stream archive to /api/evaluate (chunked multipart) and return report.
+
+    Large corpora take a long time, so there is no timeout by default.
+    """
+    content_type, body = archive.multipart()
+    response = requests.post(
+        connection.api_url("evaluate"),
+        data=body,
+        headers={"Content-Type": content_type},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+
+    return response.json()
+
+
+def real_time_factor(result: typing.Dict[str, typing.Any]) -> typing.Optional[float]:
+    """Transcription time divided by audio duration (lower is faster)."""
+    wav_seconds = result.get("wav_seconds")
+    transcribe_seconds = result.get("transcribe_seconds")
+    if (not wav_seconds) or (transcribe_seconds is None):
+        return None
+
+    return transcribe_seconds / wav_seconds
+
+
+# -----------------------------------------------------------------------------
+
+
+def benchmark(
+    connection: RhasspyConnection,
+    wav_dir: Path,
+    runs: int = 5,
+    warmup: int = 1,
+    bucket_edges: typing.Sequence[float] = DEFAULT_BUCKET_EDGES,
+    confidence: float = 0.95,
+    archive: typing.Optional[CorpusArchive] = None,
+) -> typing.Dict[str, typing.Any]:
+    """Evaluate corpus warmup + runs times and summarize real-time factors.
+
+    Warmup passes absorb first-request model loading and are not reported.
+    """
+    archive = archive or build_archive(wav_dir)
+    wav_rtfs: typing.Dict[str, typing.List[float]] = defaultdict(list)
+    wav_durations: typing.Dict[str, float] = {}
+    pass_seconds: typing.List[float] = []
+    pass_hosts: typing.List[typing.Dict[str, typing.Any]] = []
+
+    for run_index in range(warmup + runs):
+        is_warmup = run_index < warmup
+        _LOGGER.debug(
+            "%s pass %s/%s",
+            "Warmup" if is_warmup else "Benchmark",
+            run_index + 1,
+            warmup + runs,
+        )
+
+        host = host_conditions()
+        start_time = time.perf_counter()
+        report = evaluate(connection, archive)
+        end_time = time.perf_counter()
+
+        if is_warmup:
+            continue
+
+        pass_seconds.append(end_time - start_time)
+        pass_hosts.append(host)
+        for wav_name, result in report.get("actual", {}).items():
+            rtf = real_time_factor(result)
+            if rtf is None:
+                continue
+
+            # Server reports absolute paths in some versions
+            wav_name = Path(wav_name).name
+            wav_rtfs[wav_name].append(rtf)
+            wav_durations[wav_name] = result["wav_seconds"]
+
+    # Group by utterance length
+    bucket_rtfs: typing.Dict[str, typing.List[float]] = defaultdict(list)
+    for wav_name, rtfs in wav_rtfs.items():
+        bucket_rtfs[bucket_label(wav_durations[wav_name], bucket_edges)].extend(rtfs)
+
+    all_rtfs = [rtf for rtfs in wav_rtfs.values() for rtf in rtfs]
+
+    return {
+        "runs": runs,
+        "warmup": warmup,
+        "pass_seconds": summarize(pass_seconds, confidence=confidence),
+        # CPU frequency and load before each measured pass
+        "hosts": pass_hosts,
+        "real_time_factor": summarize(all_rtfs, confidence=confidence),
+        "buckets": {
+            label: summarize(bucket_rtfs[label], confidence=confidence)
+            for label in bucket_labels(bucket_edges)
+            if label in bucket_rtfs
+        },
+        "wavs": {
+            wav_name: {
+                "wav_seconds": wav_durations[wav_name],
+                "real_time_factor": summarize(rtfs, confidence=confidence),
+            }
+            for wav_name, rtfs in sorted(wav_rtfs.items())
+        },
+    }
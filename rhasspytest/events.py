@@ -0,0 +1,124 @@
+"""Timestamped log of Hermes MQTT messages."""
+import json
+import logging
+import threading
+import time
+import typing
+from dataclasses import dataclass
+
+import paho.mqtt.client as mqtt
+
+from . import RhasspyConnection
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class MqttEvent:
+    """One received MQTT message with its arrival time (perf_counter)."""
+
+    timestamp: float
+    topic: str
+    payload: typing.Dict[str, typing.Any]
+
+
+class MqttEventLog:
+    """Records JSON messages on subscribed topics and lets callers wait for them.
+
+    Timestamps are taken in the paho network thread as soon as a message
+    arrives, so they don't include time spent waiting in the caller.
+    """
+
+    def __init__(
+        self,
+        connection: RhasspyConnection,
+        topics: typing.Iterable[str],
+        client_id: str = "",
+    ):
+        self.connection = connection
+        self.topics = list(topics)
+        self.client = mqtt.Client(client_id=client_id)
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+
+        self.events: typing.List[MqttEvent] = []
+        self.condition = threading.Condition()
+        self.connected_event = threading.Event()
+
+    def __enter__(self):
+        self.client.connect(self.connection.mqtt_host, self.connection.mqtt_port)
+        self.client.loop_start()
+        if not self.connected_event.wait(timeout=5):
+            raise TimeoutError("Could not connect to MQTT broker")
+
+        return self
+
+    def __exit__(self, *args):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def on_connect(self, client, userdata, flags, rc):
+        """Subscribe to topics once connected."""
+        for topic in self.topics:
+            client.subscribe(topic)
+
+        self.connected_event.set()
+
+    def on_message(self, client, userdata, msg):
+        """Record JSON message with its arrival time."""
+        timestamp = time.perf_counter()
+        try:
+            payload = json.loads(msg.payload)
+        except ValueError:
+            # Binary payload (e.g., audio)
+            return
+
+        with self.condition:
+            self.events.append(MqttEvent(timestamp, msg.topic, payload))
+            self.condition.notify_all()
+
+    def publish(self, topic: str, payload: typing.Union[str, bytes]):
+        """Publish a message with the recording client."""
+        self.client.publish(topic, payload)
+
+    def clear(self):
+        """Forget all recorded events."""
+        with self.condition:
+            self.events.clear()
+
+    def find(
+        self, predicate: typing.Callable[[MqttEvent], bool]
+    ) -> typing.Optional[MqttEvent]:
+        """First recorded event matching predicate."""
+        with self.condition:
+            for event in self.events:
+                if predicate(event):
+                    return event
+
+        return None
+
+    def find_all(
+        self, predicate: typing.Callable[[MqttEvent], bool]
+    ) -> typing.List[MqttEvent]:
+        """All recorded events matching predicate."""
+        with self.condition:
+            return [event for event in self.events if predicate(event)]
+
+    def wait_for(
+        self, predicate: typing.Callable[[MqttEvent], bool], timeout: float
+    ) -> typing.Optional[MqttEvent]:
+        """Block until an event matching predicate has been recorded."""
+        deadline = time.perf_counter() + timeout
+        with self.condition:
+            while True:
+                for event in self.events:
+                    if predicate(event):
+                        return event
+
+                time_left = deadline - time.perf_counter()
+                if time_left <= 0:
+                    return None
+
+                self.condition.wait(timeout=time_left)
@@ -0,0 +1,402 @@
+"""Cost of server-side audio conversion for non-native WAV formats.
+
+Corpus WAV files (16 kHz, 16-bit mono) are transcoded into a matrix of
+sample rates, channel counts and sample widths, then sent to
+/api/speech-to-text and /api/speech-to-intent, and streamed in real time
+as MQTT AudioFrame messages into a dialogue session. Rhasspy converts
+everything back to its own format, so latency, CPU time (of the Rhasspy
+process tree) and accuracy are compared with the native format.
+
+Transcoding is done here with NumPy for whole files at once: samples of
+all channels are decoded into one float array, channels are averaged or
+duplicated, and the sample rate is changed by truncating or zero-padding
+the real FFT of every channel (band-limited, no per-sample loops).
+"""
+import logging
+import random
+import time
+import typing
+from contextlib import ExitStack
+from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
+
+import numpy as np
+import requests
+
+from rhasspyhermes.asr import AsrError, AsrTextCaptured
+from rhasspyhermes.dialogue import DialogueSessionStarted
+from rhasspyhermes.nlu import NluIntent, NluIntentNotRecognized
+
+from . import RhasspyConnection
+from .asr_stream import stream_wav
+from .audio import WavAudio, load_sidecar
+from .events import MqttEventLog
+from .resources import ResourceMonitor, get_rhasspy_pid
+from .scoring import get_intent_name, get_words, word_errors
+from .stats import median, summarize
+
+_LOGGER = logging.getLogger(__name__)
+
+ENDPOINTS = ("speech-to-text", "speech-to-intent")
+STREAM = "stream"
+
+DEFAULT_SAMPLE_RATES = (16000, 8000, 22050, 44100, 48000)
+DEFAULT_CHANNELS = (1, 2)
+DEFAULT_SAMPLE_WIDTHS = (2, 4)
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """PCM WAV format."""
+
+    sample_rate: int
+    channels: int
+    sample_width: int
+
+    @property
+    def name(self) -> str:
+        """Short name, e.g. 44100Hz_2ch_16bit."""
+        return f"{self.sample_rate}Hz_{self.channels}ch_{8 * self.sample_width}bit"
+
+    @classmethod
+    def of(cls, audio: WavAudio) -> "AudioFormat":
+        """Format of audio."""
+        return AudioFormat(audio.sample_rate, audio.channels, audio.sample_width)
+
+
+NATIVE_FORMAT = AudioFormat(16000, 1, 2)
+
+
+def make_formats(
+    sample_rates: typing.Sequence[int] = DEFAULT_SAMPLE_RATES,
+    channels: typing.Sequence[int] = DEFAULT_CHANNELS,
+    sample_widths: typing.Sequence[int] = DEFAULT_SAMPLE_WIDTHS,
+) -> typing.List[AudioFormat]:
+    """Every combination, native format first."""
+    formats = [
+        AudioFormat(rate, num_channels, width)
+        for rate, num_channels, width in product(sample_rates, channels, sample_widths)
+    ]
+
+    return [NATIVE_FORMAT] + [f for f in formats if f != NATIVE_FORMAT]
+
+
+def sample_wavs(wav_dir: Path, num_wavs: int, seed: int = 0) -> typing.List[Path]:
+    """Same random subset of WAV files in wav_dir for every run."""
+    wav_paths = sorted(wav_dir.glob("*.wav"))
+    if len(wav_paths) <= num_wavs:
+        return wav_paths
+
+    return sorted(random.Random(seed).sample(wav_paths, num_wavs))
+
+
+# -----------------------------------------------------------------------------
+
+# Signed integer types of sample widths (8-bit WAV is unsigned)
+_SAMPLE_TYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def decode_samples(audio: WavAudio) -> np.ndarray:
+    """Samples in [-1, 1) with shape (frames, channels)."""
+    sample_type = _SAMPLE_TYPES.get(audio.sample_width)
+    if sample_type is None:
+        raise ValueError(f"Unsupported sample width: {audio.sample_width}")
+
+    samples = np.frombuffer(audio.frames, dtype=np.dtype(sample_type).newbyteorder("<"))
+    samples = samples.astype(np.float64)
+    if audio.sample_width == 1:
+        samples -= 128
+
+    scale = float(2 ** (8 * audio.sample_width - 1))
+    return (samples / scale).reshape(-1, audio.channels)
+
+
+def encode_samples(samples: np.ndarray, sample_width: int) -> bytes:
+    """Little-endian PCM frames of samples in [-1, 1) (clipped)."""
+    sample_type = _SAMPLE_TYPES.get(sample_width)
+    if sample_type is None:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+
+    scale = float(2 ** (8 * sample_width - 1))
+    scaled = np.clip(np.round(samples * scale), -scale, scale - 1)
+    if sample_width == 1:
+        scaled += 128
+
+    return scaled.astype(np.dtype(sample_type).newbyteorder("<")).tobytes()
+
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    """Change sample rate of (frames, channels) samples in the frequency domain."""
+    num_frames = samples.shape[0]
+    if (from_rate == to_rate) or (num_frames == 0):
+        return samples
+
+    num_out = int(round(num_frames * to_rate / from_rate))
+    spectrum = np.fft.rfft(samples, axis=0)
+
+    # Drop (downsampling) or zero-pad (upsampling) frequencies above Nyquist
+    out_bins = (num_out // 2) + 1
+    out_spectrum = np.zeros((out_bins, samples.shape[1]), dtype=spectrum.dtype)
+    num_bins = min(out_bins, spectrum.shape[0])
+    out_spectrum[:num_bins] = spectrum[:num_bins]
+
+    return np.fft.irfft(out_spectrum, n=num_out, axis=0) * (num_out / num_frames)
+
+
+def convert(audio: WavAudio, audio_format: AudioFormat) -> WavAudio:
+    """Transcode audio (unchanged if already in audio_format)."""
+    if AudioFormat.of(audio) == audio_format:
+        return audio
+
+    samples = decode_samples(audio)
+    if samples.shape[1] != audio_format.channels:
+        # Mix down, then copy to every output channel
+        mono = samples.mean(axis=1, keepdims=True)
+        samples = np.repeat(mono, audio_format.channels, axis=1)
+
+    samples = resample(samples, audio.sample_rate, audio_format.sample_rate)
+
+    return WavAudio(
+        frames=encode_samples(samples, audio_format.sample_width),
+        sample_rate=audio_format.sample_rate,
+        sample_width=audio_format.sample_width,
+        channels=audio_format.channels,
+    )
+
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class FormatResult:
+    """Recognition of one converted WAV file by one endpoint (or stream)."""
+
+    wav_name: str
+    mode: str
+    latency_seconds: typing.Optional[float] = None
+    text: str = ""
+    intent_name: str = ""
+    error: typing.Optional[str] = None
+
+
+def recognize(
+    connection: RhasspyConnection, wav_name: str, wav_bytes: bytes, endpoint: str
+) -> FormatResult:
+    """POST WAV to a speech endpoint and time it."""
+    result = FormatResult(wav_name, endpoint)
+    start_time = time.perf_counter()
+    try:
+        response = requests.post(
+            connection.api_url(endpoint),
+            data=wav_bytes,
+            headers={"Content-Type": "audio/wav"},
+        )
+        response.raise_for_status()
+        result.latency_seconds = time.perf_counter() - start_time
+        if endpoint == "speech-to-intent":
+            intent = response.json()
+            result.text = str(intent.get("raw_text") or intent.get("text") or "")
+            result.intent_name = get_intent_name(intent)
+        else:
+            result.text = response.text
+    except (requests.RequestException, ValueError) as e:
+        result.error = str(e)
+
+    return result
+
+
+def summarize_mode(
+    results: typing.List[FormatResult],
+    expected: typing.Dict[str, typing.Dict[str, typing.Any]],
+    cpu_seconds: typing.Optional[float],
+    audio_seconds: float,
+) -> typing.Dict[str, typing.Any]:
+    """Latency, CPU and accuracy of one format and mode."""
+    ok_results = [r for r in results if r.error is None]
+    errors = word_errors(
+        [get_words(expected.get(r.wav_name, {})) for r in ok_results],
+        [r.text.split() for r in ok_results],
+    )
+    num_words = sum(e.words for e in errors)
+
+    summary: typing.Dict[str, typing.Any] = {
+        "count": len(results),
+        "errors": len(results) - len(ok_results),
+        "latency_seconds": summarize(
+            [r.latency_seconds for r in ok_results if r.latency_seconds is not None]
+        ),
+        "cpu_seconds": cpu_seconds,
+        "cpu_seconds_per_audio_second": (cpu_seconds / audio_seconds)
+        if (cpu_seconds is not None) and (audio_seconds > 0)
+        else None,
+        "word_error_rate": (sum(e.errors for e in errors) / num_words)
+        if num_words
+        else None,
+    }
+
+    if results and (results[0].mode != "speech-to-text"):
+        summary["intent_accuracy"] = (
+            sum(
+                1
+                for r in ok_results
+                if r.intent_name == get_intent_name(expected.get(r.wav_name, {}))
+            )
+            / len(ok_results)
+            if ok_results
+            else None
+        )
+
+    return summary
+
+
+def compare_to_native(
+    summary: typing.Dict[str, typing.Any], native: typing.Dict[str, typing.Any]
+) -> typing.Dict[str, typing.Any]:
+    """Latency, CPU and accuracy differences from the native format."""
+
+    def difference(key: str) -> typing.Optional[float]:
+        value, native_value = summary.get(key), native.get(key)
+        if (value is None) or (native_value is None):
+            return None
+
+        return value - native_value
+
+    latency = summary["latency_seconds"].get("median")
+    native_latency = native["latency_seconds"].get("median")
+    cpu = summary.get("cpu_seconds_per_audio_second")
+    native_cpu = native.get("cpu_seconds_per_audio_second")
+
+    return {
+        "added_latency_seconds": (latency - native_latency)
+        if (latency is not None) and (native_latency is not None)
+        else None,
+        "cpu_ratio": (cpu / native_cpu) if cpu and native_cpu else None,
+        "word_error_rate_change": difference("word_error_rate"),
+        "intent_accuracy_change": difference("intent_accuracy"),
+    }
+
+
+def benchmark(
+    connection: RhasspyConnection,
+    wav_paths: typing.Iterable[Path],
+    formats: typing.Sequence[AudioFormat],
+    endpoints: typing.Sequence[str] = ENDPOINTS,
+    stream: bool = True,
+    site_id: str = "default",
+    chunk_seconds: float = 0.03,
+) -> typing.Dict[str, typing.Any]:
+    """Recognize the corpus in every format and compare with native."""
+    sources = [(path, WavAudio.from_bytes(path.read_bytes())) for path in wav_paths]
+    if not sources:
+        raise ValueError("No WAV files")
+
+    expected = {path.name: load_sidecar(path) for path, _ in sources}
+    audio_seconds = sum(audio.seconds for _, audio in sources)
+
+    events: typing.Optional[MqttEventLog] = None
+    if stream:
+        events = MqttEventLog(
+            connection,
+            [
+                DialogueSessionStarted.topic(),
+                AsrTextCaptured.topic(),
+                AsrError.topic(),
+                NluIntent.topic(intent_name="#"),
+                NluIntentNotRecognized.topic(),
+            ],
+        )
+
+    report: typing.Dict[str, typing.Any] = {
+        "wavs": len(sources),
+        "audio_seconds": audio_seconds,
+        "formats": {},
+    }
+
+    rhasspy_pid = get_rhasspy_pid()
+    with ExitStack() as stack:
+        if events is not None:
+            stack.enter_context(events)
+
+        for audio_format in formats:
+            _LOGGER.debug("Format: %s", audio_format.name)
+            start_time = time.perf_counter()
+            converted = [
+                (path, convert(audio, audio_format)) for path, audio in sources
+            ]
+            convert_seconds = time.perf_counter() - start_time
+            wav_bytes = [(path, audio.to_wav()) for path, audio in converted]
+
+            format_report: typing.Dict[str, typing.Any] = {
+                "sample_rate": audio_format.sample_rate,
+                "channels": audio_format.channels,
+                "sample_width": audio_format.sample_width,
+                "upload_bytes": sum(len(data) for _, data in wav_bytes),
+                "client_convert_seconds": convert_seconds,
+                "modes": {},
+            }
+            report["formats"][audio_format.name] = format_report
+
+            for endpoint in endpoints:
+                with ResourceMonitor(rhasspy_pid, interval=0.1) as monitor:
+                    results = [
+                        recognize(connection, path.name, data, endpoint)
+                        for path, data in wav_bytes
+                    ]
+
+                format_report["modes"][endpoint] = summarize_mode(
+                    results, expected, monitor.cpu_seconds(), audio_seconds
+                )
+
+            if events is not None:
+                stream_results = []
+                with ResourceMonitor(rhasspy_pid, interval=0.1) as monitor:
+                    for path, audio in converted:
+                        stream_result = stream_wav(
+                            connection,
+                            events,
+                            path,
+                            "mqtt",
+                            site_id=site_id,
+                            chunk_seconds=chunk_seconds,
+                            audio=audio,
+                        )
+                        stream_results.append(
+                            FormatResult(
+                                path.name,
+                                STREAM,
+                                latency_seconds=stream_result.text_captured_seconds,
+                                text=stream_result.text or "",
+                                intent_name=stream_result.intent_name or "",
+                                error=stream_result.error,
+                            )
+                        )
+
+                format_report["modes"][STREAM] = summarize_mode(
+                    stream_results, expected, monitor.cpu_seconds(), audio_seconds
+                )
+
+    native = report["formats"].get(NATIVE_FORMAT.name)
+    if native is not None:
+        for format_report in report["formats"].values():
+            for mode, summary in format_report["modes"].items():
+                if mode in native["modes"]:
+                    summary["vs_native"] = compare_to_native(
+                        summary, native["modes"][mode]
+                    )
+
+    # Across non-native formats
+    report["median_added_latency_seconds"] = {}
+    for mode in list(endpoints) + ([STREAM] if stream else []):
+        added = [
+            f["modes"][mode]["vs_native"]["added_latency_seconds"]
+            for name, f in report["formats"].items()
+            if (name != NATIVE_FORMAT.name)
+            and ("vs_native" in f["modes"].get(mode, {}))
+        ]
+        added = [value for value in added if value is not None]
+        report["median_added_latency_seconds"][mode] = median(added) if added else None
+
+    return report
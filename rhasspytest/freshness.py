@@ -0,0 +1,408 @@
+"""Time from a profile change to the first recognition of the new content.
+
+Three kinds of change are made, one after the other, to a temporary
+sentences file:
+
+- slots: a new value is added to a slot referenced by a temporary intent
+- sentences: a new intent with one sentence is saved
+- custom_words: a made-up word (pronounced by the profile's G2P model) is
+  added to custom words, with a sentence that uses it
+
+The clock starts before the change is POSTed. Text-to-intent and
+speech-to-intent (with audio from the profile's text to speech system) are
+probed back to back until the new content is recognized, while
+/api/train runs. Each probe is classified as fresh (new content
+recognized), stale (old model) or error, and probes that overlapped
+training are also checked for blocking: taking much longer than the same
+probe before the change.
+"""
+import logging
+import threading
+import time
+import typing
+from dataclasses import dataclass
+
+import requests
+
+from . import RhasspyConnection
+from .g2p import LookupClient, make_words
+from .nlu import fetch_grammar
+from .slots import make_slot_values, post_sentences, post_slot
+from .stats import median, summarize
+from .training import train
+
+_LOGGER = logging.getLogger(__name__)
+
+KINDS = ("slots", "sentences", "custom_words")
+
+SLOT_NAME = "freshness"
+SENTENCES_FILE = "intents/freshness.ini"
+
+SLOT_INTENT = "FreshnessSlot"
+SENTENCE_INTENT = "FreshnessSentence"
+WORD_INTENT = "FreshnessWord"
+
+# Probes taking this many times longer than before the change are blocked
+DEFAULT_BLOCK_FACTOR = 10.0
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class Change:
+    """Content that should be recognized after a change is trained."""
+
+    kind: str
+    text: str
+    intent_name: str
+    slot_value: typing.Optional[str] = None
+
+
+@dataclass
+class Probe:
+    """One recognition request while waiting for a change."""
+
+    endpoint: str
+    start: float
+    end: float
+    outcome: str
+    error: typing.Optional[str] = None
+
+    @property
+    def seconds(self) -> float:
+        """Latency of the request."""
+        return self.end - self.start
+
+
+def is_fresh(result: typing.Dict[str, typing.Any], change: Change) -> bool:
+    """True if a recognition result contains the changed content."""
+    if result.get("intent", {}).get("name", "") != change.intent_name:
+        return False
+
+    if change.slot_value is None:
+        return True
+
+    return any(
+        (entity.get("entity") == SLOT_NAME)
+        and (str(entity.get("value", "")) == change.slot_value)
+        for entity in result.get("entities", [])
+    )
+
+
+def add_intent(ini_text: str, intent_name: str, sentence: str) -> str:
+    """Sentences file text with another intent appended."""
+    return f"{ini_text.rstrip()}\n\n[{intent_name}]\n{sentence}\n".lstrip()
+
+
+# -----------------------------------------------------------------------------
+
+
+class Prober:
+    """Sends the same recognition request repeatedly from a thread."""
+
+    def __init__(
+        self,
+        connection: RhasspyConnection,
+        endpoint: str,
+        change: Change,
+        body: typing.Union[str, bytes],
+        interval: float = 0.05,
+    ):
+        self.url = connection.api_url(endpoint)
+        self.endpoint = endpoint
+        self.change = change
+        self.body = body
+        self.headers = {"Content-Type": "audio/wav"} if isinstance(body, bytes) else {}
+        self.interval = interval
+        self.probes: typing.List[Probe] = []
+        self.session = requests.Session()
+        self.thread: typing.Optional[threading.Thread] = None
+
+    def probe(self) -> Probe:
+        """Recognize once and classify the result."""
+        start_time = time.perf_counter()
+        try:
+            response = self.session.post(self.url, data=self.body, headers=self.headers)
+            response.raise_for_status()
+            outcome = "fresh" if is_fresh(response.json(), self.change) else "stale"
+            probe = Probe(self.endpoint, start_time, time.perf_counter(), outcome)
+        except (requests.RequestException, ValueError) as e:
+            probe = Probe(
+                self.endpoint, start_time, time.perf_counter(), "error", str(e)
+            )
+
+        self.probes.append(probe)
+
+        return probe
+
+    def baseline(self, count: int) -> typing.List[Probe]:
+        """Probes before the change, which must all be stale."""
+        probes = [self.probe() for _ in range(count)]
+        self.probes.clear()
+        for probe in probes:
+            if probe.outcome == "fresh":
+                raise ValueError(f"{self.change.text} recognized before change")
+
+            if probe.outcome == "error":
+                raise ValueError(f"{self.endpoint} failed: {probe.error}")
+
+        return probes
+
+    def start(self, train_done: threading.Event, deadline: float):
+        """Probe until fresh after training (or deadline)."""
+
+        def run():
+            fresh = False
+            while time.perf_counter() < deadline:
+                probe = self.probe()
+                fresh = fresh or (probe.outcome == "fresh")
+                if fresh and train_done.is_set():
+                    break
+
+                time.sleep(self.interval)
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+    def join(self):
+        """Wait for probing to end."""
+        if self.thread is not None:
+            self.thread.join()
+
+        self.session.close()
+
+
+def summarize_probes(
+    probes: typing.List[Probe],
+    change_start: float,
+    train_window: typing.Tuple[float, float],
+    baseline_seconds: float,
+    block_factor: float = DEFAULT_BLOCK_FACTOR,
+) -> typing.Dict[str, typing.Any]:
+    """Freshness latency and behavior of requests during training."""
+    train_start, train_end = train_window
+    first_fresh = next((p for p in probes if p.outcome == "fresh"), None)
+    during = [p for p in probes if (p.start < train_end) and (p.end > train_start)]
+    block_seconds = baseline_seconds * block_factor
+    blocked = [p for p in during if p.seconds > block_seconds]
+
+    behavior = sorted(
+        {
+            {"error": "fail", "stale": "stale", "fresh": "fresh"}[p.outcome]
+            for p in during
+        }
+        | ({"block"} if blocked else set())
+    )
+
+    return {
+        "freshness_seconds": (first_fresh.end - change_start) if first_fresh else None,
+        "after_train_seconds": (first_fresh.end - train_end) if first_fresh else None,
+        "probes": len(probes),
+        "baseline_seconds": baseline_seconds,
+        "during_training": {
+            "probes": len(during),
+            "fresh": sum(1 for p in during if p.outcome == "fresh"),
+            "stale": sum(1 for p in during if p.outcome == "stale"),
+            "errors": sum(1 for p in during if p.outcome == "error"),
+            "blocked": len(blocked),
+            "latency_seconds": summarize([p.seconds for p in during]),
+            "behavior": behavior,
+        },
+    }
+
+
+# -----------------------------------------------------------------------------
+
+
+def synthesize(connection: RhasspyConnection, text: str) -> bytes:
+    """WAV audio of text from the profile's text to speech system."""
+    response = requests.post(
+        connection.api_url("text-to-speech"), data=text, params={"play": "false"}
+    )
+    response.raise_for_status()
+
+    return response.content
+
+
+class FreshnessBenchmark:
+    """Makes each kind of change and measures when it becomes available."""
+
+    def __init__(
+        self,
+        connection: RhasspyConnection,
+        speech: bool = True,
+        timeout: float = 300.0,
+        interval: float = 0.05,
+        baseline_probes: int = 5,
+        block_factor: float = DEFAULT_BLOCK_FACTOR,
+        train_timeout: typing.Optional[float] = None,
+    ):
+        self.connection = connection
+        self.speech = speech
+        self.timeout = timeout
+        self.interval = interval
+        self.baseline_probes = baseline_probes
+        self.block_factor = block_factor
+        self.train_timeout = train_timeout
+
+        self.sentences: typing.Dict[str, str] = {}
+        self.original_custom_words = ""
+        self.values: typing.List[str] = []
+
+    def run(self, kinds: typing.Sequence[str] = KINDS) -> typing.Dict[str, typing.Any]:
+        """Measure all kinds of change, restoring the profile afterwards."""
+        grammar = fetch_grammar(self.connection)
+
+        # Unused multi-word combinations of words the profile can pronounce
+        self.values = make_slot_values(grammar.vocabulary(), 3)
+
+        response = requests.get(
+            self.connection.api_url("sentences"),
+            headers={"Accept": "application/json"},
+        )
+        response.raise_for_status()
+        self.sentences = response.json()
+
+        response = requests.get(self.connection.api_url("custom-words"))
+        response.raise_for_status()
+        self.original_custom_words = response.content.decode()
+
+        report: typing.Dict[str, typing.Any] = {"kinds": {}}
+        try:
+            # Slot intent is trained before any change is timed
+            self.sentences[SENTENCES_FILE] = add_intent(
+                "", SLOT_INTENT, f"(${SLOT_NAME}){{{SLOT_NAME}}}"
+            )
+            post_sentences(self.connection, self.sentences)
+            post_slot(self.connection, SLOT_NAME, self.values[:1])
+            train(self.connection, timeout=self.train_timeout)
+
+            for kind in kinds:
+                _LOGGER.debug("Freshness: %s", kind)
+                try:
+                    report["kinds"][kind] = self.measure(kind)
+                except (requests.RequestException, ValueError) as e:
+                    _LOGGER.exception(kind)
+                    report["kinds"][kind] = {"error": str(e)}
+        finally:
+            requests.post(
+                self.connection.api_url(f"slots/{SLOT_NAME}"),
+                json=[],
+                params={"overwriteAll": "true"},
+            )
+            self.sentences[SENTENCES_FILE] = ""
+            requests.post(self.connection.api_url("sentences"), json=self.sentences)
+            requests.post(
+                self.connection.api_url("custom-words"),
+                data=self.original_custom_words.encode(),
+            )
+            requests.post(self.connection.api_url("train"))
+
+        return report
+
+    def prepare(self, kind: str) -> typing.Tuple[Change, typing.Callable[[], None]]:
+        """Change to make and a function that makes it (not yet called)."""
+        if kind == "slots":
+            value = self.values[1]
+
+            def add_slot_value():
+                post_slot(self.connection, SLOT_NAME, self.values[:2])
+
+            return Change(kind, value, SLOT_INTENT, slot_value=value), add_slot_value
+
+        if kind == "sentences":
+            sentence = self.values[2]
+
+            def add_sentence():
+                self.sentences[SENTENCES_FILE] = add_intent(
+                    self.sentences[SENTENCES_FILE], SENTENCE_INTENT, sentence
+                )
+                post_sentences(self.connection, self.sentences)
+
+            return Change(kind, sentence, SENTENCE_INTENT), add_sentence
+
+        if kind == "custom_words":
+            # Pronunciation is guessed before the clock starts
+            word = make_words(1, seed=4)[0]
+            result = LookupClient(self.connection, 1, 1).lookup(word)
+            if not result.pronunciations:
+                raise ValueError(f"No pronunciation guessed for {word}")
+
+            custom_words = (
+                f"{self.original_custom_words.rstrip()}\n"
+                f"{word} {result.pronunciations[0]}\n"
+            ).lstrip()
+            sentence = f"{word} {self.values[0]}"
+
+            def add_custom_word():
+                response = requests.post(
+                    self.connection.api_url("custom-words"),
+                    data=custom_words.encode(),
+                )
+                response.raise_for_status()
+                self.sentences[SENTENCES_FILE] = add_intent(
+                    self.sentences[SENTENCES_FILE], WORD_INTENT, sentence
+                )
+                post_sentences(self.connection, self.sentences)
+
+            return Change(kind, sentence, WORD_INTENT), add_custom_word
+
+        raise ValueError(f"Unknown kind of change: {kind}")
+
+    def measure(self, kind: str) -> typing.Dict[str, typing.Any]:
+        """Make one change, train and probe until it is recognized."""
+        change, post = self.prepare(kind)
+        report: typing.Dict[str, typing.Any] = {"text": change.text}
+
+        probers = [Prober(self.connection, "text-to-intent", change, change.text)]
+        if self.speech:
+            try:
+                probers.append(
+                    Prober(
+                        self.connection,
+                        "speech-to-intent",
+                        change,
+                        synthesize(self.connection, change.text),
+                    )
+                )
+            except requests.RequestException as e:
+                report["speech_error"] = str(e)
+
+        baselines = {
+            prober.endpoint: median(
+                [p.seconds for p in prober.baseline(self.baseline_probes)]
+            )
+            for prober in probers
+        }
+
+        train_done = threading.Event()
+        change_start = time.perf_counter()
+        post()
+        report["post_seconds"] = time.perf_counter() - change_start
+
+        deadline = change_start + self.timeout
+        for prober in probers:
+            prober.start(train_done, deadline)
+
+        train_start = time.perf_counter()
+        try:
+            report.update(train(self.connection, timeout=self.train_timeout))
+        except requests.RequestException as e:
+            report["train_error"] = str(e)
+        finally:
+            train_end = time.perf_counter()
+            train_done.set()
+            for prober in probers:
+                prober.join()
+
+        report["train_window"] = [train_start - change_start, train_end - change_start]
+        for prober in probers:
+            report[prober.endpoint] = summarize_probes(
+                prober.probes,
+                change_start,
+                (train_start, train_end),
+                baselines[prober.endpoint],
+                block_factor=self.block_factor,
+            )
+
+        return report
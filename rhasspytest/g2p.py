@@ -0,0 +1,249 @@
+"""Bulk pronunciation lookups and custom words scaling.
+
+Out-of-vocabulary words are made up from consonant-vowel syllables, so
+they are guessed by the profile's G2P model. Custom word pronunciations are
+taken from those guesses, which keeps their phonemes valid for the profile.
+"""
+import logging
+import random
+import threading
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import requests
+
+from . import RhasspyConnection
+from .stats import summarize
+from .training import train
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_NUM_WORDS = 2000
+DEFAULT_CONCURRENCY = (1, 4, 16)
+DEFAULT_NUM_PRONUNCIATIONS = (1, 5)
+DEFAULT_CUSTOM_WORDS_SIZES = (10000, 100000)
+
+_CONSONANTS = "bdfgklmnprstvz"
+_VOWELS = "aeiou"
+
+# -----------------------------------------------------------------------------
+
+
+def make_words(count: int, seed: int = 0) -> typing.List[str]:
+    """Unique pronounceable pseudo-words of 2-5 syllables."""
+    rng = random.Random(seed)
+    words: typing.Set[str] = set()
+    result: typing.List[str] = []
+    while len(result) < count:
+        word = "".join(
+            rng.choice(_CONSONANTS) + rng.choice(_VOWELS)
+            for _ in range(rng.randint(2, 5))
+        )
+        if word not in words:
+            words.add(word)
+            result.append(word)
+
+    return result
+
+
+@dataclass
+class LookupResult:
+    """Outcome of one /api/lookup request."""
+
+    word: str
+    seconds: float
+    in_dictionary: bool = False
+    pronunciations: typing.List[str] = field(default_factory=list)
+    error: typing.Optional[str] = None
+
+
+class LookupClient:
+    """Looks up words from a pool of threads."""
+
+    def __init__(
+        self, connection: RhasspyConnection, concurrency: int, num_pronunciations: int
+    ):
+        self.url = connection.api_url("lookup")
+        self.concurrency = concurrency
+        self.num_pronunciations = num_pronunciations
+        self.local = threading.local()
+
+    def lookup(self, word: str) -> LookupResult:
+        """Look up (or guess) pronunciations of one word."""
+        if not hasattr(self.local, "session"):
+            # Keep-alive connection per thread
+            self.local.session = requests.Session()
+
+        start_time = time.perf_counter()
+        try:
+            response = self.local.session.post(
+                self.url, data=word, params={"n": str(self.num_pronunciations)}
+            )
+            response.raise_for_status()
+            result = response.json()
+        except (requests.RequestException, ValueError) as e:
+            return LookupResult(word, time.perf_counter() - start_time, error=str(e))
+
+        return LookupResult(
+            word,
+            time.perf_counter() - start_time,
+            in_dictionary=bool(result.get("in_dictionary")),
+            pronunciations=list(result.get("pronunciations", [])),
+        )
+
+    def run(
+        self, words: typing.List[str]
+    ) -> typing.Tuple[typing.List[LookupResult], float]:
+        """Look up all words; returns results and wall time."""
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(self.lookup, words))
+
+        return results, time.perf_counter() - start_time
+
+
+def summarize_results(
+    results: typing.List[LookupResult], wall_seconds: float
+) -> typing.Dict[str, typing.Any]:
+    """Throughput, latency and dictionary hit rate."""
+    return {
+        "words": len(results),
+        "errors": sum(1 for r in results if r.error),
+        "wall_seconds": wall_seconds,
+        "words_per_second": (len(results) / wall_seconds) if wall_seconds else None,
+        "latency_seconds": summarize([r.seconds for r in results]),
+        "in_dictionary": (sum(1 for r in results if r.in_dictionary) / len(results))
+        if results
+        else None,
+    }
+
+
+# -----------------------------------------------------------------------------
+
+
+def benchmark_lookup(
+    connection: RhasspyConnection,
+    words: typing.List[str],
+    concurrency_levels: typing.Sequence[int] = DEFAULT_CONCURRENCY,
+    num_pronunciations: typing.Sequence[int] = DEFAULT_NUM_PRONUNCIATIONS,
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Guess pronunciations of words for each concurrency and n."""
+    reports = []
+    for n in num_pronunciations:
+        for concurrency in concurrency_levels:
+            _LOGGER.debug("Lookup: n=%s, concurrency=%s", n, concurrency)
+            results, wall_seconds = LookupClient(connection, concurrency, n).run(words)
+            reports.append(
+                {
+                    "n": n,
+                    "concurrency": concurrency,
+                    **summarize_results(results, wall_seconds),
+                }
+            )
+
+    return reports
+
+
+def make_custom_words(words: typing.List[str], pronunciations: typing.List[str]) -> str:
+    """custom_words.txt text with one pronunciation per word."""
+    return "".join(
+        f"{word} {pronunciations[i % len(pronunciations)]}\n"
+        for i, word in enumerate(words)
+    )
+
+
+def benchmark_custom_words(
+    connection: RhasspyConnection,
+    sizes: typing.Sequence[int] = DEFAULT_CUSTOM_WORDS_SIZES,
+    num_queries: int = 200,
+    concurrency: int = 4,
+    train_timeout: typing.Optional[float] = None,
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Retrain with growing custom word lists and measure lookups.
+
+    Stops growing at the first size that fails to train.
+    """
+    # Valid pronunciations come from the profile's own G2P model
+    seed_results, _ = LookupClient(connection, concurrency, 1).run(
+        make_words(50, seed=1)
+    )
+    pronunciations = [r.pronunciations[0] for r in seed_results if r.pronunciations]
+    if not pronunciations:
+        raise RuntimeError("No pronunciations could be guessed")
+
+    # One draw so out-of-vocabulary words never appear in the custom words
+    words = make_words(max(sizes) + num_queries, seed=2)
+    all_words, oov_words = words[: max(sizes)], words[max(sizes) :]
+    rng = random.Random(0)
+
+    response = requests.get(connection.api_url("custom-words"))
+    response.raise_for_status()
+    original_custom_words = response.content.decode()
+
+    reports: typing.List[typing.Dict[str, typing.Any]] = []
+    try:
+        for size in sorted(sizes):
+            _LOGGER.debug("Custom words: %s", size)
+            custom_words = make_custom_words(all_words[:size], pronunciations)
+            start_time = time.perf_counter()
+            response = requests.post(
+                connection.api_url("custom-words"), data=custom_words.encode()
+            )
+            response.raise_for_status()
+
+            size_report: typing.Dict[str, typing.Any] = {
+                "custom_words": size,
+                "post_seconds": time.perf_counter() - start_time,
+            }
+            reports.append(size_report)
+
+            try:
+                size_report.update(train(connection, timeout=train_timeout))
+            except requests.RequestException as e:
+                _LOGGER.exception("train (%s custom word(s))", size)
+                size_report["error"] = str(e)
+                break
+
+            client = LookupClient(connection, concurrency, 1)
+            known_words = rng.sample(all_words[:size], min(num_queries, size))
+            size_report["lookup_custom"] = summarize_results(*client.run(known_words))
+            size_report["lookup_unknown"] = summarize_results(*client.run(oov_words))
+    finally:
+        # Restore custom words
+        requests.post(
+            connection.api_url("custom-words"), data=original_custom_words.encode()
+        )
+        requests.post(connection.api_url("train"))
+
+    return reports
+
+
+def benchmark(
+    connection: RhasspyConnection,
+    num_words: int = DEFAULT_NUM_WORDS,
+    concurrency_levels: typing.Sequence[int] = DEFAULT_CONCURRENCY,
+    num_pronunciations: typing.Sequence[int] = DEFAULT_NUM_PRONUNCIATIONS,
+    custom_words_sizes: typing.Sequence[int] = DEFAULT_CUSTOM_WORDS_SIZES,
+    train_timeout: typing.Optional[float] = None,
+) -> typing.Dict[str, typing.Any]:
+    """Bulk lookups, then custom words scaling (if sizes are given)."""
+    report: typing.Dict[str, typing.Any] = {
+        "lookup": benchmark_lookup(
+            connection,
+            make_words(num_words),
+            concurrency_levels=concurrency_levels,
+            num_pronunciations=num_pronunciations,
+        )
+    }
+
+    if custom_words_sizes:
+        report["custom_words"] = benchmark_custom_words(
+            connection,
+            sizes=custom_words_sizes,
+            concurrency=max(concurrency_levels),
+            train_timeout=train_timeout,
+        )
+
+    return report
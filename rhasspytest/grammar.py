@@ -0,0 +1,366 @@
+"""Expansion of Rhasspy sentences.ini templates into example sentences.
+
+Supports the subset of the template language used by test profiles:
+alternatives (a | b), optionals [a], rule references <rule> and
+<Intent.rule>, slot references $slot, tags {name}, substitutions
+spoken:output, and number ranges 1..10.
+"""
+import configparser
+import itertools
+import random
+import re
+import typing
+from dataclasses import dataclass, field
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class Expression:
+    """Node of a parsed template."""
+
+
+@dataclass
+class Word(Expression):
+    """Spoken word (empty for output-only substitutions)."""
+
+    text: str
+
+
+@dataclass
+class Sequence(Expression):
+    """Items spoken in order."""
+
+    items: typing.List[Expression] = field(default_factory=list)
+
+
+@dataclass
+class Alternative(Expression):
+    """One of several choices (optional if one choice is empty)."""
+
+    choices: typing.List[Expression] = field(default_factory=list)
+
+
+@dataclass
+class RuleReference(Expression):
+    """<rule> or <Intent.rule>."""
+
+    name: str
+
+
+@dataclass
+class SlotReference(Expression):
+    """$slot whose values come from slot lists."""
+
+    name: str
+
+
+@dataclass
+class NumberRange(Expression):
+    """Integers from start to end (inclusive)."""
+
+    start: int
+    end: int
+    step: int = 1
+
+
+# -----------------------------------------------------------------------------
+
+_TOKEN_PATTERN = re.compile(
+    r"\s*(?:"
+    r"(?P<open>[(\[])|(?P<close>[)\]])|(?P<bar>\|)"
+    r"|<(?P<rule>[^>]+)>"
+    r"|\$(?P<slot>[\w.-]+)"
+    r"|\{(?P<tag>[^}]*)\}"
+    r"|(?P<range>-?\d+\.\.-?\d+(?:,\d+)?)"
+    r"|(?P<word>[^\s()\[\]|<>{}]+)"
+    r")"
+)
+
+_SUBSTITUTION_PATTERN = re.compile(r"^:[^\s()\[\]|<>{}]*")
+
+
+def parse_expression(text: str) -> Expression:
+    """Parse a template (sentence, rule body or slot value)."""
+    tokens = list(_tokenize(text))
+    expression, index = _parse_alternative(tokens, 0, end_char=None)
+    if index != len(tokens):
+        raise ValueError(f"Unexpected {tokens[index]} in: {text}")
+
+    return expression
+
+
+def _tokenize(text: str) -> typing.Iterable[typing.Tuple[str, str]]:
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN_PATTERN.match(text, position)
+        if (match is None) or (match.end() == position):
+            raise ValueError(f"Cannot parse at {position}: {text}")
+
+        position = match.end()
+        kind = match.lastgroup
+        assert kind is not None
+        value = match.group(kind)
+
+        if kind == "close":
+            # (...):output substitution applies to the whole group
+            sub_match = _SUBSTITUTION_PATTERN.match(text, position)
+            if sub_match:
+                position = sub_match.end()
+
+        if kind != "tag":
+            yield (kind, value)
+
+
+def _parse_alternative(
+    tokens: typing.List[typing.Tuple[str, str]],
+    index: int,
+    end_char: typing.Optional[str],
+) -> typing.Tuple[Expression, int]:
+    choices: typing.List[Expression] = []
+    sequence = Sequence()
+
+    while index < len(tokens):
+        kind, value = tokens[index]
+        if kind == "close":
+            if value != end_char:
+                raise ValueError(f"Mismatched {value}")
+
+            break
+
+        index += 1
+        if kind == "bar":
+            choices.append(sequence)
+            sequence = Sequence()
+        elif kind == "open":
+            close_char = ")" if value == "(" else "]"
+            group, index = _parse_alternative(tokens, index, close_char)
+            index += 1  # skip close
+
+            if value == "[":
+                # Optional
+                group = Alternative([group, Sequence()])
+
+            sequence.items.append(group)
+        elif kind == "rule":
+            sequence.items.append(RuleReference(value))
+        elif kind == "slot":
+            sequence.items.append(SlotReference(value))
+        elif kind == "range":
+            bounds, _, step = value.partition(",")
+            start, end = bounds.split("..")
+            sequence.items.append(NumberRange(int(start), int(end), int(step or 1)))
+        else:
+            # spoken:output substitution (only spoken part matters)
+            sequence.items.append(Word(value.split(":", 1)[0]))
+
+    choices.append(sequence)
+    if len(choices) == 1:
+        return choices[0], index
+
+    return Alternative(choices), index
+
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class Grammar:
+    """Parsed intents with their sentences and rules."""
+
+    sentences: typing.Dict[str, typing.List[Expression]] = field(default_factory=dict)
+    rules: typing.Dict[str, Expression] = field(default_factory=dict)
+    slots: typing.Dict[str, typing.List[Expression]] = field(default_factory=dict)
+
+    @classmethod
+    def parse(
+        cls,
+        ini_texts: typing.Iterable[str],
+        slots: typing.Optional[typing.Dict[str, typing.List[str]]] = None,
+    ) -> "Grammar":
+        """Parse sentences.ini files and slot values."""
+        grammar = Grammar()
+        for ini_text in ini_texts:
+            config = configparser.ConfigParser(
+                allow_no_value=True, strict=False, delimiters=["="]
+            )
+            config.optionxform = str  # type: ignore
+            config.read_string(ini_text)
+
+            for intent_name in config.sections():
+                intent_sentences = grammar.sentences.setdefault(intent_name, [])
+                for key, value in config[intent_name].items():
+                    if value is None:
+                        # Sentence
+                        intent_sentences.append(parse_expression(key))
+                    else:
+                        # Rule
+                        grammar.rules[
+                            f"{intent_name}.{key.strip()}"
+                        ] = parse_expression(value)
+
+        for slot_name, values in (slots or {}).items():
+            grammar.slots[slot_name] = [parse_expression(v) for v in values if v]
+
+        return grammar
+
+    def expand(
+        self, intent_name: str, limit: int = 1000
+    ) -> typing.List[typing.List[str]]:
+        """Spoken words of up to limit sentences for an intent."""
+        results: typing.List[typing.List[str]] = []
+        for sentence in self.sentences.get(intent_name, []):
+            for words in self._expand(sentence, intent_name, limit - len(results)):
+                results.append(words)
+                if len(results) >= limit:
+                    return results
+
+        return results
+
+    def expand_all(
+        self, limit_per_intent: int = 1000
+    ) -> typing.Dict[str, typing.List[str]]:
+        """Example sentences (as text) for every intent."""
+        return {
+            intent_name: [
+                " ".join(words) for words in self.expand(intent_name, limit_per_intent)
+            ]
+            for intent_name in self.sentences
+        }
+
+    def vocabulary(self) -> typing.Set[str]:
+        """All spoken words in the grammar."""
+        words: typing.Set[str] = set()
+        for sentences in self.expand_all().values():
+            for sentence in sentences:
+                words.update(sentence.split())
+
+        return words
+
+    def count(self, intent_name: str) -> int:
+        """Number of sentences of an intent (without expanding them)."""
+        return sum(
+            self._count(sentence, intent_name)
+            for sentence in self.sentences.get(intent_name, [])
+        )
+
+    def sample(self, intent_name: str, rng: random.Random) -> str:
+        """One random sentence of an intent (choices are equally likely)."""
+        sentences = self.sentences.get(intent_name)
+        if not sentences:
+            raise ValueError(f"No sentences for {intent_name}")
+
+        return " ".join(self._sample(rng.choice(sentences), intent_name, rng))
+
+    def _resolve(
+        self, reference: RuleReference, intent_name: str
+    ) -> typing.Tuple[Expression, str]:
+        rule_name = reference.name
+        if "." not in rule_name:
+            rule_name = f"{intent_name}.{rule_name}"
+
+        rule = self.rules.get(rule_name)
+        if rule is None:
+            raise ValueError(f"Missing rule: {rule_name}")
+
+        return rule, rule_name.split(".", 1)[0]
+
+    def _count(self, expression: Expression, intent_name: str) -> int:
+        if isinstance(expression, Word):
+            return 1
+
+        if isinstance(expression, NumberRange):
+            return len(range(expression.start, expression.end + 1, expression.step))
+
+        if isinstance(expression, Alternative):
+            return sum(self._count(c, intent_name) for c in expression.choices)
+
+        if isinstance(expression, RuleReference):
+            return self._count(*self._resolve(expression, intent_name))
+
+        if isinstance(expression, SlotReference):
+            return sum(
+                self._count(value, intent_name)
+                for value in self.slots.get(expression.name, [])
+            )
+
+        assert isinstance(expression, Sequence)
+        total = 1
+        for item in expression.items:
+            total *= self._count(item, intent_name)
+
+        return total
+
+    def _sample(
+        self, expression: Expression, intent_name: str, rng: random.Random
+    ) -> typing.List[str]:
+        if isinstance(expression, Word):
+            return [expression.text] if expression.text else []
+
+        if isinstance(expression, NumberRange):
+            numbers = range(expression.start, expression.end + 1, expression.step)
+            return [str(rng.choice(numbers))]
+
+        if isinstance(expression, Alternative):
+            return self._sample(rng.choice(expression.choices), intent_name, rng)
+
+        if isinstance(expression, RuleReference):
+            rule, rule_intent = self._resolve(expression, intent_name)
+            return self._sample(rule, rule_intent, rng)
+
+        if isinstance(expression, SlotReference):
+            values = self.slots.get(expression.name)
+            if not values:
+                return []
+
+            return self._sample(rng.choice(values), intent_name, rng)
+
+        assert isinstance(expression, Sequence)
+        return [
+            word
+            for item in expression.items
+            for word in self._sample(item, intent_name, rng)
+        ]
+
+    def _expand(
+        self, expression: Expression, intent_name: str, limit: int
+    ) -> typing.List[typing.List[str]]:
+        if limit <= 0:
+            return []
+
+        if isinstance(expression, Word):
+            return [[expression.text]] if expression.text else [[]]
+
+        if isinstance(expression, NumberRange):
+            numbers = range(expression.start, expression.end + 1, expression.step)
+            return [[str(n)] for n in itertools.islice(numbers, limit)]
+
+        if isinstance(expression, Alternative):
+            results: typing.List[typing.List[str]] = []
+            for choice in expression.choices:
+                results.extend(self._expand(choice, intent_name, limit - len(results)))
+
+            return results
+
+        if isinstance(expression, RuleReference):
+            rule, rule_intent = self._resolve(expression, intent_name)
+            return self._expand(rule, rule_intent, limit)
+
+        if isinstance(expression, SlotReference):
+            results = []
+            for value in self.slots.get(expression.name, []):
+                results.extend(self._expand(value, intent_name, limit - len(results)))
+
+            return results
+
+        assert isinstance(expression, Sequence)
+        item_expansions = [
+            self._expand(item, intent_name, limit) for item in expression.items
+        ]
+        return [
+            [word for words in combination for word in words]
+            for combination in itertools.islice(
+                itertools.product(*item_expansions), limit
+            )
+        ]
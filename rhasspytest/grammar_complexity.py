@@ -0,0 +1,311 @@
+"""Training time, model size and recognition latency vs grammar structure.
+
+Synthetic intents are generated from the profile's own vocabulary with:
+
+- depth: nested alternatives, (a (b | c) | d (e | f)), breadth choices each
+- optionals: [word] groups in the sentence
+- fan_out: rule references <rule_1> <rule_2> ..., breadth choices each
+- number_range: a (0..N){number} range
+
+By default, one parameter is varied at a time from a small baseline
+grammar. Each grammar is saved to a temporary sentences file and trained
+(optionally once per intent system), and random sentences from it are
+recognized with /api/text-to-intent. Model size is the total size of
+files written to the profile directory during training, if the directory
+is given.
+"""
+import html
+import itertools
+import logging
+import math
+import random
+import time
+import typing
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import requests
+
+from . import RhasspyConnection
+from .charts import svg_line_chart
+from .grammar import Grammar
+from .nlu import NluClient, NluRequest, fetch_grammar, summarize_results
+from .settings import ProfileSettings
+from .slots import post_sentences
+from .training import train
+
+_LOGGER = logging.getLogger(__name__)
+
+INTENT_NAME = "GrammarComplexity"
+SENTENCES_FILE = "intents/grammar_complexity.ini"
+
+DEFAULT_DEPTHS = (1, 2, 3, 4)
+DEFAULT_OPTIONALS = (0, 4, 8)
+DEFAULT_FAN_OUTS = (1, 2, 4, 8)
+DEFAULT_NUMBER_RANGES = (10, 100, 1000, 10000, 100000)
+
+# Plotted against the varied parameter
+PLOT_METRICS = ("train_seconds", "model_bytes", "latency_median")
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class GrammarSpec:
+    """Structure of a synthetic grammar."""
+
+    name: str
+    depth: int = 1
+    breadth: int = 3
+    optionals: int = 0
+    fan_out: int = 0
+    number_range: int = 0
+
+    @property
+    def axis(self) -> str:
+        """Parameter varied by this spec."""
+        return get_axis(self.name)
+
+
+def get_axis(spec_name: str) -> str:
+    """Parameter varied by a spec from its name (e.g., fan_out_4)."""
+    return spec_name.rsplit("_", 1)[0]
+
+
+def make_specs(
+    depths: typing.Sequence[int] = DEFAULT_DEPTHS,
+    optionals: typing.Sequence[int] = DEFAULT_OPTIONALS,
+    fan_outs: typing.Sequence[int] = DEFAULT_FAN_OUTS,
+    number_ranges: typing.Sequence[int] = DEFAULT_NUMBER_RANGES,
+    breadth: int = 3,
+) -> typing.List[GrammarSpec]:
+    """Vary one parameter at a time from depth 1 and nothing else."""
+    axes: typing.List[typing.Tuple[str, typing.Sequence[int]]] = [
+        ("depth", depths),
+        ("optionals", optionals),
+        ("fan_out", fan_outs),
+        ("number_range", number_ranges),
+    ]
+
+    return [
+        GrammarSpec(name=f"{axis}_{value}", breadth=breadth, **{axis: value})
+        for axis, values in axes
+        for value in values
+    ]
+
+
+def generate_ini(spec: GrammarSpec, words: typing.Sequence[str]) -> str:
+    """sentences.ini text of one intent with the structure of spec."""
+    if not words:
+        raise ValueError("Need vocabulary words")
+
+    next_word = itertools.cycle(words).__next__
+
+    def alternatives(depth: int) -> str:
+        if depth <= 0:
+            return next_word()
+
+        return (
+            "("
+            + " | ".join(
+                f"{next_word()} {alternatives(depth - 1)}" for _ in range(spec.breadth)
+            )
+            + ")"
+        )
+
+    rules = [
+        f"rule_{i} = ({' | '.join(next_word() for _ in range(spec.breadth))})"
+        for i in range(1, spec.fan_out + 1)
+    ]
+
+    parts = [next_word(), alternatives(spec.depth)]
+    parts.extend(f"[{next_word()}]" for _ in range(spec.optionals))
+    parts.extend(f"<rule_{i}>" for i in range(1, spec.fan_out + 1))
+    if spec.number_range > 0:
+        parts.append(f"(0..{spec.number_range}){{number}}")
+
+    return "\n".join([f"[{INTENT_NAME}]"] + rules + [" ".join(parts)]) + "\n"
+
+
+def trained_files(profile_dir: Path, since: float) -> typing.Dict[str, int]:
+    """Sizes of files in profile_dir modified at or after since (epoch)."""
+    sizes: typing.Dict[str, int] = {}
+    for path in profile_dir.rglob("*"):
+        try:
+            stat = path.stat()
+        except OSError:
+            # Removed while scanning
+            continue
+
+        if path.is_file() and (stat.st_mtime >= since):
+            sizes[str(path.relative_to(profile_dir))] = stat.st_size
+
+    return sizes
+
+
+# -----------------------------------------------------------------------------
+
+
+def measure_grammar(
+    connection: RhasspyConnection,
+    spec: GrammarSpec,
+    ini_text: str,
+    sentences: typing.Dict[str, str],
+    profile_dir: typing.Optional[Path] = None,
+    num_queries: int = 100,
+    train_timeout: typing.Optional[float] = None,
+) -> typing.Dict[str, typing.Any]:
+    """Train one grammar, then recognize random sentences from it."""
+    grammar = Grammar.parse([ini_text])
+    report: typing.Dict[str, typing.Any] = {
+        **asdict(spec),
+        "sentences": grammar.count(INTENT_NAME),
+    }
+
+    sentences[SENTENCES_FILE] = ini_text
+    post_sentences(connection, sentences)
+
+    # File times are whole seconds on some file systems
+    train_since = math.floor(time.time())
+    try:
+        report.update(train(connection, timeout=train_timeout))
+    except requests.RequestException as e:
+        _LOGGER.exception("train (%s)", spec.name)
+        report["error"] = str(e)
+        return report
+
+    if profile_dir is not None:
+        files = trained_files(profile_dir, train_since)
+        report["model_bytes"] = sum(files.values())
+        report["model_files"] = files
+
+    rng = random.Random(0)
+    queries = [
+        NluRequest(grammar.sample(INTENT_NAME, rng), "in_grammar", INTENT_NAME)
+        for _ in range(num_queries)
+    ]
+    results, wall_seconds = NluClient(connection, 1).run(queries)
+    report["text_to_intent"] = summarize_results(results, wall_seconds)
+
+    return report
+
+
+def benchmark(
+    connection: RhasspyConnection,
+    specs: typing.Sequence[GrammarSpec],
+    intent_systems: typing.Sequence[typing.Optional[str]] = (None,),
+    wav_dir: typing.Optional[Path] = None,
+    profile_dir: typing.Optional[Path] = None,
+    num_queries: int = 100,
+    train_timeout: typing.Optional[float] = None,
+) -> typing.Dict[str, typing.Any]:
+    """Measure every grammar for each intent system (None for the current one)."""
+    words = sorted(fetch_grammar(connection).vocabulary())
+    response = requests.get(
+        connection.api_url("sentences"), headers={"Accept": "application/json"}
+    )
+    response.raise_for_status()
+    sentences = response.json()
+
+    report: typing.Dict[str, typing.Any] = {"intent_systems": {}}
+    try:
+        for intent_system in intent_systems:
+            with ExitStack() as stack:
+                if intent_system:
+                    if wav_dir is None:
+                        raise ValueError("WAV directory is needed to switch systems")
+
+                    _LOGGER.debug("Intent system: %s", intent_system)
+                    settings = stack.enter_context(ProfileSettings(connection, wav_dir))
+                    settings.apply({"intent.system": intent_system})
+
+                report["intent_systems"][intent_system or "profile"] = [
+                    measure_grammar(
+                        connection,
+                        spec,
+                        generate_ini(spec, words),
+                        sentences,
+                        profile_dir=profile_dir,
+                        num_queries=num_queries,
+                        train_timeout=train_timeout,
+                    )
+                    for spec in specs
+                ]
+    finally:
+        # Remove temporary intent
+        sentences[SENTENCES_FILE] = ""
+        requests.post(connection.api_url("sentences"), json=sentences)
+        requests.post(connection.api_url("train"))
+
+    return report
+
+
+# -----------------------------------------------------------------------------
+
+
+def _metric(row: typing.Dict[str, typing.Any], metric: str) -> typing.Optional[float]:
+    if metric == "latency_median":
+        value = row.get("text_to_intent", {}).get("latency_seconds", {}).get("median")
+    else:
+        value = row.get(metric)
+
+    return float(value) if value is not None else None
+
+
+def write_html(report: typing.Dict[str, typing.Any], html_path: Path):
+    """Static HTML page with one chart per parameter and metric.
+
+    Each line is an intent system (hover for its name).
+    """
+    systems = report["intent_systems"]
+    axes: typing.List[str] = []
+    for rows in systems.values():
+        for row in rows:
+            axis = get_axis(row["name"])
+            if axis not in axes:
+                axes.append(axis)
+
+    sections = []
+    for axis in axes:
+        x_values = sorted(
+            {
+                row[axis]
+                for rows in systems.values()
+                for row in rows
+                if get_axis(row["name"]) == axis
+            }
+        )
+        charts = []
+        for metric in PLOT_METRICS:
+            series: typing.Dict[str, typing.List[typing.Optional[float]]] = {}
+            for system, rows in systems.items():
+                by_value = {
+                    row[axis]: _metric(row, metric)
+                    for row in rows
+                    if get_axis(row["name"]) == axis
+                }
+                series[system] = [by_value.get(x) for x in x_values]
+
+            charts.append(
+                svg_line_chart(
+                    f"{metric} vs {axis}",
+                    series,
+                    x_labels=[str(x) for x in x_values],
+                    width=480,
+                )
+            )
+
+        sections.append(f"<h2>{html.escape(axis)}</h2>\n" + "\n".join(charts))
+
+    title = "Grammar complexity"
+    legend = ", ".join(html.escape(system) for system in systems)
+    html_path.parent.mkdir(parents=True, exist_ok=True)
+    html_path.write_text(
+        "<!DOCTYPE html>\n"
+        f'<html><head><meta charset="utf-8"><title>{title}</title>'
+        "<style>body { font-family: sans-serif; } svg { font-size: 12px; }</style>"
+        f"</head><body><h1>{title}</h1>\n<p>Intent systems: {legend}</p>\n"
+        + "\n".join(sections)
+        + "\n</body></html>\n"
+    )
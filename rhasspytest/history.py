@@ -0,0 +1,528 @@
+"""SQLite store of past runs for performance trends.
+
+run-tests-for.sh replaces output/<lang>/<profile> every time, so the summary
+metrics and per-WAV timings of each run are copied here first, keyed by git
+commit, Docker image digest, profile and time.
+
+Pass/fail and duration of every profile run and test (outcomes) are kept
+too, along with a fingerprint of the profile or test file, for scheduling.
+"""
+import hashlib
+import html
+import json
+import logging
+import sqlite3
+import subprocess
+import time
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+
+from . import get_system, load_profile
+from .charts import svg_line_chart
+from .evaluate import real_time_factor
+from .stats import median
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TREND_METRICS = (
+    "real_time_factor",
+    "transcribe_seconds",
+    "word_error_rate",
+    "transcription_accuracy",
+    "intent_accuracy",
+    "startup_seconds",
+)
+
+# Metrics where lower values are better (for reporting changes)
+LOWER_IS_BETTER = {
+    "real_time_factor",
+    "transcribe_seconds",
+    "word_error_rate",
+    "startup_seconds",
+    "test_seconds",
+    "train_seconds",
+    "benchmark_real_time_factor",
+    "benchmark_pass_seconds",
+}
+
+# (file in output directory, metric name, path of keys in JSON)
+REPORT_METRICS: typing.List[typing.Tuple[str, str, typing.List[str]]] = [
+    ("report.json", "transcription_accuracy", ["transcription_accuracy"]),
+    ("report.json", "intent_accuracy", ["intent_accuracy"]),
+    ("report.json", "entity_accuracy", ["entity_accuracy"]),
+    ("report.json", "intent_entity_accuracy", ["intent_entity_accuracy"]),
+    ("report.json", "transcription_speedup", ["average_transcription_speedup"]),
+    ("startup.json", "startup_seconds", ["total_seconds"]),
+    ("test_timings.json", "test_seconds", ["test_seconds"]),
+    ("benchmark.json", "benchmark_real_time_factor", ["real_time_factor", "median"]),
+    ("benchmark.json", "benchmark_pass_seconds", ["pass_seconds", "median"]),
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    git_commit TEXT,
+    image_digest TEXT,
+    lang TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    speech_to_text TEXT,
+    intent TEXT
+);
+
+CREATE INDEX IF NOT EXISTS runs_by_profile ON runs (lang, profile, timestamp);
+CREATE INDEX IF NOT EXISTS runs_by_commit ON runs (git_commit);
+CREATE INDEX IF NOT EXISTS runs_by_image ON runs (image_digest);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS wavs (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    wav_name TEXT NOT NULL,
+    wav_seconds REAL,
+    transcribe_seconds REAL,
+    real_time_factor REAL,
+    word_errors INTEGER,
+    words INTEGER,
+    intent_correct INTEGER,
+    PRIMARY KEY (run_id, wav_name)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS wavs_by_name ON wavs (wav_name, run_id);
+
+CREATE TABLE IF NOT EXISTS outcomes (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    lang TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    seconds REAL,
+    fingerprint TEXT
+);
+
+CREATE INDEX IF NOT EXISTS outcomes_by_test
+ON outcomes (lang, profile, test_id, timestamp);
+"""
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class Run:
+    """One recorded run with its summary metrics."""
+
+    id: int
+    timestamp: float
+    git_commit: typing.Optional[str]
+    image_digest: typing.Optional[str]
+    lang: str
+    profile: str
+    metrics: typing.Dict[str, float]
+
+
+@dataclass
+class Outcome:
+    """Pass/fail of a whole profile run (empty test id) or one test."""
+
+    test_id: str
+    passed: bool
+    seconds: typing.Optional[float] = None
+    fingerprint: typing.Optional[str] = None
+    timestamp: typing.Optional[float] = None
+
+
+def get_git_commit(repo_dir: Path) -> typing.Optional[str]:
+    """Current commit of a git checkout (None if unavailable)."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=str(repo_dir),
+            universal_newlines=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _get_path(data: typing.Any, keys: typing.List[str]) -> typing.Optional[float]:
+    for key in keys:
+        if not isinstance(data, dict):
+            return None
+
+        data = data.get(key)
+
+    if isinstance(data, (int, float)) and not isinstance(data, bool):
+        return float(data)
+
+    return None
+
+
+def _load_json(path: Path) -> typing.Optional[typing.Any]:
+    if not path.is_file():
+        return None
+
+    try:
+        with open(path, "r") as json_file:
+            return json.load(json_file)
+    except ValueError:
+        _LOGGER.warning("Invalid JSON: %s", path)
+        return None
+
+
+def collect_metrics(output_dir: Path) -> typing.Dict[str, float]:
+    """Summary metrics from the reports in a run's output directory."""
+    metrics: typing.Dict[str, float] = {}
+    reports: typing.Dict[str, typing.Any] = {}
+    for file_name, metric_name, keys in REPORT_METRICS:
+        if file_name not in reports:
+            reports[file_name] = _load_json(output_dir / file_name)
+
+        value = _get_path(reports[file_name], keys)
+        if value is not None:
+            metrics[metric_name] = value
+
+    wavs = collect_wavs(reports.get("report.json"))
+    rtfs = [w["real_time_factor"] for w in wavs if w["real_time_factor"] is not None]
+    if rtfs:
+        metrics["real_time_factor"] = median(rtfs)
+
+    seconds = [
+        w["transcribe_seconds"] for w in wavs if w["transcribe_seconds"] is not None
+    ]
+    if seconds:
+        metrics["transcribe_seconds"] = median(seconds)
+
+    num_words = sum(w["words"] or 0 for w in wavs)
+    if num_words > 0:
+        metrics["word_error_rate"] = (
+            sum(w["word_errors"] or 0 for w in wavs) / num_words
+        )
+
+    return metrics
+
+
+def collect_wavs(report: typing.Optional[typing.Any]) -> typing.List[typing.Dict]:
+    """Per-WAV timings and errors from an /api/evaluate report."""
+    if not isinstance(report, dict):
+        return []
+
+    wavs = []
+    for wav_name, result in report.get("actual", {}).items():
+        word_error = result.get("word_error") or {}
+        intent_name = (result.get("intent") or {}).get("name")
+        expected_intent = result.get("expected_intent_name")
+        wavs.append(
+            {
+                "wav_name": Path(wav_name).name,
+                "wav_seconds": result.get("wav_seconds"),
+                "transcribe_seconds": result.get("transcribe_seconds"),
+                "real_time_factor": real_time_factor(result),
+                "word_errors": word_error.get("errors"),
+                "words": word_error.get("words"),
+                "intent_correct": None
+                if expected_intent is None
+                else int(intent_name == expected_intent),
+            }
+        )
+
+    return wavs
+
+
+def file_fingerprint(path: Path) -> typing.Optional[str]:
+    """Hash of a file, or of all file names and contents under a directory."""
+    if path.is_file():
+        file_paths = [path]
+    elif path.is_dir():
+        file_paths = sorted(p for p in path.rglob("*") if p.is_file())
+    else:
+        return None
+
+    hasher = hashlib.sha256()
+    for file_path in file_paths:
+        if file_path != path:
+            hasher.update(str(file_path.relative_to(path)).encode())
+
+        hasher.update(file_path.read_bytes())
+
+    return hasher.hexdigest()
+
+
+def collect_test_outcomes(
+    timings_path: Path, test_dir: typing.Optional[Path] = None
+) -> typing.List[Outcome]:
+    """Outcomes of tests in a test_timings.json file (without skipped tests).
+
+    Test files are fingerprinted if test_dir is given.
+    """
+    timings = _load_json(timings_path)
+    if not isinstance(timings, dict):
+        return []
+
+    fingerprints: typing.Dict[str, typing.Optional[str]] = {}
+    outcomes = []
+    for test in timings.get("tests", []):
+        if test.get("status") == "skip":
+            continue
+
+        # Test ids start with the test file's module name
+        module_name = test["id"].split(".", 1)[0]
+        if (test_dir is not None) and (module_name not in fingerprints):
+            fingerprints[module_name] = file_fingerprint(test_dir / f"{module_name}.py")
+
+        outcomes.append(
+            Outcome(
+                test_id=test["id"],
+                passed=(test.get("status") == "ok"),
+                seconds=test.get("seconds"),
+                fingerprint=fingerprints.get(module_name),
+            )
+        )
+
+    return outcomes
+
+
+# -----------------------------------------------------------------------------
+
+
+class HistoryStore:
+    """Runs, metrics and per-WAV timings in an SQLite database."""
+
+    def __init__(self, db_path: typing.Union[str, Path]):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.db_path))
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close database."""
+        self.db.close()
+
+    def record(
+        self,
+        lang: str,
+        profile: str,
+        output_dir: Path,
+        profile_dir: typing.Optional[Path] = None,
+        git_commit: typing.Optional[str] = None,
+        image_digest: typing.Optional[str] = None,
+        timestamp: typing.Optional[float] = None,
+    ) -> int:
+        """Store the reports in a run's output directory, returning run id."""
+        profile_json = load_profile(profile_dir) if profile_dir else {}
+        metrics = collect_metrics(output_dir)
+        wavs = collect_wavs(_load_json(output_dir / "report.json"))
+
+        with self.db:
+            cursor = self.db.execute(
+                "INSERT INTO runs "
+                "(timestamp, git_commit, image_digest, lang, profile, "
+                "speech_to_text, intent) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time() if timestamp is None else timestamp,
+                    git_commit,
+                    image_digest,
+                    lang,
+                    profile,
+                    get_system(profile_json, "speech_to_text"),
+                    get_system(profile_json, "intent"),
+                ),
+            )
+            run_id = cursor.lastrowid
+            assert run_id is not None
+
+            self.db.executemany(
+                "INSERT INTO metrics (run_id, name, value) VALUES (?, ?, ?)",
+                [(run_id, name, value) for name, value in metrics.items()],
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO wavs "
+                "(run_id, wav_name, wav_seconds, transcribe_seconds, "
+                "real_time_factor, word_errors, words, intent_correct) "
+                "VALUES (:run_id, :wav_name, :wav_seconds, :transcribe_seconds, "
+                ":real_time_factor, :word_errors, :words, :intent_correct)",
+                [{"run_id": run_id, **wav} for wav in wavs],
+            )
+
+        return run_id
+
+    def last_runs(self, lang: str, profile: str, limit: int = 20) -> typing.List[Run]:
+        """Most recent runs of a profile (oldest first)."""
+        rows = self.db.execute(
+            "SELECT id, timestamp, git_commit, image_digest, lang, profile "
+            "FROM runs WHERE lang = ? AND profile = ? "
+            "ORDER BY timestamp DESC LIMIT ?",
+            (lang, profile, limit),
+        ).fetchall()
+
+        runs = {
+            run_id: Run(
+                id=run_id,
+                timestamp=timestamp,
+                git_commit=git_commit,
+                image_digest=image_digest,
+                lang=run_lang,
+                profile=run_profile,
+                metrics={},
+            )
+            for run_id, timestamp, git_commit, image_digest, run_lang, run_profile in rows
+        }
+        if runs:
+            placeholders = ",".join("?" * len(runs))
+            for run_id, name, value in self.db.execute(
+                "SELECT run_id, name, value FROM metrics "
+                f"WHERE run_id IN ({placeholders})",
+                list(runs),
+            ):
+                runs[run_id].metrics[name] = value
+
+        return sorted(runs.values(), key=lambda run: run.timestamp)
+
+    def record_outcomes(
+        self,
+        lang: str,
+        profile: str,
+        outcomes: typing.Iterable[Outcome],
+        timestamp: typing.Optional[float] = None,
+    ):
+        """Store pass/fail of a profile run and its tests."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO outcomes "
+                "(timestamp, lang, profile, test_id, passed, seconds, fingerprint) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        timestamp if o.timestamp is None else o.timestamp,
+                        lang,
+                        profile,
+                        o.test_id,
+                        int(o.passed),
+                        o.seconds,
+                        o.fingerprint,
+                    )
+                    for o in outcomes
+                ],
+            )
+
+    def last_outcomes(
+        self, lang: str, profile: str, test_id: str = "", limit: int = 10
+    ) -> typing.List[Outcome]:
+        """Most recent outcomes of a profile run or test (oldest first)."""
+        rows = self.db.execute(
+            "SELECT test_id, passed, seconds, fingerprint, timestamp FROM outcomes "
+            "WHERE lang = ? AND profile = ? AND test_id = ? "
+            "ORDER BY timestamp DESC LIMIT ?",
+            (lang, profile, test_id, limit),
+        ).fetchall()
+
+        return [
+            Outcome(test_id, bool(passed), seconds, fingerprint, timestamp)
+            for test_id, passed, seconds, fingerprint, timestamp in reversed(rows)
+        ]
+
+    def wav_trend(
+        self, lang: str, profile: str, wav_name: str, limit: int = 20
+    ) -> typing.List[typing.Tuple[float, typing.Optional[float]]]:
+        """(timestamp, real-time factor) of one WAV in recent runs."""
+        rows = self.db.execute(
+            "SELECT runs.timestamp, wavs.real_time_factor FROM runs "
+            "JOIN wavs ON wavs.run_id = runs.id AND wavs.wav_name = ? "
+            "WHERE runs.lang = ? AND runs.profile = ? "
+            "ORDER BY runs.timestamp DESC LIMIT ?",
+            (wav_name, lang, profile, limit),
+        ).fetchall()
+
+        return list(reversed(rows))
+
+
+# -----------------------------------------------------------------------------
+
+
+def relative_change(
+    runs: typing.List[Run], metric: str, baseline_runs: int = 5
+) -> typing.Optional[float]:
+    """Change of latest value vs median of up to baseline_runs runs before it.
+
+    Positive means worse, taking LOWER_IS_BETTER into account.
+    """
+    values = [run.metrics[metric] for run in runs if metric in run.metrics]
+    if len(values) < 2:
+        return None
+
+    baseline = median(values[-(baseline_runs + 1) : -1])
+    if baseline == 0:
+        return None
+
+    change = (values[-1] - baseline) / abs(baseline)
+    return change if metric in LOWER_IS_BETTER else (0.0 - change)
+
+
+def format_trend(runs: typing.List[Run], metrics: typing.Sequence[str]) -> str:
+    """Text table of metrics per run, with change of the latest run."""
+    header = ["time", "commit", "image"] + list(metrics)
+    rows = [header]
+    for run in runs:
+        rows.append(
+            [
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(run.timestamp)),
+                (run.git_commit or "")[:8],
+                (run.image_digest or "").replace("sha256:", "")[:12],
+            ]
+            + [
+                f"{run.metrics[metric]:.4g}" if metric in run.metrics else "-"
+                for metric in metrics
+            ]
+        )
+
+    changes = [relative_change(runs, metric) for metric in metrics]
+    rows.append(
+        ["change", "", ""]
+        + [f"{100 * c:+.1f}%" if c is not None else "-" for c in changes]
+    )
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
+
+
+def _svg_chart(runs: typing.List[Run], metric: str) -> str:
+    values = [run.metrics.get(metric) for run in runs]
+    titles = [
+        f"{(run.git_commit or '')[:8]} {(run.image_digest or '')[:19]} {value:.4g}"
+        if value is not None
+        else ""
+        for run, value in zip(runs, values)
+    ]
+
+    return svg_line_chart(metric, {metric: values}, point_titles={metric: titles})
+
+
+def write_html(
+    runs: typing.List[Run], metrics: typing.Sequence[str], title: str, html_path: Path
+):
+    """Static HTML page with one line chart per metric (hover for commit)."""
+    charts = "\n".join(f"<div>{_svg_chart(runs, metric)}</div>" for metric in metrics)
+    html_path.parent.mkdir(parents=True, exist_ok=True)
+    html_path.write_text(
+        "<!DOCTYPE html>\n"
+        f'<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+        "<style>body { font-family: sans-serif; } svg { font-size: 12px; }</style>"
+        f"</head><body><h1>{html.escape(title)}</h1>\n{charts}\n</body></html>\n"
+    )
@@ -0,0 +1,125 @@
+"""CPU pinning and host conditions (Linux)."""
+import logging
+import os
+import re
+import time
+import typing
+from pathlib import Path
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+
+
+def parse_cpu_list(cpu_list: str) -> typing.List[int]:
+    """Parse a CPU list like 0-3,6 (same as taskset/docker --cpuset-cpus)."""
+    cpus: typing.List[int] = []
+    for part in cpu_list.split(","):
+        part = part.strip()
+        if not part:
+            continue
+
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+
+    return sorted(set(cpus))
+
+
+def format_cpu_list(cpus: typing.Iterable[int]) -> str:
+    """Format CPUs as a comma-separated list (for docker --cpuset-cpus)."""
+    return ",".join(str(cpu) for cpu in sorted(cpus))
+
+
+def available_cpus() -> typing.List[int]:
+    """CPUs the current process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+
+    return list(range(os.cpu_count() or 1))
+
+
+def split_cpus(
+    cpus: typing.Sequence[int], num_groups: int
+) -> typing.List[typing.List[int]]:
+    """Divide CPUs into disjoint, equally sized groups (extra CPUs unused)."""
+    group_size = len(cpus) // num_groups
+    if group_size < 1:
+        raise ValueError(f"Cannot split {len(cpus)} CPU(s) into {num_groups} groups")
+
+    return [
+        list(cpus[i * group_size : (i + 1) * group_size]) for i in range(num_groups)
+    ]
+
+
+def pin_process(cpus: typing.Iterable[int], pid: int = 0):
+    """Restrict a process (default: this one) to CPUs."""
+    cpus = set(cpus)
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(pid, cpus)
+        _LOGGER.debug("Pinned %s to CPU(s) %s", pid or os.getpid(), sorted(cpus))
+    else:
+        _LOGGER.warning("CPU pinning is not supported on this platform")
+
+
+# -----------------------------------------------------------------------------
+
+
+def cpu_frequencies_mhz(
+    cpus: typing.Optional[typing.Iterable[int]] = None,
+) -> typing.Dict[int, float]:
+    """Current frequency of each CPU from cpufreq (or /proc/cpuinfo)."""
+    cpus = available_cpus() if cpus is None else list(cpus)
+    frequencies: typing.Dict[int, float] = {}
+    for cpu in cpus:
+        freq_path = Path(f"/sys/devices/system/cpu/cpu{cpu}/cpufreq/scaling_cur_freq")
+        try:
+            frequencies[cpu] = int(freq_path.read_text().strip()) / 1000
+        except (OSError, ValueError):
+            pass
+
+    if frequencies:
+        return frequencies
+
+    # Virtual machines often don't expose cpufreq
+    try:
+        cpuinfo = Path("/proc/cpuinfo").read_text()
+    except OSError:
+        return frequencies
+
+    processor: typing.Optional[int] = None
+    for line in cpuinfo.splitlines():
+        match = re.match(r"^(processor|cpu MHz)\s*:\s*(\S+)", line)
+        if match is None:
+            continue
+
+        if match.group(1) == "processor":
+            processor = int(match.group(2))
+        elif (processor is not None) and (processor in cpus):
+            frequencies[processor] = float(match.group(2))
+
+    return frequencies
+
+
+def host_conditions(
+    cpus: typing.Optional[typing.Iterable[int]] = None,
+) -> typing.Dict[str, typing.Any]:
+    """CPU frequency and system load right now, to store with a result."""
+    cpus = available_cpus() if cpus is None else sorted(cpus)
+    frequencies = cpu_frequencies_mhz(cpus)
+    load_average = list(os.getloadavg()) if hasattr(os, "getloadavg") else None
+
+    return {
+        "timestamp": time.time(),
+        "cpus": cpus,
+        "cpu_mhz": {
+            "min": min(frequencies.values()),
+            "mean": sum(frequencies.values()) / len(frequencies),
+            "max": max(frequencies.values()),
+        }
+        if frequencies
+        else None,
+        "load_average": load_average,
+    }
@@ -0,0 +1,359 @@
+"""Interleaved A/B evaluation of Rhasspy configurations on pinned CPUs.
+
+Every configuration (test profile and Docker image) gets its own container,
+restricted to a dedicated CPU set, and all containers run for the whole
+benchmark. Evaluation passes then alternate between configurations round
+by round, so slow drift on the host (thermal throttling, other jobs) affects
+all of them equally instead of whichever happened to run last. The load
+generator (this process) is pinned to its own CPUs as well.
+"""
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import typing
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import requests
+
+from . import RhasspyConnection, load_profile
+from .evaluate import build_archive, evaluate, real_time_factor
+from .host import (
+    available_cpus,
+    format_cpu_list,
+    host_conditions,
+    pin_process,
+    split_cpus,
+)
+from .startup import wait_ready
+from .stats import median, summarize
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_IMAGE = "rhasspy/rhasspy:latest"
+DEFAULT_DOWNLOAD_URL_BASE = "http://localhost:5000"
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class Configuration:
+    """Test profile and Docker image to compare."""
+
+    name: str
+    profile_dir: Path
+    image: str = DEFAULT_IMAGE
+    cpus: typing.List[int] = field(default_factory=list)
+
+    @classmethod
+    def parse(cls, spec: str, profiles_dir: Path) -> "Configuration":
+        """Parse <PROFILE>[@<IMAGE>] (e.g., test_kaldi@rhasspy/rhasspy:2.5.9)."""
+        profile_name, _, image = spec.partition("@")
+        profile_dir = profiles_dir / profile_name
+        if not profile_dir.is_dir():
+            raise FileNotFoundError(f"Directory does not exist: {profile_dir}")
+
+        return Configuration(
+            name=spec, profile_dir=profile_dir, image=image or DEFAULT_IMAGE
+        )
+
+
+def get_free_port() -> int:
+    """Unused TCP port (same as scripts/get-free-port)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("", 0))
+        return s.getsockname()[1]
+
+
+def copy_tree(source_dir: Path, dest_dir: Path):
+    """Copy directory contents, merging with existing files (like cp -R)."""
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    for source_path in source_dir.iterdir():
+        if source_path.is_dir():
+            copy_tree(source_path, dest_dir / source_path.name)
+        else:
+            shutil.copy2(source_path, dest_dir / source_path.name)
+
+
+class RhasspyContainer:
+    """Trained Rhasspy Docker container for a configuration.
+
+    Same steps as run-tests-for.sh: copy profile, start, download, restart
+    and train, then wait until the trained models answer.
+    """
+
+    def __init__(
+        self,
+        config: Configuration,
+        lang: str,
+        temp_dir: Path,
+        wav_dir: Path,
+        download_url_base: str = DEFAULT_DOWNLOAD_URL_BASE,
+        timeout: float = 600,
+    ):
+        self.config = config
+        self.lang = lang
+        self.temp_dir = temp_dir
+        self.wav_dir = wav_dir
+        self.download_url_base = download_url_base
+        self.timeout = timeout
+
+        self.connection = RhasspyConnection(
+            http_port=get_free_port(), mqtt_port=get_free_port()
+        )
+        self.container_id: typing.Optional[str] = None
+
+    def __enter__(self):
+        profile_dir = self.config.profile_dir
+        user_profiles_dir = self.temp_dir / f"{len(os.listdir(self.temp_dir))}"
+        lang_dir = user_profiles_dir / self.lang
+        copy_tree(profile_dir, lang_dir)
+
+        # Shared files go on top
+        copy_tree(profile_dir.parent / "shared", lang_dir)
+
+        docker_command = ["docker", "run", "-d"]
+        if self.config.cpus:
+            docker_command += ["--cpuset-cpus", format_cpu_list(self.config.cpus)]
+
+        docker_command += [
+            "-v",
+            f"{user_profiles_dir}:/profiles",
+            "--user",
+            f"{os.getuid()}:{os.getgid()}",
+            "--network",
+            "host",
+            self.config.image,
+            "--profile",
+            self.lang,
+            "--user-profiles",
+            "/profiles",
+            "--http-port",
+            str(self.connection.http_port),
+            "--local-mqtt-port",
+            str(self.connection.mqtt_port),
+            "--",
+            "--set",
+            "download.url_base",
+            self.download_url_base,
+        ]
+        _LOGGER.debug(docker_command)
+        self.container_id = subprocess.check_output(
+            docker_command, universal_newlines=True
+        ).strip()
+
+        try:
+            self.prepare()
+        except Exception:
+            self.stop()
+            raise
+
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def prepare(self):
+        """Wait for web server, then download, restart and train."""
+        deadline = time.perf_counter() + self.timeout
+        while True:
+            try:
+                requests.get(self.connection.api_url("version")).raise_for_status()
+                break
+            except requests.RequestException:
+                if time.perf_counter() > deadline:
+                    raise
+
+                time.sleep(0.1)
+
+        profile = load_profile(self.config.profile_dir)
+        for fragment in ["download-profile", "restart"]:
+            response = requests.post(self.connection.api_url(fragment))
+            response.raise_for_status()
+
+        wait_ready(self.connection, profile, self.wav_dir, timeout=self.timeout)
+
+        response = requests.post(self.connection.api_url("train"))
+        response.raise_for_status()
+
+        wait_ready(
+            self.connection,
+            profile,
+            self.wav_dir,
+            require_success=True,
+            timeout=self.timeout,
+        )
+
+    def stop(self):
+        """Stop container."""
+        if self.container_id:
+            subprocess.run(["docker", "stop", self.container_id], check=False)
+            self.container_id = None
+
+
+# -----------------------------------------------------------------------------
+
+
+def assign_cpus(
+    configurations: typing.List[Configuration],
+    loadgen_cpus: typing.Optional[typing.List[int]] = None,
+) -> typing.List[int]:
+    """Give configurations without CPUs a disjoint set each; return loadgen CPUs.
+
+    Available CPUs are split into one group per configuration plus one for
+    the load generator.
+    """
+    used_cpus = {cpu for config in configurations for cpu in config.cpus}
+    used_cpus.update(loadgen_cpus or [])
+    free_cpus = [cpu for cpu in available_cpus() if cpu not in used_cpus]
+
+    unpinned = [config for config in configurations if not config.cpus]
+    num_groups = len(unpinned) + (0 if loadgen_cpus else 1)
+    if num_groups > 0:
+        groups = split_cpus(free_cpus, num_groups)
+        for config, cpus in zip(unpinned, groups):
+            config.cpus = cpus
+
+        if not loadgen_cpus:
+            loadgen_cpus = groups[-1]
+
+    assert loadgen_cpus is not None
+    return loadgen_cpus
+
+
+def interleave(
+    lang: str,
+    configurations: typing.List[Configuration],
+    wav_dir: Path,
+    rounds: int = 5,
+    warmup: int = 1,
+    loadgen_cpus: typing.Optional[typing.List[int]] = None,
+    pin: bool = True,
+    download_url_base: str = DEFAULT_DOWNLOAD_URL_BASE,
+) -> typing.Dict[str, typing.Any]:
+    """Evaluate configurations round-robin and compare them to the first.
+
+    The configuration that goes first rotates every round. Host conditions
+    are recorded before each pass on the configuration's CPUs.
+    """
+    if pin:
+        loadgen_cpus = assign_cpus(configurations, loadgen_cpus)
+        pin_process(loadgen_cpus)
+
+    archive = build_archive(wav_dir)
+    passes: typing.Dict[str, typing.List[typing.Dict[str, typing.Any]]] = {
+        config.name: [] for config in configurations
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir, ExitStack() as stack:
+        containers = [
+            stack.enter_context(
+                RhasspyContainer(
+                    config,
+                    lang,
+                    Path(temp_dir),
+                    wav_dir,
+                    download_url_base=download_url_base,
+                )
+            )
+            for config in configurations
+        ]
+
+        for container in containers:
+            for _ in range(warmup):
+                evaluate(container.connection, archive)
+
+        for round_index in range(rounds):
+            offset = round_index % len(containers)
+            order = containers[offset:] + containers[:offset]
+            for position, container in enumerate(order):
+                _LOGGER.debug("Round %s: %s", round_index + 1, container.config.name)
+                host = host_conditions(container.config.cpus or None)
+
+                start_time = time.perf_counter()
+                report = evaluate(container.connection, archive)
+                pass_seconds = time.perf_counter() - start_time
+
+                rtfs = [
+                    rtf
+                    for rtf in map(real_time_factor, report.get("actual", {}).values())
+                    if rtf is not None
+                ]
+                passes[container.config.name].append(
+                    {
+                        "round": round_index,
+                        "position": position,
+                        "pass_seconds": pass_seconds,
+                        "real_time_factor": median(rtfs) if rtfs else None,
+                        "host": host,
+                    }
+                )
+
+    return {
+        "rounds": rounds,
+        "warmup": warmup,
+        "loadgen_cpus": loadgen_cpus if pin else None,
+        "configurations": [
+            summarize_configuration(config, passes[config.name])
+            for config in configurations
+        ],
+        "comparison": compare(configurations, passes),
+    }
+
+
+def summarize_configuration(
+    config: Configuration, config_passes: typing.List[typing.Dict[str, typing.Any]]
+) -> typing.Dict[str, typing.Any]:
+    """Summary of one configuration's passes."""
+    return {
+        "name": config.name,
+        "profile": config.profile_dir.name,
+        "image": config.image,
+        "cpus": config.cpus,
+        "pass_seconds": summarize([p["pass_seconds"] for p in config_passes]),
+        "real_time_factor": summarize(
+            [
+                p["real_time_factor"]
+                for p in config_passes
+                if p["real_time_factor"] is not None
+            ]
+        ),
+        "passes": config_passes,
+    }
+
+
+def compare(
+    configurations: typing.List[Configuration],
+    passes: typing.Dict[str, typing.List[typing.Dict[str, typing.Any]]],
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Per-round ratios of each configuration to the first (baseline).
+
+    Ratios are paired by round, so conditions shared within a round cancel.
+    """
+    baseline = configurations[0]
+    comparisons = []
+    for config in configurations[1:]:
+        pairs = list(zip(passes[baseline.name], passes[config.name]))
+        comparisons.append(
+            {
+                "baseline": baseline.name,
+                "name": config.name,
+                "pass_seconds_ratio": summarize(
+                    [c["pass_seconds"] / b["pass_seconds"] for b, c in pairs]
+                ),
+                "real_time_factor_ratio": summarize(
+                    [
+                        c["real_time_factor"] / b["real_time_factor"]
+                        for b, c in pairs
+                        if b["real_time_factor"] and (c["real_time_factor"] is not None)
+                    ]
+                ),
+            }
+        )
+
+    return comparisons
@@ -0,0 +1,276 @@
+"""Speech recognition latency and memory of long audio.
+
+Inputs from a second up to several minutes are made by concatenating the
+corpus WAV files (in name order, repeated as needed). They are never held
+in memory: a WAV header with the final length is followed by frames read
+from the corpus files while the request body is sent with chunked
+transfer encoding.
+
+Latency, real-time factor and peak memory of Rhasspy are recorded against
+audio length. The scaling exponent is the slope of log(latency) over
+log(seconds): about 1 is linear, while 2 points to quadratic buffering or
+whole-file copies in the recognition path.
+"""
+import logging
+import math
+import struct
+import time
+import typing
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+
+from . import RhasspyConnection
+from .resources import ResourceMonitor, get_rhasspy_pid
+from .stats import linear_slope, median
+
+_LOGGER = logging.getLogger(__name__)
+
+ENDPOINTS = ("speech-to-text", "speech-to-intent")
+DEFAULT_LENGTHS = (1, 10, 30, 60, 120, 300, 600)
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+
+# -----------------------------------------------------------------------------
+
+
+def wav_header(
+    sample_rate: int, sample_width: int, channels: int, data_bytes: int
+) -> bytes:
+    """Canonical 44 byte PCM WAV header for data_bytes of frames."""
+    block_align = sample_width * channels
+    return _WAV_HEADER.pack(
+        b"RIFF",
+        36 + data_bytes,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,
+        channels,
+        sample_rate,
+        sample_rate * block_align,
+        block_align,
+        sample_width * 8,
+        b"data",
+        data_bytes,
+    )
+
+
+@dataclass
+class LongAudio:
+    """Corpus WAV files concatenated to a fixed length."""
+
+    seconds: float
+    wav_paths: typing.List[Path]
+    sample_rate: int
+    sample_width: int
+    channels: int
+
+    @classmethod
+    def from_corpus(
+        cls, wav_paths: typing.Iterable[Path], seconds: float
+    ) -> "LongAudio":
+        """Use files with the same format as the first one."""
+        wav_paths = sorted(wav_paths)
+        if not wav_paths:
+            raise ValueError("No WAV files")
+
+        with wave.open(str(wav_paths[0]), "rb") as wav_file:
+            wav_format = (
+                wav_file.getframerate(),
+                wav_file.getsampwidth(),
+                wav_file.getnchannels(),
+            )
+
+        same_format = []
+        for wav_path in wav_paths:
+            with wave.open(str(wav_path), "rb") as wav_file:
+                if (
+                    wav_file.getframerate(),
+                    wav_file.getsampwidth(),
+                    wav_file.getnchannels(),
+                ) != wav_format:
+                    _LOGGER.warning("Skipping %s (different format)", wav_path)
+                    continue
+
+                if wav_file.getnframes() > 0:
+                    same_format.append(wav_path)
+
+        return LongAudio(seconds, same_format, *wav_format)
+
+    @property
+    def block_align(self) -> int:
+        """Bytes per frame."""
+        return self.sample_width * self.channels
+
+    @property
+    def data_bytes(self) -> int:
+        """Length of audio frames in bytes."""
+        return int(self.seconds * self.sample_rate) * self.block_align
+
+    def chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> typing.Iterable[bytes]:
+        """WAV header, then frames of the corpus files until seconds are reached."""
+        yield wav_header(
+            self.sample_rate, self.sample_width, self.channels, self.data_bytes
+        )
+
+        if not self.wav_paths:
+            raise ValueError("No WAV files")
+
+        frames_per_chunk = max(1, chunk_size // self.block_align)
+        bytes_left = self.data_bytes
+        while bytes_left > 0:
+            for wav_path in self.wav_paths:
+                with wave.open(str(wav_path), "rb") as wav_file:
+                    while bytes_left > 0:
+                        frames = wav_file.readframes(frames_per_chunk)
+                        if not frames:
+                            break
+
+                        frames = frames[:bytes_left]
+                        yield frames
+                        bytes_left -= len(frames)
+
+                if bytes_left <= 0:
+                    break
+
+
+# -----------------------------------------------------------------------------
+
+
+def transcribe(
+    connection: RhasspyConnection,
+    audio: LongAudio,
+    endpoint: str,
+    timeout: typing.Optional[float] = None,
+) -> typing.Dict[str, typing.Any]:
+    """POST long audio with chunked upload and record latency and memory."""
+    upload_end_time: typing.Optional[float] = None
+
+    def body():
+        nonlocal upload_end_time
+        yield from audio.chunks()
+        upload_end_time = time.perf_counter()
+
+    result: typing.Dict[str, typing.Any] = {
+        "endpoint": endpoint,
+        "audio_seconds": audio.seconds,
+        "audio_bytes": audio.data_bytes,
+    }
+
+    with ResourceMonitor(get_rhasspy_pid(), interval=0.1) as monitor:
+        start_time = time.perf_counter()
+        try:
+            response = requests.post(
+                connection.api_url(endpoint),
+                data=body(),
+                headers={"Content-Type": "audio/wav"},
+                timeout=timeout,
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            _LOGGER.exception("transcribe")
+            result["error"] = repr(e)
+            return result
+        finally:
+            end_time = time.perf_counter()
+
+    latency_seconds = end_time - start_time
+    if endpoint == "speech-to-intent":
+        text = response.json().get("text", "")
+    else:
+        text = response.text
+
+    result.update(
+        {
+            "latency_seconds": latency_seconds,
+            "upload_seconds": (upload_end_time - start_time)
+            if upload_end_time
+            else None,
+            "after_upload_seconds": (end_time - upload_end_time)
+            if upload_end_time
+            else None,
+            "real_time_factor": latency_seconds / audio.seconds,
+            "words": len(text.split()),
+        }
+    )
+
+    if monitor.samples:
+        peak_rss_bytes = monitor.peak_rss_bytes() or 0
+        result["peak_rss_bytes"] = peak_rss_bytes
+        result["rss_growth_bytes"] = peak_rss_bytes - monitor.samples[0].rss_bytes
+
+    return result
+
+
+def scaling_exponent(
+    xs: typing.Sequence[float], ys: typing.Sequence[float]
+) -> typing.Optional[float]:
+    """Slope of log(y) over log(x), using positive pairs only."""
+    pairs = [(math.log(x), math.log(y)) for x, y in zip(xs, ys) if (x > 0) and (y > 0)]
+    return linear_slope([x for x, _ in pairs], [y for _, y in pairs])
+
+
+def summarize_scaling(
+    results: typing.List[typing.Dict[str, typing.Any]]
+) -> typing.Dict[str, typing.Any]:
+    """Median per length and scaling of latency and memory with length."""
+    by_length: typing.Dict[float, typing.List[typing.Dict[str, typing.Any]]] = {}
+    for result in results:
+        if "error" not in result:
+            by_length.setdefault(result["audio_seconds"], []).append(result)
+
+    lengths = sorted(by_length)
+    latencies = [median([r["latency_seconds"] for r in by_length[s]]) for s in lengths]
+    summary: typing.Dict[str, typing.Any] = {
+        "lengths": [
+            {
+                "audio_seconds": seconds,
+                "latency_seconds": latency,
+                "real_time_factor": latency / seconds,
+                "peak_rss_bytes": max(
+                    (r.get("peak_rss_bytes") or 0) for r in by_length[seconds]
+                )
+                or None,
+            }
+            for seconds, latency in zip(lengths, latencies)
+        ],
+        "latency_exponent": scaling_exponent(lengths, latencies),
+        "latency_seconds_per_audio_second": linear_slope(lengths, latencies),
+    }
+
+    peaks = [length["peak_rss_bytes"] for length in summary["lengths"]]
+    if all(peaks):
+        summary["rss_bytes_per_audio_second"] = linear_slope(lengths, peaks)
+
+    return summary
+
+
+def benchmark(
+    connection: RhasspyConnection,
+    wav_paths: typing.Iterable[Path],
+    lengths: typing.Sequence[float] = DEFAULT_LENGTHS,
+    endpoints: typing.Sequence[str] = ENDPOINTS,
+    repeats: int = 1,
+    timeout: typing.Optional[float] = None,
+) -> typing.Dict[str, typing.Any]:
+    """Transcribe every length with every endpoint, shortest first."""
+    wav_paths = list(wav_paths)
+    report: typing.Dict[str, typing.Any] = {"endpoints": {}}
+    for endpoint in endpoints:
+        results = []
+        for seconds in sorted(lengths):
+            audio = LongAudio.from_corpus(wav_paths, seconds)
+            for _ in range(repeats):
+                _LOGGER.debug("%s (%s second(s))", endpoint, seconds)
+                results.append(transcribe(connection, audio, endpoint, timeout))
+
+        report["endpoints"][endpoint] = {
+            "results": results,
+            **summarize_scaling(results),
+        }
+
+    return report
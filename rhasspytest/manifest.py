@@ -0,0 +1,253 @@
+"""Indexed manifest of a WAV corpus (one SQLite file per language).
+
+Every utterance in wav/<lang> is a WAV file and a sidecar JSON with the
+expected text, intent and entities. The manifest keeps the WAV format,
+duration and SHA-256 together with the expected results, so subsets can
+be selected without opening thousands of small files.
+
+Updates are incremental: only files whose size or modification time
+changed are read again. Random samples are hash-stable: utterances are
+ordered by a hash of their content (and a seed), so the same sample is
+chosen on every machine, and adding files never reshuffles it.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import typing
+import wave
+from dataclasses import dataclass
+from pathlib import Path
+
+from .audio import load_sidecar
+
+_LOGGER = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS utterances (
+    name TEXT PRIMARY KEY,
+    wav_path TEXT NOT NULL,
+    wav_size INTEGER NOT NULL,
+    wav_mtime_ns INTEGER NOT NULL,
+    json_size INTEGER,
+    json_mtime_ns INTEGER,
+    sha256 TEXT NOT NULL,
+    sample_rate INTEGER,
+    sample_width INTEGER,
+    channels INTEGER,
+    seconds REAL,
+    text TEXT,
+    intent TEXT,
+    entities TEXT
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS utterances_by_intent ON utterances (intent, seconds);
+CREATE INDEX IF NOT EXISTS utterances_by_seconds ON utterances (seconds);
+"""
+
+_CHUNK_SIZE = 64 * 1024
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class Utterance:
+    """WAV file and expected recognition results."""
+
+    name: str
+    wav_path: Path
+    sha256: str
+    sample_rate: typing.Optional[int]
+    seconds: typing.Optional[float]
+    text: typing.Optional[str]
+    intent: typing.Optional[str]
+    entities: typing.List[typing.Dict[str, typing.Any]]
+
+    @property
+    def json_path(self) -> Path:
+        """Path to sidecar JSON."""
+        return self.wav_path.with_suffix(".json")
+
+    def sample_key(self, seed: int = 0) -> str:
+        """Stable position in a random sample."""
+        return hashlib.sha256(f"{seed}:{self.sha256}".encode()).hexdigest()
+
+
+def file_sha256(file_path: Path) -> str:
+    """SHA-256 of a file, read in chunks."""
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as hash_file:
+        for chunk in iter(lambda: hash_file.read(_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+
+def _file_stat(file_path: Path) -> typing.Tuple[typing.Optional[int], ...]:
+    if not file_path.is_file():
+        return (None, None)
+
+    stat = file_path.stat()
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+# -----------------------------------------------------------------------------
+
+
+class Manifest:
+    """Utterances of one corpus directory in an SQLite database."""
+
+    def __init__(self, db_path: typing.Union[str, Path]):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.db_path))
+        self.db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close database."""
+        self.db.close()
+
+    def update(self, wav_dir: Path) -> typing.Dict[str, int]:
+        """Add, re-read or remove utterances that changed in wav_dir."""
+        known = {
+            row[0]: tuple(row[1:])
+            for row in self.db.execute(
+                "SELECT name, wav_size, wav_mtime_ns, json_size, json_mtime_ns "
+                "FROM utterances"
+            )
+        }
+
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        rows = []
+        names = set()
+        for wav_path in sorted(wav_dir.glob("*.wav")):
+            name = wav_path.name
+            names.add(name)
+            stats = _file_stat(wav_path) + _file_stat(wav_path.with_suffix(".json"))
+            if known.get(name) == stats:
+                counts["unchanged"] += 1
+                continue
+
+            counts["updated" if name in known else "added"] += 1
+            _LOGGER.debug("Reading %s", wav_path)
+            rows.append(self._read_utterance(wav_path, stats))
+
+        removed = [(name,) for name in known if name not in names]
+        counts["removed"] = len(removed)
+
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO utterances "
+                "(name, wav_path, wav_size, wav_mtime_ns, json_size, json_mtime_ns, "
+                "sha256, sample_rate, sample_width, channels, seconds, text, intent, "
+                "entities) "
+                "VALUES (:name, :wav_path, :wav_size, :wav_mtime_ns, :json_size, "
+                ":json_mtime_ns, :sha256, :sample_rate, :sample_width, :channels, "
+                ":seconds, :text, :intent, :entities)",
+                rows,
+            )
+            self.db.executemany("DELETE FROM utterances WHERE name = ?", removed)
+
+        return counts
+
+    def _read_utterance(
+        self, wav_path: Path, stats: typing.Tuple[typing.Optional[int], ...]
+    ) -> typing.Dict[str, typing.Any]:
+        row: typing.Dict[str, typing.Any] = {
+            "name": wav_path.name,
+            "wav_path": str(wav_path.absolute()),
+            "wav_size": stats[0],
+            "wav_mtime_ns": stats[1],
+            "json_size": stats[2],
+            "json_mtime_ns": stats[3],
+            "sha256": file_sha256(wav_path),
+            "sample_rate": None,
+            "sample_width": None,
+            "channels": None,
+            "seconds": None,
+        }
+
+        try:
+            with wave.open(str(wav_path), "rb") as wav_file:
+                row["sample_rate"] = wav_file.getframerate()
+                row["sample_width"] = wav_file.getsampwidth()
+                row["channels"] = wav_file.getnchannels()
+                row["seconds"] = wav_file.getnframes() / wav_file.getframerate()
+        except (wave.Error, EOFError):
+            _LOGGER.warning("Not a readable WAV file: %s", wav_path)
+
+        sidecar = load_sidecar(wav_path)
+        row["text"] = sidecar.get("text")
+        row["intent"] = (sidecar.get("intent") or {}).get("name")
+        row["entities"] = json.dumps(sidecar.get("entities", []), ensure_ascii=False)
+
+        return row
+
+    def select(
+        self,
+        intents: typing.Optional[typing.Iterable[str]] = None,
+        min_seconds: typing.Optional[float] = None,
+        max_seconds: typing.Optional[float] = None,
+        sample: typing.Optional[int] = None,
+        seed: int = 0,
+    ) -> typing.List[Utterance]:
+        """Utterances matching all filters, optionally a stable random sample.
+
+        Results are sorted by name.
+        """
+        clauses: typing.List[str] = []
+        params: typing.List[typing.Any] = []
+        if intents is not None:
+            intents = list(intents)
+            clauses.append(f"intent IN ({','.join('?' * len(intents))})")
+            params.extend(intents)
+
+        if min_seconds is not None:
+            clauses.append("seconds >= ?")
+            params.append(min_seconds)
+
+        if max_seconds is not None:
+            clauses.append("seconds <= ?")
+            params.append(max_seconds)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        utterances = [
+            Utterance(
+                name=row[0],
+                wav_path=Path(row[1]),
+                sha256=row[2],
+                sample_rate=row[3],
+                seconds=row[4],
+                text=row[5],
+                intent=row[6],
+                entities=json.loads(row[7] or "[]"),
+            )
+            for row in self.db.execute(
+                "SELECT name, wav_path, sha256, sample_rate, seconds, text, "
+                f"intent, entities FROM utterances {where} ORDER BY name",
+                params,
+            )
+        ]
+
+        if sample is not None:
+            keep = {
+                u.name
+                for u in sorted(utterances, key=lambda u: u.sample_key(seed))[:sample]
+            }
+            utterances = [u for u in utterances if u.name in keep]
+
+        return utterances
+
+    def intent_counts(self) -> typing.Dict[typing.Optional[str], int]:
+        """Number of utterances per expected intent."""
+        return dict(
+            self.db.execute(
+                "SELECT intent, COUNT(*) FROM utterances GROUP BY intent ORDER BY intent"
+            ).fetchall()
+        )
@@ -0,0 +1,328 @@
+"""Profile variants from combinations of settings, and a ranked comparison.
+
+A matrix file (JSON) lists values for dotted profile keys:
+
+    {
+        "base": "test_kaldi",
+        "settings": {"dialogue.system": "rhasspy"},
+        "axes": {
+            "speech_to_text.system": ["kaldi", "pocketsphinx"],
+            "intent.system": ["fsticuffs", "fuzzywuzzy"],
+            "intent.fuzzywuzzy.min_confidence": [0.5, 0.8]
+        }
+    }
+
+Every combination of axis values becomes a test profile directory
+(profiles/<lang>/matrix_<values>) on top of the base profile and fixed
+settings. Settings of a system that is not selected (e.g.,
+intent.fuzzywuzzy.* with intent.system=fsticuffs) are dropped, and the
+duplicate variants this creates are skipped. run-tests-for.sh then
+evaluates the variants like any other profile, and the report ranks them
+by the metrics in their output directories.
+"""
+import copy
+import json
+import logging
+import re
+import shutil
+import typing
+from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
+
+from . import load_profile
+from .history import LOWER_IS_BETTER, collect_metrics
+from .settings import get_setting, set_setting
+
+_LOGGER = logging.getLogger(__name__)
+
+PREFIX = "matrix_"
+
+# Written to each variant directory
+MATRIX_FILE_NAME = "matrix.json"
+
+# Not copied from the base profile (variants are evaluated, not tested)
+_SKIP_BASE_FILES = {"profile.json", "tests", MATRIX_FILE_NAME}
+
+DEFAULT_RANK_METRICS = ("intent_entity_accuracy", "real_time_factor")
+
+# Compared for the Pareto front: accuracy, latency and resources
+PARETO_METRICS = (
+    "intent_entity_accuracy",
+    "transcription_accuracy",
+    "real_time_factor",
+    "rss_bytes",
+)
+
+# Metrics from resources.json (container snapshot after evaluation)
+RESOURCE_METRICS = {"rss_bytes", "cpu_seconds"}
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class Variant:
+    """One combination of settings."""
+
+    name: str
+    settings: typing.Dict[str, typing.Any]
+
+
+def is_inactive(key: str, settings: typing.Dict[str, typing.Any]) -> bool:
+    """True if key belongs to a system not selected in settings.
+
+    For example, intent.fuzzywuzzy.min_confidence when intent.system is
+    fsticuffs.
+    """
+    parts = key.split(".")
+    if len(parts) < 3:
+        return False
+
+    system = settings.get(f"{parts[0]}.system")
+    return (system is not None) and (system != parts[1])
+
+
+def _slug(value: typing.Any) -> str:
+    return re.sub(r"[^A-Za-z0-9.-]+", "-", str(value)).strip("-")
+
+
+def expand_axes(
+    axes: typing.Dict[str, typing.Sequence[typing.Any]],
+    settings: typing.Optional[typing.Dict[str, typing.Any]] = None,
+) -> typing.List[Variant]:
+    """All distinct combinations of axis values (in axis order)."""
+    keys = list(axes)
+    variants: typing.List[Variant] = []
+    seen: typing.Set[str] = set()
+    for values in product(*(axes[key] for key in keys)):
+        combination = dict(settings or {})
+        combination.update(zip(keys, values))
+        combination = {
+            key: value
+            for key, value in combination.items()
+            if not is_inactive(key, combination)
+        }
+
+        signature = json.dumps(combination, sort_keys=True)
+        if signature in seen:
+            continue
+
+        seen.add(signature)
+        name = PREFIX + "_".join(
+            _slug(combination[key]) for key in keys if key in combination
+        )
+        variants.append(Variant(name=name, settings=combination))
+
+    return variants
+
+
+def load_matrix(matrix_path: Path) -> typing.Dict[str, typing.Any]:
+    """Load matrix file (base, settings, axes)."""
+    with open(matrix_path, "r") as matrix_file:
+        matrix = json.load(matrix_file)
+
+    if not matrix.get("axes"):
+        raise ValueError(f"No axes in {matrix_path}")
+
+    return matrix
+
+
+def clean_variants(profiles_dir: Path) -> typing.List[Path]:
+    """Remove variant directories written by write_variants."""
+    removed = []
+    for variant_dir in sorted(profiles_dir.glob(f"{PREFIX}*")):
+        # Only directories generated here
+        if (variant_dir / MATRIX_FILE_NAME).is_file():
+            shutil.rmtree(variant_dir)
+            removed.append(variant_dir)
+
+    return removed
+
+
+def write_variants(
+    variants: typing.Iterable[Variant],
+    profiles_dir: Path,
+    base_dir: typing.Optional[Path] = None,
+) -> typing.List[Path]:
+    """Create (or replace) a test profile directory for each variant."""
+    base_profile = load_profile(base_dir) if base_dir else {}
+    variant_dirs = []
+    for variant in variants:
+        variant_dir = profiles_dir / variant.name
+        if variant_dir.exists():
+            if not (variant_dir / MATRIX_FILE_NAME).is_file():
+                raise FileExistsError(f"Not a generated variant: {variant_dir}")
+
+            shutil.rmtree(variant_dir)
+
+        variant_dir.mkdir(parents=True)
+
+        if base_dir is not None:
+            for source_path in base_dir.iterdir():
+                if source_path.name in _SKIP_BASE_FILES:
+                    continue
+
+                if source_path.is_dir():
+                    shutil.copytree(source_path, variant_dir / source_path.name)
+                else:
+                    shutil.copy2(source_path, variant_dir / source_path.name)
+
+        profile = copy.deepcopy(base_profile)
+        for key, value in variant.settings.items():
+            set_setting(profile, key, value)
+
+        with open(variant_dir / "profile.json", "w") as profile_file:
+            json.dump(profile, profile_file, indent=4, ensure_ascii=False)
+
+        with open(variant_dir / MATRIX_FILE_NAME, "w") as matrix_file:
+            json.dump(
+                {
+                    "base": base_dir.name if base_dir else None,
+                    "settings": variant.settings,
+                },
+                matrix_file,
+                indent=4,
+                ensure_ascii=False,
+            )
+
+        # Wake word benchmark in run-tests-for.sh needs WAKE_SYSTEM
+        wake_system = get_setting(profile, "wake.system")
+        if wake_system:
+            with open(variant_dir / "env", "a") as env_file:
+                print(f"export WAKE_SYSTEM={wake_system}", file=env_file)
+
+        variant_dirs.append(variant_dir)
+
+    return variant_dirs
+
+
+# -----------------------------------------------------------------------------
+
+
+def collect_variants(
+    profiles_dir: Path, output_dir: Path
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Settings and metrics of every generated variant with output."""
+    rows = []
+    for variant_dir in sorted(profiles_dir.glob(f"{PREFIX}*")):
+        matrix_path = variant_dir / MATRIX_FILE_NAME
+        if not matrix_path.is_file():
+            continue
+
+        with open(matrix_path, "r") as matrix_file:
+            settings = json.load(matrix_file).get("settings", {})
+
+        run_dir = output_dir / variant_dir.name
+        metrics: typing.Dict[str, float] = {}
+        if run_dir.is_dir():
+            metrics = collect_metrics(run_dir)
+            resources_path = run_dir / "resources.json"
+            if resources_path.is_file():
+                with open(resources_path, "r") as resources_file:
+                    resources = json.load(resources_file)
+
+                metrics.update(
+                    {
+                        key: float(resources[key])
+                        for key in RESOURCE_METRICS
+                        if resources.get(key) is not None
+                    }
+                )
+
+        rows.append(
+            {"name": variant_dir.name, "settings": settings, "metrics": metrics}
+        )
+
+    return rows
+
+
+def is_lower_better(metric: str) -> bool:
+    """True for latency and resource metrics."""
+    return (metric in LOWER_IS_BETTER) or (metric in RESOURCE_METRICS)
+
+
+def dominates(
+    a: typing.Dict[str, float], b: typing.Dict[str, float], metrics: typing.List[str]
+) -> bool:
+    """True if a is at least as good as b in all metrics and better in one."""
+    shared = [m for m in metrics if (m in a) and (m in b)]
+    if not shared:
+        return False
+
+    better = False
+    for metric in shared:
+        a_value, b_value = (
+            (-a[metric], -b[metric])
+            if is_lower_better(metric)
+            else (a[metric], b[metric])
+        )
+        if a_value < b_value:
+            return False
+
+        if a_value > b_value:
+            better = True
+
+    return better
+
+
+def rank_variants(
+    rows: typing.List[typing.Dict[str, typing.Any]],
+    rank_metrics: typing.Sequence[str] = DEFAULT_RANK_METRICS,
+    pareto_metrics: typing.Sequence[str] = PARETO_METRICS,
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Sort variants best first by rank_metrics, marking the Pareto front.
+
+    Variants without a metric are ranked after those with it.
+    """
+
+    def sort_key(row):
+        key = []
+        for metric in rank_metrics:
+            value = row["metrics"].get(metric)
+            if value is None:
+                key.append((1, 0.0))
+            else:
+                key.append((0, value if is_lower_better(metric) else -value))
+
+        return key
+
+    ranked = sorted(rows, key=sort_key)
+    pareto_metrics = list(pareto_metrics)
+    for rank, row in enumerate(ranked, start=1):
+        row["rank"] = rank
+        row["pareto"] = bool(row["metrics"]) and not any(
+            dominates(other["metrics"], row["metrics"], pareto_metrics)
+            for other in ranked
+            if other is not row
+        )
+
+    return ranked
+
+
+def format_table(
+    ranked: typing.List[typing.Dict[str, typing.Any]],
+    metrics: typing.Sequence[str],
+) -> str:
+    """Plain text table of ranked variants (* marks the Pareto front)."""
+    setting_keys: typing.List[str] = []
+    for row in ranked:
+        for key in row["settings"]:
+            if key not in setting_keys:
+                setting_keys.append(key)
+
+    header = ["rank", "name"] + setting_keys + list(metrics)
+    lines = [header]
+    for row in ranked:
+        line = [f"{row['rank']}{'*' if row['pareto'] else ''}", row["name"]]
+        line += [str(row["settings"].get(key, "")) for key in setting_keys]
+        for metric in metrics:
+            value = row["metrics"].get(metric)
+            line.append("" if value is None else f"{value:.4g}")
+
+        lines.append(line)
+
+    widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+    return "\n".join(
+        "  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip()
+        for line in lines
+    )
@@ -0,0 +1,381 @@
+"""Binary recording and timed replay of MQTT traffic.
+
+The recorder subscribes to every topic (or the given ones) and appends
+each message to a log file as soon as it arrives. Payloads are stored as
+raw bytes, so audio frames (WAV) have no base64 or JSON overhead. Topics
+are written once and referenced by number afterwards.
+
+Log format (little endian):
+
+* header: b"RHMQ", version (u8), wall clock start time (f64)
+* topic record: 0 (u8), topic length (u16), UTF-8 topic
+* message record: 1 (u8), topic number (u32), seconds since start (f64),
+  flags (u8, QoS in bits 0-1 and retain in bit 2), payload length (u32),
+  payload
+
+Records are only ever appended. A record cut short by a crash is ignored
+when reading.
+
+The replayer publishes a log with the original spacing between messages,
+divided by a speed factor (or as fast as possible), and reports how late
+each message was published.
+"""
+import logging
+import struct
+import threading
+import time
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+
+import paho.mqtt.client as mqtt
+
+from . import RhasspyConnection
+from .stats import percentile
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"RHMQ"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sBd")
+_RECORD_TYPE = struct.Struct("<B")
+_TOPIC = struct.Struct("<H")
+_MESSAGE = struct.Struct("<IdBI")
+
+RECORD_TOPIC = 0
+RECORD_MESSAGE = 1
+
+_QOS_MASK = 0x03
+_RETAIN_FLAG = 0x04
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class LoggedMessage:
+    """MQTT message read from a log."""
+
+    timestamp: float
+    topic: str
+    payload: bytes
+    qos: int = 0
+    retain: bool = False
+
+
+class LogFormatError(Exception):
+    """File is not an MQTT log."""
+
+
+class MqttLogWriter:
+    """Appends messages to a new log file (thread safe)."""
+
+    def __init__(self, log_path: Path, start_time: typing.Optional[float] = None):
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.topic_ids: typing.Dict[str, int] = {}
+        self.num_messages = 0
+        self.lock = threading.Lock()
+
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        self.log_file = open(log_path, "wb")
+        self.log_file.write(_HEADER.pack(MAGIC, VERSION, time.time()))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(
+        self,
+        topic: str,
+        payload: bytes,
+        timestamp: typing.Optional[float] = None,
+        qos: int = 0,
+        retain: bool = False,
+    ):
+        """Append a message (timestamp is perf_counter time of arrival)."""
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        flags = (qos & _QOS_MASK) | (_RETAIN_FLAG if retain else 0)
+        with self.lock:
+            topic_id = self.topic_ids.get(topic)
+            if topic_id is None:
+                topic_id = len(self.topic_ids)
+                self.topic_ids[topic] = topic_id
+                topic_bytes = topic.encode()
+                self.log_file.write(
+                    _RECORD_TYPE.pack(RECORD_TOPIC)
+                    + _TOPIC.pack(len(topic_bytes))
+                    + topic_bytes
+                )
+
+            self.log_file.write(
+                _RECORD_TYPE.pack(RECORD_MESSAGE)
+                + _MESSAGE.pack(
+                    topic_id, timestamp - self.start_time, flags, len(payload)
+                )
+            )
+            self.log_file.write(payload)
+            self.num_messages += 1
+
+    def flush(self):
+        """Write buffered records to disk."""
+        with self.lock:
+            self.log_file.flush()
+
+    def close(self):
+        """Flush and close log file."""
+        with self.lock:
+            self.log_file.close()
+
+
+def read_log(log_path: Path) -> typing.Iterable[LoggedMessage]:
+    """Messages in a log, in recorded order."""
+    with open(log_path, "rb") as log_file:
+        header = log_file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise LogFormatError(f"Missing header: {log_path}")
+
+        magic, version, _start_wall_time = _HEADER.unpack(header)
+        if (magic != MAGIC) or (version != VERSION):
+            raise LogFormatError(f"Not an MQTT log (version {VERSION}): {log_path}")
+
+        topics: typing.List[str] = []
+
+        def read_exactly(size: int) -> typing.Optional[bytes]:
+            data = log_file.read(size)
+            if len(data) < size:
+                if data:
+                    _LOGGER.warning("Ignoring truncated record at end of %s", log_path)
+
+                return None
+
+            return data
+
+        while True:
+            type_bytes = read_exactly(_RECORD_TYPE.size)
+            if type_bytes is None:
+                break
+
+            (record_type,) = _RECORD_TYPE.unpack(type_bytes)
+            if record_type == RECORD_TOPIC:
+                length_bytes = read_exactly(_TOPIC.size)
+                topic_bytes = (
+                    read_exactly(_TOPIC.unpack(length_bytes)[0])
+                    if length_bytes
+                    else None
+                )
+                if topic_bytes is None:
+                    break
+
+                topics.append(topic_bytes.decode())
+            elif record_type == RECORD_MESSAGE:
+                message_bytes = read_exactly(_MESSAGE.size)
+                if message_bytes is None:
+                    break
+
+                topic_id, timestamp, flags, length = _MESSAGE.unpack(message_bytes)
+                payload = read_exactly(length) if length > 0 else b""
+                if payload is None:
+                    break
+
+                yield LoggedMessage(
+                    timestamp=timestamp,
+                    topic=topics[topic_id],
+                    payload=payload,
+                    qos=flags & _QOS_MASK,
+                    retain=bool(flags & _RETAIN_FLAG),
+                )
+            else:
+                raise LogFormatError(f"Unknown record type {record_type}: {log_path}")
+
+
+def read_start_time(log_path: Path) -> float:
+    """Wall clock time when recording started."""
+    with open(log_path, "rb") as log_file:
+        _magic, _version, start_wall_time = _HEADER.unpack(log_file.read(_HEADER.size))
+        return start_wall_time
+
+
+def topic_matches(topic: str, patterns: typing.Iterable[str]) -> bool:
+    """True if topic matches any MQTT subscription pattern (with wildcards)."""
+    return any(mqtt.topic_matches_sub(pattern, topic) for pattern in patterns)
+
+
+# -----------------------------------------------------------------------------
+
+
+class MqttRecorder:
+    """Records all messages on the broker into a log while active."""
+
+    def __init__(
+        self,
+        connection: RhasspyConnection,
+        log_path: Path,
+        topics: typing.Optional[typing.Iterable[str]] = None,
+        flush_interval: float = 1.0,
+    ):
+        self.connection = connection
+        self.log_path = log_path
+        self.topics = list(topics or ["#"])
+        self.flush_interval = flush_interval
+        self.writer: typing.Optional[MqttLogWriter] = None
+
+        self.client = mqtt.Client()
+        self.client.on_connect = self.on_connect
+        self.client.on_subscribe = self.on_subscribe
+        self.client.on_message = self.on_message
+        self.subscribed_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.flush_thread = threading.Thread(target=self.flush_loop, daemon=True)
+
+    def __enter__(self):
+        self.writer = MqttLogWriter(self.log_path)
+        self.client.connect(self.connection.mqtt_host, self.connection.mqtt_port)
+        self.client.loop_start()
+        if not self.subscribed_event.wait(timeout=5):
+            self.client.loop_stop()
+            raise TimeoutError("Could not subscribe to MQTT broker")
+
+        # Header reaches the disk only once messages are being recorded
+        self.writer.flush()
+        self.flush_thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop_event.set()
+        self.client.loop_stop()
+        self.client.disconnect()
+        self.flush_thread.join()
+        if self.writer is not None:
+            self.writer.close()
+
+    def on_connect(self, client, userdata, flags, rc):
+        """Subscribe to topics once connected."""
+        client.subscribe([(topic, 0) for topic in self.topics])
+
+    def on_subscribe(self, client, userdata, mid, granted_qos):
+        """Start recording once subscribed."""
+        self.subscribed_event.set()
+
+    def on_message(self, client, userdata, msg):
+        """Append message with its arrival time."""
+        timestamp = time.perf_counter()
+        if self.writer is not None:
+            self.writer.write(
+                msg.topic, msg.payload, timestamp, qos=msg.qos, retain=msg.retain
+            )
+
+    def flush_loop(self):
+        """Periodically write buffered messages to disk."""
+        while not self.stop_event.wait(self.flush_interval):
+            if self.writer is not None:
+                self.writer.flush()
+
+    @property
+    def num_messages(self) -> int:
+        """Number of messages recorded so far."""
+        return self.writer.num_messages if self.writer else 0
+
+
+def replay(
+    connection: RhasspyConnection,
+    log_path: Path,
+    speed: typing.Optional[float] = 1.0,
+    topics: typing.Optional[typing.Iterable[str]] = None,
+    exclude_topics: typing.Optional[typing.Iterable[str]] = None,
+) -> typing.Dict[str, typing.Any]:
+    """Publish a recorded log with original timing divided by speed.
+
+    speed=None publishes as fast as possible. Messages are read from disk
+    while replaying, and lag is how late each message was published.
+    """
+    topics = list(topics or [])
+    exclude_topics = list(exclude_topics or [])
+    client = mqtt.Client()
+    connected_event = threading.Event()
+    client.on_connect = lambda *args: connected_event.set()
+    client.connect(connection.mqtt_host, connection.mqtt_port)
+    client.loop_start()
+
+    lags: typing.List[float] = []
+    num_bytes = 0
+    log_seconds = 0.0
+    try:
+        if not connected_event.wait(timeout=5):
+            raise TimeoutError("Could not connect to MQTT broker")
+
+        first_timestamp: typing.Optional[float] = None
+        start_time = time.perf_counter()
+        message_info = None
+        for message in read_log(log_path):
+            if topics and (not topic_matches(message.topic, topics)):
+                continue
+
+            if topic_matches(message.topic, exclude_topics):
+                continue
+
+            if first_timestamp is None:
+                first_timestamp = message.timestamp
+
+            log_seconds = message.timestamp - first_timestamp
+            lag = 0.0
+            if speed:
+                scheduled_time = start_time + (log_seconds / speed)
+                wait_seconds = scheduled_time - time.perf_counter()
+                if wait_seconds > 0:
+                    time.sleep(wait_seconds)
+
+                lag = max(0.0, time.perf_counter() - scheduled_time)
+
+            message_info = client.publish(
+                message.topic, message.payload, qos=message.qos, retain=message.retain
+            )
+            lags.append(lag)
+            num_bytes += len(message.payload)
+
+        if message_info is not None:
+            message_info.wait_for_publish()
+
+        replay_seconds = time.perf_counter() - start_time
+    finally:
+        client.loop_stop()
+        client.disconnect()
+
+    return {
+        "log": str(log_path),
+        "speed": speed,
+        "messages": len(lags),
+        "bytes": num_bytes,
+        "log_seconds": log_seconds,
+        "replay_seconds": replay_seconds,
+        "messages_per_second": (len(lags) / replay_seconds) if replay_seconds else None,
+        "lag_seconds": {
+            "median": percentile(lags, 50),
+            "p95": percentile(lags, 95),
+            "p99": percentile(lags, 99),
+            "max": max(lags) if lags else None,
+        },
+    }
+
+
+def summarize_log(log_path: Path) -> typing.Dict[str, typing.Any]:
+    """Number of messages and bytes per topic."""
+    topics: typing.Dict[str, typing.Dict[str, int]] = {}
+    num_messages = 0
+    last_timestamp = 0.0
+    for message in read_log(log_path):
+        stats = topics.setdefault(message.topic, {"messages": 0, "bytes": 0})
+        stats["messages"] += 1
+        stats["bytes"] += len(message.payload)
+        num_messages += 1
+        last_timestamp = message.timestamp
+
+    return {
+        "log": str(log_path),
+        "start_time": read_start_time(log_path),
+        "file_bytes": log_path.stat().st_size,
+        "messages": num_messages,
+        "seconds": last_timestamp,
+        "topics": topics,
+    }
@@ -0,0 +1,299 @@
+"""Throughput and latency of /api/text-to-intent.
+
+Sentences are generated from the profile's own templates, plus near-miss
+variants (one word dropped/replaced/repeated) and out-of-grammar text.
+"""
+import logging
+import random
+import re
+import threading
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import requests
+
+from . import RhasspyConnection
+from .grammar import Grammar
+from .stats import summarize
+from .training import train
+
+_LOGGER = logging.getLogger(__name__)
+
+OUT_OF_GRAMMAR = [
+    "not a valid sentence",
+    "what is the weather like in Germany",
+    "set a timer for 10 minutes",
+    "play some music",
+]
+
+# File used for extra intents while measuring scaling
+SCALING_SENTENCES_FILE = "intents/nlu_scaling.ini"
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class NluRequest:
+    """Text to recognize and what is expected."""
+
+    text: str
+    category: str
+    expected_intent: str = ""
+
+
+@dataclass
+class NluResult:
+    """Outcome of one text-to-intent request."""
+
+    request: NluRequest
+    seconds: float
+    intent_name: str = ""
+    error: typing.Optional[str] = None
+
+
+def fetch_grammar(connection: RhasspyConnection) -> Grammar:
+    """Parse the sentences and slots of a running profile."""
+    response = requests.get(
+        connection.api_url("sentences"), headers={"Accept": "application/json"}
+    )
+    response.raise_for_status()
+    sentences = response.json()
+
+    response = requests.get(connection.api_url("slots"))
+    response.raise_for_status()
+    slots = response.json()
+
+    return Grammar.parse(
+        [text for path, text in sorted(sentences.items()) if text.strip()], slots
+    )
+
+
+def make_requests(
+    grammar: Grammar,
+    limit_per_intent: int = 1000,
+    near_misses_per_sentence: int = 1,
+    seed: int = 0,
+) -> typing.List[NluRequest]:
+    """In-grammar, near-miss and out-of-grammar requests."""
+    rng = random.Random(seed)
+    vocabulary = sorted(grammar.vocabulary())
+    nlu_requests: typing.List[NluRequest] = []
+
+    for intent_name, sentences in grammar.expand_all(limit_per_intent).items():
+        for sentence in sentences:
+            nlu_requests.append(NluRequest(sentence, "in_grammar", intent_name))
+
+            for _ in range(near_misses_per_sentence):
+                nlu_requests.append(
+                    NluRequest(near_miss(sentence, vocabulary, rng), "near_miss")
+                )
+
+    for text in OUT_OF_GRAMMAR:
+        nlu_requests.append(NluRequest(text, "out_of_grammar"))
+
+    # Word salad from the grammar's own vocabulary
+    for _ in range(len(OUT_OF_GRAMMAR)):
+        words = rng.sample(vocabulary, min(len(vocabulary), 4))
+        nlu_requests.append(NluRequest(" ".join(words), "out_of_grammar"))
+
+    return nlu_requests
+
+
+def near_miss(sentence: str, vocabulary: typing.List[str], rng: random.Random) -> str:
+    """Sentence with one word dropped, replaced or repeated."""
+    words = sentence.split()
+    index = rng.randrange(len(words))
+    operation = rng.choice(["drop", "replace", "repeat"])
+
+    if (operation == "drop") and (len(words) > 1):
+        words.pop(index)
+    elif operation == "replace":
+        words[index] = rng.choice(vocabulary)
+    else:
+        words.insert(index, words[index])
+
+    return " ".join(words)
+
+
+# -----------------------------------------------------------------------------
+
+
+class NluClient:
+    """Sends text-to-intent requests from a pool of threads."""
+
+    def __init__(self, connection: RhasspyConnection, concurrency: int):
+        self.url = connection.api_url("text-to-intent")
+        self.concurrency = concurrency
+        self.local = threading.local()
+
+    def recognize(self, nlu_request: NluRequest) -> NluResult:
+        """Recognize one text and time the request."""
+        if not hasattr(self.local, "session"):
+            # Keep-alive connection per thread
+            self.local.session = requests.Session()
+
+        start_time = time.perf_counter()
+        try:
+            response = self.local.session.post(self.url, data=nlu_request.text)
+            response.raise_for_status()
+            intent_name = response.json().get("intent", {}).get("name", "")
+        except (requests.RequestException, ValueError) as e:
+            return NluResult(
+                nlu_request, time.perf_counter() - start_time, error=str(e)
+            )
+
+        return NluResult(
+            nlu_request, time.perf_counter() - start_time, intent_name=intent_name
+        )
+
+    def run(
+        self, nlu_requests: typing.List[NluRequest]
+    ) -> typing.Tuple[typing.List[NluResult], float]:
+        """Recognize all requests; returns results and wall time."""
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(self.recognize, nlu_requests))
+
+        return results, time.perf_counter() - start_time
+
+
+def summarize_results(
+    results: typing.List[NluResult], wall_seconds: float
+) -> typing.Dict[str, typing.Any]:
+    """Throughput, latency per category and accuracy of in-grammar sentences."""
+    in_grammar = [r for r in results if r.request.category == "in_grammar"]
+    categories = sorted({r.request.category for r in results})
+
+    return {
+        "requests": len(results),
+        "errors": sum(1 for r in results if r.error),
+        "wall_seconds": wall_seconds,
+        "intents_per_second": (len(results) / wall_seconds) if wall_seconds else None,
+        "latency_seconds": summarize([r.seconds for r in results]),
+        "categories": {
+            category: summarize(
+                [r.seconds for r in results if r.request.category == category]
+            )
+            for category in categories
+        },
+        "in_grammar_accuracy": (
+            sum(1 for r in in_grammar if r.intent_name == r.request.expected_intent)
+            / len(in_grammar)
+        )
+        if in_grammar
+        else None,
+    }
+
+
+# -----------------------------------------------------------------------------
+
+
+def replicate_intents(ini_text: str, copy_index: int, prefix: str) -> str:
+    """Copy of sentences.ini with renamed intents and prefixed sentences."""
+    lines = []
+    for line in ini_text.splitlines():
+        stripped = line.strip()
+        if (not stripped) or stripped.startswith("#"):
+            lines.append(line)
+        elif stripped.startswith("["):
+            lines.append(re.sub(r"^\[(.+)\]$", rf"[\1_{copy_index}]", stripped))
+        else:
+            # Point cross-intent rule references at the copied intents
+            line = re.sub(r"<([^.>]+)\.", rf"<\1_{copy_index}.", line)
+            if "=" not in line:
+                line = f"{prefix} {line.strip()}"
+
+            lines.append(line)
+
+    return "\n".join(lines) + "\n"
+
+
+def benchmark(
+    connection: RhasspyConnection,
+    concurrency_levels: typing.Sequence[int] = (1, 4, 16),
+    limit_per_intent: int = 1000,
+    scale_copies: typing.Sequence[int] = (),
+) -> typing.Dict[str, typing.Any]:
+    """Measure throughput at each concurrency, then latency vs grammar size."""
+    grammar = fetch_grammar(connection)
+    nlu_requests = make_requests(grammar, limit_per_intent=limit_per_intent)
+
+    report: typing.Dict[str, typing.Any] = {
+        "intents": len(grammar.sentences),
+        "concurrency": {},
+    }
+
+    for concurrency in concurrency_levels:
+        _LOGGER.debug("Concurrency: %s", concurrency)
+        client = NluClient(connection, concurrency)
+        results, wall_seconds = client.run(nlu_requests)
+        report["concurrency"][concurrency] = summarize_results(results, wall_seconds)
+
+    if scale_copies:
+        report["scaling"] = measure_scaling(
+            connection, grammar, nlu_requests, scale_copies, max(concurrency_levels)
+        )
+
+    return report
+
+
+def measure_scaling(
+    connection: RhasspyConnection,
+    grammar: Grammar,
+    nlu_requests: typing.List[NluRequest],
+    scale_copies: typing.Sequence[int],
+    concurrency: int,
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    """Latency after adding copies of every intent to the profile."""
+    response = requests.get(
+        connection.api_url("sentences"), headers={"Accept": "application/json"}
+    )
+    response.raise_for_status()
+    sentences = response.json()
+    ini_texts = [
+        text
+        for path, text in sorted(sentences.items())
+        if text.strip() and (path != SCALING_SENTENCES_FILE)
+    ]
+
+    # Distinct prefixes from the profile's vocabulary (known to the ASR)
+    vocabulary = sorted(grammar.vocabulary())
+    prefixes = [" ".join(pair) for pair in zip(vocabulary, reversed(vocabulary))]
+    prefixes += [f"{a} {b} {a}" for a in vocabulary for b in vocabulary if a != b]
+
+    scaling = []
+    try:
+        for num_copies in scale_copies:
+            extra_text = "\n".join(
+                replicate_intents(ini_text, copy_index, prefixes[copy_index - 1])
+                for copy_index in range(1, num_copies + 1)
+                for ini_text in ini_texts
+            )
+            sentences[SCALING_SENTENCES_FILE] = extra_text
+            response = requests.post(connection.api_url("sentences"), json=sentences)
+            response.raise_for_status()
+
+            training = train(connection)
+            results, wall_seconds = NluClient(connection, concurrency).run(nlu_requests)
+            scaled_grammar = Grammar.parse(ini_texts + [extra_text])
+            scaled_grammar.slots = grammar.slots
+            scaling.append(
+                {
+                    "copies": num_copies,
+                    "intents": len(scaled_grammar.sentences),
+                    "sentences": sum(
+                        len(s) for s in scaled_grammar.expand_all().values()
+                    ),
+                    **training,
+                    **summarize_results(results, wall_seconds),
+                }
+            )
+    finally:
+        # Restore sentences
+        sentences[SCALING_SENTENCES_FILE] = ""
+        requests.post(connection.api_url("sentences"), json=sentences)
+        requests.post(connection.api_url("train"))
+
+    return scaling
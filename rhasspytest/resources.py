@@ -0,0 +1,211 @@
+"""CPU and memory usage of Rhasspy processes (Linux /proc)."""
+import logging
+import os
+import subprocess
+import threading
+import time
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+
+_LOGGER = logging.getLogger(__name__)
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class ResourceSample:
+    """Resource usage of a set of processes at one point in time."""
+
+    timestamp: float
+    rss_bytes: int
+    cpu_seconds: float
+    num_processes: int
+
+
+def get_rhasspy_pid() -> typing.Optional[int]:
+    """Get PID of Rhasspy from RHASSPY_PID or RHASSPY_CONTAINER_ID."""
+    pid_str = os.environ.get("RHASSPY_PID")
+    if pid_str:
+        return int(pid_str)
+
+    container_id = os.environ.get("RHASSPY_CONTAINER_ID")
+    if container_id:
+        return get_container_pid(container_id)
+
+    return None
+
+
+def get_container_pid(container_id: str) -> typing.Optional[int]:
+    """Host PID of a Docker container's main process."""
+    try:
+        pid_str = subprocess.check_output(
+            ["docker", "inspect", "--format", "{{.State.Pid}}", container_id],
+            universal_newlines=True,
+        ).strip()
+        return int(pid_str) or None
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        _LOGGER.exception("get_container_pid")
+
+    return None
+
+
+def _read_stat(pid: int) -> typing.Optional[typing.List[str]]:
+    """Fields of /proc/<pid>/stat after the command name."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+
+    # Command name is in parentheses and may contain spaces
+    return stat[stat.rfind(")") + 2 :].split()
+
+
+def _read_cmdline(pid: int) -> str:
+    try:
+        return Path(f"/proc/{pid}/cmdline").read_bytes().replace(b"\0", b" ").decode()
+    except OSError:
+        return ""
+
+
+def get_process_tree(root_pid: int) -> typing.List[int]:
+    """PIDs of a process and all of its descendants."""
+    children: typing.Dict[int, typing.List[int]] = {}
+    for proc_dir in Path("/proc").iterdir():
+        if not proc_dir.name.isdigit():
+            continue
+
+        fields = _read_stat(int(proc_dir.name))
+        if fields:
+            children.setdefault(int(fields[1]), []).append(int(proc_dir.name))
+
+    tree = [root_pid]
+    index = 0
+    while index < len(tree):
+        tree.extend(children.get(tree[index], []))
+        index += 1
+
+    return tree
+
+
+def sample_processes(pids: typing.Iterable[int]) -> ResourceSample:
+    """Sum resident memory and CPU time (user + system) of processes."""
+    rss_bytes = 0
+    cpu_ticks = 0
+    num_processes = 0
+    for pid in pids:
+        fields = _read_stat(pid)
+        if not fields:
+            continue
+
+        # utime=14, stime=15, rss=24 (1-based, see proc(5))
+        cpu_ticks += int(fields[11]) + int(fields[12])
+        rss_bytes += int(fields[21]) * _PAGE_SIZE
+        num_processes += 1
+
+    return ResourceSample(
+        timestamp=time.perf_counter(),
+        rss_bytes=rss_bytes,
+        cpu_seconds=cpu_ticks / _CLOCK_TICKS,
+        num_processes=num_processes,
+    )
+
+
+# -----------------------------------------------------------------------------
+
+
+class ResourceMonitor:
+    """Samples resource usage of a process tree in a background thread.
+
+    If name_filter is given, only processes whose command line contains it are
+    included (e.g., "wake" for the wake word service).
+    """
+
+    def __init__(
+        self,
+        root_pid: typing.Optional[int],
+        name_filter: typing.Optional[str] = None,
+        interval: float = 0.5,
+    ):
+        self.root_pid = root_pid
+        self.name_filter = name_filter
+        self.interval = interval
+        self.samples: typing.List[ResourceSample] = []
+
+        self._stop_event = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        """True if there is a process to monitor."""
+        return self.root_pid is not None
+
+    def __enter__(self):
+        if self.enabled:
+            self.sample()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+        return self
+
+    def __exit__(self, *args):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self.sample()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def get_pids(self) -> typing.List[int]:
+        """PIDs currently being monitored."""
+        if self.root_pid is None:
+            return []
+
+        pids = get_process_tree(self.root_pid)
+        if self.name_filter:
+            pids = [pid for pid in pids if self.name_filter in _read_cmdline(pid)]
+
+        return pids
+
+    def sample(self) -> ResourceSample:
+        """Take and record a sample now."""
+        sample = sample_processes(self.get_pids())
+        self.samples.append(sample)
+        return sample
+
+    # -------------------------------------------------------------------------
+
+    def cpu_seconds(self) -> typing.Optional[float]:
+        """CPU time used between first and last sample."""
+        if len(self.samples) < 2:
+            return None
+
+        return self.samples[-1].cpu_seconds - self.samples[0].cpu_seconds
+
+    def peak_rss_bytes(self) -> typing.Optional[int]:
+        """Largest resident memory seen."""
+        if not self.samples:
+            return None
+
+        return max(s.rss_bytes for s in self.samples)
+
+    def summary(self) -> typing.Dict[str, typing.Any]:
+        """CPU time, utilization and memory over the monitored period."""
+        if len(self.samples) < 2:
+            return {}
+
+        wall_seconds = self.samples[-1].timestamp - self.samples[0].timestamp
+        cpu_seconds = self.cpu_seconds() or 0.0
+        return {
+            "wall_seconds": wall_seconds,
+            "cpu_seconds": cpu_seconds,
+            "cpu_utilization": (cpu_seconds / wall_seconds) if wall_seconds else None,
+            "start_rss_bytes": self.samples[0].rss_bytes,
+            "end_rss_bytes": self.samples[-1].rss_bytes,
+            "peak_rss_bytes": self.peak_rss_bytes(),
+        }
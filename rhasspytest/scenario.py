@@ -0,0 +1,616 @@
+"""Concurrent mixed workloads against one profile, described in a JSON file.
+
+A scenario runs several workloads at the same time for a fixed duration:
+
+    {
+        "duration": 300,
+        "warmup": 10,
+        "workloads": [
+            {"type": "wake", "satellites": 20, "interval": 10},
+            {"type": "text_to_intent", "rate": 5},
+            {"type": "text_to_speech", "rate": 0.5},
+            {"type": "speech_to_text", "rate": 1},
+            {"type": "retrain", "interval": 60, "slot": "scenario", "values": 1000}
+        ]
+    }
+
+Request workloads (text_to_intent, text_to_speech, speech_to_text,
+speech_to_intent) are open loop: requests are scheduled at the target rate
+(evenly, or with "poisson": true) no matter how long earlier ones take, and
+latency is measured from the scheduled time. A slow server therefore shows
+up as queueing instead of as a lower request rate.
+
+Wake satellites stream the wake WAV followed by silence, once per interval,
+as AudioFrame messages for their own site ids. Latency is from the end of
+the keyword to HotwordDetected.
+
+Retraining optionally replaces a slot's values, then POSTs /api/train. A
+slot only enters the trained model when a sentence references it, so a
+temporary intents/scenario.ini with an intent for the slot is saved first.
+The slot and sentences are restored and the profile retrained once the
+scenario ends. Every workload's latency is also split into requests that
+overlapped training and those that did not, so interference shows up as a
+slowdown ratio.
+"""
+import json
+import logging
+import random
+import threading
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+
+from rhasspyhermes.audioserver import AudioFrame
+from rhasspyhermes.dialogue import DialogueEndSession, DialogueSessionStarted
+from rhasspyhermes.wake import HotwordDetected, HotwordToggleOn, HotwordToggleReason
+
+from . import RhasspyConnection
+from .audio import pace
+from .events import MqttEventLog
+from .nlu import fetch_grammar, make_requests
+from .settings import ProfileSettings
+from .slots import make_slot_values, post_sentences, post_slot
+from .stats import median, summarize
+from .training import train
+from .wake import WakeSample, find_wake_wav
+
+_LOGGER = logging.getLogger(__name__)
+
+# Temporary intent that references the slot of a retrain workload
+SLOT_INTENT = "ScenarioSlot"
+SENTENCES_FILE = "intents/scenario.ini"
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class Sample:
+    """One request (or wake detection) of a workload."""
+
+    scheduled: float
+    start: float
+    end: float
+    error: typing.Optional[str] = None
+
+    @property
+    def latency(self) -> float:
+        """Seconds from scheduled time to completion."""
+        return self.end - self.scheduled
+
+    @property
+    def service(self) -> float:
+        """Seconds from start to completion (without queueing)."""
+        return self.end - self.start
+
+
+class Workload:
+    """Base class of workloads; run() records samples until end_time."""
+
+    def __init__(self, name: str, spec: typing.Dict[str, typing.Any]):
+        self.name = name
+        self.spec = spec
+        self.samples: typing.List[Sample] = []
+        self.lock = threading.Lock()
+
+    @property
+    def target_rate(self) -> typing.Optional[float]:
+        """Scheduled samples per second."""
+        return None
+
+    def record(self, sample: Sample):
+        """Add a sample (thread safe)."""
+        with self.lock:
+            self.samples.append(sample)
+
+    def prepare(self, engine: "ScenarioEngine"):
+        """Load inputs before the scenario starts."""
+
+    def run(self, engine: "ScenarioEngine", start_time: float, end_time: float):
+        """Generate load from start_time to end_time."""
+        raise NotImplementedError()
+
+    def cleanup(self, engine: "ScenarioEngine"):
+        """Undo changes to the profile."""
+
+
+class RequestWorkload(Workload):
+    """Open-loop HTTP requests at a target rate."""
+
+    endpoint = ""
+    headers: typing.Dict[str, str] = {}
+    params: typing.Dict[str, str] = {}
+
+    def __init__(self, name: str, spec: typing.Dict[str, typing.Any]):
+        super().__init__(name, spec)
+        self.rate = float(spec["rate"])
+        if self.rate <= 0:
+            raise ValueError(f"rate must be positive for {name}")
+
+        self.concurrency = int(spec.get("concurrency", 8))
+        self.poisson = bool(spec.get("poisson", False))
+        self.seed = int(spec.get("seed", 0))
+        self.bodies: typing.List[typing.Union[str, bytes]] = []
+        self.local = threading.local()
+
+    @property
+    def target_rate(self) -> typing.Optional[float]:
+        return self.rate
+
+    def arrivals(self, start_time: float, end_time: float) -> typing.Iterable[float]:
+        """Scheduled times of requests."""
+        rng = random.Random(self.seed)
+        scheduled = start_time
+        while scheduled < end_time:
+            yield scheduled
+            scheduled += rng.expovariate(self.rate) if self.poisson else 1 / self.rate
+
+    def run(self, engine: "ScenarioEngine", start_time: float, end_time: float):
+        url = engine.connection.api_url(self.endpoint)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for index, scheduled in enumerate(self.arrivals(start_time, end_time)):
+                if engine.stop_event.wait(max(0.0, scheduled - time.perf_counter())):
+                    break
+
+                body = self.bodies[index % len(self.bodies)]
+                executor.submit(self.send, url, body, scheduled)
+
+    def send(self, url: str, body: typing.Union[str, bytes], scheduled: float):
+        """POST one request and record it."""
+        if not hasattr(self.local, "session"):
+            # Keep-alive connection per thread
+            self.local.session = requests.Session()
+
+        start_time = time.perf_counter()
+        error: typing.Optional[str] = None
+        try:
+            response = self.local.session.post(
+                url, data=body, headers=self.headers, params=self.params
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            error = str(e)
+
+        self.record(Sample(scheduled, start_time, time.perf_counter(), error))
+
+
+class TextToIntentWorkload(RequestWorkload):
+    """Sentences generated from the profile's grammar."""
+
+    endpoint = "text-to-intent"
+
+    def prepare(self, engine: "ScenarioEngine"):
+        nlu_requests = make_requests(
+            fetch_grammar(engine.connection),
+            limit_per_intent=int(self.spec.get("limit_per_intent", 100)),
+            seed=self.seed,
+        )
+        self.bodies = [r.text for r in nlu_requests if r.category == "in_grammar"]
+        random.Random(self.seed).shuffle(self.bodies)
+
+
+class TextToSpeechWorkload(TextToIntentWorkload):
+    """Sentences from the grammar spoken without playing them."""
+
+    endpoint = "text-to-speech"
+    params = {"play": "false"}
+
+
+class SpeechToTextWorkload(RequestWorkload):
+    """WAV files from the corpus."""
+
+    endpoint = "speech-to-text"
+    headers = {"Content-Type": "audio/wav"}
+
+    def prepare(self, engine: "ScenarioEngine"):
+        wav_dir = Path(self.spec.get("wav_dir", engine.wav_dir))
+        self.bodies = [
+            wav_path.read_bytes() for wav_path in sorted(wav_dir.glob("*.wav"))
+        ]
+        if not self.bodies:
+            raise ValueError(f"No WAV files in {wav_dir}")
+
+
+class SpeechToIntentWorkload(SpeechToTextWorkload):
+    """WAV files from the corpus, recognized through to intents."""
+
+    endpoint = "speech-to-intent"
+
+
+class RetrainWorkload(Workload):
+    """Slot update (optional) and /api/train at a fixed interval."""
+
+    def __init__(self, name: str, spec: typing.Dict[str, typing.Any]):
+        super().__init__(name, spec)
+        self.interval = float(spec["interval"])
+        self.slot_name: typing.Optional[str] = spec.get("slot")
+        self.num_values = int(spec.get("values", 100))
+        self.vocabulary: typing.List[str] = []
+        self.original_values: typing.Optional[typing.List[str]] = None
+        self.sentences: typing.Dict[str, str] = {}
+        self.windows: typing.List[typing.Tuple[float, float]] = []
+
+    @property
+    def target_rate(self) -> typing.Optional[float]:
+        return 1 / self.interval
+
+    def prepare(self, engine: "ScenarioEngine"):
+        if not self.slot_name:
+            return
+
+        self.vocabulary = sorted(fetch_grammar(engine.connection).vocabulary())
+        response = requests.get(engine.connection.api_url("slots"))
+        response.raise_for_status()
+        self.original_values = response.json().get(self.slot_name)
+
+        # Slot values are only trained if an intent references the slot
+        response = requests.get(
+            engine.connection.api_url("sentences"),
+            headers={"Accept": "application/json"},
+        )
+        response.raise_for_status()
+        self.sentences = response.json()
+        self.sentences[
+            SENTENCES_FILE
+        ] = f"[{SLOT_INTENT}]\n(${self.slot_name}){{{self.slot_name}}}\n"
+        post_sentences(engine.connection, self.sentences)
+
+    def run(self, engine: "ScenarioEngine", start_time: float, end_time: float):
+        scheduled = start_time
+        index = 0
+        while scheduled < end_time:
+            if engine.stop_event.wait(max(0.0, scheduled - time.perf_counter())):
+                break
+
+            error: typing.Optional[str] = None
+            sample_start = time.perf_counter()
+            try:
+                if self.slot_name:
+                    # Different number of values each time so training has work
+                    values = make_slot_values(
+                        self.vocabulary, self.num_values + (index % 2)
+                    )
+                    post_slot(engine.connection, self.slot_name, values)
+
+                train_start = time.perf_counter()
+                try:
+                    train(engine.connection)
+                finally:
+                    self.windows.append((train_start, time.perf_counter()))
+            except (requests.RequestException, ValueError) as e:
+                error = str(e)
+
+            self.record(Sample(scheduled, sample_start, time.perf_counter(), error))
+            scheduled += self.interval
+            index += 1
+
+    def cleanup(self, engine: "ScenarioEngine"):
+        if not self.slot_name:
+            return
+
+        post_slot(engine.connection, self.slot_name, self.original_values or [])
+        self.sentences[SENTENCES_FILE] = ""
+        post_sentences(engine.connection, self.sentences)
+        train(engine.connection)
+
+
+class WakeWorkload(Workload):
+    """Satellites streaming the wake WAV once per interval."""
+
+    def __init__(self, name: str, spec: typing.Dict[str, typing.Any]):
+        super().__init__(name, spec)
+        self.satellites = int(spec.get("satellites", 1))
+        self.interval = float(spec.get("interval", 10))
+        self.timeout = float(spec.get("timeout", 2))
+        self.chunk_seconds = float(spec.get("chunk_seconds", 0.03))
+        self.site_ids = [f"{name}{i}" for i in range(1, self.satellites + 1)]
+        self.sample: typing.Optional[WakeSample] = None
+
+    @property
+    def target_rate(self) -> typing.Optional[float]:
+        return self.satellites / self.interval
+
+    def prepare(self, engine: "ScenarioEngine"):
+        if "wav" in self.spec:
+            wav_path = Path(self.spec["wav"])
+        else:
+            wake_system = self.spec.get("wake_system", engine.wake_system)
+            if (not wake_system) or (engine.wake_wav_dir is None):
+                raise ValueError(f"{self.name} needs wav, or wake_system and wav dir")
+
+            wav_path = find_wake_wav(engine.wake_wav_dir, wake_system)
+
+        self.sample = WakeSample.load(wav_path)
+        if self.sample.audio.seconds + self.timeout > self.interval:
+            raise ValueError(f"interval of {self.name} is shorter than WAV + timeout")
+
+    def run(self, engine: "ScenarioEngine", start_time: float, end_time: float):
+        # Spread satellites evenly over the interval
+        threads = [
+            threading.Thread(
+                target=self.stream,
+                args=(
+                    engine,
+                    site_id,
+                    start_time + (index * self.interval / self.satellites),
+                    end_time,
+                ),
+            )
+            for index, site_id in enumerate(self.site_ids)
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+    def stream(
+        self,
+        engine: "ScenarioEngine",
+        site_id: str,
+        cycle_start: float,
+        end_time: float,
+    ):
+        """Publish wake WAV and silence for one satellite, paced in real time."""
+        assert (self.sample is not None) and (engine.events is not None)
+        events = engine.events
+        audio = self.sample.audio
+        wav_chunks = [
+            audio.to_wav(chunk) for _, chunk in audio.iter_chunks(self.chunk_seconds)
+        ]
+        silence = audio.to_wav(audio.silence(self.chunk_seconds))
+        topic = AudioFrame.topic(site_id=site_id)
+        num_chunks = int(self.interval / self.chunk_seconds)
+
+        while (cycle_start + self.interval <= end_time) and (
+            not engine.stop_event.is_set()
+        ):
+            keyword_time = cycle_start + self.sample.keyword_end_seconds
+            checked = False
+            for index in range(num_chunks):
+                pace(cycle_start, index * self.chunk_seconds)
+                events.publish(
+                    topic, wav_chunks[index] if index < len(wav_chunks) else silence
+                )
+
+                if (not checked) and (
+                    time.perf_counter() >= keyword_time + self.timeout
+                ):
+                    self.check_detection(engine, site_id, cycle_start, keyword_time)
+                    checked = True
+
+            if not checked:
+                self.check_detection(engine, site_id, cycle_start, keyword_time)
+
+            cycle_start += self.interval
+
+    def check_detection(
+        self,
+        engine: "ScenarioEngine",
+        site_id: str,
+        cycle_start: float,
+        keyword_time: float,
+    ):
+        """Record detection of this cycle and re-enable wake without blocking."""
+        events = engine.events
+        assert events is not None
+        detection = events.find(
+            lambda e: HotwordDetected.is_topic(e.topic)
+            and (e.timestamp >= cycle_start)
+            and (e.payload.get("siteId") == site_id)
+        )
+        if detection is None:
+            self.record(
+                Sample(keyword_time, keyword_time, time.perf_counter(), "missed")
+            )
+        else:
+            self.record(Sample(keyword_time, keyword_time, detection.timestamp))
+
+        # Dialogue manager disables wake during the session started by detection
+        for started in events.find_all(
+            lambda e: DialogueSessionStarted.is_topic(e.topic)
+            and (e.timestamp >= cycle_start)
+            and (e.payload.get("siteId") == site_id)
+        ):
+            end_session = DialogueEndSession(
+                session_id=started.payload.get("sessionId", "")
+            )
+            events.publish(end_session.topic(), end_session.payload())
+
+        toggle_on = HotwordToggleOn(
+            site_id=site_id, reason=HotwordToggleReason.DIALOGUE_SESSION
+        )
+        events.publish(toggle_on.topic(), toggle_on.payload())
+
+
+WORKLOAD_TYPES: typing.Dict[str, typing.Type[Workload]] = {
+    "text_to_intent": TextToIntentWorkload,
+    "text_to_speech": TextToSpeechWorkload,
+    "speech_to_text": SpeechToTextWorkload,
+    "speech_to_intent": SpeechToIntentWorkload,
+    "retrain": RetrainWorkload,
+    "wake": WakeWorkload,
+}
+
+
+def make_workloads(
+    specs: typing.Iterable[typing.Dict[str, typing.Any]]
+) -> typing.List[Workload]:
+    """Create workloads, naming them after their type if no name is given."""
+    workloads: typing.List[Workload] = []
+    names: typing.Set[str] = set()
+    for spec in specs:
+        workload_type = spec.get("type")
+        if workload_type not in WORKLOAD_TYPES:
+            raise ValueError(f"Unknown workload type: {workload_type}")
+
+        name = spec.get("name") or workload_type
+        if name in names:
+            name = f"{name}{len(workloads) + 1}"
+
+        names.add(name)
+        workloads.append(WORKLOAD_TYPES[workload_type](name, spec))
+
+    return workloads
+
+
+def load_scenario(scenario_path: Path) -> typing.Dict[str, typing.Any]:
+    """Load scenario JSON file."""
+    with open(scenario_path, "r") as scenario_file:
+        scenario = json.load(scenario_file)
+
+    if not scenario.get("workloads"):
+        raise ValueError(f"No workloads in {scenario_path}")
+
+    return scenario
+
+
+# -----------------------------------------------------------------------------
+
+
+def overlaps(sample: Sample, windows: typing.Iterable[typing.Tuple[float, float]]):
+    """True if sample was in progress during any window."""
+    return any(
+        (sample.scheduled < window_end) and (sample.end > window_start)
+        for window_start, window_end in windows
+    )
+
+
+def summarize_workload(
+    workload: Workload,
+    start_time: float,
+    end_time: float,
+    training_windows: typing.List[typing.Tuple[float, float]],
+) -> typing.Dict[str, typing.Any]:
+    """Throughput and latency of a workload, split by overlap with training."""
+    samples = [s for s in workload.samples if start_time <= s.scheduled < end_time]
+    ok_samples = [s for s in samples if s.error is None]
+    seconds = end_time - start_time
+
+    report: typing.Dict[str, typing.Any] = {
+        "type": workload.spec.get("type"),
+        "target_rate": workload.target_rate,
+        "achieved_rate": (len(ok_samples) / seconds) if seconds > 0 else None,
+        "count": len(samples),
+        "errors": len(samples) - len(ok_samples),
+        "latency_seconds": summarize([s.latency for s in ok_samples]),
+        "service_seconds": summarize([s.service for s in ok_samples]),
+    }
+
+    if training_windows and not isinstance(workload, RetrainWorkload):
+        during = [s.latency for s in ok_samples if overlaps(s, training_windows)]
+        outside = [s.latency for s in ok_samples if not overlaps(s, training_windows)]
+        report["during_training"] = summarize(during)
+        report["outside_training"] = summarize(outside)
+        report["training_slowdown"] = (
+            (median(during) / median(outside))
+            if during and outside and (median(outside) > 0)
+            else None
+        )
+
+    return report
+
+
+class ScenarioEngine:
+    """Runs all workloads of a scenario at once against one profile."""
+
+    def __init__(
+        self,
+        connection: RhasspyConnection,
+        scenario: typing.Dict[str, typing.Any],
+        wav_dir: Path,
+        wake_wav_dir: typing.Optional[Path] = None,
+        wake_system: typing.Optional[str] = None,
+    ):
+        self.connection = connection
+        self.scenario = scenario
+        self.wav_dir = wav_dir
+        self.wake_wav_dir = wake_wav_dir
+        self.wake_system = wake_system
+        self.duration = float(scenario.get("duration", 60))
+        self.warmup = float(scenario.get("warmup", 0))
+        self.workloads = make_workloads(scenario["workloads"])
+        self.stop_event = threading.Event()
+        self.events: typing.Optional[MqttEventLog] = None
+
+    def run(self) -> typing.Dict[str, typing.Any]:
+        """Run scenario and report per-workload latency."""
+        wake_workloads = [w for w in self.workloads if isinstance(w, WakeWorkload)]
+
+        with ExitStack() as stack:
+            if wake_workloads:
+                self.events = stack.enter_context(
+                    MqttEventLog(
+                        self.connection,
+                        [
+                            HotwordDetected.topic(wakeword_id="+"),
+                            DialogueSessionStarted.topic(),
+                        ],
+                    )
+                )
+
+                # Wake service only listens to known satellites
+                settings = stack.enter_context(
+                    ProfileSettings(self.connection, self.wav_dir)
+                )
+                settings.apply(
+                    {
+                        "wake.satellite_site_ids": ",".join(
+                            site_id for w in wake_workloads for site_id in w.site_ids
+                        )
+                    }
+                )
+
+            for workload in self.workloads:
+                _LOGGER.debug("Preparing %s", workload.name)
+                workload.prepare(self)
+
+            start_time = time.perf_counter() + 1.0
+            end_time = start_time + self.warmup + self.duration
+            threads = [
+                threading.Thread(
+                    target=workload.run,
+                    args=(self, start_time, end_time),
+                    daemon=True,
+                )
+                for workload in self.workloads
+            ]
+
+            try:
+                for thread in threads:
+                    thread.start()
+
+                for thread in threads:
+                    thread.join()
+            finally:
+                self.stop_event.set()
+                for workload in self.workloads:
+                    workload.cleanup(self)
+
+        measure_start = start_time + self.warmup
+        training_windows = [
+            window
+            for workload in self.workloads
+            if isinstance(workload, RetrainWorkload)
+            for window in workload.windows
+        ]
+
+        return {
+            "duration": self.duration,
+            "warmup": self.warmup,
+            "training_windows": [
+                [window_start - measure_start, window_end - measure_start]
+                for window_start, window_end in training_windows
+            ],
+            "workloads": {
+                workload.name: summarize_workload(
+                    workload, measure_start, end_time, training_windows
+                )
+                for workload in self.workloads
+            },
+        }
@@ -0,0 +1,443 @@
+"""History-driven ordering of test profiles (and tests) on a pool of workers.
+
+Durations and failure rates of recent profile runs and tests come from
+the outcomes in the history database (see history.HistoryStore). A job is
+risky if it failed recently or changed since its last recorded run
+(different fingerprint, or no history at all). Risky jobs run first, the
+one most likely to fail per predicted second before the others, so a
+failure shows up as early as possible. The remaining jobs are sorted
+longest first, and every job goes to the worker that is predicted to be
+free first (longest processing time packing of the pool).
+
+Jobs are run as separate commands (run-tests-for.sh for one profile). With
+fail_fast, the first failure stops the running jobs and no more are
+started. The report has predicted and actual start/end times of each job.
+"""
+import heapq
+import logging
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+import typing
+import unittest
+from dataclasses import dataclass
+from pathlib import Path
+
+from .history import HistoryStore, Outcome, file_fingerprint
+from .stats import median
+
+_LOGGER = logging.getLogger(__name__)
+
+# Duration of jobs without history, if no other job has one either
+DEFAULT_SECONDS = 600.0
+
+# Failure rate assumed for changed jobs (and jobs without history)
+CHANGED_RISK = 0.5
+
+STATUS_PASSED = "passed"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class Job:
+    """Profile (or test) to run, with predictions from history."""
+
+    name: str
+    predicted_seconds: typing.Optional[float] = None
+    failure_rate: float = 0.0
+    changed: bool = True
+    history_runs: int = 0
+
+    @property
+    def risk(self) -> float:
+        """Assumed probability of failure."""
+        return max(self.failure_rate, CHANGED_RISK if self.changed else 0.0)
+
+    @property
+    def seconds(self) -> float:
+        """Predicted duration (for ordering and packing)."""
+        return (
+            DEFAULT_SECONDS
+            if self.predicted_seconds is None
+            else self.predicted_seconds
+        )
+
+
+@dataclass
+class Slot:
+    """Predicted or actual placement of a job on a worker."""
+
+    job: Job
+    worker: int
+    start_seconds: float
+    end_seconds: float
+    status: typing.Optional[str] = None
+    returncode: typing.Optional[int] = None
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """Times relative to the start of the schedule (for JSON)."""
+        return {
+            "worker": self.worker,
+            "start_seconds": self.start_seconds,
+            "end_seconds": self.end_seconds,
+            "seconds": self.end_seconds - self.start_seconds,
+            "status": self.status,
+            "returncode": self.returncode,
+        }
+
+
+def predict_job(
+    name: str, outcomes: typing.List[Outcome], fingerprint: typing.Optional[str]
+) -> Job:
+    """Job whose duration and failure rate come from its recent outcomes."""
+    passed_seconds = [
+        o.seconds for o in outcomes if o.passed and (o.seconds is not None)
+    ]
+    all_seconds = [o.seconds for o in outcomes if o.seconds is not None]
+
+    # Failed runs may have stopped early, so prefer passing ones
+    seconds = passed_seconds or all_seconds
+
+    return Job(
+        name=name,
+        predicted_seconds=median(seconds) if seconds else None,
+        failure_rate=(sum(1 for o in outcomes if not o.passed) / len(outcomes))
+        if outcomes
+        else 0.0,
+        changed=(not outcomes) or (fingerprint != outcomes[-1].fingerprint),
+        history_runs=len(outcomes),
+    )
+
+
+def predict_jobs(
+    store: HistoryStore,
+    lang: str,
+    profile_fingerprints: typing.Dict[str, typing.Optional[str]],
+    history_runs: int = 10,
+) -> typing.List[Job]:
+    """Jobs for test profiles (name -> fingerprint of profile directory).
+
+    Profiles without history are predicted to take as long as the median
+    of the others.
+    """
+    jobs = [
+        predict_job(
+            name, store.last_outcomes(lang, name, limit=history_runs), fingerprint
+        )
+        for name, fingerprint in profile_fingerprints.items()
+    ]
+    fill_unknown_seconds(jobs)
+
+    return jobs
+
+
+def fill_unknown_seconds(jobs: typing.List[Job]):
+    """Predict median duration of known jobs for jobs without history."""
+    known = [job.predicted_seconds for job in jobs if job.predicted_seconds is not None]
+    for job in jobs:
+        if job.predicted_seconds is None:
+            job.predicted_seconds = median(known) if known else DEFAULT_SECONDS
+
+
+def order_tests(
+    cases: typing.Iterable[unittest.TestCase],
+    store: HistoryStore,
+    lang: str,
+    profile: str,
+    test_dir: typing.Optional[Path] = None,
+    history_runs: int = 10,
+) -> typing.List[unittest.TestCase]:
+    """Test cases of a profile ordered like jobs (see order_jobs).
+
+    Tests are changed if their test file (in test_dir) is.
+    """
+    cases_by_id = {case.id(): case for case in cases}
+    fingerprints: typing.Dict[str, typing.Optional[str]] = {}
+    jobs = []
+    for test_id in cases_by_id:
+        module_name = test_id.split(".", 1)[0]
+        if (test_dir is not None) and (module_name not in fingerprints):
+            fingerprints[module_name] = file_fingerprint(test_dir / f"{module_name}.py")
+
+        jobs.append(
+            predict_job(
+                test_id,
+                store.last_outcomes(lang, profile, test_id, limit=history_runs),
+                fingerprints.get(module_name),
+            )
+        )
+
+    fill_unknown_seconds(jobs)
+    return [cases_by_id[job.name] for job in order_jobs(jobs)]
+
+
+def order_jobs(jobs: typing.Iterable[Job]) -> typing.List[Job]:
+    """Risky jobs first (most likely to fail per second), then longest first.
+
+    Ties keep their original order.
+    """
+    jobs = list(jobs)
+    risky = [job for job in jobs if job.risk > 0]
+    safe = [job for job in jobs if job.risk <= 0]
+
+    risky.sort(key=lambda job: job.risk / max(job.seconds, 1e-3), reverse=True)
+    safe.sort(key=lambda job: job.seconds, reverse=True)
+
+    return risky + safe
+
+
+def plan(jobs: typing.Iterable[Job], workers: int = 1) -> typing.List[Slot]:
+    """Predicted slots of ordered jobs, each on the first free worker."""
+    if workers < 1:
+        raise ValueError("Need at least one worker")
+
+    free_at = [(0.0, worker) for worker in range(workers)]
+    slots = []
+    for job in jobs:
+        start_seconds, worker = heapq.heappop(free_at)
+        end_seconds = start_seconds + job.seconds
+        slots.append(Slot(job, worker, start_seconds, end_seconds))
+        heapq.heappush(free_at, (end_seconds, worker))
+
+    return slots
+
+
+# -----------------------------------------------------------------------------
+
+
+class JobPool:
+    """Runs one command per job on a fixed number of workers.
+
+    Jobs are taken in order by the next free worker. Output of each job is
+    written to log_dir/<name>.txt if given.
+    """
+
+    def __init__(
+        self,
+        command: typing.Callable[[Job], typing.List[str]],
+        workers: int = 1,
+        fail_fast: bool = False,
+        log_dir: typing.Optional[Path] = None,
+        env: typing.Optional[typing.Dict[str, str]] = None,
+        stream: typing.TextIO = sys.stderr,
+    ):
+        self.command = command
+        self.workers = workers
+        self.fail_fast = fail_fast
+        self.log_dir = log_dir
+        self.env = env
+        self.stream = stream
+
+        self.slots: typing.List[Slot] = []
+        self.wall_seconds = 0.0
+
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes: typing.Dict[str, subprocess.Popen] = {}
+
+    def run(self, jobs: typing.Iterable[Job]) -> bool:
+        """Run jobs, returning True if all were run and passed."""
+        waiting: "queue.Queue[Job]" = queue.Queue()
+        num_jobs = 0
+        for job in jobs:
+            waiting.put(job)
+            num_jobs += 1
+
+        if self.log_dir is not None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+
+        start_time = time.perf_counter()
+        threads = [
+            threading.Thread(
+                target=self._run_worker, args=(worker, waiting, start_time)
+            )
+            for worker in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.wall_seconds = time.perf_counter() - start_time
+        return (len(self.slots) == num_jobs) and all(
+            slot.status == STATUS_PASSED for slot in self.slots
+        )
+
+    def _run_worker(self, worker: int, waiting: "queue.Queue[Job]", start_time: float):
+        while not self._stop_event.is_set():
+            try:
+                job = waiting.get_nowait()
+            except queue.Empty:
+                return
+
+            job_start = time.perf_counter() - start_time
+            returncode = self._run_job(job, worker)
+            if returncode is None:
+                # Stopped before the job could start
+                return
+
+            slot = Slot(job, worker, job_start, time.perf_counter() - start_time)
+            slot.returncode = returncode
+
+            with self._lock:
+                if returncode == 0:
+                    slot.status = STATUS_PASSED
+                elif self._stop_event.is_set():
+                    # Stopped because another job failed
+                    slot.status = STATUS_CANCELLED
+                else:
+                    slot.status = STATUS_FAILED
+                    if self.fail_fast:
+                        self.stop()
+
+                self.slots.append(slot)
+
+            self._print(
+                f"{job.name} ... {slot.status} "
+                f"({slot.end_seconds - slot.start_seconds:.1f}s)"
+            )
+
+    def _run_job(self, job: Job, worker: int) -> typing.Optional[int]:
+        log_file: typing.Optional[typing.IO] = None
+        if self.log_dir is not None:
+            log_file = open(self.log_dir / f"{job.name}.txt", "w")
+
+        try:
+            with self._lock:
+                if self._stop_event.is_set():
+                    return None
+
+                self._print(f"{job.name} ... started on worker {worker}")
+
+                # Own process group, so the whole job can be stopped
+                process = subprocess.Popen(
+                    self.command(job),
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT if log_file else None,
+                    env=self.env,
+                    start_new_session=True,
+                )
+                self._processes[job.name] = process
+
+            return process.wait()
+        finally:
+            with self._lock:
+                self._processes.pop(job.name, None)
+
+            if log_file is not None:
+                log_file.close()
+
+    def stop(self):
+        """Start no more jobs and terminate running ones (call with lock)."""
+        self._stop_event.set()
+        for name, process in self._processes.items():
+            _LOGGER.debug("Stopping %s", name)
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _print(self, message: str):
+        print(message, file=self.stream, flush=True)
+
+
+# -----------------------------------------------------------------------------
+
+
+def schedule_report(
+    predicted: typing.List[Slot],
+    actual: typing.List[Slot],
+    workers: int,
+    fail_fast: bool = False,
+) -> typing.Dict[str, typing.Any]:
+    """Predicted vs actual slot of every job, and overall errors."""
+    actual_by_name = {slot.job.name: slot for slot in actual}
+    failed = [slot for slot in actual if slot.status == STATUS_FAILED]
+    duration_errors = [
+        abs((slot.end_seconds - slot.start_seconds) - slot.job.seconds)
+        / slot.job.seconds
+        for slot in actual
+        if (slot.status == STATUS_PASSED) and (slot.job.seconds > 0)
+    ]
+
+    first_failure = min(failed, key=lambda slot: slot.end_seconds) if failed else None
+
+    return {
+        "workers": workers,
+        "fail_fast": fail_fast,
+        "predicted_seconds": max((s.end_seconds for s in predicted), default=0.0),
+        "actual_seconds": max((s.end_seconds for s in actual), default=0.0),
+        "median_duration_error": median(duration_errors) if duration_errors else None,
+        "first_failure": {
+            "name": first_failure.job.name,
+            "seconds": first_failure.end_seconds,
+        }
+        if first_failure
+        else None,
+        "counts": {
+            status: sum(1 for slot in actual if slot.status == status)
+            for status in [STATUS_PASSED, STATUS_FAILED, STATUS_CANCELLED]
+        },
+        "not_run": [
+            slot.job.name for slot in predicted if slot.job.name not in actual_by_name
+        ],
+        "jobs": [
+            {
+                "name": slot.job.name,
+                "order": order,
+                "risk": slot.job.risk,
+                "failure_rate": slot.job.failure_rate,
+                "changed": slot.job.changed,
+                "history_runs": slot.job.history_runs,
+                "predicted": slot.to_dict(),
+                "actual": actual_by_name[slot.job.name].to_dict()
+                if slot.job.name in actual_by_name
+                else None,
+            }
+            for order, slot in enumerate(predicted)
+        ],
+    }
+
+
+def format_schedule(report: typing.Dict[str, typing.Any]) -> str:
+    """Text table of predicted vs actual times."""
+    rows = [["job", "risk", "worker", "predicted", "actual", "status"]]
+    for job in report["jobs"]:
+        predicted, actual = job["predicted"], job["actual"]
+        rows.append(
+            [
+                job["name"],
+                f"{job['risk']:.2f}",
+                str(predicted["worker"]),
+                f"{predicted['start_seconds']:.0f}-{predicted['end_seconds']:.0f}s",
+                f"{actual['start_seconds']:.0f}-{actual['end_seconds']:.0f}s"
+                if actual
+                else "-",
+                actual["status"] if actual else "not run",
+            ]
+        )
+
+    rows.append(
+        [
+            "total",
+            "",
+            "",
+            f"{report['predicted_seconds']:.0f}s",
+            f"{report['actual_seconds']:.0f}s",
+            "",
+        ]
+    )
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
@@ -0,0 +1,414 @@
+"""Local scoring of recognition results, same as /api/evaluate.
+
+Word error is a Levenshtein alignment of the expected and actual raw text
+(split on whitespace). Alignments are computed for whole batches at once
+with NumPy: each row of the edit distance matrix is vectorized over the
+batch and over columns (insertions are a running minimum along the row),
+and all backtraces take one step together. Utterances are sorted by length
+before batching to keep padding small.
+
+Differences and counts reproduce the server's report.json, including its
+quirks: the backtrace prefers a diagonal step (match/substitution) on ties
+and stops when either sentence is exhausted, so leading insertions and
+deletions are not listed or counted, while "errors" is the full distance.
+
+Intent names are compared exactly. Entities are compared as
+(entity, value) pairs, and only when the intent is correct.
+"""
+import json
+import logging
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+_LOGGER = logging.getLogger(__name__)
+
+OP_MATCH = 0
+OP_SUBSTITUTION = 1
+OP_DELETION = 2
+OP_INSERTION = 3
+
+DEFAULT_BATCH_SIZE = 4096
+
+# Keys added to each actual result by scoring
+SCORE_KEYS = [
+    "expected_intent_name",
+    "missing_entities",
+    "wrong_entities",
+    "word_error",
+]
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class WordError:
+    """Alignment of reference (expected) and hypothesis (actual) words."""
+
+    reference: typing.List[str]
+    hypothesis: typing.List[str]
+    differences: typing.List[str]
+    matches: int
+    substitutions: int
+    insertions: int
+    deletions: int
+    errors: int
+
+    @property
+    def words(self) -> int:
+        """Number of reference words."""
+        return len(self.reference)
+
+    @property
+    def error_rate(self) -> float:
+        """Listed substitutions, insertions and deletions per reference word."""
+        if self.words == 0:
+            return 0.0
+
+        return (self.substitutions + self.insertions + self.deletions) / self.words
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """Same keys as word_error in report.json."""
+        return {
+            "deletions": self.deletions,
+            "differences": self.differences,
+            "error_rate": self.error_rate,
+            "errors": self.errors,
+            "hypothesis": self.hypothesis,
+            "insertions": self.insertions,
+            "matches": self.matches,
+            "reference": self.reference,
+            "substitutions": self.substitutions,
+            "words": self.words,
+        }
+
+
+def word_errors(
+    references: typing.Sequence[typing.List[str]],
+    hypotheses: typing.Sequence[typing.List[str]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> typing.List[WordError]:
+    """Align reference/hypothesis word lists (in batches)."""
+    assert len(references) == len(hypotheses)
+    vocabulary: typing.Dict[str, int] = {}
+
+    def to_ids(words: typing.List[str]) -> typing.List[int]:
+        # Id 0 is padding
+        return [vocabulary.setdefault(word, len(vocabulary) + 1) for word in words]
+
+    ref_ids = [to_ids(words) for words in references]
+    hyp_ids = [to_ids(words) for words in hypotheses]
+
+    # Similar lengths in the same batch
+    order = sorted(
+        range(len(references)), key=lambda i: (len(ref_ids[i]), len(hyp_ids[i]))
+    )
+
+    results: typing.List[typing.Optional[WordError]] = [None] * len(references)
+    for batch_start in range(0, len(order), batch_size):
+        batch = order[batch_start : batch_start + batch_size]
+        batch_errors = _align_batch(
+            [ref_ids[i] for i in batch],
+            [hyp_ids[i] for i in batch],
+            [references[i] for i in batch],
+            [hypotheses[i] for i in batch],
+        )
+        for index, word_error in zip(batch, batch_errors):
+            results[index] = word_error
+
+    return typing.cast(typing.List[WordError], results)
+
+
+def _pad(sequences: typing.List[typing.List[int]]) -> np.ndarray:
+    max_length = max(1, max(len(s) for s in sequences))
+    padded = np.zeros((len(sequences), max_length), dtype=np.int64)
+    for row, sequence in enumerate(sequences):
+        padded[row, : len(sequence)] = sequence
+
+    return padded
+
+
+def _align_batch(
+    ref_ids: typing.List[typing.List[int]],
+    hyp_ids: typing.List[typing.List[int]],
+    references: typing.List[typing.List[str]],
+    hypotheses: typing.List[typing.List[str]],
+) -> typing.List[WordError]:
+    num_items = len(ref_ids)
+    ref = _pad(ref_ids)
+    hyp = _pad(hyp_ids)
+    ref_lengths = np.array([len(r) for r in ref_ids], dtype=np.int64)
+    hyp_lengths = np.array([len(h) for h in hyp_ids], dtype=np.int64)
+    max_ref, max_hyp = ref.shape[1], hyp.shape[1]
+
+    # distance[b, i, j] = edit distance of ref[b, :i] and hyp[b, :j]
+    columns = np.arange(max_hyp + 1, dtype=np.int64)
+    distance = np.empty((num_items, max_ref + 1, max_hyp + 1), dtype=np.int64)
+    distance[:, 0, :] = columns
+    row = np.empty((num_items, max_hyp + 1), dtype=np.int64)
+    for i in range(1, max_ref + 1):
+        cost = ref[:, i - 1, None] != hyp
+        row[:, 0] = i
+        row[:, 1:] = np.minimum(
+            distance[:, i - 1, :-1] + cost, distance[:, i - 1, 1:] + 1
+        )
+
+        # Insertions: distance[i, j] = min_k(row[k] + j - k)
+        distance[:, i, :] = np.minimum.accumulate(row - columns, axis=1) + columns
+
+    items = np.arange(num_items)
+    total_errors = distance[items, ref_lengths, hyp_lengths]
+
+    # Backtrace all items together until one sentence is exhausted
+    ref_pos = ref_lengths.copy()
+    hyp_pos = hyp_lengths.copy()
+    ops = np.full((num_items, max_ref + max_hyp), -1, dtype=np.int8)
+    for step in range(max_ref + max_hyp):
+        active = np.nonzero((ref_pos > 0) & (hyp_pos > 0))[0]
+        if len(active) == 0:
+            break
+
+        ai, aj = ref_pos[active], hyp_pos[active]
+        current = distance[active, ai, aj]
+        same = ref[active, ai - 1] == hyp[active, aj - 1]
+        diagonal = distance[active, ai - 1, aj - 1] + (~same)
+        deletion = distance[active, ai - 1, aj] + 1
+        op = np.where(
+            diagonal == current,
+            np.where(same, OP_MATCH, OP_SUBSTITUTION),
+            np.where(deletion == current, OP_DELETION, OP_INSERTION),
+        )
+
+        ops[active, step] = op
+        ref_pos[active] -= op != OP_INSERTION
+        hyp_pos[active] -= op != OP_DELETION
+
+    counts = {
+        op: (ops == op).sum(axis=1)
+        for op in [OP_MATCH, OP_SUBSTITUTION, OP_DELETION, OP_INSERTION]
+    }
+
+    results = []
+    for index in range(num_items):
+        reference, hypothesis = references[index], hypotheses[index]
+        ref_index, hyp_index = int(ref_pos[index]), int(hyp_pos[index])
+        differences = []
+        for op in ops[index, ::-1]:
+            if op == OP_MATCH:
+                differences.append(reference[ref_index])
+            elif op == OP_SUBSTITUTION:
+                differences.append(f"{reference[ref_index]}:{hypothesis[hyp_index]}")
+            elif op == OP_DELETION:
+                differences.append(f"-{reference[ref_index]}")
+            elif op == OP_INSERTION:
+                differences.append(f"+{hypothesis[hyp_index]}")
+            else:
+                continue
+
+            ref_index += int(op != OP_INSERTION)
+            hyp_index += int(op != OP_DELETION)
+
+        results.append(
+            WordError(
+                reference=reference,
+                hypothesis=hypothesis,
+                differences=differences,
+                matches=int(counts[OP_MATCH][index]),
+                substitutions=int(counts[OP_SUBSTITUTION][index]),
+                insertions=int(counts[OP_INSERTION][index]),
+                deletions=int(counts[OP_DELETION][index]),
+                errors=int(total_errors[index]),
+            )
+        )
+
+    return results
+
+
+# -----------------------------------------------------------------------------
+
+
+def get_words(result: typing.Dict[str, typing.Any]) -> typing.List[str]:
+    """Words of raw text in a recognition result."""
+    return str(result.get("raw_text") or result.get("text") or "").split()
+
+
+def get_intent_name(result: typing.Dict[str, typing.Any]) -> str:
+    """Intent name of a recognition result (empty if not recognized)."""
+    return str((result.get("intent") or {}).get("name") or "")
+
+
+def compare_entities(
+    expected: typing.Dict[str, typing.Any], actual: typing.Dict[str, typing.Any]
+) -> typing.Tuple[int, typing.List[typing.Any], typing.List[typing.Any]]:
+    """(correct count, missing expected entities, wrong actual entities)."""
+    missing = list(expected.get("entities") or [])
+    wrong = []
+    num_correct = 0
+    for entity in actual.get("entities") or []:
+        key = (entity.get("entity"), entity.get("value"))
+        for index, expected_entity in enumerate(missing):
+            if (expected_entity.get("entity"), expected_entity.get("value")) == key:
+                num_correct += 1
+                missing.pop(index)
+                break
+        else:
+            wrong.append(entity)
+
+    return num_correct, missing, wrong
+
+
+def score(
+    expected: typing.Dict[str, typing.Dict[str, typing.Any]],
+    actual: typing.Dict[str, typing.Dict[str, typing.Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> typing.Dict[str, typing.Any]:
+    """Report with the same fields as /api/evaluate.
+
+    Keys of actual without an expected result are skipped.
+    """
+    keys = [key for key in actual if key in expected]
+    for key in actual:
+        if key not in expected:
+            _LOGGER.warning("No expected result for %s", key)
+
+    errors = word_errors(
+        [get_words(expected[key]) for key in keys],
+        [get_words(actual[key]) for key in keys],
+        batch_size=batch_size,
+    )
+
+    num_entities = 0
+    correct_entities = 0
+    correct_intent_names = 0
+    correct_intent_and_entities = 0
+    speedups = []
+    actual_results = {}
+    for key, word_error in zip(keys, errors):
+        expected_result, actual_result = expected[key], actual[key]
+        expected_intent_name = get_intent_name(expected_result)
+        num_entities += len(expected_result.get("entities") or [])
+
+        missing: typing.List[typing.Any] = []
+        wrong: typing.List[typing.Any] = []
+        if get_intent_name(actual_result) == expected_intent_name:
+            correct_intent_names += 1
+            num_correct, missing, wrong = compare_entities(
+                expected_result, actual_result
+            )
+            correct_entities += num_correct
+            if not (missing or wrong):
+                correct_intent_and_entities += 1
+
+        wav_seconds = actual_result.get("wav_seconds")
+        transcribe_seconds = actual_result.get("transcribe_seconds")
+        if wav_seconds and transcribe_seconds:
+            speedups.append(wav_seconds / transcribe_seconds)
+
+        actual_results[key] = {
+            **actual_result,
+            "expected_intent_name": expected_intent_name,
+            "missing_entities": missing,
+            "wrong_entities": wrong,
+            "word_error": word_error.to_dict(),
+        }
+
+    num_wavs = len(keys)
+    num_words = sum(e.words for e in errors)
+    correct_words = sum(e.matches for e in errors)
+
+    def ratio(numerator: int, denominator: int) -> float:
+        return numerator / denominator if denominator > 0 else 0.0
+
+    return {
+        "actual": actual_results,
+        "average_transcription_speedup": ratio(sum(speedups), len(speedups)),
+        "correct_entities": correct_entities,
+        "correct_intent_and_entities": correct_intent_and_entities,
+        "correct_intent_names": correct_intent_names,
+        "correct_transcriptions": sum(1 for e in errors if e.errors == 0),
+        "correct_words": correct_words,
+        "entity_accuracy": ratio(correct_entities, num_entities),
+        "expected": {key: expected[key] for key in keys},
+        "intent_accuracy": ratio(correct_intent_names, num_wavs),
+        "intent_entity_accuracy": ratio(correct_intent_and_entities, num_wavs),
+        "num_entities": num_entities,
+        "num_intents": num_wavs,
+        "num_wavs": num_wavs,
+        "num_words": num_words,
+        "transcription_accuracy": ratio(correct_words, num_words),
+    }
+
+
+# -----------------------------------------------------------------------------
+
+
+def load_expected(wav_dir: Path) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    """Expected results from sidecar JSON files, keyed by WAV file name."""
+    expected = {}
+    for json_path in sorted(wav_dir.glob("*.json")):
+        wav_path = json_path.with_suffix(".wav")
+        if wav_path.is_file():
+            with open(json_path, "r") as json_file:
+                expected[wav_path.name] = json.load(json_file)
+
+    return expected
+
+
+def rescore_report(
+    report: typing.Dict[str, typing.Any], batch_size: int = DEFAULT_BATCH_SIZE
+) -> typing.Dict[str, typing.Any]:
+    """Score the expected/actual results of an existing report again."""
+    actual = {
+        key: {k: v for k, v in result.items() if k not in SCORE_KEYS}
+        for key, result in report.get("actual", {}).items()
+    }
+
+    return score(report.get("expected", {}), actual, batch_size=batch_size)
+
+
+def compare_reports(
+    expected: typing.Any,
+    actual: typing.Any,
+    path: str = "",
+    rel_tolerance: float = 1e-12,
+) -> typing.List[str]:
+    """Paths where two reports differ.
+
+    Floats are compared with a relative tolerance, since the server sums
+    speedups in the (unrecorded) order files were extracted.
+    """
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        differences = []
+        for key in sorted(set(expected) | set(actual), key=str):
+            key_path = f"{path}/{key}"
+            if (key not in expected) or (key not in actual):
+                differences.append(key_path)
+            else:
+                differences.extend(
+                    compare_reports(expected[key], actual[key], key_path, rel_tolerance)
+                )
+
+        return differences
+
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [path]
+
+        differences = []
+        for index, (e, a) in enumerate(zip(expected, actual)):
+            differences.extend(compare_reports(e, a, f"{path}/{index}", rel_tolerance))
+
+        return differences
+
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        if isinstance(expected, bool) or isinstance(actual, bool):
+            return [] if expected == actual else [path]
+
+        if abs(expected - actual) <= rel_tolerance * max(abs(expected), abs(actual)):
+            return []
+
+        return [path]
+
+    return [] if expected == actual else [path]
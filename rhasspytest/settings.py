@@ -0,0 +1,101 @@
+"""Temporarily changing settings of a running Rhasspy profile."""
+import copy
+import logging
+import typing
+from pathlib import Path
+
+import requests
+
+from . import RhasspyConnection
+from .startup import wait_ready
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+
+
+def set_setting(profile: typing.Dict[str, typing.Any], key: str, value: typing.Any):
+    """Set a dotted key (e.g., wake.raven.probability_threshold) in a profile."""
+    parts = key.split(".")
+    section = profile
+    for part in parts[:-1]:
+        section = section.setdefault(part, {})
+
+    section[parts[-1]] = value
+
+
+def get_setting(
+    profile: typing.Dict[str, typing.Any], key: str, default: typing.Any = None
+) -> typing.Any:
+    """Get a dotted key from a profile."""
+    value: typing.Any = profile
+    for part in key.split("."):
+        if not isinstance(value, dict) or (part not in value):
+            return default
+
+        value = value[part]
+
+    return value
+
+
+def parse_value(value_str: str) -> typing.Any:
+    """Interpret command-line setting value as a number or boolean if possible."""
+    for convert in (int, float):
+        try:
+            return convert(value_str)
+        except ValueError:
+            pass
+
+    if value_str.lower() in {"true", "false"}:
+        return value_str.lower() == "true"
+
+    return value_str
+
+
+# -----------------------------------------------------------------------------
+
+
+class ProfileSettings:
+    """Applies settings to the user profile and restores it on exit.
+
+    Services are restarted after every change, and the caller is blocked until
+    they answer readiness probes again.
+    """
+
+    def __init__(self, connection: RhasspyConnection, wav_dir: Path):
+        self.connection = connection
+        self.wav_dir = wav_dir
+        self.original_profile: typing.Optional[typing.Dict[str, typing.Any]] = None
+
+    def __enter__(self):
+        response = requests.get(
+            self.connection.api_url("profile"), params={"layers": "profile"}
+        )
+        response.raise_for_status()
+        self.original_profile = response.json()
+
+        return self
+
+    def __exit__(self, *args):
+        if self.original_profile is not None:
+            self.save(self.original_profile)
+
+    def apply(self, settings: typing.Dict[str, typing.Any]):
+        """Set dotted keys on top of the original user profile."""
+        assert self.original_profile is not None
+        profile = copy.deepcopy(self.original_profile)
+        for key, value in settings.items():
+            set_setting(profile, key, value)
+
+        self.save(profile)
+
+    def save(self, profile: typing.Dict[str, typing.Any]):
+        """Save user profile, restart, and wait for services."""
+        _LOGGER.debug("Saving profile: %s", profile)
+        response = requests.post(self.connection.api_url("profile"), json=profile)
+        response.raise_for_status()
+
+        response = requests.post(self.connection.api_url("restart"))
+        response.raise_for_status()
+
+        wait_ready(self.connection, profile, self.wav_dir)
@@ -0,0 +1,205 @@
+"""Evaluation of one corpus split across replicas of the same trained profile.
+
+Utterances (WAV file and its JSON sidecar) are assigned to shards by a
+hash of their file name, so an utterance always lands in the same shard
+for a given number of shards. Each replica takes the next waiting shard
+and streams it to its own /api/evaluate; a shard that fails is given to
+another replica, and the failing replica takes no more shards.
+
+Shard reports are merged by scoring all expected/actual results together
+again (see scoring.score), so summary fields such as intent_accuracy,
+correct_words and average_transcription_speedup are the same as if the
+whole corpus had been evaluated by one instance.
+"""
+import dataclasses
+import hashlib
+import logging
+import queue
+import threading
+import time
+import typing
+from collections import defaultdict
+from pathlib import Path
+
+import requests
+
+from . import RhasspyConnection
+from .archive import CorpusArchive
+from .evaluate import evaluate
+from .scoring import SCORE_KEYS, score
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+
+
+class ShardError(Exception):
+    """One or more shards could not be evaluated by any replica."""
+
+
+@dataclasses.dataclass
+class Shard:
+    """Subset of a corpus evaluated by one replica."""
+
+    index: int
+    archive: CorpusArchive
+    replica: typing.Optional[int] = None
+    seconds: typing.Optional[float] = None
+    report: typing.Optional[typing.Dict[str, typing.Any]] = None
+    errors: typing.List[str] = dataclasses.field(default_factory=list)
+
+    @property
+    def utterances(self) -> int:
+        """Number of WAV files in the shard."""
+        return sum(1 for m in self.archive.members if m.name.endswith(".wav"))
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """Summary without results (for JSON)."""
+        return {
+            "index": self.index,
+            "utterances": self.utterances,
+            "replica": self.replica,
+            "seconds": self.seconds,
+            "errors": self.errors,
+        }
+
+
+def shard_index(name: str, num_shards: int) -> int:
+    """Hash-stable shard of an utterance (by file name without suffix)."""
+    digest = hashlib.sha256(Path(name).stem.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % num_shards
+
+
+def split_archive(archive: CorpusArchive, num_shards: int) -> typing.List[Shard]:
+    """Non-empty shards of an archive, keeping WAV and JSON files together."""
+    if num_shards < 1:
+        raise ValueError("Need at least one shard")
+
+    members = defaultdict(list)
+    for member in archive.members:
+        members[shard_index(member.name, num_shards)].append(member)
+
+    return [
+        Shard(index=index, archive=CorpusArchive(members[index]))
+        for index in sorted(members)
+    ]
+
+
+def replica_connections(
+    connection: RhasspyConnection, http_ports: typing.Iterable[int]
+) -> typing.List[RhasspyConnection]:
+    """Connection followed by copies for the HTTP ports of other replicas."""
+    return [connection] + [
+        dataclasses.replace(connection, http_port=port) for port in http_ports
+    ]
+
+
+# -----------------------------------------------------------------------------
+
+
+def merge_reports(
+    reports: typing.Iterable[typing.Dict[str, typing.Any]]
+) -> typing.Dict[str, typing.Any]:
+    """One report.json from the reports of disjoint shards."""
+    expected: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+    actual: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+    for report in reports:
+        # Server reports are keyed by path (different for each replica)
+        for key, result in report.get("expected", {}).items():
+            expected[Path(key).name] = result
+
+        for key, result in report.get("actual", {}).items():
+            actual[Path(key).name] = {
+                k: v for k, v in result.items() if k not in SCORE_KEYS
+            }
+
+    return score(expected, actual)
+
+
+def evaluate_sharded(
+    connections: typing.Sequence[RhasspyConnection],
+    archive: CorpusArchive,
+    num_shards: typing.Optional[int] = None,
+    timeout: typing.Optional[float] = None,
+    retries: int = 1,
+) -> typing.Tuple[typing.Dict[str, typing.Any], typing.List[Shard]]:
+    """Evaluate shards in parallel (one at a time per replica) and merge them.
+
+    Raises ShardError if a shard failed on retries + 1 replicas or no
+    healthy replica was left to take it.
+    """
+    shards = split_archive(archive, num_shards or len(connections))
+    waiting: "queue.Queue[Shard]" = queue.Queue()
+    for shard in shards:
+        waiting.put(shard)
+
+    # Shards not yet evaluated or given up on (waiting or in flight), and
+    # replicas that have not failed. Guarded by lock.
+    pending = len(shards)
+    healthy = len(connections)
+    lock = threading.Lock()
+
+    def run_replica(replica: int, connection: RhasspyConnection):
+        nonlocal pending, healthy
+        while True:
+            with lock:
+                if pending <= 0:
+                    return
+
+            # Failed shards may still be re-queued by other replicas
+            try:
+                shard = waiting.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            _LOGGER.debug(
+                "Shard %s (%s utterance(s)) on replica %s",
+                shard.index,
+                shard.utterances,
+                replica,
+            )
+            start_time = time.perf_counter()
+            try:
+                shard.report = evaluate(connection, shard.archive, timeout=timeout)
+            except requests.RequestException as e:
+                _LOGGER.warning(
+                    "Shard %s failed on replica %s: %s", shard.index, replica, e
+                )
+                shard.errors.append(f"replica {replica}: {e}")
+
+                # Replica takes no more shards
+                with lock:
+                    healthy -= 1
+                    if (len(shard.errors) <= retries) and (healthy > 0):
+                        waiting.put(shard)
+                    else:
+                        pending -= 1
+
+                return
+
+            shard.replica = replica
+            shard.seconds = time.perf_counter() - start_time
+            with lock:
+                pending -= 1
+
+    threads = [
+        threading.Thread(target=run_replica, args=(replica, connection))
+        for replica, connection in enumerate(connections)
+    ]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    failed = [shard for shard in shards if shard.report is None]
+    if failed:
+        raise ShardError(
+            "Failed shard(s): "
+            + ", ".join(
+                f"{shard.index} ({'; '.join(shard.errors) or 'no replica left'})"
+                for shard in failed
+            )
+        )
+
+    return merge_reports(shard.report for shard in shards if shard.report), shards
@@ -0,0 +1,161 @@
+"""Training time, memory and recognition latency vs slot list size.
+
+Slot values are made from combinations of words already in the profile's
+grammar, so every speech system can pronounce them without G2P guessing.
+A temporary intent references the slot so that its values end up in the
+trained language model.
+"""
+import itertools
+import logging
+import random
+import time
+import typing
+from pathlib import Path
+
+import requests
+
+from . import RhasspyConnection
+from .nlu import NluClient, NluRequest, fetch_grammar, summarize_results
+from .stats import summarize
+from .training import train
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+
+SLOT_NAME = "slot_scaling"
+INTENT_NAME = "SlotScaling"
+SENTENCES_FILE = "intents/slot_scaling.ini"
+
+# -----------------------------------------------------------------------------
+
+
+def make_slot_values(vocabulary: typing.Iterable[str], count: int) -> typing.List[str]:
+    """Unique multi-word values (shortest first) from vocabulary words."""
+    words = sorted(set(vocabulary))
+    if len(words) < 2:
+        raise ValueError("Need at least two vocabulary words")
+
+    values: typing.List[str] = []
+    length = 2
+    while len(values) < count:
+        combinations = itertools.product(words, repeat=length)
+        values.extend(
+            " ".join(combination)
+            for combination in itertools.islice(combinations, count - len(values))
+        )
+        length += 1
+
+    return values
+
+
+def post_slot(
+    connection: RhasspyConnection, slot_name: str, values: typing.List[str]
+) -> float:
+    """Replace all values of a slot, returning seconds taken."""
+    start_time = time.perf_counter()
+    response = requests.post(
+        connection.api_url(f"slots/{slot_name}"),
+        json=values,
+        params={"overwriteAll": "true"},
+    )
+    response.raise_for_status()
+
+    return time.perf_counter() - start_time
+
+
+def post_sentences(connection: RhasspyConnection, sentences: typing.Dict[str, str]):
+    """Save sentence files."""
+    response = requests.post(connection.api_url("sentences"), json=sentences)
+    response.raise_for_status()
+
+
+def speech_latency(
+    connection: RhasspyConnection, wav_paths: typing.List[Path]
+) -> typing.Dict[str, typing.Any]:
+    """Latency of /api/speech-to-text for each WAV file."""
+    latencies: typing.List[float] = []
+    with requests.Session() as session:
+        for wav_path in wav_paths:
+            wav_bytes = wav_path.read_bytes()
+            start_time = time.perf_counter()
+            response = session.post(
+                connection.api_url("speech-to-text"),
+                data=wav_bytes,
+                headers={"Content-Type": "audio/wav"},
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start_time)
+
+    return summarize(latencies)
+
+
+# -----------------------------------------------------------------------------
+
+
+def benchmark(
+    connection: RhasspyConnection,
+    sizes: typing.Sequence[int] = DEFAULT_SIZES,
+    wav_dir: typing.Optional[Path] = None,
+    num_queries: int = 100,
+    train_timeout: typing.Optional[float] = None,
+) -> typing.Dict[str, typing.Any]:
+    """Train with slot lists of each size and measure the cost.
+
+    Stops growing at the first size that fails to train.
+    """
+    grammar = fetch_grammar(connection)
+    all_values = make_slot_values(grammar.vocabulary(), max(sizes))
+    wav_paths = sorted(wav_dir.glob("*.wav")) if wav_dir else []
+
+    response = requests.get(
+        connection.api_url("sentences"), headers={"Accept": "application/json"}
+    )
+    response.raise_for_status()
+    sentences = response.json()
+
+    rng = random.Random(0)
+    report: typing.Dict[str, typing.Any] = {"slot": SLOT_NAME, "sizes": []}
+
+    try:
+        sentences[SENTENCES_FILE] = f"[{INTENT_NAME}]\n(${SLOT_NAME}){{value}}\n"
+        post_sentences(connection, sentences)
+
+        for size in sorted(sizes):
+            _LOGGER.debug("Slot size: %s", size)
+            values = all_values[:size]
+            size_report: typing.Dict[str, typing.Any] = {
+                "values": size,
+                "post_seconds": post_slot(connection, SLOT_NAME, values),
+            }
+            report["sizes"].append(size_report)
+
+            try:
+                size_report.update(train(connection, timeout=train_timeout))
+            except requests.RequestException as e:
+                _LOGGER.exception("train (%s value(s))", size)
+                size_report["error"] = str(e)
+                break
+
+            # Recognize a sample of the new values
+            queries = [
+                NluRequest(value, "in_grammar", INTENT_NAME)
+                for value in rng.sample(values, min(num_queries, size))
+            ]
+            results, wall_seconds = NluClient(connection, 1).run(queries)
+            size_report["text_to_intent"] = summarize_results(results, wall_seconds)
+
+            if wav_paths:
+                size_report["speech_to_text"] = speech_latency(connection, wav_paths)
+    finally:
+        # Remove slot and temporary intent
+        requests.post(
+            connection.api_url(f"slots/{SLOT_NAME}"),
+            json=[],
+            params={"overwriteAll": "true"},
+        )
+        sentences[SENTENCES_FILE] = ""
+        requests.post(connection.api_url("sentences"), json=sentences)
+        requests.post(connection.api_url("train"))
+
+    return report
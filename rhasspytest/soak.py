@@ -0,0 +1,272 @@
+"""Wake word soak test with compressed-time background audio.
+
+Long recordings without the keyword are split across several site ids and
+streamed in parallel, faster than real time. Streaming speed is adjusted so
+the wake service stays below a target CPU utilization, i.e. it keeps up with
+the audio. Every HotwordDetected is a false activation.
+"""
+import functools
+import logging
+import threading
+import time
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+
+from rhasspyhermes.audioserver import AudioFrame
+from rhasspyhermes.dialogue import DialogueSessionEnded, DialogueSessionStarted
+from rhasspyhermes.wake import HotwordDetected
+
+from . import RhasspyConnection
+from .audio import iter_wav_file
+from .events import MqttEvent, MqttEventLog
+from .resources import ResourceMonitor, get_rhasspy_pid
+from .settings import ProfileSettings
+from .stats import linear_slope
+from .wake import WAKE_PROCESS_FILTER, end_wake_sessions, get_site_ids
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class FalseActivation:
+    """Hotword detected in background audio."""
+
+    site_id: str
+    wav_name: str
+    offset_seconds: float
+    audio_hours: float
+
+
+def is_session_started(event: MqttEvent, site_id: str, since: float) -> bool:
+    """True if event is a dialogue session started on site after since."""
+    return (
+        DialogueSessionStarted.is_topic(event.topic)
+        and (event.timestamp >= since)
+        and (event.payload.get("siteId") == site_id)
+    )
+
+
+class SpeedController:
+    """Streaming speed (x real time) that backs off when the engine is busy."""
+
+    def __init__(
+        self,
+        max_speed: float,
+        target_utilization: float,
+        min_speed: float = 1.0,
+    ):
+        self.speed = min_speed
+        self.min_speed = min_speed
+        self.max_speed = max_speed
+        self.target_utilization = target_utilization
+
+    def update(self, utilization: typing.Optional[float]):
+        """Adjust speed from CPU utilization (cores) of wake processes."""
+        if utilization is None:
+            # Nothing to measure, so trust the maximum
+            self.speed = self.max_speed
+        elif utilization > self.target_utilization:
+            self.speed = max(self.min_speed, self.speed * 0.8)
+        else:
+            self.speed = min(self.max_speed, self.speed * 1.25)
+
+
+class SoakTest:
+    """Parallel compressed-time streams of background audio."""
+
+    def __init__(
+        self,
+        events: MqttEventLog,
+        wav_paths: typing.List[Path],
+        site_ids: typing.List[str],
+        target_hours: float,
+        controller: SpeedController,
+        chunk_seconds: float = 0.1,
+        session_timeout: float = 5.0,
+    ):
+        self.events = events
+        self.wav_paths = wav_paths
+        self.site_ids = site_ids
+        self.target_seconds = target_hours * 3600
+        self.controller = controller
+        self.chunk_seconds = chunk_seconds
+        self.session_timeout = session_timeout
+
+        self.audio_seconds = 0.0
+        self.false_activations: typing.List[FalseActivation] = []
+        self.lock = threading.Lock()
+        self.done_event = threading.Event()
+
+    def stream(self, stream_index: int):
+        """Stream this site's share of the corpus, looping until target reached."""
+        site_id = self.site_ids[stream_index]
+        topic = AudioFrame.topic(site_id=site_id)
+        wav_paths = self.wav_paths[stream_index :: len(self.site_ids)] or self.wav_paths
+        num_detections = 0
+        next_time = time.perf_counter()
+
+        while not self.done_event.is_set():
+            for wav_path in wav_paths:
+                for offset_seconds, wav_chunk in iter_wav_file(
+                    wav_path, self.chunk_seconds
+                ):
+                    if self.done_event.is_set():
+                        return
+
+                    # Pace at current speed (absolute deadlines avoid drift)
+                    next_time += self.chunk_seconds / self.controller.speed
+                    delay = next_time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                    chunk_start = time.perf_counter()
+                    self.events.publish(topic, wav_chunk)
+
+                    with self.lock:
+                        self.audio_seconds += self.chunk_seconds
+                        if self.audio_seconds >= self.target_seconds:
+                            self.done_event.set()
+
+                    detections = self.events.find_all(
+                        lambda e: HotwordDetected.is_topic(e.topic)
+                        and (e.payload.get("siteId") == site_id)
+                    )
+                    if len(detections) > num_detections:
+                        num_detections = len(detections)
+                        self.record_activation(site_id, wav_path, offset_seconds)
+
+                        # Re-enable wake immediately so later activations count.
+                        # The session starts after the detection and disables
+                        # wake, so it has to be ended first.
+                        self.events.wait_for(
+                            functools.partial(
+                                is_session_started,
+                                site_id=site_id,
+                                since=chunk_start - 1,
+                            ),
+                            timeout=self.session_timeout,
+                        )
+                        end_wake_sessions(
+                            self.events,
+                            [site_id],
+                            timeout=self.session_timeout,
+                            since=chunk_start - 1,
+                        )
+                        next_time = time.perf_counter()
+
+    def record_activation(self, site_id: str, wav_path: Path, offset_seconds: float):
+        """Remember where a false activation happened."""
+        with self.lock:
+            activation = FalseActivation(
+                site_id=site_id,
+                wav_name=wav_path.name,
+                offset_seconds=offset_seconds,
+                audio_hours=self.audio_seconds / 3600,
+            )
+            self.false_activations.append(activation)
+
+        _LOGGER.info("False activation: %s", activation)
+
+    def run(
+        self, monitor: ResourceMonitor, sample_seconds: float
+    ) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Stream until target hours are reached, returning resource timeline."""
+        threads = [
+            threading.Thread(target=self.stream, args=(i,), daemon=True)
+            for i in range(len(self.site_ids))
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        start_time = time.perf_counter()
+        timeline: typing.List[typing.Dict[str, typing.Any]] = []
+        last_sample = monitor.sample() if monitor.enabled else None
+
+        while not self.done_event.wait(sample_seconds):
+            utilization: typing.Optional[float] = None
+            if last_sample is not None:
+                sample = monitor.sample()
+                utilization = (sample.cpu_seconds - last_sample.cpu_seconds) / (
+                    sample.timestamp - last_sample.timestamp
+                )
+                last_sample = sample
+
+            self.controller.update(utilization)
+            timeline.append(
+                {
+                    "wall_seconds": time.perf_counter() - start_time,
+                    "audio_hours": self.audio_seconds / 3600,
+                    "speed": self.controller.speed,
+                    "cpu_utilization": utilization,
+                    "rss_bytes": last_sample.rss_bytes if last_sample else None,
+                    "false_activations": len(self.false_activations),
+                }
+            )
+
+        for thread in threads:
+            thread.join()
+
+        return timeline
+
+
+# -----------------------------------------------------------------------------
+
+
+def soak(
+    connection: RhasspyConnection,
+    background_dir: Path,
+    probe_wav_dir: Path,
+    num_streams: int = 4,
+    target_hours: float = 24.0,
+    max_speed: float = 8.0,
+    target_utilization: float = 0.8,
+    sample_seconds: float = 10.0,
+) -> typing.Dict[str, typing.Any]:
+    """Count false activations per hour and track resource drift."""
+    wav_paths = sorted(background_dir.rglob("*.wav"))
+    if not wav_paths:
+        raise FileNotFoundError(f"No WAV files in {background_dir}")
+
+    site_ids = get_site_ids(num_streams)
+    topics = [
+        HotwordDetected.topic(wakeword_id="+"),
+        DialogueSessionStarted.topic(),
+        DialogueSessionEnded.topic(),
+    ]
+
+    controller = SpeedController(max_speed, target_utilization)
+
+    with MqttEventLog(connection, topics) as events, ProfileSettings(
+        connection, probe_wav_dir
+    ) as settings:
+        settings.apply({"wake.satellite_site_ids": ",".join(site_ids[1:])})
+
+        test = SoakTest(events, wav_paths, site_ids, target_hours, controller)
+        monitor = ResourceMonitor(get_rhasspy_pid(), WAKE_PROCESS_FILTER)
+        start_time = time.perf_counter()
+        timeline = test.run(monitor, sample_seconds)
+        wall_seconds = time.perf_counter() - start_time
+
+    audio_hours = test.audio_seconds / 3600
+    rss_points = [p for p in timeline if p["rss_bytes"] is not None]
+
+    return {
+        "streams": num_streams,
+        "audio_hours": audio_hours,
+        "wall_hours": wall_seconds / 3600,
+        "compression": (test.audio_seconds / wall_seconds) if wall_seconds else None,
+        "false_activations": len(test.false_activations),
+        "false_activations_per_hour": (len(test.false_activations) / audio_hours)
+        if audio_hours
+        else None,
+        "rss_drift_bytes_per_audio_hour": linear_slope(
+            [p["audio_hours"] for p in rss_points],
+            [p["rss_bytes"] for p in rss_points],
+        ),
+        "activations": [vars(a) for a in test.false_activations],
+        "timeline": timeline,
+    }
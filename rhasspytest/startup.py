@@ -0,0 +1,244 @@
+"""Readiness probes used while starting Rhasspy for tests.
+
+Instead of sleeping for a fixed time after download/restart/train, a probe is
+sent over MQTT until the enabled services answer it.
+"""
+import io
+import json
+import logging
+import threading
+import time
+import typing
+from pathlib import Path
+from uuid import uuid4
+
+import paho.mqtt.client as mqtt
+
+from rhasspyhermes.asr import (
+    AsrError,
+    AsrStartListening,
+    AsrStopListening,
+    AsrTextCaptured,
+)
+from rhasspyhermes.audioserver import AudioFrame
+from rhasspyhermes.nlu import NluError, NluIntent, NluIntentNotRecognized, NluQuery
+
+from . import RhasspyConnection, get_system
+from .scoring import get_intent_name, get_words
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+
+
+class ProbeFailed(Exception):
+    """Raised when a service does not answer a probe in time."""
+
+
+class MqttProbe:
+    """Sends a request over MQTT until a matching response arrives."""
+
+    def __init__(self, connection: RhasspyConnection, site_id: str = "default"):
+        self.connection = connection
+        self.site_id = site_id
+        self.client = mqtt.Client()
+        self.client.reconnect_delay_set(min_delay=0.1, max_delay=1)
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+
+        self.connected_event = threading.Event()
+        self.response_event = threading.Event()
+        self.response: typing.Optional[typing.Tuple[str, typing.Dict[str, typing.Any]]]
+        self.response = None
+
+        self.topics: typing.List[str] = []
+        self.request_ids: typing.Set[str] = set()
+
+    def __enter__(self):
+        self.client.connect_async(self.connection.mqtt_host, self.connection.mqtt_port)
+        self.client.loop_start()
+        return self
+
+    def __exit__(self, *args):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def on_connect(self, client, userdata, flags, rc):
+        """Re-subscribe after every (re-)connect, since the broker may restart."""
+        for topic in self.topics:
+            client.subscribe(topic)
+
+        self.connected_event.set()
+
+    def on_message(self, client, userdata, msg):
+        """Accept the first response that belongs to one of our requests."""
+        try:
+            payload = json.loads(msg.payload)
+        except ValueError:
+            return
+
+        response_id = payload.get("sessionId") or payload.get("id")
+        if response_id in self.request_ids:
+            self.response = (msg.topic, payload)
+            self.response_event.set()
+
+    def wait(
+        self,
+        topics: typing.List[str],
+        send_request: typing.Callable[[str], None],
+        timeout: float,
+        resend_seconds: float,
+    ) -> typing.Tuple[str, typing.Dict[str, typing.Any]]:
+        """Send requests until a response arrives or timeout expires."""
+        self.topics = topics
+        self.response_event.clear()
+        self.response = None
+
+        deadline = time.perf_counter() + timeout
+        if not self.connected_event.wait(timeout=timeout):
+            raise ProbeFailed("Could not connect to MQTT broker")
+
+        for topic in topics:
+            self.client.subscribe(topic)
+
+        while time.perf_counter() < deadline:
+            request_id = str(uuid4())
+            self.request_ids.add(request_id)
+            send_request(request_id)
+
+            wait_seconds = min(resend_seconds, max(0, deadline - time.perf_counter()))
+            if self.response_event.wait(timeout=wait_seconds):
+                assert self.response is not None
+                return self.response
+
+        raise ProbeFailed(f"No response on {topics} after {timeout} second(s)")
+
+    # -------------------------------------------------------------------------
+
+    def probe_nlu(
+        self, text: str, timeout: float = 30, resend_seconds: float = 0.5
+    ) -> typing.Tuple[str, typing.Dict[str, typing.Any]]:
+        """Wait for intent recognizer to answer an NluQuery."""
+
+        def send_query(request_id: str):
+            query = NluQuery(input=text, id=request_id, site_id=self.site_id)
+            self.client.publish(query.topic(), query.payload())
+
+        return self.wait(
+            [
+                NluIntent.topic(intent_name="#"),
+                NluIntentNotRecognized.topic(),
+                NluError.topic(),
+            ],
+            send_query,
+            timeout=timeout,
+            resend_seconds=resend_seconds,
+        )
+
+    def probe_asr(
+        self, wav_bytes: bytes, timeout: float = 30, resend_seconds: float = 2.0
+    ) -> typing.Tuple[str, typing.Dict[str, typing.Any]]:
+        """Wait for speech recognizer to transcribe a WAV file."""
+
+        def send_audio(session_id: str):
+            start = AsrStartListening(
+                site_id=self.site_id, session_id=session_id, stop_on_silence=False
+            )
+            self.client.publish(start.topic(), start.payload())
+
+            # Audio is sent as fast as possible; only readiness matters here
+            audio_topic = AudioFrame.topic(site_id=self.site_id)
+            with io.BytesIO(wav_bytes) as wav_io:
+                for chunk in AudioFrame.iter_wav_chunked(wav_io, 4096):
+                    self.client.publish(audio_topic, chunk)
+
+            stop = AsrStopListening(site_id=self.site_id, session_id=session_id)
+            self.client.publish(stop.topic(), stop.payload())
+
+        return self.wait(
+            [AsrTextCaptured.topic(), AsrError.topic()],
+            send_audio,
+            timeout=timeout,
+            resend_seconds=resend_seconds,
+        )
+
+
+# -----------------------------------------------------------------------------
+
+
+def find_probe_sample(
+    wav_dir: Path,
+) -> typing.Tuple[typing.Optional[Path], str, str]:
+    """Get first WAV file with a sidecar JSON, its expected text and intent."""
+    for json_path in sorted(wav_dir.glob("*.json")):
+        wav_path = json_path.with_suffix(".wav")
+        if not wav_path.is_file():
+            continue
+
+        with open(json_path, "r") as json_file:
+            expected = json.load(json_file)
+
+        return (
+            wav_path,
+            " ".join(get_words(expected)),
+            get_intent_name(expected),
+        )
+
+    return None, "", ""
+
+
+def wait_ready(
+    connection: RhasspyConnection,
+    profile: typing.Dict[str, typing.Any],
+    wav_dir: Path,
+    require_success: bool = False,
+    timeout: float = 60,
+) -> typing.Dict[str, float]:
+    """Block until speech/intent services answer probes.
+
+    If require_success is True, the answers must also show trained models:
+    the expected intent for the text of the first sample in wav_dir and a
+    non-empty transcription of its audio (not necessarily exact, since some
+    profiles never transcribe it word for word). Returns seconds until each
+    service answered.
+    """
+    wav_path, text, intent_name = find_probe_sample(wav_dir)
+    timings: typing.Dict[str, float] = {}
+    start_time = time.perf_counter()
+    deadline = start_time + timeout
+
+    def time_left() -> float:
+        return max(0, deadline - time.perf_counter())
+
+    with MqttProbe(connection) as probe:
+        if (get_system(profile, "intent") != "dummy") and text:
+            while True:
+                topic, payload = probe.probe_nlu(text, timeout=time_left())
+                if (not require_success) or (
+                    NluIntent.is_topic(topic)
+                    and (
+                        (not intent_name)
+                        or payload.get("intent", {}).get("intentName") == intent_name
+                    )
+                ):
+                    break
+
+                _LOGGER.debug("Intent not recognized yet: %s %s", topic, payload)
+
+            timings["nlu"] = time.perf_counter() - start_time
+
+        if (get_system(profile, "speech_to_text") != "dummy") and wav_path:
+            wav_bytes = wav_path.read_bytes()
+            while True:
+                topic, payload = probe.probe_asr(wav_bytes, timeout=time_left())
+                if (not require_success) or (
+                    AsrTextCaptured.is_topic(topic)
+                    and str(payload.get("text") or "").strip()
+                ):
+                    break
+
+                _LOGGER.debug("No transcription yet: %s", payload)
+
+            timings["asr"] = time.perf_counter() - start_time
+
+    return timings
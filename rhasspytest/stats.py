@@ -0,0 +1,110 @@
+"""Summary statistics for repeated timing measurements."""
+import math
+import random
+import typing
+
+# -----------------------------------------------------------------------------
+
+
+def percentile(values: typing.Sequence[float], percent: float) -> float:
+    """Percentile with linear interpolation between closest ranks."""
+    if not values:
+        return math.nan
+
+    sorted_values = sorted(values)
+    rank = (len(sorted_values) - 1) * (percent / 100)
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return sorted_values[int(rank)]
+
+    return sorted_values[lower] + (
+        (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+    )
+
+
+def median(values: typing.Sequence[float]) -> float:
+    """Median of values (NaN if empty)."""
+    return percentile(values, 50)
+
+
+def bootstrap_ci(
+    values: typing.Sequence[float],
+    statistic: typing.Callable[[typing.Sequence[float]], float] = median,
+    confidence: float = 0.95,
+    resamples: int = 1000,
+    seed: int = 0,
+) -> typing.Tuple[float, float]:
+    """Percentile bootstrap confidence interval for a statistic.
+
+    A fixed seed keeps intervals reproducible between report runs.
+    """
+    if not values:
+        return (math.nan, math.nan)
+
+    rng = random.Random(seed)
+    num_values = len(values)
+    estimates = [
+        statistic([values[rng.randrange(num_values)] for _ in range(num_values)])
+        for _ in range(resamples)
+    ]
+
+    alpha = (1 - confidence) / 2
+    return (
+        percentile(estimates, 100 * alpha),
+        percentile(estimates, 100 * (1 - alpha)),
+    )
+
+
+def summarize(
+    values: typing.Sequence[float], confidence: float = 0.95, resamples: int = 1000
+) -> typing.Dict[str, typing.Any]:
+    """Count, mean, median, p95, min/max and bootstrap CI of the median."""
+    if not values:
+        return {"count": 0}
+
+    ci_low, ci_high = bootstrap_ci(values, confidence=confidence, resamples=resamples)
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "median": median(values),
+        "p95": percentile(values, 95),
+        "min": min(values),
+        "max": max(values),
+        "median_ci": [ci_low, ci_high],
+        "confidence": confidence,
+    }
+
+
+def bucket_labels(edges: typing.Sequence[float]) -> typing.List[str]:
+    """Names of all buckets for edges, in ascending order."""
+    lows = [0.0] + list(edges)
+    return [f"{low:g}-{high:g}" for low, high in zip(lows, edges)] + [f"{lows[-1]:g}+"]
+
+
+def bucket_label(value: float, edges: typing.Sequence[float]) -> str:
+    """Name of half-open bucket [low, high) that value falls into."""
+    low = 0.0
+    for high in edges:
+        if value < high:
+            return f"{low:g}-{high:g}"
+
+        low = high
+
+    return f"{low:g}+"
+
+
+def linear_slope(
+    xs: typing.Sequence[float], ys: typing.Sequence[float]
+) -> typing.Optional[float]:
+    """Least-squares slope of ys over xs (None if undefined)."""
+    if len(xs) < 2:
+        return None
+
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    if var_x == 0:
+        return None
+
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x
@@ -0,0 +1,47 @@
+"""Markers for running integration tests concurrently.
+
+Tests are serialized unless marked. The markers only set attributes, so
+marked tests still run unchanged under python3 -m unittest.
+"""
+import typing
+
+# Attribute names set by markers
+RESOURCES_ATTR = "_rhasspytest_resources"
+MUTATES_STATE_ATTR = "_rhasspytest_mutates_state"
+
+# -----------------------------------------------------------------------------
+
+
+def shares(*resources: str) -> typing.Callable[[typing.Any], typing.Any]:
+    """Mark a test (method or class) as safe to run alongside other tests.
+
+    Tests that name the same resource (e.g., "wake" for hotwords on the
+    default site) never run at the same time.
+    """
+
+    def decorator(obj):
+        setattr(obj, RESOURCES_ATTR, frozenset(resources))
+        return obj
+
+    return decorator
+
+
+def mutates_state(obj):
+    """Mark a test that changes slots, sentences or training (runs alone)."""
+    setattr(obj, MUTATES_STATE_ATTR, True)
+    return obj
+
+
+def get_resources(test_object: typing.Any) -> typing.Optional[typing.FrozenSet[str]]:
+    """Resources of a marked test method/class (None if it must run alone)."""
+    if getattr(test_object, MUTATES_STATE_ATTR, False):
+        return None
+
+    return getattr(test_object, RESOURCES_ATTR, None)
+
+
+def is_marked(test_object: typing.Any) -> bool:
+    """True if a test method/class has a marker."""
+    return hasattr(test_object, RESOURCES_ATTR) or hasattr(
+        test_object, MUTATES_STATE_ATTR
+    )
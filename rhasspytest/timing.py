@@ -0,0 +1,220 @@
+"""Per-test timing broken down by what a test was waiting for.
+
+While instrument() is active, blocking calls made by a test are recorded
+as intervals of the current test (a context variable, so concurrent tests
+and their worker threads are kept apart):
+
+* http - requests calls (except POST /api/train)
+* train - requests calls to /api/train
+* mqtt - queue.Queue.get and threading.Event.wait with a timeout (tests
+  block on these for MQTT messages and broker connections)
+* websocket - asyncio.wait_for in a test that opened a websocket
+
+Tests without a websocket only await MQTT messages (HermesClient), so
+asyncio.wait_for counts as mqtt there. Intervals of a category are merged
+before summing, so nested or overlapping waits are not counted twice.
+"""
+import asyncio
+import contextvars
+import functools
+import queue
+import threading
+import time
+import typing
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+import requests
+
+CATEGORY_HTTP = "http"
+CATEGORY_MQTT = "mqtt"
+CATEGORY_WEBSOCKET = "websocket"
+CATEGORY_TRAIN = "train"
+CATEGORIES = [CATEGORY_HTTP, CATEGORY_MQTT, CATEGORY_WEBSOCKET, CATEGORY_TRAIN]
+
+# Resolved to mqtt or websocket when the test finishes
+_CATEGORY_ASYNC = "async"
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class WaitTiming:
+    """Wait intervals recorded for one test."""
+
+    intervals: typing.List[typing.Tuple[str, float, float]] = field(
+        default_factory=list
+    )
+    opened_websocket: bool = False
+
+    def add(self, category: str, start_time: float, end_time: float):
+        """Record a wait interval."""
+        self.intervals.append((category, start_time, end_time))
+
+    def breakdown(self, seconds: float) -> typing.Dict[str, typing.Any]:
+        """Seconds and number of calls per category, plus unaccounted time."""
+        async_category = CATEGORY_WEBSOCKET if self.opened_websocket else CATEGORY_MQTT
+        by_category: typing.Dict[str, typing.List[typing.Tuple[float, float]]] = {
+            category: [] for category in CATEGORIES
+        }
+        for category, start_time, end_time in self.intervals:
+            if category == _CATEGORY_ASYNC:
+                category = async_category
+
+            by_category[category].append((start_time, end_time))
+
+        result: typing.Dict[str, typing.Any] = {}
+        for category, intervals in by_category.items():
+            result[f"{category}_seconds"] = merged_seconds(intervals)
+            result[f"{category}_calls"] = len(intervals)
+
+        all_intervals = [i for intervals in by_category.values() for i in intervals]
+        result["other_seconds"] = max(0.0, seconds - merged_seconds(all_intervals))
+
+        return result
+
+
+def merged_seconds(intervals: typing.Iterable[typing.Tuple[float, float]]) -> float:
+    """Total length of the union of [start, end] intervals."""
+    total = 0.0
+    current_start: typing.Optional[float] = None
+    current_end = 0.0
+    for start_time, end_time in sorted(intervals):
+        if (current_start is None) or (start_time > current_end):
+            if current_start is not None:
+                total += current_end - current_start
+
+            current_start, current_end = start_time, end_time
+        else:
+            current_end = max(current_end, end_time)
+
+    if current_start is not None:
+        total += current_end - current_start
+
+    return total
+
+
+# -----------------------------------------------------------------------------
+
+_current_timing: "contextvars.ContextVar[typing.Optional[WaitTiming]]" = (
+    contextvars.ContextVar("rhasspytest_timing", default=None)
+)
+
+
+@contextmanager
+def timing_scope(timing: WaitTiming):
+    """Record waits in this context (task or thread) to timing."""
+    token = _current_timing.set(timing)
+    try:
+        yield timing
+    finally:
+        _current_timing.reset(token)
+
+
+def http_category(url: str) -> str:
+    """Category of a requests call."""
+    if urlparse(url).path.rstrip("/").endswith("/api/train"):
+        return CATEGORY_TRAIN
+
+    return CATEGORY_HTTP
+
+
+def _timed(function, get_category: typing.Callable[..., typing.Optional[str]]):
+    """Wrap a blocking function to record calls made by the current test."""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        timing = _current_timing.get()
+        category = get_category(*args, **kwargs) if timing else None
+        if (timing is None) or (category is None):
+            return function(*args, **kwargs)
+
+        start_time = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timing.add(category, start_time, time.perf_counter())
+
+    return wrapper
+
+
+def _timed_async(function):
+    """Wrap asyncio.wait_for to record awaits made by the current test."""
+
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        timing = _current_timing.get()
+        if timing is None:
+            return await function(*args, **kwargs)
+
+        start_time = time.perf_counter()
+        try:
+            return await function(*args, **kwargs)
+        finally:
+            timing.add(_CATEGORY_ASYNC, start_time, time.perf_counter())
+
+    return wrapper
+
+
+def _marks_websocket(function):
+    """Wrap websockets.connect to mark the current test."""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        timing = _current_timing.get()
+        if timing is not None:
+            timing.opened_websocket = True
+
+        return function(*args, **kwargs)
+
+    return wrapper
+
+
+def _request_category(_session, method, url, *args, **kwargs) -> str:
+    return http_category(str(url))
+
+
+def _queue_get_category(_queue, block=True, timeout=None) -> typing.Optional[str]:
+    return CATEGORY_MQTT if block else None
+
+
+def _event_wait_category(_event, timeout=None) -> typing.Optional[str]:
+    # Skip waits without timeout (e.g., Thread.start)
+    return CATEGORY_MQTT if timeout is not None else None
+
+
+@contextmanager
+def instrument():
+    """Patch blocking calls so waits of the current test are recorded."""
+    patches: typing.List[typing.Tuple[typing.Any, str, typing.Any]] = [
+        (
+            requests.Session,
+            "request",
+            _timed(requests.Session.request, _request_category),
+        ),
+        (queue.Queue, "get", _timed(queue.Queue.get, _queue_get_category)),
+        (
+            threading.Event,
+            "wait",
+            _timed(threading.Event.wait, _event_wait_category),
+        ),
+        (asyncio, "wait_for", _timed_async(asyncio.wait_for)),
+    ]
+
+    try:
+        import websockets
+
+        patches.append((websockets, "connect", _marks_websocket(websockets.connect)))
+    except ImportError:
+        pass
+
+    originals = [(obj, name, getattr(obj, name)) for obj, name, _ in patches]
+    try:
+        for obj, name, patched in patches:
+            setattr(obj, name, patched)
+
+        yield
+    finally:
+        for obj, name, original in originals:
+            setattr(obj, name, original)
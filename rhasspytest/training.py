@@ -0,0 +1,38 @@
+"""Timed training of a running Rhasspy profile."""
+import logging
+import time
+import typing
+
+import requests
+
+from . import RhasspyConnection
+from .resources import ResourceMonitor, get_rhasspy_pid
+
+_LOGGER = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+
+
+def train(
+    connection: RhasspyConnection, timeout: typing.Optional[float] = None
+) -> typing.Dict[str, typing.Any]:
+    """POST /api/train, returning seconds taken and resource usage.
+
+    Memory is sampled for the whole Rhasspy process tree, since training
+    happens in child processes (e.g., Kaldi or ngram tools).
+    """
+    with ResourceMonitor(get_rhasspy_pid(), interval=0.1) as monitor:
+        start_time = time.perf_counter()
+        response = requests.post(connection.api_url("train"), timeout=timeout)
+        train_seconds = time.perf_counter() - start_time
+
+    if response.status_code != 200:
+        _LOGGER.error(response.text)
+
+    response.raise_for_status()
+
+    return {
+        "train_seconds": train_seconds,
+        "peak_rss_bytes": monitor.peak_rss_bytes(),
+        "resources": monitor.summary(),
+    }
@@ -0,0 +1,306 @@
+"""Wake word detection latency, CPU cost and real-time capacity.
+
+Each wake WAV (wav/wake/<lang>/<system>_*.wav) is streamed in real time as
+AudioFrame messages. Latency is measured from the end of the keyword
+(keyword_end_seconds in the sidecar JSON) to HotwordDetected.
+
+Concurrent streams use extra site ids, which are added to the profile as
+wake.satellite_site_ids for the duration of the benchmark.
+"""
+import functools
+import logging
+import threading
+import time
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+
+from rhasspyhermes.audioserver import AudioFrame
+from rhasspyhermes.dialogue import (
+    DialogueEndSession,
+    DialogueSessionEnded,
+    DialogueSessionStarted,
+)
+from rhasspyhermes.wake import HotwordDetected, HotwordToggleOn, HotwordToggleReason
+
+from . import RhasspyConnection
+from .audio import KEYWORD_END_KEY, WavAudio, detect_speech_segments, load_sidecar, pace
+from .events import MqttEvent, MqttEventLog
+from .resources import ResourceMonitor, get_rhasspy_pid
+from .settings import ProfileSettings
+from .stats import percentile, summarize
+
+_LOGGER = logging.getLogger(__name__)
+
+WAKE_SYSTEMS = ("porcupine", "snowboy", "precise", "raven", "pocketsphinx")
+
+# Command line of wake services contains this
+WAKE_PROCESS_FILTER = "wake"
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class WakeSample:
+    """WAV file with the end of its keyword."""
+
+    wav_path: Path
+    audio: WavAudio
+    keyword_end_seconds: float
+
+    @classmethod
+    def load(cls, wav_path: Path) -> "WakeSample":
+        """Load WAV and keyword annotation (detected if missing)."""
+        audio = WavAudio.from_bytes(wav_path.read_bytes())
+        keyword_end = load_sidecar(wav_path).get(KEYWORD_END_KEY)
+        if keyword_end is None:
+            # Keyword is the first utterance before a pause
+            segments = detect_speech_segments(audio)
+            keyword_end = segments[0][1] if segments else audio.seconds
+            _LOGGER.warning(
+                "No %s for %s (detected %.2f)", KEYWORD_END_KEY, wav_path, keyword_end
+            )
+
+        return WakeSample(wav_path, audio, float(keyword_end))
+
+
+def find_wake_wav(wav_dir: Path, wake_system: str) -> Path:
+    """WAV recorded for a specific wake system."""
+    for wav_path in sorted(wav_dir.glob(f"{wake_system}_*.wav")):
+        return wav_path
+
+    raise FileNotFoundError(f"No WAV for {wake_system} in {wav_dir}")
+
+
+def get_site_ids(num_streams: int, base_site_id: str = "default") -> typing.List[str]:
+    """Site ids for concurrent streams (first is the base site)."""
+    return [base_site_id] + [f"wakebench{i}" for i in range(1, num_streams)]
+
+
+# -----------------------------------------------------------------------------
+
+
+class WakeBenchmark:
+    """Streams wake WAVs to one or more sites and records detections."""
+
+    def __init__(
+        self,
+        connection: RhasspyConnection,
+        events: MqttEventLog,
+        sample: WakeSample,
+        chunk_seconds: float = 0.03,
+        timeout: float = 5.0,
+    ):
+        self.connection = connection
+        self.events = events
+        self.sample = sample
+        self.chunk_seconds = chunk_seconds
+        self.timeout = timeout
+
+    def stream(self, site_id: str, start_time: float):
+        """Publish audio for one site, paced from a shared start time."""
+        topic = AudioFrame.topic(site_id=site_id)
+        silence = self.sample.audio.silence(self.chunk_seconds)
+        audio_seconds = 0.0
+        for audio_seconds, chunk in self.sample.audio.iter_chunks(self.chunk_seconds):
+            pace(start_time, audio_seconds)
+            self.events.publish(topic, self.sample.audio.to_wav(chunk))
+
+        # Keep audio flowing while waiting for late detections
+        silence_end = audio_seconds + self.timeout
+        while audio_seconds < silence_end:
+            if self.events.find(lambda e: self.is_detection(e, site_id)):
+                break
+
+            audio_seconds += self.chunk_seconds
+            pace(start_time, audio_seconds)
+            self.events.publish(topic, self.sample.audio.to_wav(silence))
+
+    def is_detection(self, event: MqttEvent, site_id: str) -> bool:
+        """True if event is a hotword detection for site."""
+        return HotwordDetected.is_topic(event.topic) and (
+            event.payload.get("siteId") == site_id
+        )
+
+    def run(self, site_ids: typing.List[str]) -> typing.List[typing.Optional[float]]:
+        """Stream to all sites at once; latency per site (None if missed)."""
+        self.events.clear()
+
+        # Small delay so all threads start on the same audio boundary
+        start_time = time.perf_counter() + 0.1
+        threads = [
+            threading.Thread(target=self.stream, args=(site_id, start_time))
+            for site_id in site_ids
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        keyword_end_time = start_time + self.sample.keyword_end_seconds
+        latencies: typing.List[typing.Optional[float]] = []
+        for site_id in site_ids:
+            detection = self.events.find(
+                functools.partial(self.is_detection, site_id=site_id)
+            )
+            latencies.append(
+                (detection.timestamp - keyword_end_time) if detection else None
+            )
+
+        self.reset(site_ids)
+        return latencies
+
+    def reset(self, site_ids: typing.List[str]):
+        """End dialogue sessions started by detections and re-enable wake."""
+        end_wake_sessions(self.events, site_ids, timeout=self.timeout)
+
+
+def is_session_ended(event: MqttEvent, session_id: str) -> bool:
+    """True if event is the end of a dialogue session."""
+    return DialogueSessionEnded.is_topic(event.topic) and (
+        event.payload.get("sessionId") == session_id
+    )
+
+
+def end_wake_sessions(
+    events: MqttEventLog,
+    site_ids: typing.Collection[str],
+    timeout: float = 5.0,
+    since: float = 0.0,
+):
+    """End dialogue sessions started (after since) on sites and re-enable wake.
+
+    The dialogue manager disables wake during a session, which would hide
+    detections that follow closely.
+    """
+    sessions_started = events.find_all(
+        lambda e: DialogueSessionStarted.is_topic(e.topic)
+        and (e.timestamp >= since)
+        and (e.payload.get("siteId") in site_ids)
+    )
+
+    for started in sessions_started:
+        session_id = started.payload.get("sessionId")
+        if not session_id:
+            continue
+
+        end_session = DialogueEndSession(session_id=session_id)
+        events.publish(end_session.topic(), end_session.payload())
+        events.wait_for(
+            functools.partial(is_session_ended, session_id=session_id),
+            timeout=timeout,
+        )
+
+    for site_id in site_ids:
+        toggle_on = HotwordToggleOn(
+            site_id=site_id, reason=HotwordToggleReason.DIALOGUE_SESSION
+        )
+        events.publish(toggle_on.topic(), toggle_on.payload())
+
+
+# -----------------------------------------------------------------------------
+
+
+def measure(
+    bench: WakeBenchmark, repeats: int, max_streams: int, max_latency: float
+) -> typing.Dict[str, typing.Any]:
+    """Single-stream latency/CPU and maximum real-time concurrent streams."""
+    monitor_pid = get_rhasspy_pid()
+    audio_seconds = bench.sample.audio.seconds
+
+    # Single stream latency
+    latencies: typing.List[float] = []
+    with ResourceMonitor(monitor_pid, WAKE_PROCESS_FILTER) as monitor:
+        for _ in range(repeats):
+            latency = bench.run(get_site_ids(1))[0]
+            if latency is not None:
+                latencies.append(latency)
+
+    cpu_seconds = monitor.cpu_seconds()
+    report: typing.Dict[str, typing.Any] = {
+        "wav": bench.sample.wav_path.name,
+        "keyword_end_seconds": bench.sample.keyword_end_seconds,
+        "latency_seconds": summarize(latencies),
+        "detection_rate": len(latencies) / repeats,
+        # CPU seconds per second of audio (fraction of one core per stream)
+        "cpu_per_stream": (cpu_seconds / (repeats * audio_seconds))
+        if cpu_seconds is not None
+        else None,
+        "concurrency": [],
+        "max_realtime_streams": 0,
+    }
+
+    # Double number of streams until detections are missed or late
+    num_streams = 1
+    while num_streams <= max_streams:
+        with ResourceMonitor(monitor_pid, WAKE_PROCESS_FILTER) as monitor:
+            stream_latencies = bench.run(get_site_ids(num_streams))
+
+        detected = [latency for latency in stream_latencies if latency is not None]
+        realtime = (len(detected) == num_streams) and (
+            percentile(detected, 95) <= max_latency
+        )
+        report["concurrency"].append(
+            {
+                "streams": num_streams,
+                "detected": len(detected),
+                "latency_seconds": summarize(detected),
+                "realtime": realtime,
+                "resources": monitor.summary(),
+            }
+        )
+
+        if not realtime:
+            break
+
+        report["max_realtime_streams"] = num_streams
+        num_streams *= 2
+
+    return report
+
+
+def benchmark(
+    connection: RhasspyConnection,
+    wav_dir: Path,
+    probe_wav_dir: Path,
+    wake_system: str,
+    repeats: int = 5,
+    max_streams: int = 32,
+    max_latency: float = 1.0,
+    sweep_key: typing.Optional[str] = None,
+    sweep_values: typing.Sequence[typing.Any] = (),
+) -> typing.Dict[str, typing.Any]:
+    """Measure wake system, optionally for each value of a profile setting."""
+    sample = WakeSample.load(find_wake_wav(wav_dir, wake_system))
+    topics = [
+        HotwordDetected.topic(wakeword_id="+"),
+        DialogueSessionStarted.topic(),
+        DialogueSessionEnded.topic(),
+    ]
+
+    satellite_ids = ",".join(get_site_ids(max_streams)[1:])
+    report: typing.Dict[str, typing.Any] = {"wake_system": wake_system}
+
+    with MqttEventLog(connection, topics) as events, ProfileSettings(
+        connection, probe_wav_dir
+    ) as settings:
+        bench = WakeBenchmark(connection, events, sample)
+        base_settings = {"wake.satellite_site_ids": satellite_ids}
+
+        if not sweep_key:
+            settings.apply(base_settings)
+            report.update(measure(bench, repeats, max_streams, max_latency))
+            return report
+
+        report["sweep_key"] = sweep_key
+        report["sweep"] = []
+        for value in sweep_values:
+            _LOGGER.debug("%s = %s", sweep_key, value)
+            settings.apply({**base_settings, sweep_key: value})
+            sweep_report = measure(bench, repeats, max_streams, max_latency)
+            sweep_report["value"] = value
+            report["sweep"].append(sweep_report)
+
+    return report
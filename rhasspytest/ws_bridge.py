@@ -0,0 +1,427 @@
+"""Throughput, latency and backpressure of the /api/mqtt websocket bridge.
+
+Messages are published over MQTT to a unique topic while a websocket
+client reads them from /api/mqtt/<topic>, the same path UIs use for
+audio level events. Each stage publishes a fixed number of messages of
+one kind and size at a target rate (0 = as fast as possible):
+
+* json - JSON object with sequence number, padded to the payload size
+* wav - the same with a base64 encoded WAV (silence) of about the payload
+  size, like AudioPlayBytes (the bridge only forwards JSON messages)
+
+A read delay makes the websocket client slow. Its receive queue is then
+limited to one message, so the bridge feels the backpressure instead of
+the client library buffering for it. What the bridge does is classified
+from the results:
+
+* closed - the bridge closed the websocket during the stage
+* dropping - messages never arrived
+* stalling - no message arrived for stall_seconds while some were missing
+* buffering - latency at the end of the stage grew compared to the start
+* keeping_up - none of the above
+"""
+import asyncio
+import base64
+import json
+import logging
+import threading
+import time
+import typing
+from dataclasses import dataclass
+from uuid import uuid4
+
+import paho.mqtt.client as mqtt
+import websockets
+
+from . import RhasspyConnection
+from .audio import WavAudio, pace
+from .resources import ResourceMonitor, get_rhasspy_pid
+from .stats import linear_slope, median, summarize
+
+_LOGGER = logging.getLogger(__name__)
+
+KINDS = ("json", "wav")
+TOPIC_PREFIX = "rhasspytest/bridge"
+
+# Sequence number of messages sent until the bridge is subscribed
+PROBE_SEQ = -1
+
+# Fraction of messages at start/end of a stage compared for buffering
+_EDGE_FRACTION = 0.1
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class BridgeStage:
+    """Messages published in one benchmark stage."""
+
+    kind: str
+    payload_bytes: int
+    messages: int
+    rate: float = 0.0
+    read_delay: float = 0.0
+
+
+def make_payload(kind: str, seq: int, payload_bytes: int) -> bytes:
+    """JSON payload of (at least) payload_bytes carrying a sequence number."""
+    message: typing.Dict[str, typing.Any] = {"seq": seq}
+    if kind == "wav":
+        # Largest WAV whose base64 encoding fits in the payload
+        overhead = len(json.dumps({"seq": seq, "wav": "", "padding": ""}))
+        wav_bytes = (max(0, payload_bytes - overhead) // 4) * 3
+        audio = WavAudio(
+            frames=bytes((max(0, wav_bytes - 44) // 2) * 2),
+            sample_rate=16000,
+            sample_width=2,
+            channels=1,
+        )
+        message["wav"] = base64.b64encode(audio.to_wav()).decode()
+
+    message["padding"] = ""
+    padding = payload_bytes - len(json.dumps(message))
+    message["padding"] = "x" * max(0, padding)
+    return json.dumps(message).encode()
+
+
+def parse_seq(message: typing.Union[str, bytes]) -> typing.Optional[int]:
+    """Sequence number of a message received from the bridge (None if unknown)."""
+    if isinstance(message, bytes):
+        try:
+            message = message.decode()
+        except UnicodeDecodeError:
+            return None
+
+    try:
+        event = json.loads(message)
+    except ValueError:
+        return None
+
+    payload = event.get("payload", event) if isinstance(event, dict) else None
+    if isinstance(payload, str):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            return None
+
+    if isinstance(payload, dict) and isinstance(payload.get("seq"), int):
+        return payload["seq"]
+
+    return None
+
+
+# -----------------------------------------------------------------------------
+
+
+class Publisher:
+    """Publishes stage messages over MQTT."""
+
+    def __init__(self, connection: RhasspyConnection):
+        self.connection = connection
+        self.client = mqtt.Client()
+        self.connected_event = threading.Event()
+        self.client.on_connect = lambda *args: self.connected_event.set()
+
+    def __enter__(self):
+        self.client.connect(self.connection.mqtt_host, self.connection.mqtt_port)
+        self.client.loop_start()
+        if not self.connected_event.wait(timeout=5):
+            raise TimeoutError("Could not connect to MQTT broker")
+
+        return self
+
+    def __exit__(self, *args):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def publish_probe(self, topic: str):
+        """Publish a message that is ignored by the stage."""
+        self.client.publish(topic, make_payload("json", PROBE_SEQ, 0))
+
+    def publish_stage(self, topic: str, stage: BridgeStage) -> typing.Dict[int, float]:
+        """Publish all messages of a stage at its rate; returns send times."""
+        # Payloads are built up front so only publishing is timed
+        payloads = [
+            make_payload(stage.kind, seq, stage.payload_bytes)
+            for seq in range(stage.messages)
+        ]
+
+        send_times: typing.Dict[int, float] = {}
+        start_time = time.perf_counter()
+        for seq, payload in enumerate(payloads):
+            if stage.rate > 0:
+                pace(start_time, seq / stage.rate)
+
+            send_times[seq] = time.perf_counter()
+            self.client.publish(topic, payload)
+
+        return send_times
+
+
+async def run_stage(
+    connection: RhasspyConnection,
+    publisher: Publisher,
+    stage: BridgeStage,
+    drain_seconds: float = 5.0,
+) -> typing.Tuple[
+    typing.Dict[int, float], typing.List[typing.Tuple[int, float, int]], int, bool
+]:
+    """Publish a stage and read it through the bridge.
+
+    Returns send times, (seq, receive time, bytes) of received messages, the
+    number of messages that could not be matched to a sequence number and
+    whether the bridge closed the websocket.
+    """
+    topic = f"{TOPIC_PREFIX}/{uuid4()}"
+    connect_args: typing.Dict[str, typing.Any] = {"max_size": None}
+    if stage.read_delay > 0:
+        connect_args["max_queue"] = 1
+
+    receipts: typing.List[typing.Tuple[int, float, int]] = []
+    unmatched = 0
+    closed = False
+    loop = asyncio.get_event_loop()
+
+    async with websockets.connect(
+        connection.ws_url(f"mqtt/{topic}"), **connect_args
+    ) as websocket:
+        # Bridge subscribes after the websocket is open
+        deadline = time.perf_counter() + drain_seconds
+        while True:
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"No message received from bridge on {topic}")
+
+            publisher.publish_probe(topic)
+            try:
+                probe = await asyncio.wait_for(websocket.recv(), timeout=0.1)
+                if parse_seq(probe) == PROBE_SEQ:
+                    break
+            except asyncio.TimeoutError:
+                pass
+
+        send_future = loop.run_in_executor(None, publisher.publish_stage, topic, stage)
+        received: typing.Set[int] = set()
+        while len(received) < stage.messages:
+            try:
+                message = await asyncio.wait_for(
+                    websocket.recv(), timeout=drain_seconds
+                )
+            except asyncio.TimeoutError:
+                if send_future.done():
+                    break
+
+                continue
+            except websockets.exceptions.ConnectionClosed:
+                _LOGGER.warning("Bridge closed websocket on %s", topic)
+                closed = True
+                break
+
+            receive_time = time.perf_counter()
+            seq = parse_seq(message)
+            if seq is None:
+                unmatched += 1
+            elif seq != PROBE_SEQ:
+                receipts.append((seq, receive_time, len(message)))
+                received.add(seq)
+
+            if stage.read_delay > 0:
+                await asyncio.sleep(stage.read_delay)
+
+        send_times = await send_future
+
+    return send_times, receipts, unmatched, closed
+
+
+# -----------------------------------------------------------------------------
+
+
+def classify(
+    dropped: int,
+    max_gap_seconds: float,
+    early_latency: float,
+    late_latency: float,
+    stall_seconds: float = 1.0,
+    growth_factor: float = 2.0,
+    min_growth_seconds: float = 0.05,
+    closed: bool = False,
+) -> str:
+    """Name of the bridge behavior seen in a stage (see module docstring)."""
+    if closed:
+        return "closed"
+
+    if dropped > 0:
+        return "dropping"
+
+    if max_gap_seconds >= stall_seconds:
+        return "stalling"
+
+    if (late_latency > early_latency * growth_factor) and (
+        (late_latency - early_latency) >= min_growth_seconds
+    ):
+        return "buffering"
+
+    return "keeping_up"
+
+
+def analyze_stage(
+    stage: BridgeStage,
+    send_times: typing.Dict[int, float],
+    receipts: typing.List[typing.Tuple[int, float, int]],
+    unmatched: int = 0,
+    stall_seconds: float = 1.0,
+    closed: bool = False,
+) -> typing.Dict[str, typing.Any]:
+    """Throughput, latency and behavior of one stage."""
+    result: typing.Dict[str, typing.Any] = {
+        "kind": stage.kind,
+        "payload_bytes": stage.payload_bytes,
+        "target_rate": stage.rate or None,
+        "read_delay": stage.read_delay,
+        "sent": len(send_times),
+        "unmatched": unmatched,
+    }
+
+    seen: typing.Set[int] = set()
+    duplicates = 0
+    out_of_order = 0
+    last_seq = PROBE_SEQ
+    bytes_received = 0
+    send_offsets: typing.List[float] = []
+    latencies: typing.List[float] = []
+    for seq, receive_time, num_bytes in receipts:
+        if (seq in seen) or (seq not in send_times):
+            duplicates += 1
+            continue
+
+        seen.add(seq)
+        if seq < last_seq:
+            out_of_order += 1
+
+        last_seq = max(last_seq, seq)
+        bytes_received += num_bytes
+        send_offsets.append(send_times[seq])
+        latencies.append(receive_time - send_times[seq])
+
+    dropped = len(send_times) - len(seen)
+    result.update(
+        {
+            "received": len(seen),
+            "dropped": dropped,
+            "duplicates": duplicates,
+            "out_of_order": out_of_order,
+        }
+    )
+
+    if (not send_times) or (not latencies):
+        result["behavior"] = classify(dropped, 0.0, 0.0, 0.0, closed=closed)
+        return result
+
+    first_send = min(send_times.values())
+    publish_seconds = max(send_times.values()) - first_send
+    receive_times = [first_send] + sorted(t for _, t, _ in receipts)
+    receive_seconds = receive_times[-1] - first_send
+    max_gap_seconds = max(b - a for a, b in zip(receive_times, receive_times[1:]))
+
+    edge = max(1, int(len(latencies) * _EDGE_FRACTION))
+    early_latency = median(latencies[:edge])
+    late_latency = median(latencies[-edge:])
+
+    result.update(
+        {
+            "publish_seconds": publish_seconds,
+            "publish_rate": (len(send_times) / publish_seconds)
+            if publish_seconds
+            else None,
+            "receive_seconds": receive_seconds,
+            "messages_per_second": (len(seen) / receive_seconds)
+            if receive_seconds
+            else None,
+            "bytes_per_second": (bytes_received / receive_seconds)
+            if receive_seconds
+            else None,
+            "latency_seconds": summarize(latencies),
+            "early_latency_seconds": early_latency,
+            "late_latency_seconds": late_latency,
+            "latency_slope": linear_slope(
+                [t - first_send for t in send_offsets], latencies
+            ),
+            "max_gap_seconds": max_gap_seconds,
+            "behavior": classify(
+                dropped,
+                max_gap_seconds,
+                early_latency,
+                late_latency,
+                stall_seconds=stall_seconds,
+                closed=closed,
+            ),
+        }
+    )
+
+    return result
+
+
+def make_stages(
+    kinds: typing.Sequence[str],
+    payload_sizes: typing.Sequence[int],
+    rates: typing.Sequence[float],
+    read_delays: typing.Sequence[float],
+    messages: int = 1000,
+    max_stage_bytes: int = 64 * 1024 * 1024,
+) -> typing.List[BridgeStage]:
+    """All combinations, with fewer messages for large payloads."""
+    return [
+        BridgeStage(
+            kind=kind,
+            payload_bytes=payload_bytes,
+            messages=max(1, min(messages, max_stage_bytes // max(1, payload_bytes))),
+            rate=rate,
+            read_delay=read_delay,
+        )
+        for read_delay in read_delays
+        for kind in kinds
+        for payload_bytes in payload_sizes
+        for rate in rates
+    ]
+
+
+def benchmark(
+    connection: RhasspyConnection,
+    stages: typing.Sequence[BridgeStage],
+    drain_seconds: float = 5.0,
+    stall_seconds: float = 1.0,
+) -> typing.Dict[str, typing.Any]:
+    """Run stages one after another, sampling Rhasspy's memory during each."""
+    loop = asyncio.get_event_loop()
+    monitor_pid = get_rhasspy_pid()
+    results = []
+
+    with Publisher(connection) as publisher:
+        for stage in stages:
+            _LOGGER.debug(stage)
+            with ResourceMonitor(monitor_pid, interval=0.1) as monitor:
+                try:
+                    send_times, receipts, unmatched, closed = loop.run_until_complete(
+                        run_stage(connection, publisher, stage, drain_seconds)
+                    )
+                    result = analyze_stage(
+                        stage,
+                        send_times,
+                        receipts,
+                        unmatched,
+                        stall_seconds=stall_seconds,
+                        closed=closed,
+                    )
+                except (OSError, websockets.exceptions.WebSocketException) as e:
+                    _LOGGER.exception("run_stage")
+                    result = {
+                        "kind": stage.kind,
+                        "payload_bytes": stage.payload_bytes,
+                        "target_rate": stage.rate or None,
+                        "read_delay": stage.read_delay,
+                        "error": repr(e),
+                    }
+
+            result["resources"] = monitor.summary()
+            results.append(result)
+
+    return {"stall_seconds": stall_seconds, "stages": results}
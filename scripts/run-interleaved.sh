@@ -0,0 +1,30 @@
+#!/usr/bin/env bash
+this_dir="$( cd "$( dirname "$0" )" && pwd )"
+base_dir="$(realpath "${this_dir}/..")"
+
+lang="$1"
+if [[ -z "$2" ]]; then
+    echo "Usage: run-interleaved.sh <LANGUAGE> <PROFILE>[@<IMAGE>] <PROFILE>[@<IMAGE>] ..."
+    exit 1
+fi
+
+shift 1
+
+venv="${base_dir}/.venv"
+if [[ -d "${venv}" ]]; then
+    echo "Using virtual environment at ${venv}"
+    source "${venv}/bin/activate"
+fi
+
+# -----------------------------------------------------------------------------
+
+# Each configuration runs in its own container on dedicated CPUs, and
+# evaluation passes alternate between them (INTERLEAVE_ROUNDS times).
+output_dir="${base_dir}/output/${lang}"
+mkdir -p "${output_dir}"
+
+cd "${base_dir}" && \
+    python3 -m rhasspytest interleave "${lang}" "$@" \
+            --rounds "${INTERLEAVE_ROUNDS:-5}" \
+            --warmup "${INTERLEAVE_WARMUP:-1}" \
+            --output "${output_dir}/interleave.json"
@@ -0,0 +1,38 @@
+#!/usr/bin/env bash
+this_dir="$( cd "$( dirname "$0" )" && pwd )"
+base_dir="$(realpath "${this_dir}/..")"
+
+matrix_file="$1"
+if [[ -z "$2" ]]; then
+    echo "Usage: run-matrix.sh <MATRIX_JSON> <LANGUAGE> [<LANGUAGE> ...]"
+    exit 1
+fi
+
+matrix_file="$(realpath "${matrix_file}")"
+shift 1
+
+venv="${base_dir}/.venv"
+if [[ -d "${venv}" ]]; then
+    echo "Using virtual environment at ${venv}"
+    source "${venv}/bin/activate"
+fi
+
+# -----------------------------------------------------------------------------
+
+# Every combination of settings in the matrix becomes a test profile
+# (profiles/<lang>/matrix_*), which is evaluated like any other profile.
+# Benchmarks are enabled with the usual variables (BENCHMARK_RUNS, etc.).
+export RESOURCE_SNAPSHOT=1
+
+for lang in "$@"; do
+    variants="$(cd "${base_dir}" && \
+                    python3 -m rhasspytest matrix-generate "${lang}" \
+                            --matrix "${matrix_file}" \
+                            --clean)" || exit 1
+
+    "${this_dir}/run-tests-for.sh" "${lang}" ${variants}
+
+    (cd "${base_dir}" && \
+         python3 -m rhasspytest matrix-report "${lang}" \
+                 --output "${base_dir}/output/${lang}/matrix.json") || exit 1
+done
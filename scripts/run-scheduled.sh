@@ -0,0 +1,38 @@
+#!/usr/bin/env bash
+this_dir="$( cd "$( dirname "$0" )" && pwd )"
+base_dir="$(realpath "${this_dir}/..")"
+
+lang="$1"
+if [[ -z "${lang}" ]]; then
+    echo "Usage: run-scheduled.sh <LANGUAGE> [<PROFILE> <PROFILE> ...]"
+    exit 1
+fi
+
+shift 1
+
+venv="${base_dir}/.venv"
+if [[ -d "${venv}" ]]; then
+    echo "Using virtual environment at ${venv}"
+    source "${venv}/bin/activate"
+fi
+
+# -----------------------------------------------------------------------------
+
+# Profiles (default: all) run SCHEDULE_WORKERS at a time with
+# run-tests-for.sh, ordered by recorded durations and failures. FAIL_FAST=1
+# stops everything at the first failure. Leave RHASSPY_CPUS unset with more
+# than one worker, or all containers are pinned to the same CPUs.
+output_dir="${base_dir}/output/${lang}"
+mkdir -p "${output_dir}"
+
+fail_fast_args=''
+if [[ -n "${FAIL_FAST}" ]]; then
+    fail_fast_args='--fail-fast'
+fi
+
+cd "${base_dir}" && \
+    python3 -m rhasspytest run-scheduled "${lang}" "$@" \
+            --workers "${SCHEDULE_WORKERS:-1}" \
+            ${fail_fast_args} \
+            --log-dir "${output_dir}/logs" \
+            --output "${output_dir}/schedule.json"
@@ -21,23 +21,100 @@ fi
 # Create a temporary directory for profiles
 temp_dir="$(mktemp -d)"
 
+# Containers of this run are labeled, so they can be stopped on exit
+run_label="rhasspytest.run=$(basename "${temp_dir}")"
+
 function cleanup {
+    container_ids="$(docker ps -q --filter "label=${run_label}")"
+    if [[ -n "${container_ids}" ]]; then
+        echo 'Stopping containers...'
+        docker stop ${container_ids} > /dev/null
+    fi
+
     echo "Cleaning up ${temp_dir}"
     rm -rf "${temp_dir}"
 }
 
 trap cleanup EXIT
 
+# Stopped by run-scheduled (fail-fast) or interrupted
+trap 'exit 1' TERM INT
+
 # -----------------------------------------------------------------------------
 
 function wait-for-url() {
     url="$1"
     echo "Waiting for ${url}"
     timeout 30 bash -c \
-            'while [[ "$(curl -s -o /dev/null -w "%{http_code}" "${0}")" != "200" ]]; do sleep 0.5; done' \
+            'while [[ "$(curl -s -o /dev/null -w "%{http_code}" "${0}")" != "200" ]]; do sleep 0.1; done' \
             "${url}"
 }
 
+# Block until speech/intent services answer MQTT probes.
+# Pass --require-success to wait for trained models (intent and transcription).
+function wait-for-services() {
+    echo "Waiting for services"
+    (cd "${base_dir}" && python3 -m rhasspytest wait-ready \
+                                 --profile "${profile_dir}" \
+                                 --wav-dir "${base_dir}/wav/${lang}" \
+                                 "$@")
+}
+
+# Run a command and record how long it took as a startup phase.
+# Usage: time-phase <NAME> <COMMAND> [<ARG> ...]
+function time-phase() {
+    phase_name="$1"
+    shift 1
+
+    phase_start="$(date +%s.%N)"
+    "$@" || return 1
+    phase_end="$(date +%s.%N)"
+
+    echo "${phase_name} ${phase_start} ${phase_end}" >> "${phases_file}"
+}
+
+# Convert recorded phases into a JSON startup report
+function write-startup-report() {
+    jq -R -n '[inputs | split(" ") | {name: .[0], seconds: ((.[2] | tonumber) - (.[1] | tonumber))}] | {phases: ., total_seconds: (map(.seconds) | add)}' \
+       < "${phases_file}" > "${output_dir}/startup.json"
+}
+
+# Start EVAL_REPLICAS - 1 more containers with copies of the trained profile
+# and wait until their models answer. Sets replica_ids and replica_args
+# (--replica-port for each) for sharded evaluation.
+function start-replicas() {
+    replica_ids=()
+    replica_args=''
+    for (( replica = 1; replica < EVAL_REPLICAS; replica++ )); do
+        replica_profile_dir="${temp_dir}/${profile_name}_replica${replica}"
+        rm -rf "${replica_profile_dir}"
+        cp -R "${temp_profile_dir}" "${replica_profile_dir}"
+
+        replica_web_port="$(${base_dir}/scripts/get-free-port)"
+        replica_mqtt_port="$(${base_dir}/scripts/get-free-port)"
+        echo "Starting replica ${replica} (http=${replica_web_port}, mqtt=${replica_mqtt_port})"
+
+        # Not pinned to RHASSPY_CPUS, replicas should use the idle cores
+        replica_id="$(docker run -d --label "${run_label}" -v "${replica_profile_dir}:/profiles" --user "${user}" --network host rhasspy/rhasspy:latest --profile "${lang}" --user-profiles /profiles --http-port ${replica_web_port} --local-mqtt-port ${replica_mqtt_port} -- --set download.url_base 'http://localhost:5000')" || return 1
+        replica_ids+=("${replica_id}")
+
+        wait-for-url "http://localhost:${replica_web_port}/api/version" || return 1
+        RHASSPY_HTTP_PORT="${replica_web_port}" RHASSPY_MQTT_PORT="${replica_mqtt_port}" \
+                         wait-for-services --require-success || return 1
+
+        replica_args="${replica_args} --replica-port ${replica_web_port}"
+    done
+}
+
+function stop-replicas() {
+    if [[ "${#replica_ids[@]}" -gt 0 ]]; then
+        echo 'Stopping replicas...'
+        docker stop "${replica_ids[@]}" > /dev/null
+    fi
+
+    replica_ids=()
+}
+
 # -----------------------------------------------------------------------------
 
 profiles_dir="${base_dir}/profiles/${lang}"
@@ -57,12 +134,52 @@ else
     profile_dirs="${profiles[@]}"
 fi
 
+# Optional history-driven order (HISTORY_ORDER=1): profiles that failed
+# recently or changed since their last run first, then the longest.
+if [[ -n "${HISTORY_ORDER}" ]]; then
+    profile_names=()
+    for profile_dir in ${profile_dirs}; do
+        profile_names+=("$(basename "${profile_dir}")")
+    done
+
+    ordered_names="$(cd "${base_dir}" && python3 -m rhasspytest schedule "${lang}" "${profile_names[@]}")" || exit 1
+
+    profile_dirs=''
+    for profile_name in ${ordered_names}; do
+        profile_dirs="${profile_dirs} ${profiles_dir}/${profile_name}"
+    done
+fi
+
+# Stop at the first failed test or profile (FAIL_FAST=1)
+test_args=''
+if [[ -n "${FAIL_FAST}" ]]; then
+    test_args='--fail-fast'
+fi
+
+failed=''
+
+# Index evaluation corpus once for all profiles (streamed uncompressed)
+wav_dir="${base_dir}/wav/${lang}"
+archive_index="${temp_dir}/${lang}-archive.json"
+(cd "${base_dir}" && python3 -m rhasspytest archive-corpus \
+                             --wav-dir "${wav_dir}" \
+                             --output "${archive_index}") || exit 1
+
+# Optional smoke evaluation of a hash-stable sample (EVAL_SAMPLE=<count>),
+# selected from an incrementally updated manifest of the corpus.
+selection_args=''
+if [[ -n "${EVAL_SAMPLE}" ]]; then
+    selection_args="--manifest ${base_dir}/manifests/${lang}.db --sample ${EVAL_SAMPLE}"
+fi
+
 for profile_dir in ${profile_dirs}; do
     if [[ ! -d "${profile_dir}" ]]; then
         echo "Directory does not exist: ${profile_dir}"
         exit 1
     fi
 
+    profile_start="$(date +%s.%N)"
+    profile_failed=''
     web_port="$(${base_dir}/scripts/get-free-port)"
     mqtt_port="$(${base_dir}/scripts/get-free-port)"
     profile_name="$(basename "${profile_dir}")"
@@ -82,15 +199,24 @@ for profile_dir in ${profile_dirs}; do
     cp -R "${profile_dir}" "${temp_profile_dir}/${lang}"
     cp -R "${shared_dir}"/* "${temp_profile_dir}/${lang}/"
 
+    # Optional CPU pinning (RHASSPY_CPUS for the container, LOADGEN_CPUS for
+    # rhasspytest benchmarks), e.g. RHASSPY_CPUS=0-1 LOADGEN_CPUS=2-3
+    cpuset_args=''
+    if [[ -n "${RHASSPY_CPUS}" ]]; then
+        cpuset_args="--cpuset-cpus ${RHASSPY_CPUS}"
+    fi
+
     user="$(id -u):$(id -g)"
-    docker_command="docker run -d -v "${temp_profile_dir}:/profiles" --user "${user}" --network host rhasspy/rhasspy:latest --profile "${lang}" --user-profiles /profiles --http-port ${web_port} --local-mqtt-port ${mqtt_port} -- --set download.url_base 'http://localhost:5000'"
+    docker_command="docker run -d --label ${run_label} ${cpuset_args} -v "${temp_profile_dir}:/profiles" --user "${user}" --network host rhasspy/rhasspy:latest --profile "${lang}" --user-profiles /profiles --http-port ${web_port} --local-mqtt-port ${mqtt_port} -- --set download.url_base 'http://localhost:5000'"
     echo "${docker_command}"
 
-    container_id="$(${docker_command})"
+    phases_file="${output_dir}/phases.txt"
+    time-phase container_start eval 'container_id="$(${docker_command})"'
 
     (
         export RHASSPY_HTTP_PORT="${web_port}"
         export RHASSPY_MQTT_PORT="${mqtt_port}"
+        export RHASSPY_CONTAINER_ID="${container_id}"
 
         env_file="${profile_dir}/env"
         if [[ -f "${env_file}" ]]; then
@@ -98,27 +224,44 @@ for profile_dir in ${profile_dirs}; do
         fi
 
         # Block until Rhasspy web server is ready
-        wait-for-url "http://localhost:${web_port}/api/version" || exit 1
+        time-phase http_ready wait-for-url "http://localhost:${web_port}/api/version" || exit 1
         echo ''
 
-        # Download all profile artifacts
+        # Download all profile artifacts (returns when finished)
         echo "Downloading..."
-        curl -X POST "http://localhost:${web_port}/api/download-profile" || exit 1
-        sleep 1
+        time-phase download curl -sS -X POST "http://localhost:${web_port}/api/download-profile" || exit 1
         echo ''
 
-        # Re-start services
+        # Re-start services and block until they answer
         echo "Restarting..."
-        curl -X POST "http://localhost:${web_port}/api/restart" || exit 1
-        sleep 1
+        time-phase restart curl -sS -X POST "http://localhost:${web_port}/api/restart" || exit 1
+        time-phase services_ready wait-for-services || exit 1
         echo ''
 
-        # Train profile
+        # Train profile (returns when finished)
         echo "Training..."
-        curl -X POST "http://localhost:${web_port}/api/train" || exit 1
-        sleep 1
+        time-phase train curl -sS -X POST "http://localhost:${web_port}/api/train" || exit 1
         echo ''
 
+        # Block until trained models answer (expected intent, any transcription)
+        time-phase first_inference wait-for-services --require-success || exit 1
+        write-startup-report
+        echo ''
+
+        # Optional recording of all MQTT traffic during tests/evaluation
+        # (MQTT_RECORD=1), replayable with "rhasspytest mqtt-replay".
+        recorder_pid=''
+        if [[ -n "${MQTT_RECORD}" ]]; then
+            mqtt_log="${output_dir}/mqtt.log"
+            echo "Recording MQTT traffic to ${mqtt_log}"
+            (cd "${base_dir}" && exec python3 -m rhasspytest mqtt-record --output "${mqtt_log}") &
+            recorder_pid="$!"
+            trap '[[ -n "${recorder_pid}" ]] && kill -TERM "${recorder_pid}"' EXIT
+
+            # Header is written once subscribed
+            timeout 10 bash -c 'until [[ -s "$0" ]]; do sleep 0.1; done' "${mqtt_log}" || exit 1
+        fi
+
         # Run tests
         test_dir="${profile_dir}/tests"
         if [[ -d "${test_dir}" ]]; then
@@ -128,28 +271,272 @@ for profile_dir in ${profile_dirs}; do
                     source "${env_file}"
                 fi
                 cd "${base_dir}"
-                python3 -m unittest "${profile_dir}/tests"/*.py
+
+                # Overlap waits of tests marked with rhasspytest.testing
+                # (ASYNC_TESTS=1), otherwise run tests one at a time.
+                concurrency=1
+                if [[ -n "${ASYNC_TESTS}" ]]; then
+                    concurrency=8
+                fi
+
+                # Recently failed or changed tests first (HISTORY_ORDER=1)
+                order_args=''
+                if [[ -n "${HISTORY_ORDER}" ]]; then
+                    order_args="--order-by-history ${lang} ${profile_name}"
+                fi
+
+                python3 -m rhasspytest run-tests "${profile_dir}/tests"/*.py \
+                        --concurrency "${concurrency}" \
+                        ${test_args} \
+                        ${order_args} \
+                        --junit-xml "${output_dir}/junit.xml" \
+                        --timings "${output_dir}/test_timings.json"
             ) > "${output_dir}/test.txt" || exit 1
         else
+            # Optional sharded evaluation (EVAL_REPLICAS=<count>, including
+            # this container) across replicas of the trained profile.
+            replica_ids=()
+            replica_args=''
+            if [[ "${EVAL_REPLICAS:-1}" -gt 1 ]]; then
+                start-replicas || { stop-replicas; exit 1; }
+                replica_args="${replica_args} --shard-output ${output_dir}/shards.json"
+            fi
+
             echo "Evaluating..."
-            wav_archive="${temp_dir}/${profile_name}.tar.gz"
             (
-                cd "${base_dir}/wav/${lang}"
-                tar -czf "${wav_archive}" . 2>/dev/null
+                cd "${base_dir}"
+                python3 -m rhasspytest evaluate \
+                        --wav-dir "${wav_dir}" \
+                        --archive-index "${archive_index}" \
+                        ${selection_args} \
+                        ${replica_args} \
+                        --output "${output_dir}/report.json"
+            ) || { stop-replicas; exit 1; }
+
+            stop-replicas
+
+            # Optional repeated passes with warmup (BENCHMARK_RUNS=K)
+            if [[ -n "${BENCHMARK_RUNS}" ]]; then
+                echo "Benchmarking (runs=${BENCHMARK_RUNS}, warmup=${BENCHMARK_WARMUP:-1})..."
+                (
+                    cd "${base_dir}"
+                    python3 -m rhasspytest benchmark-evaluate \
+                            --wav-dir "${wav_dir}" \
+                            --archive-index "${archive_index}" \
+                            ${selection_args} \
+                            --runs "${BENCHMARK_RUNS}" \
+                            --warmup "${BENCHMARK_WARMUP:-1}" \
+                            --output "${output_dir}/benchmark.json"
+                ) || exit 1
+            fi
+        fi
+
+        if [[ -n "${recorder_pid}" ]]; then
+            kill -TERM "${recorder_pid}"
+            wait "${recorder_pid}"
+            recorder_pid=''
+        fi
+
+        # Optional memory/CPU snapshot of the container (RESOURCE_SNAPSHOT=1)
+        if [[ -n "${RESOURCE_SNAPSHOT}" ]]; then
+            (
+                cd "${base_dir}"
+                python3 -m rhasspytest resource-snapshot \
+                        --output "${output_dir}/resources.json"
+            ) || echo "Failed to record resources"
+        fi
+
+        # Optional streaming ASR latency measurement (STREAMING_ASR=1)
+        if [[ -n "${STREAMING_ASR}" ]]; then
+            echo "Measuring streaming ASR latency..."
+            (
+                cd "${base_dir}"
+                python3 -m rhasspytest stream-asr \
+                        --wav-dir "${base_dir}/wav/${lang}" \
+                        --profile "${profile_dir}" \
+                        --output "${output_dir}/streaming_asr.json"
+            ) || exit 1
+        fi
+
+        # Optional wake word benchmark (WAKE_BENCHMARK=1, needs WAKE_SYSTEM)
+        if [[ -n "${WAKE_BENCHMARK}" && -n "${WAKE_SYSTEM}" ]]; then
+            echo "Benchmarking wake system ${WAKE_SYSTEM}..."
+            (
+                cd "${base_dir}"
+                python3 -m rhasspytest benchmark-wake \
+                        --wake-system "${WAKE_SYSTEM}" \
+                        --wav-dir "${base_dir}/wav/wake/${lang}" \
+                        --probe-wav-dir "${base_dir}/wav/${lang}" \
+                        --output "${output_dir}/wake_benchmark.json"
             ) || exit 1
-            curl -s -X POST -F "archive=@${wav_archive}" "http://localhost:${web_port}/api/evaluate" | \
-                tee "${output_dir}/response.txt" | \
-                jq . > "${output_dir}/report.json"
         fi
+
+        # Optional wake word soak test (WAKE_SOAK_DIR=<dir of long WAVs>)
+        if [[ -n "${WAKE_SOAK_DIR}" && -n "${WAKE_SYSTEM}" ]]; then
+            echo "Soaking wake system ${WAKE_SYSTEM} (${WAKE_SOAK_HOURS:-24} hour(s))..."
+            (
+                cd "${base_dir}"
+                python3 -m rhasspytest soak-wake \
+                        --background-dir "${WAKE_SOAK_DIR}" \
+                        --probe-wav-dir "${base_dir}/wav/${lang}" \
+                        --hours "${WAKE_SOAK_HOURS:-24}" \
+                        --output "${output_dir}/wake_soak.json"
+            ) || exit 1
+        fi
+
+        # Optional NLU throughput benchmark (NLU_BENCHMARK=1)
+        if [[ -n "${NLU_BENCHMARK}" ]]; then
+            echo "Benchmarking intent recognition..."
+            (
+                cd "${base_dir}"
+                python3 -m rhasspytest benchmark-nlu \
+                        --profile "${profile_dir}" \
+                        --output "${output_dir}/nlu_benchmark.json"
+            ) || exit 1
+        fi
+
+        # Optional slot list scaling benchmark (SLOT_BENCHMARK=1)
+        if [[ -n "${SLOT_BENCHMARK}" ]]; then
+            echo "Benchmarking slot list sizes..."
+            (
+                cd "${base_dir}"
+                python3 -m rhasspytest benchmark-slots \
+                        --profile "${profile_dir}" \
+                        --wav-dir "${base_dir}/wav/${lang}" \
+                        --output "${output_dir}/slot_benchmark.json"
+            ) || exit 1
+        fi
+
+        # Optional retrain-to-availability benchmark (FRESHNESS_BENCHMARK=1)
+        if [[ -n "${FRESHNESS_BENCHMARK}" ]]; then
+            echo "Measuring freshness after profile changes..."
+            (
+                cd "${base_dir}"
+                python3 -m rhasspytest benchmark-freshness \
+                        --profile "${profile_dir}" \
+                        --output "${output_dir}/freshness.json"
+            ) || exit 1
+        fi
+
+        # Optional grammar complexity benchmark (GRAMMAR_BENCHMARK=1)
+        if [[ -n "${GRAMMAR_BENCHMARK}" ]]; then
+            echo "Benchmarking grammar complexity..."
+            (
+                cd "${base_dir}"
+                python3 -m rhasspytest benchmark-grammar \
+                        --profile "${profile_dir}" \
+                        --profile-dir "${temp_profile_dir}/${lang}" \
+                        --html "${output_dir}/grammar_benchmark.html" \
+                        --output "${output_dir}/grammar_benchmark.json"
+            ) || exit 1
+        fi
+
+        # Optional audio format benchmark (FORMAT_BENCHMARK=1)
+        if [[ -n "${FORMAT_BENCHMARK}" ]]; then
+            echo "Benchmarking audio formats..."
+            (
+                cd "${base_dir}"
+                python3 -m rhasspytest benchmark-formats \
+                        --wav-dir "${wav_dir}" \
+                        --profile "${profile_dir}" \
+                        --output "${output_dir}/format_benchmark.json"
+            ) || exit 1
+        fi
+
+        # Optional G2P benchmark (G2P_BENCHMARK=1)
+        if [[ -n "${G2P_BENCHMARK}" ]]; then
+            echo "Benchmarking pronunciation lookups..."
+            (
+                cd "${base_dir}"
+                python3 -m rhasspytest benchmark-g2p \
+                        --profile "${profile_dir}" \
+                        --output "${output_dir}/g2p_benchmark.json"
+            ) || exit 1
+        fi
+
+        # Optional long audio scaling with chunked upload (LONG_AUDIO=1)
+        if [[ -n "${LONG_AUDIO}" ]]; then
+            echo "Measuring long audio recognition..."
+            (
+                cd "${base_dir}"
+                python3 -m rhasspytest long-audio \
+                        --wav-dir "${wav_dir}" \
+                        --profile "${profile_dir}" \
+                        --output "${output_dir}/long_audio.json"
+            ) || exit 1
+        fi
+
+        # Optional mixed workload scenario (SCENARIO=scenarios/<name>.json)
+        if [[ -n "${SCENARIO}" ]]; then
+            echo "Running scenario ${SCENARIO}..."
+            (
+                cd "${base_dir}"
+                python3 -m rhasspytest scenario "${SCENARIO}" \
+                        --wav-dir "${wav_dir}" \
+                        --wake-wav-dir "${base_dir}/wav/wake/${lang}" \
+                        --profile "${profile_dir}" \
+                        --output "${output_dir}/scenario.json"
+            ) || exit 1
+        fi
+
+        # Optional /api/mqtt websocket bridge benchmark (BRIDGE_BENCHMARK=1)
+        if [[ -n "${BRIDGE_BENCHMARK}" ]]; then
+            echo "Benchmarking websocket MQTT bridge..."
+            (
+                cd "${base_dir}"
+                python3 -m rhasspytest benchmark-bridge \
+                        --output "${output_dir}/bridge_benchmark.json"
+            ) || exit 1
+        fi
+
+        # Keep summary metrics of every run (output directory is replaced)
+        image_digest="$(docker inspect --format '{{.Image}}' "${container_id}")"
+        (
+            cd "${base_dir}"
+            python3 -m rhasspytest history-record "${lang}" "${profile_name}" \
+                    --output-dir "${output_dir}" \
+                    --profile-dir "${profile_dir}" \
+                    --image-digest "${image_digest}"
+        ) || echo "Failed to record history"
+
         echo 'OK'
-    ) || (
+    ) || {
         echo "TEST FAILED"
-        docker stop "${container_id}"
-    )
+        profile_failed=1
+        failed=1
+    }
 
     echo 'Stopping Docker container...'
     docker stop "${container_id}"
+
+    # Pass/fail and duration of profile and tests (for HISTORY_ORDER)
+    outcome_args=''
+    if [[ -n "${profile_failed}" ]]; then
+        outcome_args='--failed'
+    fi
+
+    if [[ -f "${output_dir}/test_timings.json" ]]; then
+        outcome_args="${outcome_args} --timings ${output_dir}/test_timings.json"
+    fi
+
+    (
+        cd "${base_dir}"
+        python3 -m rhasspytest history-outcome "${lang}" "${profile_name}" \
+                --started "${profile_start}" \
+                --profile-dir "${profile_dir}" \
+                ${outcome_args}
+    ) || echo "Failed to record outcome"
+
     echo "Finished ${profile_name}"
     echo '----------'
     echo ''
+
+    if [[ -n "${profile_failed}" && -n "${FAIL_FAST}" ]]; then
+        echo 'Stopping at first failure'
+        break
+    fi
 done
+
+if [[ -n "${failed}" ]]; then
+    exit 1
+fi
@@ -23,16 +23,25 @@ from rhasspyhermes.dialogue import (
 )
 from rhasspyhermes.nlu import NluIntentNotRecognized
 from rhasspyhermes.wake import HotwordDetected
+from rhasspytest.testing import shares
 
 _LOGGER = logging.getLogger(__name__)
 
 
+# Each test has its own site ids (satellites are dialogue.satellite_site_ids
+# in profile), so only test_basic_wake uses the base site
+@shares()
 class DialogueManagerTests(unittest.TestCase):
     """Test dialogue manager with multiple satellites."""
 
+    SITE_IDS = {
+        "test_basic_wake": ["default"],
+        "test_not_recognized": ["not_recognized"],
+        "test_multi_session": ["multi_session", "satellite1", "satellite2"],
+    }
+
     def setUp(self):
-        self.base_id = "default"
-        self.satellite_ids = ["satellite1", "satellite2"]
+        self.base_id, *self.satellite_ids = self.SITE_IDS[self._testMethodName]
         self.session_ids = {}
         self.custom_data = {}
         self.continue_site_id = None
@@ -124,7 +133,7 @@ class DialogueManagerTests(unittest.TestCase):
         self.loop.run_until_complete(self.async_test_not_recognized())
 
     async def async_test_not_recognized(self):
-        """Test start/end/not recognized without a satellite"""
+        """Test start/end/not recognized on a single site"""
         self.custom_data[self.base_id] = str(uuid4())
 
         for event_name in ["started", "ended"]:
@@ -202,7 +211,7 @@ class DialogueManagerTests(unittest.TestCase):
         self.loop.run_until_complete(self.async_test_multi_session())
 
     async def async_test_multi_session(self):
-        """Test multiple sessions on multiple satellites without a satellite"""
+        """Test simultaneous sessions on three satellites"""
         self.continue_site_id = self.satellite_ids[0]
 
         for site_id in [self.base_id] + self.satellite_ids:
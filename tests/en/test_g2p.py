@@ -7,6 +7,8 @@ from uuid import uuid4
 
 import requests
 
+from rhasspytest.testing import mutates_state
+
 
 class G2pEnglishTests(unittest.TestCase):
     """Test grapheme to phoneme (English)"""
@@ -40,6 +42,7 @@ class G2pEnglishTests(unittest.TestCase):
         self.assertGreater(len(pronunciations), 0)
         self.assertGreater(len(pronunciations[0]), 0)
 
+    @mutates_state
     def test_custom_words(self):
         """Test unknown word lookup"""
         response = requests.get(self.api_url("custom-words"))
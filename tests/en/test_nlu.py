@@ -7,6 +7,7 @@ from uuid import uuid4
 import requests
 
 from rhasspyhermes.nlu import NluIntent, NluIntentNotRecognized
+from rhasspytest.testing import mutates_state
 
 
 class NluEnglishTests(unittest.TestCase):
@@ -134,6 +135,7 @@ class NluEnglishTests(unittest.TestCase):
 
         self.assertTrue(found_entity)
 
+    @mutates_state
     def test_http_nlu_new_slot_value(self):
         """Test recognition with a new slot value"""
         response = requests.post(
@@ -194,6 +196,7 @@ class NluEnglishTests(unittest.TestCase):
         response = requests.post(self.api_url("train"))
         self.check_status(response)
 
+    @mutates_state
     def test_http_nlu_new_slot(self):
         """Test recognition with a new slot"""
         response = requests.post(
@@ -271,6 +274,7 @@ class NluEnglishTests(unittest.TestCase):
             response = requests.post(self.api_url("train"))
             self.check_status(response)
 
+    @mutates_state
     def test_http_nlu_number_range(self):
         """Test recognition with a number range"""
         response = requests.post(
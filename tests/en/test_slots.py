@@ -5,6 +5,8 @@ import unittest
 
 import requests
 
+from rhasspytest.testing import mutates_state
+
 
 class SlotsEnglishTests(unittest.TestCase):
     """Test slots (English)"""
@@ -48,6 +50,7 @@ class SlotsEnglishTests(unittest.TestCase):
         # Expect empty list
         self.assertEqual(response.json(), [])
 
+    @mutates_state
     def test_http_modify_slot(self):
         """Test slots POST HTTP endpoint"""
 
@@ -76,6 +79,7 @@ class SlotsEnglishTests(unittest.TestCase):
         colors2 = set(response.json())
         self.assertEqual(colors, colors2)
 
+    @mutates_state
     def test_http_add_slot(self):
         """Test slots POST HTTP endpoint"""
 
@@ -10,13 +10,28 @@ from uuid import uuid4
 import paho.mqtt.client as mqtt
 import requests
 
-from rhasspyhermes.audioserver import AudioPlayBytes, AudioToggleOff, AudioToggleOn
+from rhasspyhermes.audioserver import (
+    AudioPlayBytes,
+    AudioPlayFinished,
+    AudioToggleOff,
+    AudioToggleOn,
+)
 from rhasspyhermes.tts import TtsSay, TtsSayFinished
+from rhasspytest.testing import shares
 
 
+# Each test has its own site id (text_to_speech.satellite_site_ids in profile),
+# but both read tts/say and tts/sayFinished of any site in order and repeat
+# the last sentence spoken on the server
+@shares("tts")
 class TtsEnglishTests(unittest.TestCase):
     """Test text to speech (English)"""
 
+    SITE_IDS = {
+        "test_http_mqtt_text_to_speech": "tts_speech",
+        "test_no_play": "tts_no_play",
+    }
+
     def setUp(self):
         self.http_port = os.environ.get("RHASSPY_HTTP_PORT", 12101)
         self.http_host = os.environ.get("RHASSPY_HTTP_HOST", "localhost")
@@ -26,6 +41,16 @@ class TtsEnglishTests(unittest.TestCase):
         self.mqtt_messages = queue.Queue()
 
         def on_message(client, userdata, msg):
+            if AudioPlayBytes.is_topic(msg.topic):
+                # Satellite sites have no audio output, so finish playback here
+                play_finished = AudioPlayFinished(
+                    id=AudioPlayBytes.get_request_id(msg.topic),
+                    session_id=self.session_id,
+                )
+                client.publish(
+                    play_finished.topic(site_id=self.site_id), play_finished.payload()
+                )
+
             self.mqtt_messages.put(msg)
 
         self.client.on_message = on_message
@@ -39,7 +64,7 @@ class TtsEnglishTests(unittest.TestCase):
         # Block until connected
         connected_event.wait(timeout=5)
 
-        self.site_id = "default"
+        self.site_id = self.SITE_IDS[self._testMethodName]
         self.session_id = str(uuid4())
 
     def tearDown(self):
@@ -16,6 +16,7 @@ from rhasspyhermes.asr import AsrTextCaptured
 from rhasspyhermes.intent import Intent, Slot
 from rhasspyhermes.nlu import NluIntent
 from rhasspyhermes.wake import HotwordDetected
+from rhasspytest.testing import shares
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -76,6 +77,7 @@ class WebsocketEnglishTests(unittest.TestCase):
 
     # -------------------------------------------------------------------------
 
+    @shares("asr")
     def test_ws_text(self):
         """Calls async_test_ws_text"""
         self.loop.run_until_complete(self.async_test_ws_text())
@@ -113,6 +115,7 @@ class WebsocketEnglishTests(unittest.TestCase):
 
     # -------------------------------------------------------------------------
 
+    @shares("nlu")
     def test_ws_intent(self):
         """Calls async_test_ws_intent"""
         self.loop.run_until_complete(self.async_test_ws_intent())
@@ -178,6 +181,7 @@ class WebsocketEnglishTests(unittest.TestCase):
 
     # -------------------------------------------------------------------------
 
+    @shares("wake")
     def test_ws_wake(self):
         """Calls async_test_ws_wake"""
         self.loop.run_until_complete(self.async_test_ws_wake())
@@ -208,6 +212,7 @@ class WebsocketEnglishTests(unittest.TestCase):
 
     # -------------------------------------------------------------------------
 
+    @shares()
     def test_ws_mqtt(self):
         """Calls async_test_ws_mqtt"""
         self.loop.run_until_complete(self.async_test_ws_mqtt())
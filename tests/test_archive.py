@@ -0,0 +1,73 @@
+"""Tests for streamed corpus archives."""
+import hashlib
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+
+from rhasspytest.archive import CorpusArchive, CorpusChangedError, load_or_build
+
+
+class CorpusArchiveTests(unittest.TestCase):
+    """Test uncompressed tar streams generated from an index"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.wav_dir = Path(self.temp_dir.name)
+        self.files = {
+            "a.wav": os.urandom(1000),
+            "a.json": b'{"text": "a"}',
+            # Needs PAX header (long, non-ASCII name)
+            ("ü" * 60) + ".wav": os.urandom(512),
+            "empty.wav": b"",
+        }
+        for name, data in self.files.items():
+            (self.wav_dir / name).write_bytes(data)
+
+        (self.wav_dir / "ignored.txt").write_text("not part of corpus")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_stream(self):
+        """Test that stream is a valid tar with the corpus files"""
+        archive = CorpusArchive.from_dir(self.wav_dir)
+        stream = b"".join(archive.chunks(chunk_size=100))
+        self.assertEqual(len(stream), archive.size)
+        self.assertEqual(len(stream) % tarfile.RECORDSIZE, 0)
+        self.assertEqual(archive.sha256, hashlib.sha256(stream).hexdigest())
+
+        with tarfile.open(fileobj=io.BytesIO(stream), mode="r:") as tar_file:
+            names = tar_file.getnames()
+            self.assertEqual(sorted(names), sorted(self.files))
+            for name, data in self.files.items():
+                self.assertEqual(tar_file.extractfile(name).read(), data)
+
+    def test_multipart(self):
+        """Test multipart framing around the tar stream"""
+        archive = CorpusArchive.from_dir(self.wav_dir)
+        content_type, body = archive.multipart()
+        boundary = content_type.split("boundary=")[1]
+        body_bytes = b"".join(body)
+
+        self.assertTrue(body_bytes.startswith(f"--{boundary}\r\n".encode()))
+        self.assertTrue(body_bytes.endswith(f"\r\n--{boundary}--\r\n".encode()))
+        self.assertIn(b'filename="archive.tar"', body_bytes)
+
+    def test_index(self):
+        """Test that saved index is reused until the corpus changes"""
+        index_path = self.wav_dir / "index" / "archive.json"
+        archive = load_or_build(self.wav_dir, index_path)
+        reloaded = load_or_build(self.wav_dir, index_path)
+        self.assertEqual(reloaded.sha256, archive.sha256)
+
+        # Changed file fails the stream and is re-indexed
+        wav_path = self.wav_dir / "a.wav"
+        wav_path.write_bytes(os.urandom(2000))
+        with self.assertRaises(CorpusChangedError):
+            b"".join(reloaded.chunks())
+
+        rebuilt = load_or_build(self.wav_dir, index_path)
+        self.assertNotEqual(rebuilt.sha256, archive.sha256)
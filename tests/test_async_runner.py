@@ -0,0 +1,107 @@
+"""Tests for the concurrent integration test runner."""
+import asyncio
+import io
+import threading
+import time
+import typing
+import unittest
+
+from rhasspytest.async_runner import STATUS_FAIL, AsyncTestRunner
+from rhasspytest.testing import mutates_state, shares
+
+
+def make_cases(
+    intervals: typing.Dict[str, typing.List[float]],
+    setup_threads: typing.Optional[typing.Set[int]] = None,
+) -> typing.List[unittest.TestCase]:
+    """Fake integration tests that record when (and where) they run."""
+
+    def record(name: str, start_time: float):
+        intervals[name] = [start_time, time.perf_counter()]
+
+    @shares("tts")
+    class FakeTests(unittest.TestCase):
+        """Tests with different markers"""
+
+        def setUp(self):
+            if setup_threads is not None:
+                setup_threads.add(threading.get_ident())
+
+            self.loop = asyncio.get_event_loop()
+
+        def test_async(self):
+            self.loop.run_until_complete(self.async_test_async())
+
+        async def async_test_async(self):
+            start_time = time.perf_counter()
+            await asyncio.sleep(0.2)
+            record("async", start_time)
+
+        @shares("wake")
+        def test_sync(self):
+            start_time = time.perf_counter()
+            time.sleep(0.2)
+            record("sync", start_time)
+
+        def test_same_resource(self):
+            start_time = time.perf_counter()
+            time.sleep(0.2)
+            record("same_resource", start_time)
+
+        @mutates_state
+        def test_mutates(self):
+            start_time = time.perf_counter()
+            time.sleep(0.05)
+            record("mutates", start_time)
+
+        @shares()
+        def test_failure(self):
+            self.fail("Expected failure")
+
+    return [
+        FakeTests(name) for name in unittest.TestLoader().getTestCaseNames(FakeTests)
+    ]
+
+
+def overlaps(first: typing.List[float], second: typing.List[float]) -> bool:
+    """True if two [start, end] intervals overlap."""
+    return (first[0] < second[1]) and (second[0] < first[1])
+
+
+class AsyncRunnerTests(unittest.TestCase):
+    """Test scheduling of marked tests"""
+
+    def test_scheduling(self):
+        """Test that only tests without shared resources overlap"""
+        intervals: typing.Dict[str, typing.List[float]] = {}
+        setup_threads: typing.Set[int] = set()
+        runner = AsyncTestRunner(stream=io.StringIO())
+        self.assertFalse(runner.run(make_cases(intervals, setup_threads)))
+
+        # setUp runs in worker threads (with the shared loop as current loop)
+        self.assertEqual(len(runner.outcomes), 5)
+        self.assertNotIn(threading.main_thread().ident, setup_threads)
+
+        self.assertEqual(len(intervals), 4)
+        self.assertTrue(overlaps(intervals["async"], intervals["sync"]))
+        self.assertFalse(overlaps(intervals["async"], intervals["same_resource"]))
+        for name in ["async", "sync", "same_resource"]:
+            self.assertFalse(overlaps(intervals["mutates"], intervals[name]))
+
+        statuses = {o.test_id.split(".")[-1]: o.status for o in runner.outcomes}
+        self.assertEqual(statuses["test_failure"], STATUS_FAIL)
+
+    def test_fail_fast(self):
+        """Test that no tests start after the first failure"""
+        intervals: typing.Dict[str, typing.List[float]] = {}
+        runner = AsyncTestRunner(
+            max_concurrency=1, stream=io.StringIO(), fail_fast=True
+        )
+        self.assertFalse(runner.run(make_cases(intervals)))
+
+        # Alphabetical order: test_async, test_failure, ...
+        self.assertEqual(
+            [o.test_id.split(".")[-1] for o in runner.outcomes],
+            ["test_async", "test_failure"],
+        )
+        self.assertEqual(list(intervals), ["async"])
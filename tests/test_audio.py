@@ -0,0 +1,91 @@
+"""Tests for WAV helpers."""
+import json
+import math
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+
+from rhasspytest.audio import (
+    SPEECH_END_KEY,
+    WavAudio,
+    annotate,
+    detect_speech_segments,
+    get_speech_end,
+    iter_wav_file,
+)
+
+
+def make_audio(pattern, sample_rate=16000):
+    """Create mono 16-bit audio from (seconds, amplitude) pairs."""
+    samples = []
+    for seconds, amplitude in pattern:
+        for i in range(int(seconds * sample_rate)):
+            samples.append(
+                int(amplitude * math.sin(2 * math.pi * 440 * i / sample_rate))
+            )
+
+    return WavAudio(
+        frames=struct.pack(f"<{len(samples)}h", *samples),
+        sample_rate=sample_rate,
+        sample_width=2,
+        channels=1,
+    )
+
+
+class AudioTests(unittest.TestCase):
+    """Test audio chunking and speech detection"""
+
+    def test_wav_round_trip(self):
+        """Test WAV header wrapping"""
+        audio = make_audio([(0.5, 1000)])
+        audio2 = WavAudio.from_bytes(audio.to_wav())
+        self.assertEqual(audio, audio2)
+        self.assertAlmostEqual(audio2.seconds, 0.5)
+
+    def test_iter_chunks(self):
+        """Test chunk end times cover all audio"""
+        audio = make_audio([(1.0, 1000)])
+        chunks = list(audio.iter_chunks(0.3))
+        self.assertEqual(len(chunks), 4)
+        self.assertAlmostEqual(chunks[0][0], 0.3)
+        self.assertAlmostEqual(chunks[-1][0], 1.0)
+        self.assertEqual(b"".join(c for _, c in chunks), audio.frames)
+
+    def test_detect_speech_segments(self):
+        """Test keyword and command separated by a pause"""
+        audio = make_audio([(0.2, 0), (0.5, 8000), (0.6, 0), (1.0, 8000), (0.4, 0)])
+        segments = detect_speech_segments(audio)
+        self.assertEqual(len(segments), 2)
+        self.assertAlmostEqual(segments[0][0], 0.2, places=1)
+        self.assertAlmostEqual(segments[0][1], 0.7, places=1)
+        self.assertAlmostEqual(segments[1][1], 2.3, places=1)
+
+    def test_annotation_overrides_detection(self):
+        """Test that sidecar annotation is preferred"""
+        audio = make_audio([(0.5, 8000), (0.5, 0)])
+        with tempfile.TemporaryDirectory() as temp_dir:
+            wav_path = Path(temp_dir) / "test.wav"
+            wav_path.write_bytes(audio.to_wav())
+            wav_path.with_suffix(".json").write_text(json.dumps({"text": "test"}))
+
+            self.assertAlmostEqual(get_speech_end(wav_path), 0.5, places=1)
+
+            annotate(wav_path, SPEECH_END_KEY, 0.25)
+            self.assertEqual(get_speech_end(wav_path), 0.25)
+
+            sidecar = json.loads(wav_path.with_suffix(".json").read_text())
+            self.assertEqual(sidecar["text"], "test")
+
+    def test_iter_wav_file(self):
+        """Test chunked reading of a WAV file"""
+        audio = make_audio([(1.0, 1000)])
+        with tempfile.TemporaryDirectory() as temp_dir:
+            wav_path = Path(temp_dir) / "test.wav"
+            wav_path.write_bytes(audio.to_wav())
+
+            chunks = list(iter_wav_file(wav_path, 0.25))
+
+        self.assertEqual([start for start, _ in chunks], [0, 0.25, 0.5, 0.75])
+        frames = b"".join(WavAudio.from_bytes(c).frames for _, c in chunks)
+        self.assertEqual(frames, audio.frames)
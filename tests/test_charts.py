@@ -0,0 +1,31 @@
+"""Tests for SVG line charts."""
+import math
+import unittest
+
+from rhasspytest.charts import svg_line_chart
+
+
+class ChartTests(unittest.TestCase):
+    """Test lines, point titles and missing values"""
+
+    def test_lines(self):
+        """Test one line per series with labels and point titles"""
+        svg = svg_line_chart(
+            "latency",
+            {"a": [1.0, None, 3.0], "b": [2.0, math.nan, 2.0]},
+            x_labels=["x1", "x2", "x3"],
+            point_titles={"a": ["first", "", "third"]},
+        )
+        self.assertEqual(svg.count("<polyline"), 2)
+        self.assertIn("<title>b</title>", svg)
+        self.assertIn(">x3</text>", svg)
+
+        # Circles only for valid points of series with titles
+        self.assertEqual(svg.count("<circle"), 2)
+        self.assertIn("<title>third</title>", svg)
+
+    def test_no_values(self):
+        """Test placeholder without values"""
+        self.assertEqual(
+            svg_line_chart("rss", {"a": [None, math.inf]}), "<p>No values for rss</p>"
+        )
@@ -0,0 +1,107 @@
+"""Tests for audio format conversion benchmark."""
+import unittest
+
+import numpy as np
+
+from rhasspytest.audio import WavAudio
+from rhasspytest.formats import (
+    NATIVE_FORMAT,
+    AudioFormat,
+    FormatResult,
+    compare_to_native,
+    convert,
+    decode_samples,
+    make_formats,
+    summarize_mode,
+)
+
+
+def _sine(frequency: float, sample_rate: int = 16000, seconds: float = 1.0):
+    times = np.arange(int(sample_rate * seconds)) / sample_rate
+    samples = (0.5 * np.sin(2 * np.pi * frequency * times) * 32767).astype("<i2")
+    return WavAudio(samples.tobytes(), sample_rate, 2, 1)
+
+
+def _peak_frequency(audio: WavAudio) -> float:
+    samples = decode_samples(audio)[:, 0]
+    spectrum = np.abs(np.fft.rfft(samples))
+    return float(np.argmax(spectrum)) * audio.sample_rate / len(samples)
+
+
+class FormatsTests(unittest.TestCase):
+    """Test transcoding and summaries"""
+
+    def test_formats(self):
+        """Test format matrix and names"""
+        formats = make_formats([16000, 44100], [1, 2], [2])
+        self.assertEqual(formats[0], NATIVE_FORMAT)
+        self.assertEqual(len(formats), 4)
+        self.assertEqual(AudioFormat(44100, 2, 4).name, "44100Hz_2ch_32bit")
+
+    def test_convert(self):
+        """Test sample rate, channels and width conversion"""
+        audio = _sine(440)
+        self.assertIs(convert(audio, NATIVE_FORMAT), audio)
+
+        for audio_format in make_formats([8000, 44100], [1, 2], [1, 2, 4]):
+            converted = convert(audio, audio_format)
+            self.assertEqual(AudioFormat.of(converted), audio_format)
+            self.assertAlmostEqual(converted.seconds, audio.seconds, places=3)
+
+            # Tone survives (and comes back)
+            self.assertAlmostEqual(_peak_frequency(converted), 440, delta=2)
+            restored = convert(converted, NATIVE_FORMAT)
+            self.assertEqual(len(restored.frames), len(audio.frames))
+            error = decode_samples(restored) - decode_samples(audio)
+            self.assertLess(np.abs(error).max(), 0.02)
+
+    def test_channels(self):
+        """Test that stereo is mixed down to mono"""
+        stereo = WavAudio(
+            np.array([100, 300, -200, 0], dtype="<i2").tobytes(), 16000, 2, 2
+        )
+        mono = convert(stereo, NATIVE_FORMAT)
+        self.assertEqual(np.frombuffer(mono.frames, dtype="<i2").tolist(), [200, -100])
+
+    def test_summary(self):
+        """Test accuracy and comparison with the native format"""
+        expected = {
+            "a.wav": {"text": "turn on the light", "intent": {"name": "Light"}},
+            "b.wav": {"text": "what time is it", "intent": {"name": "Time"}},
+        }
+        native = summarize_mode(
+            [
+                FormatResult(
+                    "a.wav", "speech-to-intent", 0.2, "turn on the light", "Light"
+                ),
+                FormatResult(
+                    "b.wav", "speech-to-intent", 0.4, "what time is it", "Time"
+                ),
+            ],
+            expected,
+            cpu_seconds=1.0,
+            audio_seconds=4.0,
+        )
+        self.assertEqual(native["word_error_rate"], 0)
+        self.assertEqual(native["intent_accuracy"], 1)
+
+        summary = summarize_mode(
+            [
+                FormatResult(
+                    "a.wav", "speech-to-intent", 0.3, "turn on light", "Light"
+                ),
+                FormatResult("b.wav", "speech-to-intent", error="timeout"),
+            ],
+            expected,
+            cpu_seconds=3.0,
+            audio_seconds=4.0,
+        )
+        self.assertEqual(summary["errors"], 1)
+        self.assertAlmostEqual(summary["word_error_rate"], 1 / 4)
+
+        difference = compare_to_native(summary, native)
+        # Same median latency (0.3) as native
+        self.assertAlmostEqual(difference["added_latency_seconds"], 0.0)
+        self.assertAlmostEqual(difference["cpu_ratio"], 3.0)
+        self.assertAlmostEqual(difference["word_error_rate_change"], 1 / 4)
+        self.assertEqual(difference["intent_accuracy_change"], 0)
@@ -0,0 +1,67 @@
+"""Tests for retrain-to-availability measurement."""
+import unittest
+
+from rhasspytest.freshness import (
+    SLOT_NAME,
+    Change,
+    Probe,
+    add_intent,
+    is_fresh,
+    summarize_probes,
+)
+
+
+class FreshnessTests(unittest.TestCase):
+    """Test probe classification and summaries"""
+
+    def test_is_fresh(self):
+        """Test intent and slot value checks"""
+        change = Change("slots", "red blue", "FreshnessSlot", slot_value="red blue")
+        result = {
+            "intent": {"name": "FreshnessSlot"},
+            "entities": [{"entity": SLOT_NAME, "value": "red red"}],
+        }
+        self.assertFalse(is_fresh(result, change))
+
+        result["entities"].append({"entity": SLOT_NAME, "value": "red blue"})
+        self.assertTrue(is_fresh(result, change))
+
+        sentence_change = Change("sentences", "red green", "FreshnessSentence")
+        self.assertFalse(is_fresh(result, sentence_change))
+        self.assertFalse(is_fresh({"intent": {"name": ""}}, sentence_change))
+        self.assertTrue(
+            is_fresh({"intent": {"name": "FreshnessSentence"}}, sentence_change)
+        )
+
+    def test_add_intent(self):
+        """Test appending intents to a sentences file"""
+        ini_text = add_intent("", "A", "red")
+        self.assertEqual(ini_text, "[A]\nred\n")
+        self.assertEqual(add_intent(ini_text, "B", "blue"), "[A]\nred\n\n[B]\nblue\n")
+
+    def test_summarize(self):
+        """Test freshness latency and behavior during training"""
+        probes = [
+            Probe("text-to-intent", 0.0, 0.1, "stale"),
+            # Training from 1 to 5
+            Probe("text-to-intent", 1.0, 1.1, "stale"),
+            Probe("text-to-intent", 1.2, 3.0, "stale"),
+            Probe("text-to-intent", 3.0, 3.1, "error", "503"),
+            Probe("text-to-intent", 4.9, 5.5, "fresh"),
+            Probe("text-to-intent", 5.6, 5.7, "fresh"),
+        ]
+        summary = summarize_probes(probes, 0.0, (1.0, 5.0), baseline_seconds=0.1)
+        self.assertAlmostEqual(summary["freshness_seconds"], 5.5)
+        self.assertAlmostEqual(summary["after_train_seconds"], 0.5)
+
+        during = summary["during_training"]
+        self.assertEqual(during["probes"], 4)
+        self.assertEqual(
+            (during["stale"], during["errors"], during["fresh"]), (2, 1, 1)
+        )
+        self.assertEqual(during["blocked"], 1)
+        self.assertEqual(during["behavior"], ["block", "fail", "fresh", "stale"])
+
+        never = summarize_probes(probes[:2], 0.0, (1.0, 5.0), baseline_seconds=0.1)
+        self.assertIsNone(never["freshness_seconds"])
+        self.assertEqual(never["during_training"]["behavior"], ["stale"])
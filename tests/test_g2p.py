@@ -0,0 +1,21 @@
+"""Tests for pronunciation benchmark helpers."""
+import unittest
+
+from rhasspytest.g2p import make_custom_words, make_words
+
+
+class G2pHelperTests(unittest.TestCase):
+    """Test generated words"""
+
+    def test_make_words(self):
+        """Test that words are unique and reproducible"""
+        words = make_words(500)
+        self.assertEqual(len(set(words)), 500)
+        self.assertEqual(words, make_words(500))
+        self.assertNotEqual(words, make_words(500, seed=1))
+        self.assertTrue(all(w.isalpha() and w.islower() for w in words))
+
+    def test_make_custom_words(self):
+        """Test that pronunciations are reused in order"""
+        text = make_custom_words(["ab", "cd", "ef"], ["P1 P2", "P3"])
+        self.assertEqual(text, "ab P1 P2\ncd P3\nef P1 P2\n")
@@ -0,0 +1,79 @@
+"""Tests for sentence template expansion."""
+import random
+import unittest
+from pathlib import Path
+
+from rhasspytest.grammar import Grammar
+from rhasspytest.nlu import replicate_intents
+
+_PROFILES_DIR = Path(__file__).parent.parent / "profiles"
+
+
+class GrammarTests(unittest.TestCase):
+    """Test parsing and expansion of sentences.ini"""
+
+    def test_expand(self):
+        """Test optionals, alternatives, substitutions and tags"""
+        grammar = Grammar.parse(
+            [
+                "[SetLight]\n"
+                "light = (lamp | light):lamp\n"
+                "turn (on | off){state} [the] <light>\n"
+            ]
+        )
+        sentences = grammar.expand_all()["SetLight"]
+        self.assertEqual(len(sentences), 8)
+        self.assertIn("turn on the lamp", sentences)
+        self.assertIn("turn off light", sentences)
+
+    def test_slots_and_ranges(self):
+        """Test slot references, number ranges and limits"""
+        grammar = Grammar.parse(
+            ["[SetTimer]\nset $name timer for 1..10 minutes\n"],
+            {"name": ["kitchen", "oven:stove"]},
+        )
+        self.assertEqual(len(grammar.expand("SetTimer")), 20)
+        self.assertEqual(len(grammar.expand("SetTimer", limit=5)), 5)
+        self.assertIn("set oven timer for 3 minutes", grammar.expand_all()["SetTimer"])
+
+    def test_count_and_sample(self):
+        """Test counting without expansion and random sentences"""
+        grammar = Grammar.parse(
+            [
+                "[SetTimer]\n"
+                "unit = (minutes | seconds)\n"
+                "set [a] $name timer for 0..99999 <unit>\n"
+            ],
+            {"name": ["kitchen", "oven:stove"]},
+        )
+        self.assertEqual(grammar.count("SetTimer"), 2 * 2 * 100000 * 2)
+
+        # Every sampled sentence can be expanded
+        small_grammar = Grammar.parse(
+            ["[SetTimer]\nset [a] $name timer for 1..5 (minutes | seconds)\n"],
+            {"name": ["kitchen", "oven:stove"]},
+        )
+        sentences = small_grammar.expand_all()["SetTimer"]
+        rng = random.Random(0)
+        samples = {small_grammar.sample("SetTimer", rng) for _ in range(100)}
+        self.assertTrue(samples.issubset(sentences))
+        self.assertGreater(len(samples), 10)
+
+    def test_english_profile(self):
+        """Test cross-intent rule reference in shared English sentences"""
+        ini_text = (_PROFILES_DIR / "en" / "shared" / "sentences.ini").read_text()
+        grammar = Grammar.parse([ini_text])
+        sentences = grammar.expand_all()
+        self.assertEqual(len(sentences["ChangeLightState"]), 24)
+        self.assertIn("turn on the living room lamp", sentences["ChangeLightState"])
+
+    def test_replicate_intents(self):
+        """Test that copies are renamed and reference copied rules"""
+        ini_text = (_PROFILES_DIR / "en" / "shared" / "sentences.ini").read_text()
+        copy_text = replicate_intents(ini_text, 1, "alpha beta")
+        grammar = Grammar.parse([ini_text, copy_text])
+        sentences = grammar.expand_all()
+        self.assertEqual(len(sentences["ChangeLightState_1"]), 24)
+        self.assertTrue(
+            all(s.startswith("alpha beta ") for s in sentences["ChangeLightState_1"])
+        )
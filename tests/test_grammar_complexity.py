@@ -0,0 +1,78 @@
+"""Tests for synthetic grammar generation."""
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from rhasspytest.grammar import Grammar
+from rhasspytest.grammar_complexity import (
+    INTENT_NAME,
+    GrammarSpec,
+    generate_ini,
+    make_specs,
+    trained_files,
+    write_html,
+)
+
+WORDS = ["red", "green", "blue", "light", "lamp"]
+
+
+class GrammarComplexityTests(unittest.TestCase):
+    """Test grammar structure and size"""
+
+    def test_generate(self):
+        """Test sentence counts for each parameter"""
+        for spec, expected_count in [
+            (GrammarSpec("depth_2", depth=2, breadth=3), 9),
+            (GrammarSpec("optionals_4", optionals=4), 3 * 16),
+            (GrammarSpec("fan_out_2", fan_out=2, breadth=2), 2 * 4),
+            (GrammarSpec("number_range_1000", number_range=1000), 3 * 1001),
+        ]:
+            grammar = Grammar.parse([generate_ini(spec, WORDS)])
+            self.assertEqual(grammar.count(INTENT_NAME), expected_count, spec)
+
+        specs = make_specs(
+            depths=[1, 2], optionals=[], fan_outs=[4], number_ranges=[10]
+        )
+        self.assertEqual(
+            [s.name for s in specs],
+            ["depth_1", "depth_2", "fan_out_4", "number_range_10"],
+        )
+        self.assertEqual(specs[3].axis, "number_range")
+        self.assertEqual((specs[3].depth, specs[3].number_range), (1, 10))
+
+    def test_trained_files(self):
+        """Test that only files written since training started are counted"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            profile_dir = Path(temp_dir)
+            old_path = profile_dir / "old.txt"
+            old_path.write_text("old")
+            os.utime(old_path, (0, 0))
+
+            (profile_dir / "kaldi").mkdir()
+            (profile_dir / "kaldi" / "HCLG.fst").write_bytes(bytes(100))
+
+            self.assertEqual(
+                trained_files(profile_dir, time.time() - 10), {"kaldi/HCLG.fst": 100}
+            )
+
+    def test_html(self):
+        """Test one chart per parameter and metric"""
+        report = {
+            "intent_systems": {
+                system: [
+                    {**GrammarSpec(f"depth_{d}", depth=d).__dict__, "train_seconds": d}
+                    for d in [1, 2]
+                ]
+                for system in ["fsticuffs", "fuzzywuzzy"]
+            }
+        }
+        with tempfile.TemporaryDirectory() as temp_dir:
+            html_path = Path(temp_dir) / "grammar.html"
+            write_html(report, html_path)
+            html_text = html_path.read_text()
+
+        self.assertEqual(html_text.count("<svg"), 1)
+        self.assertIn("No values for model_bytes vs depth", html_text)
+        self.assertIn("<title>fuzzywuzzy</title>", html_text)
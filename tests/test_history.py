@@ -0,0 +1,108 @@
+"""Tests for the run history store."""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from rhasspytest.history import (
+    HistoryStore,
+    Outcome,
+    collect_test_outcomes,
+    file_fingerprint,
+    format_trend,
+    relative_change,
+)
+
+
+def write_report(output_dir: Path, transcribe_seconds: float):
+    """Write a minimal /api/evaluate report with one WAV."""
+    report = {
+        "transcription_accuracy": 0.5,
+        "actual": {
+            "a.wav": {
+                "wav_seconds": 2.0,
+                "transcribe_seconds": transcribe_seconds,
+                "word_error": {"errors": 1, "words": 4},
+                "intent": {"name": "GetTime"},
+                "expected_intent_name": "GetTime",
+            }
+        },
+    }
+    (output_dir / "report.json").write_text(json.dumps(report))
+
+
+class HistoryTests(unittest.TestCase):
+    """Test recording and querying runs"""
+
+    def test_record_and_trend(self):
+        """Test that last runs come back oldest first with metrics"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_dir = Path(temp_dir)
+            with HistoryStore(output_dir / "history.db") as store:
+                for index, seconds in enumerate([0.1, 0.1, 0.2]):
+                    write_report(output_dir, seconds)
+                    store.record(
+                        "en",
+                        "test_kaldi",
+                        output_dir,
+                        git_commit=f"commit{index}",
+                        timestamp=float(index),
+                    )
+
+                runs = store.last_runs("en", "test_kaldi", limit=2)
+                self.assertEqual([r.git_commit for r in runs], ["commit1", "commit2"])
+                self.assertAlmostEqual(runs[-1].metrics["real_time_factor"], 0.1)
+                self.assertAlmostEqual(runs[-1].metrics["word_error_rate"], 0.25)
+                self.assertEqual(len(store.wav_trend("en", "test_kaldi", "a.wav")), 3)
+                self.assertEqual(store.last_runs("de", "test_kaldi"), [])
+
+            # Slower transcription is a positive (worse) change
+            self.assertAlmostEqual(relative_change(runs, "real_time_factor"), 1.0)
+            self.assertIn("+100.0%", format_trend(runs, ["real_time_factor"]))
+
+    def test_outcomes(self):
+        """Test profile and test outcomes with fingerprints"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+            test_dir = temp_path / "tests"
+            test_dir.mkdir()
+            (test_dir / "test_api.py").write_text("# version 1")
+            fingerprint = file_fingerprint(test_dir)
+
+            timings_path = temp_path / "test_timings.json"
+            timings_path.write_text(
+                json.dumps(
+                    {
+                        "tests": [
+                            {"id": "test_api.Tests.test_a", "status": "ok"},
+                            {"id": "test_api.Tests.test_b", "status": "fail"},
+                            {"id": "test_api.Tests.test_c", "status": "skip"},
+                        ]
+                    }
+                )
+            )
+            tests = collect_test_outcomes(timings_path, test_dir)
+            self.assertEqual([o.passed for o in tests], [True, False])
+            self.assertEqual(
+                tests[0].fingerprint, file_fingerprint(test_dir / "test_api.py")
+            )
+
+            with HistoryStore(temp_path / "history.db") as store:
+                for timestamp in [1.0, 2.0]:
+                    store.record_outcomes(
+                        "en",
+                        "test_kaldi",
+                        [Outcome("", True, timestamp, fingerprint)] + tests,
+                        timestamp=timestamp,
+                    )
+
+                runs = store.last_outcomes("en", "test_kaldi")
+                self.assertEqual([o.seconds for o in runs], [1.0, 2.0])
+                self.assertEqual(runs[-1].fingerprint, fingerprint)
+
+                failed = store.last_outcomes("en", "test_kaldi", tests[1].test_id)
+                self.assertEqual([o.passed for o in failed], [False, False])
+
+            # Changing a file changes the directory's fingerprint
+            (test_dir / "test_api.py").write_text("# version 2")
+            self.assertNotEqual(file_fingerprint(test_dir), fingerprint)
@@ -0,0 +1,20 @@
+"""Tests for CPU pinning helpers."""
+import unittest
+
+from rhasspytest.host import format_cpu_list, parse_cpu_list, split_cpus
+
+
+class HostTests(unittest.TestCase):
+    """Test CPU lists"""
+
+    def test_parse_cpu_list(self):
+        """Test ranges and single CPUs"""
+        self.assertEqual(parse_cpu_list("0-3,6"), [0, 1, 2, 3, 6])
+        self.assertEqual(parse_cpu_list("2, 1,1"), [1, 2])
+        self.assertEqual(format_cpu_list([3, 1]), "1,3")
+
+    def test_split_cpus(self):
+        """Test disjoint groups of equal size"""
+        self.assertEqual(split_cpus(list(range(7)), 3), [[0, 1], [2, 3], [4, 5]])
+        with self.assertRaises(ValueError):
+            split_cpus([0], 2)
@@ -0,0 +1,72 @@
+"""Tests for long audio generated from a corpus."""
+import io
+import tempfile
+import unittest
+import wave
+from pathlib import Path
+
+from rhasspytest.audio import WavAudio
+from rhasspytest.long_audio import LongAudio, scaling_exponent, summarize_scaling
+
+
+class LongAudioTests(unittest.TestCase):
+    """Test concatenated WAV streams"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.wav_dir = Path(self.temp_dir.name)
+        for name, value, sample_rate in [
+            ("a.wav", 1, 16000),
+            ("b.wav", 2, 16000),
+            ("c.wav", 3, 8000),
+        ]:
+            audio = WavAudio(
+                frames=bytes([value, 0]) * (sample_rate // 2),
+                sample_rate=sample_rate,
+                sample_width=2,
+                channels=1,
+            )
+            (self.wav_dir / name).write_bytes(audio.to_wav())
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_concatenate(self):
+        """Test that files repeat until length and other formats are skipped"""
+        audio = LongAudio.from_corpus(self.wav_dir.glob("*.wav"), 1.75)
+        self.assertEqual([p.name for p in audio.wav_paths], ["a.wav", "b.wav"])
+
+        wav_bytes = b"".join(audio.chunks(chunk_size=1000))
+        with wave.open(io.BytesIO(wav_bytes), "rb") as wav_file:
+            self.assertEqual(wav_file.getframerate(), 16000)
+            self.assertEqual(wav_file.getnframes(), 28000)
+            frames = wav_file.readframes(wav_file.getnframes())
+
+        self.assertEqual(len(frames), audio.data_bytes)
+        self.assertEqual(len(wav_bytes), 44 + audio.data_bytes)
+
+        # a, b, a, b (half)
+        samples = frames[::2]
+        self.assertEqual(set(samples[:8000]), {1})
+        self.assertEqual(set(samples[8000:16000]), {2})
+        self.assertEqual(set(samples[16000:24000]), {1})
+        self.assertEqual(len(samples[24000:]), 4000)
+        self.assertEqual(set(samples[24000:]), {2})
+
+    def test_scaling(self):
+        """Test linear and quadratic scaling exponents"""
+        lengths = [1, 10, 100]
+        self.assertAlmostEqual(scaling_exponent(lengths, [0.5, 5, 50]), 1.0)
+        self.assertAlmostEqual(scaling_exponent(lengths, [1, 100, 10000]), 2.0)
+
+        summary = summarize_scaling(
+            [
+                {"audio_seconds": 10, "latency_seconds": 2.0},
+                {"audio_seconds": 10, "latency_seconds": 4.0},
+                {"audio_seconds": 1, "latency_seconds": 0.3},
+                {"audio_seconds": 100, "error": "timeout"},
+            ]
+        )
+        self.assertEqual([s["audio_seconds"] for s in summary["lengths"]], [1, 10])
+        self.assertAlmostEqual(summary["lengths"][1]["real_time_factor"], 0.3)
+        self.assertAlmostEqual(summary["latency_exponent"], 1.0)
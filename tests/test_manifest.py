@@ -0,0 +1,90 @@
+"""Tests for the corpus manifest."""
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from rhasspytest.audio import WavAudio
+from rhasspytest.manifest import Manifest
+
+
+def write_utterance(wav_dir: Path, name: str, seconds: float, intent: str):
+    """Write silent WAV and sidecar JSON."""
+    audio = WavAudio(
+        frames=bytes(int(16000 * seconds) * 2),
+        sample_rate=16000,
+        sample_width=2,
+        channels=1,
+    )
+    (wav_dir / f"{name}.wav").write_bytes(audio.to_wav())
+    (wav_dir / f"{name}.json").write_text(
+        json.dumps(
+            {
+                "text": name.replace("_", " "),
+                "intent": {"name": intent},
+                "entities": [{"entity": "name", "value": name}],
+            }
+        )
+    )
+
+
+class ManifestTests(unittest.TestCase):
+    """Test incremental updates and subset selection"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.wav_dir = Path(self.temp_dir.name) / "wav"
+        self.wav_dir.mkdir()
+        for index in range(20):
+            write_utterance(
+                self.wav_dir,
+                f"utterance_{index}",
+                seconds=0.1 * (index + 1),
+                intent="Even" if (index % 2) == 0 else "Odd",
+            )
+
+        self.manifest = Manifest(Path(self.temp_dir.name) / "manifest.db")
+
+    def tearDown(self):
+        self.manifest.close()
+        self.temp_dir.cleanup()
+
+    def test_update(self):
+        """Test that only changed files are read again"""
+        self.assertEqual(self.manifest.update(self.wav_dir)["added"], 20)
+        self.assertEqual(self.manifest.update(self.wav_dir)["unchanged"], 20)
+
+        write_utterance(self.wav_dir, "utterance_0", seconds=5, intent="Changed")
+        os.utime(self.wav_dir / "utterance_0.json", ns=(0, 0))
+        (self.wav_dir / "utterance_1.wav").unlink()
+
+        counts = self.manifest.update(self.wav_dir)
+        self.assertEqual(counts["updated"], 1)
+        self.assertEqual(counts["removed"], 1)
+        self.assertEqual(counts["unchanged"], 18)
+
+        (changed,) = self.manifest.select(intents=["Changed"])
+        self.assertEqual(changed.name, "utterance_0.wav")
+        self.assertAlmostEqual(changed.seconds, 5.0)
+        self.assertEqual(changed.sample_rate, 16000)
+        self.assertEqual(changed.text, "utterance 0")
+        self.assertEqual(changed.entities[0]["value"], "utterance_0")
+
+    def test_select(self):
+        """Test selection by intent, duration and stable sample"""
+        self.manifest.update(self.wav_dir)
+        self.assertEqual(len(self.manifest.select(intents=["Odd"])), 10)
+
+        short = self.manifest.select(intents=["Even"], max_seconds=1.0)
+        self.assertEqual(len(short), 5)
+        self.assertTrue(all(u.seconds <= 1.0 for u in short))
+
+        sample = self.manifest.select(sample=5)
+        self.assertEqual(len(sample), 5)
+        self.assertEqual(sample, self.manifest.select(sample=5))
+        self.assertNotEqual(sample, self.manifest.select(sample=5, seed=1))
+
+        # Larger samples contain smaller ones
+        larger = {u.name for u in self.manifest.select(sample=10)}
+        self.assertTrue({u.name for u in sample} <= larger)
@@ -0,0 +1,104 @@
+"""Tests for profile matrix generation and ranking."""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from rhasspytest.matrix import (
+    clean_variants,
+    collect_variants,
+    expand_axes,
+    format_table,
+    rank_variants,
+    write_variants,
+)
+
+
+class MatrixTests(unittest.TestCase):
+    """Test variants from axes"""
+
+    def test_expand(self):
+        """Test that settings of unselected systems don't duplicate variants"""
+        variants = expand_axes(
+            {
+                "intent.system": ["fsticuffs", "fuzzywuzzy"],
+                "intent.fuzzywuzzy.min_confidence": [0.5, 0.8],
+            },
+            {"dialogue.system": "rhasspy"},
+        )
+        self.assertEqual(
+            [v.name for v in variants],
+            [
+                "matrix_fsticuffs",
+                "matrix_fuzzywuzzy_0.5",
+                "matrix_fuzzywuzzy_0.8",
+            ],
+        )
+        self.assertEqual(
+            variants[1].settings,
+            {
+                "dialogue.system": "rhasspy",
+                "intent.system": "fuzzywuzzy",
+                "intent.fuzzywuzzy.min_confidence": 0.5,
+            },
+        )
+
+    def test_write_and_collect(self):
+        """Test variant directories and collected metrics"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            profiles_dir = Path(temp_dir) / "profiles"
+            output_dir = Path(temp_dir) / "output"
+            base_dir = profiles_dir / "test_base"
+            (base_dir / "tests").mkdir(parents=True)
+            (base_dir / "profile.json").write_text(
+                json.dumps({"wake": {"system": "raven", "raven": {"x": 1}}})
+            )
+            (base_dir / "custom_words.txt").write_text("okay O K")
+
+            variants = expand_axes({"speech_to_text.system": ["kaldi", "pocketsphinx"]})
+            variant_dirs = write_variants(variants, profiles_dir, base_dir)
+
+            kaldi_dir = variant_dirs[0]
+            profile = json.loads((kaldi_dir / "profile.json").read_text())
+            self.assertEqual(profile["speech_to_text"], {"system": "kaldi"})
+            self.assertEqual(profile["wake"]["raven"], {"x": 1})
+            self.assertTrue((kaldi_dir / "custom_words.txt").is_file())
+            self.assertFalse((kaldi_dir / "tests").exists())
+            self.assertIn("WAKE_SYSTEM=raven", (kaldi_dir / "env").read_text())
+
+            run_dir = output_dir / kaldi_dir.name
+            run_dir.mkdir(parents=True)
+            (run_dir / "report.json").write_text(json.dumps({"intent_accuracy": 1}))
+            (run_dir / "resources.json").write_text(json.dumps({"rss_bytes": 100}))
+
+            rows = collect_variants(profiles_dir, output_dir)
+            self.assertEqual(len(rows), 2)
+            self.assertEqual(
+                rows[0]["metrics"], {"intent_accuracy": 1.0, "rss_bytes": 100.0}
+            )
+            self.assertEqual(rows[1]["metrics"], {})
+
+            # Base profile is kept
+            removed = clean_variants(profiles_dir)
+            self.assertEqual(len(removed), 2)
+            self.assertTrue(base_dir.is_dir())
+
+    def test_rank(self):
+        """Test ranking and Pareto front"""
+        rows = [
+            {"name": "slow", "settings": {}, "metrics": {"acc": 0.9, "rss_bytes": 9}},
+            {"name": "best", "settings": {}, "metrics": {"acc": 0.9, "rss_bytes": 1}},
+            {"name": "small", "settings": {}, "metrics": {"acc": 0.5, "rss_bytes": 0}},
+            {"name": "failed", "settings": {}, "metrics": {}},
+        ]
+        ranked = rank_variants(
+            rows, rank_metrics=["acc", "rss_bytes"], pareto_metrics=["acc", "rss_bytes"]
+        )
+        self.assertEqual(
+            [(r["name"], r["pareto"]) for r in ranked],
+            [("best", True), ("slow", False), ("small", True), ("failed", False)],
+        )
+
+        table = format_table(ranked, ["acc"]).splitlines()
+        self.assertEqual(len(table), 5)
+        self.assertTrue(table[1].startswith("1*"))
@@ -0,0 +1,87 @@
+"""Tests for binary MQTT logs."""
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from rhasspytest.mqtt_log import (
+    LogFormatError,
+    MqttLogWriter,
+    read_log,
+    summarize_log,
+    topic_matches,
+)
+
+
+class MqttLogTests(unittest.TestCase):
+    """Test writing and reading MQTT logs"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_path = Path(self.temp_dir.name) / "mqtt.log"
+        self.audio = os.urandom(2048)
+
+        with MqttLogWriter(self.log_path, start_time=100.0) as writer:
+            writer.write("hermes/hotword/toggleOn", b'{"siteId": "default"}', 100.5)
+            writer.write("hermes/audioServer/default/audioFrame", self.audio, 101.0)
+            writer.write("hermes/hotword/toggleOn", b"", 102.25, qos=1, retain=True)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        """Test that messages are read back with timing and flags"""
+        messages = list(read_log(self.log_path))
+        self.assertEqual(
+            [(m.timestamp, m.topic) for m in messages],
+            [
+                (0.5, "hermes/hotword/toggleOn"),
+                (1.0, "hermes/audioServer/default/audioFrame"),
+                (2.25, "hermes/hotword/toggleOn"),
+            ],
+        )
+        self.assertEqual(messages[1].payload, self.audio)
+        self.assertEqual((messages[0].qos, messages[0].retain), (0, False))
+        self.assertEqual((messages[2].qos, messages[2].retain), (1, True))
+
+    def test_compact(self):
+        """Test that payloads are stored raw and topics only once"""
+        size = self.log_path.stat().st_size
+        topics = len("hermes/hotword/toggleOn") + len(
+            "hermes/audioServer/default/audioFrame"
+        )
+        self.assertLess(size, len(self.audio) + topics + 100)
+
+    def test_truncated(self):
+        """Test that a record cut short at the end is ignored"""
+        data = self.log_path.read_bytes()
+        self.log_path.write_bytes(data[:-1])
+        self.assertEqual(len(list(read_log(self.log_path))), 2)
+
+        # Cut inside audio payload
+        self.log_path.write_bytes(data[:-1000])
+        self.assertEqual(len(list(read_log(self.log_path))), 1)
+
+    def test_not_a_log(self):
+        """Test that other files are rejected"""
+        self.log_path.write_bytes(b"{}")
+        with self.assertRaises(LogFormatError):
+            list(read_log(self.log_path))
+
+    def test_summary(self):
+        """Test per-topic counts"""
+        summary = summarize_log(self.log_path)
+        self.assertEqual(summary["messages"], 3)
+        self.assertEqual(summary["seconds"], 2.25)
+        self.assertEqual(
+            summary["topics"]["hermes/audioServer/default/audioFrame"],
+            {"messages": 1, "bytes": len(self.audio)},
+        )
+
+    def test_topic_matches(self):
+        """Test topic filters with wildcards"""
+        topic = "hermes/audioServer/default/audioFrame"
+        self.assertTrue(topic_matches(topic, ["hermes/audioServer/+/audioFrame"]))
+        self.assertTrue(topic_matches(topic, ["hermes/hotword/#", "hermes/#"]))
+        self.assertFalse(topic_matches(topic, ["hermes/hotword/#"]))
+        self.assertFalse(topic_matches(topic, []))
@@ -0,0 +1,88 @@
+"""Tests for mixed workload scenarios."""
+import unittest
+from pathlib import Path
+
+from rhasspytest.scenario import (
+    RetrainWorkload,
+    Sample,
+    TextToIntentWorkload,
+    WakeWorkload,
+    load_scenario,
+    make_workloads,
+    summarize_workload,
+)
+
+SCENARIOS_DIR = Path(__file__).parent.parent / "scenarios"
+
+
+class ScenarioTests(unittest.TestCase):
+    """Test workload creation and interference reports"""
+
+    def test_example(self):
+        """Test that example scenario is valid"""
+        for scenario_path in SCENARIOS_DIR.glob("*.json"):
+            scenario = load_scenario(scenario_path)
+            workloads = make_workloads(scenario["workloads"])
+            self.assertEqual(
+                len({w.name for w in workloads}), len(workloads), scenario_path
+            )
+
+    def test_make_workloads(self):
+        """Test types, unique names and target rates"""
+        workloads = make_workloads(
+            [
+                {"type": "text_to_intent", "rate": 5},
+                {"type": "text_to_intent", "rate": 2},
+                {"type": "wake", "name": "sat", "satellites": 4, "interval": 8},
+            ]
+        )
+        self.assertEqual(
+            [w.name for w in workloads], ["text_to_intent", "text_to_intent2", "sat"]
+        )
+        self.assertIsInstance(workloads[0], TextToIntentWorkload)
+        self.assertIsInstance(workloads[2], WakeWorkload)
+        self.assertEqual(workloads[2].target_rate, 0.5)
+        self.assertEqual(workloads[2].site_ids, ["sat1", "sat2", "sat3", "sat4"])
+
+        with self.assertRaises(ValueError):
+            make_workloads([{"type": "unknown"}])
+
+        with self.assertRaises(ValueError):
+            make_workloads([{"type": "speech_to_text", "rate": 0}])
+
+    def test_arrivals(self):
+        """Test open-loop schedules"""
+        (workload,) = make_workloads([{"type": "text_to_intent", "rate": 4}])
+        self.assertEqual(list(workload.arrivals(10.0, 11.0)), [10, 10.25, 10.5, 10.75])
+
+        (poisson,) = make_workloads(
+            [{"type": "text_to_intent", "rate": 100, "poisson": True}]
+        )
+        arrivals = list(poisson.arrivals(0.0, 10.0))
+        self.assertAlmostEqual(len(arrivals) / 10, 100, delta=15)
+        self.assertEqual(arrivals, list(poisson.arrivals(0.0, 10.0)))
+
+    def test_training_interference(self):
+        """Test latency split by overlap with training"""
+        (workload,) = make_workloads([{"type": "text_to_intent", "rate": 1}])
+        for second in range(10):
+            # Slow while training (seconds 4-6)
+            latency = 1.0 if 4 <= second <= 6 else 0.1
+            workload.record(Sample(second, second, second + latency))
+
+        workload.record(Sample(8.5, 8.5, 9.0, error="500"))
+        workload.record(Sample(-1.0, -1.0, 0.0))  # warmup
+
+        report = summarize_workload(workload, 0.0, 10.0, [(4.5, 6.5)])
+        self.assertEqual(report["count"], 11)
+        self.assertEqual(report["errors"], 1)
+        self.assertAlmostEqual(report["achieved_rate"], 1.0)
+        self.assertEqual(report["during_training"]["count"], 3)
+        self.assertEqual(report["outside_training"]["count"], 7)
+        self.assertAlmostEqual(report["training_slowdown"], 10.0)
+
+        (retrain,) = make_workloads([{"type": "retrain", "interval": 60}])
+        self.assertIsInstance(retrain, RetrainWorkload)
+        self.assertNotIn(
+            "during_training", summarize_workload(retrain, 0.0, 10.0, [(4.5, 6.5)])
+        )
@@ -0,0 +1,135 @@
+"""Tests for history-driven scheduling."""
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from rhasspytest.history import HistoryStore, Outcome
+from rhasspytest.schedule import (
+    STATUS_CANCELLED,
+    STATUS_FAILED,
+    STATUS_PASSED,
+    Job,
+    JobPool,
+    order_jobs,
+    order_tests,
+    plan,
+    predict_job,
+    predict_jobs,
+    schedule_report,
+)
+
+
+class ScheduleTests(unittest.TestCase):
+    """Test predictions, ordering, packing and fail-fast runs"""
+
+    def test_predict(self):
+        """Test duration, failure rate and change detection from history"""
+        outcomes = [
+            Outcome("", True, 100.0, "abc"),
+            Outcome("", False, 5.0, "abc"),
+            Outcome("", True, 120.0, "abc"),
+        ]
+        job = predict_job("test_kaldi", outcomes, "abc")
+        self.assertEqual(job.predicted_seconds, 110.0)
+        self.assertAlmostEqual(job.failure_rate, 1 / 3)
+        self.assertFalse(job.changed)
+
+        self.assertTrue(predict_job("test_kaldi", outcomes, "def").changed)
+        self.assertTrue(predict_job("test_new", [], "abc").changed)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with HistoryStore(Path(temp_dir) / "history.db") as store:
+                store.record_outcomes(
+                    "en", "test_kaldi", [Outcome("", True, 100.0, "abc")]
+                )
+                jobs = predict_jobs(
+                    store, "en", {"test_kaldi": "abc", "test_new": None}
+                )
+
+        # Profile without history takes as long as the others
+        self.assertEqual([job.predicted_seconds for job in jobs], [100.0, 100.0])
+        self.assertEqual([job.risk for job in jobs], [0.0, 0.5])
+
+    def test_order_and_plan(self):
+        """Test that risky jobs go first and the rest are packed"""
+        jobs = [
+            Job("short", 10.0, changed=False),
+            Job("long", 40.0, changed=False),
+            Job("medium", 20.0, changed=False),
+            Job("flaky", 30.0, failure_rate=0.5, changed=False),
+            Job("changed", 10.0, changed=True),
+        ]
+        ordered = order_jobs(jobs)
+        self.assertEqual(
+            [job.name for job in ordered],
+            ["changed", "flaky", "long", "medium", "short"],
+        )
+
+        slots = plan(ordered, workers=2)
+        self.assertEqual(
+            [(s.job.name, s.worker, s.start_seconds) for s in slots],
+            [
+                ("changed", 0, 0.0),
+                ("flaky", 1, 0.0),
+                ("long", 0, 10.0),
+                ("medium", 1, 30.0),
+                ("short", 0, 50.0),
+            ],
+        )
+        self.assertEqual(max(s.end_seconds for s in slots), 60.0)
+
+    def test_order_tests(self):
+        """Test that failing tests of a profile move to the front"""
+
+        class FakeTests(unittest.TestCase):
+            """Two tests of a profile"""
+
+            def test_a(self):
+                pass
+
+            def test_b(self):
+                pass
+
+        cases = list(unittest.TestLoader().loadTestsFromTestCase(FakeTests))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with HistoryStore(Path(temp_dir) / "history.db") as store:
+                store.record_outcomes(
+                    "en",
+                    "test_kaldi",
+                    [
+                        Outcome(cases[0].id(), True, 1.0),
+                        Outcome(cases[1].id(), False, 1.0),
+                    ],
+                )
+                ordered = order_tests(cases, store, "en", "test_kaldi")
+
+        self.assertEqual(
+            [case.id() for case in ordered], [cases[1].id(), cases[0].id()]
+        )
+
+    def test_fail_fast(self):
+        """Test that the first failure stops running and waiting jobs"""
+        jobs = [Job("fail", 0.1), Job("slow", 10.0), Job("never", 1.0)]
+        commands = {
+            "fail": ["sh", "-c", "sleep 0.2; exit 1"],
+            "slow": ["sleep", "10"],
+            "never": ["true"],
+        }
+        pool = JobPool(
+            lambda job: commands[job.name],
+            workers=2,
+            fail_fast=True,
+            stream=io.StringIO(),
+        )
+        self.assertFalse(pool.run(jobs))
+        self.assertLess(pool.wall_seconds, 5)
+
+        statuses = {slot.job.name: slot.status for slot in pool.slots}
+        self.assertEqual(statuses, {"fail": STATUS_FAILED, "slow": STATUS_CANCELLED})
+
+        report = schedule_report(plan(jobs, 2), pool.slots, 2, fail_fast=True)
+        self.assertEqual(report["first_failure"]["name"], "fail")
+        self.assertEqual(report["not_run"], ["never"])
+        self.assertEqual(report["counts"][STATUS_PASSED], 0)
+        self.assertIsNone(report["jobs"][2]["actual"])
@@ -0,0 +1,101 @@
+"""Tests for local scoring of recognition results."""
+import json
+import unittest
+from pathlib import Path
+
+from rhasspytest.scoring import compare_reports, rescore_report, score, word_errors
+
+_OUTPUT_DIR = Path(__file__).parent.parent / "output"
+
+
+class WordErrorTests(unittest.TestCase):
+    """Test alignments against server results"""
+
+    def test_differences(self):
+        """Test markers and counts of aligned words"""
+        (word_error,) = word_errors(
+            [["encender", "la", "luz", "del", "garaje"]],
+            [["enciende", "la", "del", "estar", "hace", "es"]],
+        )
+        self.assertEqual(
+            word_error.differences,
+            ["encender:enciende", "la", "+del", "luz:estar", "del:hace", "garaje:es"],
+        )
+        self.assertEqual(word_error.insertions, 1)
+        self.assertEqual(word_error.substitutions, 4)
+        self.assertEqual(word_error.matches, 1)
+        self.assertEqual(word_error.errors, 5)
+        self.assertEqual(word_error.error_rate, 1)
+
+    def test_leading_deletion(self):
+        """Test that leading deletions are counted in errors only"""
+        deleted, middle = word_errors(
+            [["che", "ore", "sono"], ["quelle", "est", "la", "température"]],
+            [["ore", "sono"], ["quelle", "la", "température"]],
+        )
+        self.assertEqual(deleted.differences, ["ore", "sono"])
+        self.assertEqual(deleted.deletions, 0)
+        self.assertEqual(deleted.errors, 1)
+        self.assertEqual(deleted.error_rate, 0)
+
+        self.assertEqual(middle.differences, ["quelle", "-est", "la", "température"])
+        self.assertEqual(middle.deletions, 1)
+        self.assertEqual(middle.error_rate, 0.25)
+
+    def test_batches(self):
+        """Test that results keep input order across batches"""
+        references = [["a"] * n for n in range(10)]
+        hypotheses = [["a", "b"] for _ in range(10)]
+        errors = word_errors(references, hypotheses, batch_size=3)
+        self.assertEqual([e.words for e in errors], list(range(10)))
+        self.assertEqual(errors[0].errors, 2)
+        self.assertEqual(errors[1].differences, ["a", "+b"])
+
+
+class ScoreTests(unittest.TestCase):
+    """Test intent/entity scoring"""
+
+    def test_entities(self):
+        """Test missing and wrong entities"""
+        expected = {
+            "a.wav": {
+                "raw_text": "set it to red",
+                "intent": {"name": "SetColor"},
+                "entities": [
+                    {"entity": "color", "value": "red"},
+                    {"entity": "name", "value": "lamp"},
+                ],
+            },
+            "b.wav": {"raw_text": "what time is it", "intent": {"name": "GetTime"}},
+        }
+        actual = {
+            "a.wav": {
+                "raw_text": "set it to blue",
+                "intent": {"name": "SetColor"},
+                "entities": [{"entity": "color", "value": "blue"}],
+            },
+            "b.wav": {"raw_text": "what time is it", "intent": {"name": ""}},
+        }
+        report = score(expected, actual)
+        result = report["actual"]["a.wav"]
+        self.assertEqual(result["missing_entities"], expected["a.wav"]["entities"])
+        self.assertEqual(result["wrong_entities"], actual["a.wav"]["entities"])
+        self.assertEqual(report["correct_intent_names"], 1)
+        self.assertEqual(report["correct_intent_and_entities"], 0)
+        self.assertEqual(report["num_entities"], 2)
+        self.assertEqual(report["correct_transcriptions"], 1)
+        self.assertEqual(report["transcription_accuracy"], 7 / 8)
+
+    def test_reports(self):
+        """Test that saved server reports are reproduced"""
+        report_paths = sorted(_OUTPUT_DIR.glob("*/*/report.json"))
+        if not report_paths:
+            self.skipTest("No reports in output directory")
+
+        for report_path in report_paths:
+            with open(report_path, "r") as report_file:
+                report = json.load(report_file)
+
+            self.assertEqual(
+                compare_reports(report, rescore_report(report)), [], str(report_path)
+            )
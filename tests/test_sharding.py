@@ -0,0 +1,174 @@
+"""Tests for sharded evaluation across replicas."""
+import json
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+from rhasspytest import RhasspyConnection
+from rhasspytest.archive import CorpusArchive
+from rhasspytest.scoring import compare_reports, score
+from rhasspytest.sharding import (
+    ShardError,
+    evaluate_sharded,
+    merge_reports,
+    replica_connections,
+    split_archive,
+)
+
+
+def _result(text: str, intent_name: str, transcribe_seconds: float):
+    return {
+        "raw_text": text,
+        "text": text,
+        "intent": {"name": intent_name},
+        "entities": [],
+        "wav_seconds": 2.0,
+        "transcribe_seconds": transcribe_seconds,
+    }
+
+
+class FakeReplica(BaseHTTPRequestHandler):
+    """/api/evaluate that returns an empty report (or fails) after a delay"""
+
+    delay = 0.05
+    fail = False
+
+    def do_POST(self):
+        # Archive is streamed with chunked encoding
+        while True:
+            size = int(self.rfile.readline().strip(), 16)
+            self.rfile.read(size + 2)
+            if size == 0:
+                break
+
+        time.sleep(self.delay)
+        if self.fail:
+            self.send_error(500)
+            return
+
+        body = json.dumps({"expected": {}, "actual": {}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FailingReplica(FakeReplica):
+    """Replica whose evaluations fail (after the other replica is done)"""
+
+    delay = 0.3
+    fail = True
+
+
+def _start_server(handler) -> HTTPServer:
+    server = HTTPServer(("localhost", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class ShardingTests(unittest.TestCase):
+    """Test shard assignment and merged reports"""
+
+    def test_split(self):
+        """Test that utterances stay together in stable shards"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            wav_dir = Path(temp_dir)
+            for i in range(20):
+                (wav_dir / f"utt{i}.wav").write_bytes(b"RIFF")
+                (wav_dir / f"utt{i}.json").write_text("{}")
+
+            archive = CorpusArchive.from_dir(wav_dir)
+            shards = split_archive(archive, 3)
+            again = split_archive(CorpusArchive.from_dir(wav_dir), 3)
+
+        self.assertEqual(sum(shard.utterances for shard in shards), 20)
+        self.assertGreater(len(shards), 1)
+        for shard, same_shard in zip(shards, again):
+            names = [m.name for m in shard.archive.members]
+            self.assertEqual(names, [m.name for m in same_shard.archive.members])
+            self.assertEqual(
+                sorted(Path(n).stem for n in names if n.endswith(".wav")),
+                sorted(Path(n).stem for n in names if n.endswith(".json")),
+            )
+
+    def test_merge(self):
+        """Test that merged summary fields match scoring all results at once"""
+        expected = {
+            "a.wav": _result("turn on the light", "ChangeLightState", 0),
+            "b.wav": _result("what time is it", "GetTime", 0),
+            "c.wav": _result("how hot is it", "GetTemperature", 0),
+        }
+        actual = {
+            "a.wav": _result("turn on light", "ChangeLightState", 0.5),
+            "b.wav": _result("what time is it", "GetTime", 0.1),
+            "c.wav": _result("how cold is it", "GetGarageState", 1.0),
+        }
+        full_report = score(expected, actual)
+
+        shard_reports = []
+        for replica, keys in enumerate([["a.wav", "b.wav"], ["c.wav"]]):
+            # Each replica reports its own extraction path
+            shard_report = score(
+                {k: expected[k] for k in keys}, {k: actual[k] for k in keys}
+            )
+            for field in ["expected", "actual"]:
+                shard_report[field] = {
+                    f"/tmp/replica{replica}/{k}": v
+                    for k, v in shard_report[field].items()
+                }
+
+            shard_reports.append(shard_report)
+
+        merged = merge_reports(shard_reports)
+        self.assertEqual(compare_reports(full_report, merged), [])
+        self.assertAlmostEqual(merged["intent_accuracy"], 2 / 3)
+        self.assertEqual(merged["correct_words"], 3 + 4 + 3)
+        self.assertAlmostEqual(
+            merged["average_transcription_speedup"], (4 + 20 + 2) / 3
+        )
+
+    def test_failed_replicas(self):
+        """Test that shards no replica could evaluate are reported"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            wav_path = Path(temp_dir) / "a.wav"
+            wav_path.write_bytes(b"RIFF")
+            archive = CorpusArchive.from_paths([wav_path])
+
+            # Nothing listens on port 1
+            connections = replica_connections(RhasspyConnection(http_port=1), [1])
+            self.assertEqual(len(connections), 2)
+            with self.assertRaises(ShardError):
+                evaluate_sharded(connections, archive, timeout=5)
+
+    def test_retry(self):
+        """Test that a failed shard is retried after the queue was empty"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            wav_dir = Path(temp_dir)
+            for i in range(20):
+                (wav_dir / f"utt{i}.wav").write_bytes(b"RIFF")
+
+            archive = CorpusArchive.from_dir(wav_dir)
+
+            # Each replica takes one shard, the healthy one finishes first
+            servers = [_start_server(FakeReplica), _start_server(FailingReplica)]
+            try:
+                connections = replica_connections(
+                    RhasspyConnection(http_port=servers[0].server_port),
+                    [servers[1].server_port],
+                )
+                _, shards = evaluate_sharded(connections, archive, timeout=5)
+            finally:
+                for server in servers:
+                    server.shutdown()
+                    server.server_close()
+
+        self.assertEqual(len(shards), 2)
+        self.assertEqual([shard.replica for shard in shards], [0, 0])
+        self.assertEqual(sum(len(shard.errors) for shard in shards), 1)
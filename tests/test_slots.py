@@ -0,0 +1,21 @@
+"""Tests for slot list generation."""
+import unittest
+
+from rhasspytest.slots import make_slot_values
+
+
+class SlotValuesTests(unittest.TestCase):
+    """Test synthetic slot values"""
+
+    def test_make_slot_values(self):
+        """Test that values are unique and grow longer when needed"""
+        values = make_slot_values(["lamp", "on", "off"], 20)
+        self.assertEqual(len(values), 20)
+        self.assertEqual(len(set(values)), 20)
+        self.assertEqual(values[0], "lamp lamp")
+        self.assertEqual(len(values[-1].split()), 3)
+
+    def test_too_few_words(self):
+        """Test that a single word is rejected"""
+        with self.assertRaises(ValueError):
+            make_slot_values(["lamp"], 10)
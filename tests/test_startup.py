@@ -0,0 +1,35 @@
+"""Tests for readiness probes."""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from rhasspytest.startup import find_probe_sample
+
+
+class StartupTests(unittest.TestCase):
+    """Test probe sample selection"""
+
+    def test_probe_sample(self):
+        """Test that the expected text and intent come from the sidecar"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            wav_dir = Path(temp_dir)
+            self.assertEqual(find_probe_sample(wav_dir), (None, "", ""))
+
+            # No WAV file
+            (wav_dir / "a.json").write_text("{}")
+            (wav_dir / "b.wav").write_bytes(b"RIFF")
+            (wav_dir / "b.json").write_text(
+                json.dumps(
+                    {
+                        "text": "what time is it",
+                        "raw_text": "what time is it",
+                        "intent": {"name": "GetTime"},
+                    }
+                )
+            )
+
+            self.assertEqual(
+                find_probe_sample(wav_dir),
+                (wav_dir / "b.wav", "what time is it", "GetTime"),
+            )
@@ -0,0 +1,50 @@
+"""Tests for benchmark statistics."""
+import unittest
+
+from rhasspytest.stats import (
+    bootstrap_ci,
+    bucket_label,
+    bucket_labels,
+    linear_slope,
+    median,
+    percentile,
+    summarize,
+)
+
+
+class StatsTests(unittest.TestCase):
+    """Test summary statistics"""
+
+    def test_percentile(self):
+        """Test linear interpolation between ranks"""
+        values = [4, 1, 3, 2]
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile(values, 100), 4)
+        self.assertEqual(median(values), 2.5)
+        self.assertAlmostEqual(percentile(list(range(101)), 95), 95)
+
+    def test_bootstrap_ci(self):
+        """Test that interval contains median and is reproducible"""
+        values = [float(v % 7) for v in range(50)]
+        low, high = bootstrap_ci(values, resamples=200)
+        self.assertLessEqual(low, median(values))
+        self.assertGreaterEqual(high, median(values))
+        self.assertEqual((low, high), bootstrap_ci(values, resamples=200))
+
+    def test_summarize_empty(self):
+        """Test summary without values"""
+        self.assertEqual(summarize([]), {"count": 0})
+
+    def test_buckets(self):
+        """Test wav_seconds bucket names"""
+        edges = [1.0, 2.5]
+        self.assertEqual(bucket_labels(edges), ["0-1", "1-2.5", "2.5+"])
+        self.assertEqual(bucket_label(0.5, edges), "0-1")
+        self.assertEqual(bucket_label(1.0, edges), "1-2.5")
+        self.assertEqual(bucket_label(10, edges), "2.5+")
+
+    def test_linear_slope(self):
+        """Test least-squares slope"""
+        self.assertAlmostEqual(linear_slope([0, 1, 2, 3], [1, 3, 5, 7]), 2)
+        self.assertIsNone(linear_slope([1], [1]))
+        self.assertIsNone(linear_slope([1, 1], [1, 2]))
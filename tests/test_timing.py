@@ -0,0 +1,123 @@
+"""Tests for per-test wait timing."""
+import asyncio
+import io
+import queue
+import threading
+import unittest
+import xml.etree.ElementTree as ET
+
+from rhasspytest.async_runner import AsyncTestRunner, junit_xml, summarize_outcomes
+from rhasspytest.testing import shares
+from rhasspytest.timing import (
+    CATEGORY_HTTP,
+    CATEGORY_TRAIN,
+    WaitTiming,
+    http_category,
+    instrument,
+    merged_seconds,
+    timing_scope,
+)
+
+
+class TimingTests(unittest.TestCase):
+    """Test wait interval bookkeeping"""
+
+    def test_merged_seconds(self):
+        """Test that overlapping intervals are counted once"""
+        self.assertEqual(merged_seconds([]), 0.0)
+        self.assertAlmostEqual(merged_seconds([(0, 2), (1, 3), (5, 6)]), 4.0)
+        self.assertAlmostEqual(merged_seconds([(0, 4), (1, 2)]), 4.0)
+
+    def test_http_category(self):
+        """Test that training is separated from other HTTP calls"""
+        self.assertEqual(http_category("http://localhost:12101/api/train"), "train")
+        self.assertEqual(
+            http_category("http://localhost:12101/api/text-to-intent"), CATEGORY_HTTP
+        )
+        self.assertEqual(CATEGORY_TRAIN, "train")
+
+    def test_breakdown(self):
+        """Test async waits are attributed to websockets only if one was opened"""
+        timing = WaitTiming()
+        timing.add("http", 0.0, 1.0)
+        timing.add("async", 1.0, 3.0)
+        breakdown = timing.breakdown(4.0)
+        self.assertAlmostEqual(breakdown["mqtt_seconds"], 2.0)
+        self.assertAlmostEqual(breakdown["websocket_seconds"], 0.0)
+        self.assertAlmostEqual(breakdown["other_seconds"], 1.0)
+
+        timing.opened_websocket = True
+        breakdown = timing.breakdown(4.0)
+        self.assertAlmostEqual(breakdown["websocket_seconds"], 2.0)
+        self.assertEqual(breakdown["websocket_calls"], 1)
+
+    def test_instrument_thread(self):
+        """Test that blocking waits are recorded only in a timing scope"""
+        messages: queue.Queue = queue.Queue()
+        timing = WaitTiming()
+        with instrument():
+            messages.put(1)
+            messages.get(timeout=1)
+            with timing_scope(timing):
+                messages.put(2)
+                messages.get(timeout=1)
+                threading.Event().wait(timeout=0.01)
+
+        self.assertEqual([i[0] for i in timing.intervals], ["mqtt", "mqtt"])
+        self.assertIsNot(queue.Queue.get.__name__, "wrapper")
+
+
+def make_cases():
+    """Fake integration tests that wait on MQTT-like queues."""
+
+    class FakeTests(unittest.TestCase):
+        """Tests that wait in different ways"""
+
+        @shares()
+        def test_queue(self):
+            messages: queue.Queue = queue.Queue()
+            threading.Timer(0.1, lambda: messages.put(1)).start()
+            messages.get(timeout=5)
+
+        @shares()
+        def test_wait_for(self):
+            asyncio.get_event_loop().run_until_complete(self.async_test_wait_for())
+
+        async def async_test_wait_for(self):
+            await asyncio.wait_for(asyncio.sleep(0.1), timeout=5)
+
+        def test_skip(self):
+            self.skipTest("not supported")
+
+    return list(unittest.TestLoader().loadTestsFromTestCase(FakeTests))
+
+
+class RunnerTimingTests(unittest.TestCase):
+    """Test timing summary and JUnit output of the test runner"""
+
+    def test_reports(self):
+        """Test waits of concurrent tests are kept apart"""
+        runner = AsyncTestRunner(stream=io.StringIO())
+        self.assertTrue(runner.run(make_cases()))
+
+        summary = summarize_outcomes(runner.outcomes, runner.wall_seconds)
+        self.assertEqual(summary["num_tests"], 3)
+        tests = {t["id"].split(".")[-1]: t for t in summary["tests"]}
+        self.assertEqual(tests["test_queue"]["mqtt_calls"], 1)
+        self.assertGreaterEqual(tests["test_queue"]["mqtt_seconds"], 0.05)
+        self.assertEqual(tests["test_wait_for"]["mqtt_calls"], 1)
+        self.assertEqual(tests["test_skip"]["mqtt_calls"], 0)
+
+        seconds = [t["seconds"] for t in summary["tests"]]
+        self.assertEqual(seconds, sorted(seconds, reverse=True))
+        self.assertEqual([t["rank"] for t in summary["tests"]], [1, 2, 3])
+
+        suite = ET.fromstring(
+            ET.tostring(junit_xml(runner.outcomes, runner.wall_seconds).getroot())
+        )
+        self.assertEqual(suite.get("tests"), "3")
+        self.assertEqual(suite.get("skipped"), "1")
+        self.assertEqual(len(suite.findall("testcase/skipped")), 1)
+        self.assertIsNotNone(
+            suite.find("testcase/properties/property[@name='mqtt_seconds']")
+        )
@@ -0,0 +1,84 @@
+"""Tests for websocket bridge benchmark analysis."""
+import base64
+import json
+import unittest
+
+from rhasspytest.ws_bridge import (
+    BridgeStage,
+    analyze_stage,
+    classify,
+    make_payload,
+    make_stages,
+    parse_seq,
+)
+
+
+class PayloadTests(unittest.TestCase):
+    """Test payloads and sequence numbers"""
+
+    def test_sizes(self):
+        """Test that payloads have the requested size"""
+        for kind in ["json", "wav"]:
+            payload = make_payload(kind, 42, 4096)
+            self.assertEqual(len(payload), 4096, kind)
+            self.assertEqual(parse_seq(payload), 42, kind)
+
+        # Bridge only forwards JSON, so WAV audio is base64 encoded
+        wav = base64.b64decode(json.loads(make_payload("wav", 1, 4096))["wav"])
+        self.assertTrue(wav.startswith(b"RIFF"))
+        self.assertGreater(len(wav), 3000)
+
+    def test_bridge_messages(self):
+        """Test sequence numbers in messages forwarded by the bridge"""
+        payload = json.loads(make_payload("json", 7, 100))
+        self.assertEqual(parse_seq(json.dumps({"topic": "t", "payload": payload})), 7)
+        self.assertEqual(
+            parse_seq(json.dumps({"topic": "t", "payload": json.dumps(payload)})), 7
+        )
+        self.assertIsNone(parse_seq(json.dumps({"topic": "t", "payload": "abc"})))
+        self.assertIsNone(parse_seq(b"\xff\xfe"))
+
+
+class AnalysisTests(unittest.TestCase):
+    """Test stage results and behavior classification"""
+
+    def test_keeping_up(self):
+        """Test throughput and latency of a complete stage"""
+        stage = BridgeStage(kind="json", payload_bytes=100, messages=10)
+        send_times = {seq: seq * 0.1 for seq in range(10)}
+        receipts = [(seq, (seq * 0.1) + 0.01, 100) for seq in range(10)]
+        result = analyze_stage(stage, send_times, receipts)
+
+        self.assertEqual(result["received"], 10)
+        self.assertEqual(result["dropped"], 0)
+        self.assertAlmostEqual(result["latency_seconds"]["median"], 0.01)
+        self.assertAlmostEqual(result["bytes_per_second"], 1000 / 0.91)
+        self.assertEqual(result["behavior"], "keeping_up")
+
+    def test_dropping(self):
+        """Test missing, duplicate and reordered messages"""
+        stage = BridgeStage(kind="wav", payload_bytes=100, messages=4)
+        send_times = {seq: 0.0 for seq in range(4)}
+        receipts = [(1, 0.1, 100), (0, 0.2, 100), (0, 0.3, 100)]
+        result = analyze_stage(stage, send_times, receipts)
+
+        self.assertEqual(result["dropped"], 2)
+        self.assertEqual(result["duplicates"], 1)
+        self.assertEqual(result["out_of_order"], 1)
+        self.assertEqual(result["behavior"], "dropping")
+
+    def test_classify(self):
+        """Test behavior rules"""
+        self.assertEqual(classify(0, 2.0, 0.01, 0.01), "stalling")
+        self.assertEqual(classify(5, 2.0, 0.01, 0.01, closed=True), "closed")
+        self.assertEqual(classify(0, 0.1, 0.01, 0.5), "buffering")
+        self.assertEqual(classify(0, 0.1, 0.01, 0.03), "keeping_up")
+
+    def test_stages(self):
+        """Test fewer messages for large payloads"""
+        stages = make_stages(
+            ["json"], [100, 1000], [0], [0, 0.1], messages=50, max_stage_bytes=10000
+        )
+        self.assertEqual(len(stages), 4)
+        self.assertEqual([s.messages for s in stages[:2]], [50, 10])
+        self.assertEqual([s.read_delay for s in stages], [0, 0, 0.1, 0.1])